@@ -14,24 +14,50 @@ from opencmiss.zinc.region import Region
 from opencmiss.zinc.result import RESULT_OK
 from opencmiss.zinc.streamregion import StreaminformationRegion
 from opencmiss.zinc.spectrum import Spectrumcomponent
+from zincview_timeseries import ZincRegion_bindTimeSeriesStore
+from zincview_decimate import ZincRegion_readTimesteps
+import os
+
+# numbered node files ZincView re-reads when new or modified while watching
+# model files: (pattern, time per number)
+watch_timesteps = [("heart{:0>4}.exnode", 1.0/50.0)]
+
+# if present, node parameters are taken from this memory-mapped store
+# instead of reading all exnode files; only a few times around the current
+# time are copied into Zinc, the rest are read from the store as the time
+# changes. Create it with:
+# python zincview_timeseries.py deforming_heart.zvstore --time-step 0.02 heart00*.exnode
+time_series_store = "deforming_heart.zvstore"
 
 def loadModel(region):
     '''
     Read time-varying deforming heart model.
     Define strains fields and make some graphics to visualise them.
     '''
-    sir = region.createStreaminformationRegion()
-    sir.createStreamresourceFile("reference_heart.exnode")
-    sir.createStreamresourceFile("reference_heart.exelem")
-    for i in range(51):
-        filename = 'heart{:0>4}.exnode'.format(i)
-        fr = sir.createStreamresourceFile(filename)
-        sir.setResourceAttributeReal(fr, StreaminformationRegion.ATTRIBUTE_TIME, i/50.0)
-    sir.createStreamresourceFile("heart.exelem")
-    result = region.read(sir)
+    use_store = os.path.isdir(time_series_store)
+    reference_file_names = ["reference_heart.exnode", "reference_heart.exelem"]
+    if use_store:
+        sir = region.createStreaminformationRegion()
+        for file_name in reference_file_names:
+            sir.createStreamresourceFile(file_name)
+        result = region.read(sir)
+    else:
+        # timesteps may be decimated with ZincView --keep-every, --keep-steps
+        # or --keep-tolerance options
+        file_names = ['heart{:0>4}.exnode'.format(i) for i in range(51)]
+        times = [i/50.0 for i in range(51)]
+        result, times = ZincRegion_readTimesteps(region, file_names, times,
+            beforeFileNames=reference_file_names, afterFileNames=["heart.exelem"])
     if result != RESULT_OK:
         print("Failed to read model file")
         return False
+    if use_store:
+        # store template defines the node fields, so read elements after binding
+        ZincRegion_bindTimeSeriesStore(region, time_series_store)
+        result = region.readFile("heart.exelem")
+        if result != RESULT_OK:
+            print("Failed to read heart.exelem")
+            return False
     scene = region.getScene()
     timekeepermodule = scene.getTimekeepermodule()
     timekeeper = timekeepermodule.getDefaultTimekeeper()
@@ -14,6 +14,40 @@ from opencmiss.zinc.region import Region
 from opencmiss.zinc.result import RESULT_OK
 from opencmiss.zinc.streamregion import StreaminformationRegion
 from opencmiss.zinc.spectrum import Spectrumcomponent
+from zincview_volume import loadImageVolumePyramid, ZincFieldImage_readVolume, STORAGE_AUTO, VolumeLevelOfDetail
+from zincview_isosurface import IsosurfaceEngine
+import numpy
+
+# STORAGE_AUTO stores greyscale stacks with one component; the foot
+# cryosection images are colour so are kept as RGB
+volume_storage = STORAGE_AUTO
+
+# extract muscle and skin surfaces from the volume array with the
+# isosurface engine instead of Zinc contours; the surfaces are cached so
+# they are not recomputed when revisited
+use_isosurface_engine = True
+
+def getVolumeRGB(volume):
+    '''
+    :return volume as float32 RGB values in [0, 1], as in the image field.
+    '''
+    rgb = volume.astype(numpy.float32)/(numpy.iinfo(volume.dtype).max)
+    if rgb.ndim == 3:
+        rgb = numpy.repeat(rgb[..., numpy.newaxis], 3, axis=3)
+    return rgb
+
+def getOffsetMagnitudeFunction(offset):
+    '''
+    :return function of volume matching Zinc field magnitude(image + offset).
+    '''
+    return lambda volume: numpy.linalg.norm(getVolumeRGB(volume) + numpy.array(offset, dtype=numpy.float32), axis=3)
+
+def getBlue(volume):
+    '''
+    :return volume function matching Zinc field blue - red - green.
+    '''
+    rgb = getVolumeRGB(volume)
+    return rgb[..., 2] - rgb[..., 0] - rgb[..., 1]
 
 def loadModel(region):
     sir = region.createStreaminformationRegion()
@@ -52,21 +86,28 @@ def loadModel(region):
 
     image_field.setDomainField(coordinate_field)
     image_field.setTextureCoordinateSizes([256, 400, 128])
-    # Create a stream information object that we can use to read the
-    # image file from disk
-    stream_information = image_field.createStreaminformationImage()
-    i = 1860
-    while i >= 1733:
-        stream_information.createStreamresourceFile("foot"+str(i)+ ".jpg")
-        i = i - 1
-    image_field.read(stream_information)
+    # Decode the slice images concurrently into one volume, cached as raw
+    # data so reopening skips decoding, with a pyramid of coarser levels,
+    # and transfer full resolution to the image field
+    file_names = ["foot" + str(i) + ".jpg" for i in range(1860, 1732, -1)]
+    volume_levels = loadImageVolumePyramid(file_names, cacheFileName="foot.volume.raw", storage=volume_storage)
+    volume = volume_levels[0]
+    result = ZincFieldImage_readVolume(image_field, volume)
+    if result != RESULT_OK:
+        print("Failed to read foot images")
+        return False
     foot = scene.getMaterialmodule().createMaterial()
     foot.setManaged(True)
     foot.setName("foot")
     foot.setTextureField(1, image_field)
     
     #rescaledImage = field_module.createFieldImagefilterRescaleIntensity(image_field, 0.0, 1.0)
-    rescaledImage = image_field
+    if volume.ndim == 3:
+        # greyscale image has one component; repeat it so the colour
+        # expressions below are unchanged
+        rescaledImage = field_module.createFieldConcatenate([image_field, image_field, image_field])
+    else:
+        rescaledImage = image_field
     
     bone = scene.getMaterialmodule().findMaterialByName('bone')
     muscle = scene.getMaterialmodule().findMaterialByName('muscle')
@@ -108,6 +149,8 @@ def loadModel(region):
     tessellation = tessellation_module.createTessellation()
     tessellation.setName("iso_tessellation")
     tessellation.setMinimumDivisions([16])
+    # use a coarse volume and tessellation for contours while editing
+    VolumeLevelOfDetail(image_field, volume_levels, [tessellation])
     
     offset1 = field_module.createFieldConstant([-0.9, -0.75, -0.6])
     non_bone = field_module.createFieldAdd(rescaledImage, offset1)
@@ -137,7 +180,7 @@ def loadModel(region):
     contour.setTextureCoordinateField(coordinate_field)
     contour.setSubgroupField(isoBlockGroup)
     contour.setTessellation(tessellation)
-    contour.setVisibilityFlag(True)
+    contour.setVisibilityFlag(not use_isosurface_engine)
     
     rescaledImage1 = field_module.createFieldComponent(rescaledImage, 1)
     rescaledImage2 = field_module.createFieldComponent(rescaledImage, 2)
@@ -157,8 +200,15 @@ def loadModel(region):
     contour.setTextureCoordinateField(coordinate_field)
     contour.setSubgroupField(isoBlockGroup)
     contour.setTessellation(tessellation)
-    contour.setVisibilityFlag(True)
+    contour.setVisibilityFlag(not use_isosurface_engine)
     
     scene.endChange()
 
+    if use_isosurface_engine:
+        isosurface_engine = IsosurfaceEngine(region, volume_levels)
+        isosurface_engine.defineScalar("mag_non_muscle", getOffsetMagnitudeFunction([-0.35, -0.12, -0.12]))
+        isosurface_engine.defineScalar("blue", getBlue)
+        isosurface_engine.showIsosurface("mag_non_muscle", 0.2, muscle)
+        isosurface_engine.showIsosurface("blue", -0.25, skin)
+
     return True
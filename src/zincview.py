@@ -6,16 +6,31 @@ This Source Code Form is subject to the terms of the Mozilla Public
 License, v. 2.0. If a copy of the MPL was not distributed with this
 file, You can obtain one at http://mozilla.org/MPL/2.0/.
 """
+import time as _time
+_processStartTime = _time.perf_counter()
 
 import os
 import sys
 import json
+from collections import deque, OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy
 from PySide import QtGui, QtCore
 from zincview_ui import Ui_ZincView
+from zincview_playback import FrameCache, TimePlayer
+from zincview_startup import isScriptFileName, ModelPrefetcher, parseArguments, StartupProfiler
+from zincview_watch import ModelWatcher
+from zincview_paging import RegionPager
+from zincview_memory import RegionMemoryAccountant
+from zincview_manifest import isManifestFileName, readManifest, ZincRegion_readManifest
 from opencmiss.zinc.context import Context as ZincContext
 from opencmiss.zinc.scenecoordinatesystem import *
+from opencmiss.zinc.sceneviewer import Sceneviewerevent
 from opencmiss.zinc.result import RESULT_OK
-from opencmiss.zinc.field import Field
+from opencmiss.zinc.field import Field, FieldGroup
+from opencmiss.zinc.element import Element
+from opencmiss.zinc.node import Node
+from opencmiss.zinc.graphics import Graphics
 
 def ZincRegion_getMeshSize(region, dimension):
     '''
@@ -32,6 +47,302 @@ def ZincRegion_getMeshSize(region, dimension):
         child = child.getNextSibling()
     return meshSize
 
+def _ZincField_createTimesField(field, fieldcache, times):
+    '''
+    Get field giving values of field at all of times in one evaluation, by
+    concatenating time lookups of it. For a single time, sets the time in
+    fieldcache and returns field itself. Time series store parameters are
+    loaded into Zinc over the range of times first.
+    :return field with components of field at each time in turn
+    '''
+    from zincview_timeseries import ZincRegion_loadTimeSeriesTimes
+    ZincRegion_loadTimeSeriesTimes(field.getFieldmodule().getRegion(), times)
+    if len(times) == 1:
+        fieldcache.setTime(times[0])
+        return field
+    fieldmodule = field.getFieldmodule()
+    fieldmodule.beginChange()
+    timesField = fieldmodule.createFieldConcatenate(
+        [fieldmodule.createFieldTimeLookup(field, fieldmodule.createFieldConstant([time])) for time in times])
+    fieldmodule.endChange()
+    return timesField
+
+def _ZincField_evaluateAtLocations(timesField, fieldcache, locationIndexes, values):
+    '''
+    Evaluate field from _ZincField_createTimesField at each location set in
+    fieldcache by iterating locationIndexes, writing into
+    values[timeIndex, locationIndex, :]. Values are left unchanged where
+    the field is not defined.
+    :param locationIndexes: Iterable setting the next location in fieldcache
+    then giving its index in values.
+    '''
+    numberOfTimes, _, numberOfComponents = values.shape
+    size = numberOfTimes*numberOfComponents
+    indexes = []
+    results = []
+    for index in locationIndexes:
+        result, fieldValues = timesField.evaluateReal(fieldcache, size)
+        if result == RESULT_OK:
+            indexes.append(index)
+            results.append(fieldValues)
+    if indexes:
+        values[:, indexes, :] = numpy.array(results).reshape(
+            len(indexes), numberOfTimes, numberOfComponents).transpose(1, 0, 2)
+
+def _ZincField_getTimes(times):
+    '''
+    :return list of float times and whether a single time (or None) was supplied.
+    '''
+    if times is None:
+        return [0.0], True
+    if numpy.ndim(times) == 0:
+        return [float(times)], True
+    return [float(time) for time in times], False
+
+def ZincRegion_evaluateFieldAtNodes(region, fieldName, times=None, fieldDomainType=Field.DOMAIN_TYPE_NODES):
+    '''
+    Evaluate named field at all nodes of a nodeset in region, at one or
+    many times. Values are NaN at nodes where the field is not defined.
+    :param times: Single time, list of times, or None for time 0.0.
+    :param fieldDomainType: Field.DOMAIN_TYPE_NODES or DOMAIN_TYPE_DATAPOINTS.
+    :return nodeIdentifiers int32 array(nodes), values float64 array(nodes, components)
+    for a single time, or array(times, nodes, components) for a list of times.
+    Returns None, None if the field is not found.
+    '''
+    fieldmodule = region.getFieldmodule()
+    field = fieldmodule.findFieldByName(fieldName)
+    if not field.isValid():
+        return None, None
+    timesList, singleTime = _ZincField_getTimes(times)
+    nodeset = fieldmodule.findNodesetByFieldDomainType(fieldDomainType)
+    size = nodeset.getSize()
+    nodeIdentifiers = numpy.empty(size, dtype=numpy.int32)
+    values = numpy.full((len(timesList), size, field.getNumberOfComponents()), numpy.nan)
+    fieldcache = fieldmodule.createFieldcache()
+    timesField = _ZincField_createTimesField(field, fieldcache, timesList)
+
+    def setNodes():
+        nodeiter = nodeset.createNodeiterator()
+        node = nodeiter.next()
+        index = 0
+        while node.isValid():
+            nodeIdentifiers[index] = node.getIdentifier()
+            fieldcache.setNode(node)
+            yield index
+            index += 1
+            node = nodeiter.next()
+
+    _ZincField_evaluateAtLocations(timesField, fieldcache, setNodes(), values)
+    if singleTime:
+        return nodeIdentifiers, values[0]
+    return nodeIdentifiers, values
+
+def ZincMesh_getXiGrid(dimension, xiDivisions):
+    '''
+    Get regular grid of xi locations including element boundaries, with xi
+    varying fastest in the first direction.
+    :param xiDivisions: Number of divisions in each xi direction, int or list.
+    :return float64 array(points, dimension)
+    '''
+    if isinstance(xiDivisions, int):
+        xiDivisions = [xiDivisions]*dimension
+    axes = [numpy.linspace(0.0, 1.0, xiDivisions[i] + 1) for i in range(dimension)]
+    grid = numpy.meshgrid(*axes, indexing='ij')
+    return numpy.ascontiguousarray(numpy.stack([g.ravel(order='F') for g in grid], axis=1))
+
+def ZincRegion_iterateFieldOnElementXiGrid(region, fieldName, dimension, xiDivisions=2, times=None, chunkSize=4096):
+    '''
+    Generator evaluating named field on a regular xi grid in every element
+    of the mesh of given dimension, at one or many times, in chunks of
+    elements to bound memory. Values are NaN where the field is not defined.
+    :param chunkSize: Maximum number of elements per chunk.
+    :return yields elementIdentifiers int32 array(elements), values float64
+    array(elements, points, components) for a single time, or array(times,
+    elements, points, components) for a list of times. Point order matches
+    ZincMesh_getXiGrid. Yields nothing if field not found.
+    '''
+    fieldmodule = region.getFieldmodule()
+    field = fieldmodule.findFieldByName(fieldName)
+    if not field.isValid():
+        return
+    timesList, singleTime = _ZincField_getTimes(times)
+    mesh = fieldmodule.findMeshByDimension(dimension)
+    xiGrid = [list(xi) for xi in ZincMesh_getXiGrid(dimension, xiDivisions)]
+    numberOfPoints = len(xiGrid)
+    numberOfComponents = field.getNumberOfComponents()
+    fieldcache = fieldmodule.createFieldcache()
+    timesField = _ZincField_createTimesField(field, fieldcache, timesList)
+    elementiter = mesh.createElementiterator()
+    element = elementiter.next()
+    while element.isValid():
+        elements = []
+        while element.isValid() and (len(elements) < chunkSize):
+            elements.append(element)
+            element = elementiter.next()
+        elementIdentifiers = [chunkElement.getIdentifier() for chunkElement in elements]
+        values = numpy.full((len(timesList), len(elements)*numberOfPoints, numberOfComponents), numpy.nan)
+
+        def setChunkLocations():
+            index = 0
+            for chunkElement in elements:
+                for xi in xiGrid:
+                    fieldcache.setMeshLocation(chunkElement, xi)
+                    yield index
+                    index += 1
+
+        _ZincField_evaluateAtLocations(timesField, fieldcache, setChunkLocations(), values)
+        count = len(elementIdentifiers)
+        values = numpy.ascontiguousarray(values[:, :count*numberOfPoints, :].reshape(
+            len(timesList), count, numberOfPoints, numberOfComponents))
+        yield numpy.array(elementIdentifiers, dtype=numpy.int32), (values[0] if singleTime else values)
+
+def ZincRegion_evaluateFieldOnElementXiGrid(region, fieldName, dimension, xiDivisions=2, times=None, chunkSize=4096):
+    '''
+    Evaluate named field on a regular xi grid in every element of the mesh
+    of given dimension, at one or many times. Evaluates in chunks of
+    elements; use ZincRegion_iterateFieldOnElementXiGrid directly to avoid
+    holding all values for very large meshes.
+    :return elementIdentifiers, values as for ZincRegion_iterateFieldOnElementXiGrid
+    but for all elements, or None, None if field not found.
+    '''
+    chunks = list(ZincRegion_iterateFieldOnElementXiGrid(region, fieldName, dimension, xiDivisions, times, chunkSize))
+    if not chunks:
+        fieldmodule = region.getFieldmodule()
+        field = fieldmodule.findFieldByName(fieldName)
+        if not field.isValid():
+            return None, None
+        timesList, singleTime = _ZincField_getTimes(times)
+        numberOfPoints = ZincMesh_getXiGrid(dimension, xiDivisions).shape[0]
+        shape = (0, numberOfPoints, field.getNumberOfComponents())
+        if not singleTime:
+            shape = (len(timesList),) + shape
+        return numpy.empty(0, dtype=numpy.int32), numpy.empty(shape)
+    elementIdentifiers = numpy.concatenate([chunk[0] for chunk in chunks])
+    axis = 0 if (chunks[0][1].ndim == 3) else 1
+    values = numpy.ascontiguousarray(numpy.concatenate([chunk[1] for chunk in chunks], axis=axis))
+    return elementIdentifiers, values
+
+def ZincRegion_evaluateFieldAtMeshLocations(region, fieldName, dimension, elementIdentifiers, xi, times=None):
+    '''
+    Evaluate named field at many element xi locations in the mesh of given
+    dimension, at one or many times, in a single pass over locations.
+    Values are NaN where the field is not defined or element not found.
+    :param elementIdentifiers: Sequence of element identifiers.
+    :param xi: float array(locations, dimension).
+    :return float64 array(locations, components) for a single time, or
+    array(times, locations, components) for a list of times. Returns None
+    if the field is not found.
+    '''
+    fieldmodule = region.getFieldmodule()
+    field = fieldmodule.findFieldByName(fieldName)
+    if not field.isValid():
+        return None
+    timesList, singleTime = _ZincField_getTimes(times)
+    mesh = fieldmodule.findMeshByDimension(dimension)
+    values = numpy.full((len(timesList), len(elementIdentifiers), field.getNumberOfComponents()), numpy.nan)
+    fieldcache = fieldmodule.createFieldcache()
+    timesField = _ZincField_createTimesField(field, fieldcache, timesList)
+
+    # look up each distinct element once and visit its locations together
+    uniqueIdentifiers, elementIndexes = numpy.unique(
+        numpy.asarray(elementIdentifiers, dtype=numpy.int64), return_inverse=True)
+    elements = [mesh.findElementByIdentifier(int(elementIdentifier)) for elementIdentifier in uniqueIdentifiers]
+    xiList = numpy.asarray(xi, dtype=numpy.float64).reshape(-1, dimension).tolist()
+
+    def setMeshLocations():
+        for index in numpy.argsort(elementIndexes, kind="stable").tolist():
+            element = elements[elementIndexes[index]]
+            if element.isValid():
+                fieldcache.setMeshLocation(element, xiList[index])
+                yield index
+
+    _ZincField_evaluateAtLocations(timesField, fieldcache, setMeshLocations(), values)
+    if singleTime:
+        return values[0]
+    return values
+
+# xi directions in which element shapes are simplex, with xi summing to at most 1
+_SIMPLEX_XI_COMPONENTS = {
+    Element.SHAPE_TYPE_TRIANGLE: (0, 1),
+    Element.SHAPE_TYPE_TETRAHEDRON: (0, 1, 2),
+    Element.SHAPE_TYPE_WEDGE12: (0, 1),
+    Element.SHAPE_TYPE_WEDGE13: (0, 2),
+    Element.SHAPE_TYPE_WEDGE23: (1, 2)
+}
+
+def ZincElement_getSimplexXiComponents(element):
+    '''
+    :return tuple of indexes of xi directions in which element is simplex, empty if none.
+    '''
+    return _SIMPLEX_XI_COMPONENTS.get(element.getShapeType(), ())
+
+def clampXi(xi, simplexComponents=()):
+    '''
+    Get nearest xi inside an element: in [0, 1] in each direction and, for
+    simplex directions, with non-negative xi summing to at most 1.
+    :param simplexComponents: From ZincElement_getSimplexXiComponents.
+    :return float64 array of clamped xi
+    '''
+    xi = numpy.asarray(xi, dtype=numpy.float64)
+    clamped = numpy.clip(xi, 0.0, 1.0)
+    if simplexComponents:
+        simplexXi = xi[list(simplexComponents)]
+        if numpy.sum(numpy.maximum(simplexXi, 0.0)) > 1.0:
+            # project onto the face where simplex xi sum to 1
+            descending = numpy.sort(simplexXi)[::-1]
+            sums = numpy.cumsum(descending) - 1.0
+            counts = numpy.arange(1, descending.size + 1)
+            rho = numpy.flatnonzero(descending - sums/counts > 0.0)[-1]
+            clamped[list(simplexComponents)] = numpy.maximum(simplexXi - sums[rho]/counts[rho], 0.0)
+    return clamped
+
+def ZincElement_getCentreXi(element):
+    '''
+    :return xi at centre of element, the centroid in simplex directions.
+    '''
+    xi = numpy.full(element.getDimension(), 0.5)
+    simplexComponents = ZincElement_getSimplexXiComponents(element)
+    if simplexComponents:
+        xi[list(simplexComponents)] = 1.0/(len(simplexComponents) + 1)
+    return xi
+
+def ZincElement_findXiOnLine(coordinateField, element, point, direction, time=0.0, maximumIterations=20):
+    '''
+    Find xi in element where rectangular cartesian coordinateField is
+    nearest to a line, e.g. where a pick ray meets a surface element, by
+    Newton iteration with xi kept inside the element.
+    :return xi list, distance from line; xi is None if evaluation failed.
+    '''
+    mesh = element.getMesh()
+    dimension = mesh.getDimension()
+    fieldcache = coordinateField.getFieldmodule().createFieldcache()
+    fieldcache.setTime(time)
+    derivatives = [mesh.getChartDifferentialoperator(1, term) for term in range(1, dimension + 1)]
+    direction = numpy.asarray(direction, dtype=numpy.float64)
+    direction = direction/numpy.linalg.norm(direction)
+    # residual is the component of the offset from the line perpendicular to it
+    projection = numpy.eye(3) - numpy.outer(direction, direction)
+    simplexComponents = ZincElement_getSimplexXiComponents(element)
+    xi = ZincElement_getCentreXi(element)
+    distance = numpy.inf
+    for iteration in range(maximumIterations):
+        fieldcache.setMeshLocation(element, xi.tolist())
+        result, x = coordinateField.evaluateReal(fieldcache, 3)
+        if result != RESULT_OK:
+            return None, numpy.inf
+        residual = projection.dot(numpy.asarray(point) - numpy.array(x))
+        distance = float(numpy.linalg.norm(residual))
+        jacobian = numpy.empty((3, dimension))
+        for i, derivative in enumerate(derivatives):
+            result, dx = coordinateField.evaluateDerivative(derivative, fieldcache, 3)
+            jacobian[:, i] = dx
+        deltaXi = numpy.linalg.lstsq(projection.dot(jacobian), residual, rcond=None)[0]
+        newXi = clampXi(xi + deltaXi, simplexComponents)
+        if numpy.max(numpy.abs(newXi - xi)) < 1.0E-10:
+            break
+        xi = newXi
+    return xi.tolist(), distance
+
 def ZincRegion_getTimeRange(region):
     '''
     Recursively get the time range of finite element field parameters in region, or any child regions
@@ -85,33 +396,1469 @@ def ZincRegion_getTimeRange(region):
         child = child.getNextSibling()
     return minimum, maximum
 
+def ZincRegion_getTimes(region, times=None):
+    '''
+    Recursively get the sorted distinct times at which finite element field
+    parameters are stored in region or any child regions, from the
+    timesequences of the first node or datapoint in each nodeset, and the
+    times of any time series stores bound to the regions.
+    :return list of times, empty if not time-varying
+    '''
+    from zincview_timeseries import getTimeSeriesBindings
+    if times is None:
+        times = set()
+    path = region.getPath()
+    for binding in getTimeSeriesBindings():
+        if binding.getRegion().getPath() == path:
+            times.update(binding.getTimes())
+    fieldmodule = region.getFieldmodule()
+    for fieldDomainType in [Field.DOMAIN_TYPE_NODES, Field.DOMAIN_TYPE_DATAPOINTS]:
+        nodeset = fieldmodule.findNodesetByFieldDomainType(fieldDomainType)
+        nodeiter = nodeset.createNodeiterator()
+        node = nodeiter.next()
+        if node.isValid():
+            fielditer = fieldmodule.createFielditerator()
+            field = fielditer.next()
+            while field.isValid():
+                feField = field.castFiniteElement()
+                if feField.isValid():
+                    nodetemplate = nodeset.createNodetemplate()
+                    nodetemplate.defineFieldFromNode(feField, node)
+                    timesequence = nodetemplate.getTimesequence(feField)
+                    if timesequence.isValid():
+                        for i in range(1, timesequence.getNumberOfTimes() + 1):
+                            times.add(timesequence.getTime(i))
+                field = fielditer.next()
+    # recurse children
+    child = region.getFirstChild()
+    while child.isValid():
+        ZincRegion_getTimes(child, times)
+        child = child.getNextSibling()
+    return sorted(times)
+
+def ZincRegion_getHighestDimensionMesh(region):
+    '''
+    :return highest dimension mesh with elements in region, or None if none
+    '''
+    fieldmodule = region.getFieldmodule()
+    for dimension in range(3, 0, -1):
+        mesh = fieldmodule.findMeshByDimension(dimension)
+        if mesh.getSize() > 0:
+            return mesh
+    return None
+
+def ZincScene_getSpectrumDataFields(scene, spectrum, scenefilter=None, dataFields=None):
+    '''
+    Recursively get data fields of visible graphics coloured by spectrum in
+    scene and the scenes of all child regions. Hidden scenes, with their
+    child scenes, and hidden graphics are skipped.
+    :param scenefilter: Optional scene filter graphics must also pass, e.g.
+    the sceneviewer's filter.
+    :return list of (region, dataField)
+    '''
+    if dataFields is None:
+        dataFields = []
+    if not scene.getVisibilityFlag():
+        return dataFields
+    spectrumName = spectrum.getName()
+    graphics = scene.getFirstGraphics()
+    while graphics.isValid():
+        dataField = graphics.getDataField()
+        graphicsSpectrum = graphics.getSpectrum()
+        if dataField.isValid() and graphicsSpectrum.isValid() and (graphicsSpectrum.getName() == spectrumName) and \
+                graphics.getVisibilityFlag() and ((scenefilter is None) or scenefilter.evaluateGraphics(graphics)):
+            region = scene.getRegion()
+            if not any(((r.getPath() == region.getPath()) and (f.getName() == dataField.getName())) for r, f in dataFields):
+                dataFields.append((region, dataField))
+        graphics = scene.getNextGraphics(graphics)
+    # recurse children
+    child = scene.getRegion().getFirstChild()
+    while child.isValid():
+        ZincScene_getSpectrumDataFields(child.getScene(), spectrum, scenefilter, dataFields)
+        child = child.getNextSibling()
+    return dataFields
+
+def ZincField_getSampleValues(field, component, time, xiDivisions=2):
+    '''
+    Evaluate one component of field at time at all nodes where it is defined,
+    and at a regular grid of xi locations with xiDivisions per direction in
+    every element of the highest dimension mesh.
+    :param component: Component number starting at 1.
+    :return float64 array of values
+    '''
+    region = field.getFieldmodule().getRegion()
+    fieldName = field.getName()
+    _, nodeValues = ZincRegion_evaluateFieldAtNodes(region, fieldName, time)
+    values = [nodeValues[:, component - 1]]
+    mesh = ZincRegion_getHighestDimensionMesh(region)
+    if mesh is not None:
+        for _, elementValues in ZincRegion_iterateFieldOnElementXiGrid(region, fieldName, mesh.getDimension(), xiDivisions, time):
+            values.append(elementValues[:, :, component - 1].ravel())
+    values = numpy.concatenate(values)
+    return values[~numpy.isnan(values)]
+
+def ZincFieldmodule_getDefaultCoordinateField(fieldmodule):
+    '''
+    :return first real finite element coordinate field with up to 3 components, or None
+    '''
+    fielditer = fieldmodule.createFielditerator()
+    field = fielditer.next()
+    while field.isValid():
+        if field.isTypeCoordinate() and (field.getValueType() == Field.VALUE_TYPE_REAL) and \
+                (field.getNumberOfComponents() <= 3) and field.castFiniteElement().isValid():
+            return field
+        field = fielditer.next()
+    return None
+
+def _ZincFieldmodule_createBakedField(fieldmodule, name, numberOfComponents, isCoordinate=False):
+    '''
+    Create or reuse managed finite element field to hold baked values.
+    '''
+    field = fieldmodule.findFieldByName(name).castFiniteElement()
+    if (not field.isValid()) or (field.getNumberOfComponents() != numberOfComponents):
+        field = fieldmodule.createFieldFiniteElement(numberOfComponents)
+        field.setName(name)
+        field.setManaged(True)
+    field.setTypeCoordinate(isCoordinate)
+    return field
+
+def ZincRegion_bakeFieldAtNodes(region, fieldName, times, bakedFieldName=None):
+    '''
+    Evaluate a field defined at nodes, e.g. a derived expression of nodal
+    fields, once at each of times and store the results as time-varying
+    parameters of a new finite element field on the same nodes. Graphics
+    using the baked field interpolate stored parameters instead of
+    re-evaluating the expression on every redraw.
+    :param bakedFieldName: Name of new field, default fieldName + "_baked".
+    :return baked field, or None if field not found or not defined at any node.
+    '''
+    if bakedFieldName is None:
+        bakedFieldName = fieldName + "_baked"
+    times = list(times)
+    nodeIdentifiers, values = ZincRegion_evaluateFieldAtNodes(region, fieldName, times)
+    if nodeIdentifiers is None:
+        return None
+    defined = ~numpy.isnan(values).any(axis=(0, 2))
+    if not defined.any():
+        return None
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    bakedField = _ZincFieldmodule_createBakedField(fieldmodule, bakedFieldName, values.shape[2])
+    nodeset = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodeset.createNodetemplate()
+    nodetemplate.defineField(bakedField)
+    nodetemplate.setTimesequence(bakedField, fieldmodule.getMatchingTimesequence(times))
+    fieldcache = fieldmodule.createFieldcache()
+    for index in numpy.nonzero(defined)[0]:
+        node = nodeset.findNodeByIdentifier(int(nodeIdentifiers[index]))
+        node.merge(nodetemplate)
+        fieldcache.setNode(node)
+        for t, time in enumerate(times):
+            fieldcache.setTime(time)
+            bakedField.assignReal(fieldcache, values[t, index, :].tolist())
+    fieldmodule.endChange()
+    return bakedField
+
+def ZincRegion_bakeFieldsAtElementPoints(region, fieldNames, times, coordinateFieldName=None, xiDivisions=1, suffix="_baked"):
+    '''
+    Evaluate fields, e.g. strains computed from deformation gradients which
+    are not defined at nodes, once at each of times on a regular xi grid in
+    every element of the highest dimension mesh. Results are stored as
+    time-varying parameters at new datapoints, one per sample location, in
+    fields named with suffix, together with baked coordinates for placing
+    them. Points graphics on DOMAIN_TYPE_DATAPOINTS can then show the baked
+    values without evaluating the expression chain.
+    :param coordinateFieldName: Coordinate field to bake, default first coordinate field.
+    :return list of baked fields with baked coordinates first, or None if failed.
+    '''
+    fieldmodule = region.getFieldmodule()
+    if coordinateFieldName is None:
+        coordinates = ZincFieldmodule_getDefaultCoordinateField(fieldmodule)
+        if coordinates is None:
+            return None
+        coordinateFieldName = coordinates.getName()
+    mesh = ZincRegion_getHighestDimensionMesh(region)
+    if mesh is None:
+        return None
+    times = list(times)
+    names = [coordinateFieldName] + [name for name in fieldNames if name != coordinateFieldName]
+    allValues = []
+    for name in names:
+        _, values = ZincRegion_evaluateFieldOnElementXiGrid(region, name, mesh.getDimension(), xiDivisions, times)
+        if values is None:
+            return None
+        # flatten elements and points to one axis of sample locations
+        allValues.append(values.reshape(len(times), -1, values.shape[-1]))
+    defined = numpy.ones(allValues[0].shape[1], dtype=bool)
+    for values in allValues:
+        defined &= ~numpy.isnan(values).any(axis=(0, 2))
+    fieldmodule.beginChange()
+    bakedFields = [_ZincFieldmodule_createBakedField(fieldmodule, name + suffix, values.shape[2], isCoordinate=(name == coordinateFieldName))
+        for name, values in zip(names, allValues)]
+    datapoints = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_DATAPOINTS)
+    # replace datapoints from any earlier bake with the same coordinates
+    datapoints.destroyNodesConditional(fieldmodule.createFieldIsDefined(bakedFields[0]))
+    nodetemplate = datapoints.createNodetemplate()
+    timesequence = fieldmodule.getMatchingTimesequence(times)
+    for bakedField in bakedFields:
+        nodetemplate.defineField(bakedField)
+        nodetemplate.setTimesequence(bakedField, timesequence)
+    fieldcache = fieldmodule.createFieldcache()
+    for index in numpy.nonzero(defined)[0]:
+        node = datapoints.createNode(-1, nodetemplate)
+        fieldcache.setNode(node)
+        for t, time in enumerate(times):
+            fieldcache.setTime(time)
+            for bakedField, values in zip(bakedFields, allValues):
+                bakedField.assignReal(fieldcache, values[t, index, :].tolist())
+    fieldmodule.endChange()
+    return bakedFields
+
+def ZincScene_replaceGraphicsField(scene, field, newField):
+    '''
+    Make all graphics in scene use newField wherever they use field.
+    :return number of graphics changed
+    '''
+    fieldName = field.getName()
+
+    def uses(graphicsField):
+        return graphicsField.isValid() and (graphicsField.getName() == fieldName)
+
+    count = 0
+    scene.beginChange()
+    graphics = scene.getFirstGraphics()
+    while graphics.isValid():
+        changed = False
+        for getField, setField in (
+                (graphics.getCoordinateField, graphics.setCoordinateField),
+                (graphics.getDataField, graphics.setDataField),
+                (graphics.getTextureCoordinateField, graphics.setTextureCoordinateField)):
+            if uses(getField()):
+                setField(newField)
+                changed = True
+        contours = graphics.castContours()
+        if contours.isValid() and uses(contours.getIsoscalarField()):
+            contours.setIsoscalarField(newField)
+            changed = True
+        pointattributes = graphics.getGraphicspointattributes()
+        if pointattributes.isValid():
+            for getField, setField in (
+                    (pointattributes.getOrientationScaleField, pointattributes.setOrientationScaleField),
+                    (pointattributes.getSignedScaleField, pointattributes.setSignedScaleField),
+                    (pointattributes.getLabelField, pointattributes.setLabelField)):
+                if uses(getField()):
+                    setField(newField)
+                    changed = True
+        if changed:
+            count += 1
+        graphics = scene.getNextGraphics(graphics)
+    scene.endChange()
+    return count
+
+def ZincScene_useBakedElementPoints(scene, field, bakedCoordinates, bakedField):
+    '''
+    Make points graphics in scene showing field at element points show
+    bakedField at the datapoints from ZincRegion_bakeFieldsAtElementPoints.
+    Other graphics using field are unchanged as they cannot use datapoints.
+    :return number of graphics changed
+    '''
+    fieldName = field.getName()
+    meshDomainTypes = (Field.DOMAIN_TYPE_MESH1D, Field.DOMAIN_TYPE_MESH2D, Field.DOMAIN_TYPE_MESH3D,
+        Field.DOMAIN_TYPE_MESH_HIGHEST_DIMENSION)
+    count = 0
+    scene.beginChange()
+    graphics = scene.getFirstGraphics()
+    while graphics.isValid():
+        dataField = graphics.getDataField()
+        if (graphics.getType() == Graphics.TYPE_POINTS) and (graphics.getFieldDomainType() in meshDomainTypes) and \
+                dataField.isValid() and (dataField.getName() == fieldName):
+            graphics.setFieldDomainType(Field.DOMAIN_TYPE_DATAPOINTS)
+            graphics.setCoordinateField(bakedCoordinates)
+            graphics.setDataField(bakedField)
+            count += 1
+        graphics = scene.getNextGraphics(graphics)
+    scene.endChange()
+    return count
+
+def ZincField_getRectangularCartesian(field):
+    '''
+    Get field in rectangular cartesian coordinates, converting from other
+    coordinate systems such as prolate spheroidal with a named, unmanaged
+    coordinate transformation field which lives while referenced.
+    '''
+    if field.getCoordinateSystemType() == Field.COORDINATE_SYSTEM_TYPE_RECTANGULAR_CARTESIAN:
+        return field
+    fieldmodule = field.getFieldmodule()
+    name = field.getName() + "_rectangular_cartesian"
+    rcField = fieldmodule.findFieldByName(name)
+    if not rcField.isValid():
+        rcField = fieldmodule.createFieldCoordinateTransformation(field)
+        rcField.setCoordinateSystemType(Field.COORDINATE_SYSTEM_TYPE_RECTANGULAR_CARTESIAN)
+        rcField.setName(name)
+    return rcField
+
+def ZincRegion_getRegionsInTree(region, regions=None):
+    '''
+    :return list of region and all its descendants, parents before children.
+    '''
+    if regions is None:
+        regions = []
+    regions.append(region)
+    child = region.getFirstChild()
+    while child.isValid():
+        ZincRegion_getRegionsInTree(child, regions)
+        child = child.getNextSibling()
+    return regions
+
+def ZincRegion_writeToBuffer(region, time=None, nodesOnly=False):
+    '''
+    Write region tree in EX format to a memory buffer.
+    :param time: Time to write time-varying parameters at, or None.
+    :param nodesOnly: Write only nodes and datapoints, e.g. for additional times.
+    :return bytes, or None on failure
+    '''
+    from opencmiss.zinc.streamregion import StreaminformationRegion
+    sir = region.createStreaminformationRegion()
+    srm = sir.createStreamresourceMemory()
+    if time is not None:
+        sir.setResourceAttributeReal(srm, StreaminformationRegion.ATTRIBUTE_TIME, time)
+    if nodesOnly:
+        sir.setResourceDomainTypes(srm, Field.DOMAIN_TYPE_NODES | Field.DOMAIN_TYPE_DATAPOINTS)
+    if region.write(sir) != RESULT_OK:
+        return None
+    result, buffer = srm.getBuffer()
+    if result != RESULT_OK:
+        return None
+    return bytes(buffer)
+
+def ZincRegion_readBuffers(region, buffers):
+    '''
+    Read EX format memory buffers into region in one read, merging
+    time-varying parameters.
+    :param buffers: List of (bytes, time) with time None if not time-varying.
+    :return result
+    '''
+    from opencmiss.zinc.streamregion import StreaminformationRegion
+    sir = region.createStreaminformationRegion()
+    for buffer, time in buffers:
+        srm = sir.createStreamresourceMemoryBuffer(buffer)
+        if time is not None:
+            sir.setResourceAttributeReal(srm, StreaminformationRegion.ATTRIBUTE_TIME, time)
+    return region.read(sir)
+
+def ZincRegion_setNodeFrames(region, fields, nodeIdentifiers, frames):
+    '''
+    Set node parameters of fields at the times of frames, creating fields
+    and nodes as needed. Times are merged into the nodes' timesequences so
+    parameters stored at other times are kept.
+    :param fields: List of (name, number of components, is coordinate).
+    :param nodeIdentifiers: Sequence of node identifiers.
+    :param frames: List of (time, values) with values array(nodes, values
+    per node) holding the components of each field in order.
+    :return True on success
+    '''
+    fieldmodule = region.getFieldmodule()
+    finiteElementFields = []
+    for name, numberOfComponents, coordinate in fields:
+        field = fieldmodule.findFieldByName(name)
+        if field.isValid():
+            finiteElementField = field.castFiniteElement()
+            if (not finiteElementField.isValid()) or (field.getNumberOfComponents() != numberOfComponents):
+                print("Cannot set node parameters of field " + name + " with " + str(numberOfComponents) + " components")
+                return False
+        else:
+            fieldmodule.beginChange()
+            finiteElementField = fieldmodule.createFieldFiniteElement(numberOfComponents)
+            finiteElementField.setName(name)
+            finiteElementField.setManaged(True)
+            if coordinate:
+                finiteElementField.setTypeCoordinate(True)
+                if numberOfComponents <= 3:
+                    for c in range(numberOfComponents):
+                        finiteElementField.setComponentName(c + 1, "xyz"[c])
+            fieldmodule.endChange()
+        finiteElementFields.append(finiteElementField)
+    fieldmodule.beginChange()
+    # nodes merged with a template over only the new times keep their
+    # parameters at other times
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodes.createNodetemplate()
+    timesequence = fieldmodule.getMatchingTimesequence(sorted(set(time for time, _ in frames)))
+    for finiteElementField in finiteElementFields:
+        nodetemplate.defineField(finiteElementField)
+        nodetemplate.setTimesequence(finiteElementField, timesequence)
+    nodeList = []
+    for nodeIdentifier in numpy.asarray(nodeIdentifiers).tolist():
+        node = nodes.findNodeByIdentifier(nodeIdentifier)
+        if node.isValid():
+            node.merge(nodetemplate)
+        else:
+            node = nodes.createNode(nodeIdentifier, nodetemplate)
+        nodeList.append(node)
+    fieldSlices = []
+    start = 0
+    for finiteElementField, (_, numberOfComponents, _) in zip(finiteElementFields, fields):
+        fieldSlices.append((finiteElementField, start, start + numberOfComponents))
+        start += numberOfComponents
+    fieldcache = fieldmodule.createFieldcache()
+    success = True
+    for time, values in frames:
+        fieldcache.setTime(time)
+        for node, row in zip(nodeList, numpy.asarray(values, dtype=numpy.float64).tolist()):
+            fieldcache.setNode(node)
+            for finiteElementField, start, stop in fieldSlices:
+                if finiteElementField.setNodeParameters(fieldcache, -1, Node.VALUE_LABEL_VALUE, 1, row[start:stop]) != RESULT_OK:
+                    success = False
+    fieldmodule.endChange()
+    return success
+
+def _ZincModule_writeDescription(module):
+    '''
+    :return JSON description string of module if supported by this Zinc, otherwise None.
+    '''
+    if hasattr(module, "writeDescription"):
+        return module.writeDescription()
+    return None
+
+def _ZincModule_readDescription(module, description, *args):
+    if (description is not None) and hasattr(module, "readDescription"):
+        if module.readDescription(description, *args) != RESULT_OK:
+            print("Failed to read " + type(module).__name__ + " description from session")
+
+def ZincRegion_writeSnapshot(region, writer, times):
+    '''
+    Add region tree EX data to a snapshot writer: section "region" with
+    parameters at the first time, and sections "nodes1", "nodes2"... with
+    node parameters at each later time.
+    :param writer: zincview_session.SessionWriter.
+    :param times: Times from ZincRegion_getTimes.
+    :return True on success
+    '''
+    tree = ZincRegion_writeToBuffer(region, times[0] if times else None)
+    if tree is None:
+        print("Failed to write region " + region.getPath())
+        return False
+    writer.addSection("region", tree)
+    for i, time in enumerate(times[1:]):
+        nodes = ZincRegion_writeToBuffer(region, time, nodesOnly=True)
+        if nodes is None:
+            print("Failed to write nodes of region " + region.getPath() + " at time " + str(time))
+            return False
+        writer.addSection("nodes" + str(i + 1), nodes)
+    return True
+
+def ZincRegion_readSnapshot(region, reader, times, currentTime):
+    '''
+    Read region tree from a snapshot with node parameters at its first time
+    and at the stored time nearest currentTime. Other times are left to be
+    read later with ZincRegion_readBuffers.
+    :param reader: zincview_session.SessionReader.
+    :param times: Times the snapshot was written with.
+    :return list of (section index, time) not yet read.
+    :raise ValueError if region data could not be read.
+    '''
+    buffers = [(reader.getSection("region"), times[0] if times else None)]
+    pendingTimes = list(enumerate(times))[1:]
+    if pendingTimes:
+        # read nearest stored time first
+        nearest = min(pendingTimes, key=lambda indexTime: abs(indexTime[1] - currentTime))
+        if abs(nearest[1] - currentTime) < abs(times[0] - currentTime):
+            pendingTimes.remove(nearest)
+            buffers.append((reader.getSection("nodes" + str(nearest[0])), nearest[1]))
+    if any((buffer is None) for buffer, time in buffers) or (ZincRegion_readBuffers(region, buffers) != RESULT_OK):
+        raise ValueError("Failed to read session region data")
+    return pendingTimes
+
+def ZincRegion_getDescriptions(region):
+    '''
+    :return list of field and scene descriptions of region and its
+    descendants, with paths relative to region.
+    '''
+    basePath = region.getPath()
+    descriptions = []
+    for subregion in ZincRegion_getRegionsInTree(region):
+        descriptions.append({
+            "path": subregion.getPath()[len(basePath):],
+            "fields": _ZincModule_writeDescription(subregion.getFieldmodule()),
+            "scene": _ZincModule_writeDescription(subregion.getScene())})
+    return descriptions
+
+def ZincRegion_readDescriptions(region, descriptions):
+    '''
+    Restore field and scene descriptions from ZincRegion_getDescriptions
+    to region and its descendants.
+    '''
+    for description in descriptions:
+        path = description["path"]
+        subregion = region.findSubregionAtPath(path) if path.strip("/") else region
+        if not subregion.isValid():
+            continue
+        _ZincModule_readDescription(subregion.getFieldmodule(), description["fields"])
+        _ZincModule_readDescription(subregion.getScene(), description["scene"], True)
+
+def ZincRegion_getRegionVisibilitiesInTree(region, visible=True, regionVisibilities=None):
+    '''
+    :param visible: Whether region's ancestors are all visible.
+    :return list of (region, visible) for region and all its descendants,
+    parents before children, where a region is visible if its scene
+    visibility flag and those of all its ancestors are set.
+    '''
+    if regionVisibilities is None:
+        regionVisibilities = []
+    visible = visible and region.getScene().getVisibilityFlag()
+    regionVisibilities.append((region, visible))
+    child = region.getFirstChild()
+    while child.isValid():
+        ZincRegion_getRegionVisibilitiesInTree(child, visible, regionVisibilities)
+        child = child.getNextSibling()
+    return regionVisibilities
+
+def ZincRegion_replaceWithPlaceholder(region):
+    '''
+    Replace region in its parent with a new empty region of the same name
+    and scene visibility, at the same position among its siblings.
+    :return placeholder region
+    '''
+    parent = region.getParent()
+    name = region.getName()
+    nextSibling = region.getNextSibling()
+    placeholder = region.createRegion()
+    placeholder.getScene().setVisibilityFlag(region.getScene().getVisibilityFlag())
+    parent.beginHierarchicalChange()
+    parent.removeChild(region)
+    placeholder.setName(name)
+    if nextSibling.isValid():
+        parent.insertChildBefore(placeholder, nextSibling)
+    else:
+        parent.appendChild(placeholder)
+    parent.endHierarchicalChange()
+    return placeholder
+
+def ZincScene_selectNodes(scene, nodeIdentifiers, add=False):
+    '''
+    Select nodes of the scene's region in the selection group of the root
+    scene, as used by the sceneviewer widget, creating groups as needed.
+    :param add: Add to existing selection if True, otherwise replace it.
+    '''
+    region = scene.getRegion()
+    rootRegion = region
+    while rootRegion.getParent().isValid():
+        rootRegion = rootRegion.getParent()
+    rootScene = rootRegion.getScene()
+    rootFieldmodule = rootRegion.getFieldmodule()
+    rootFieldmodule.beginChange()
+    selectionGroup = rootScene.getSelectionField().castGroup()
+    if not selectionGroup.isValid():
+        selectionGroup = rootFieldmodule.createFieldGroup()
+        selectionGroup.setName("cmiss_selection")
+        rootScene.setSelectionField(selectionGroup)
+    if not add:
+        selectionGroup.clear()
+    group = selectionGroup
+    if region.getPath() != rootRegion.getPath():
+        group = selectionGroup.getSubregionFieldGroup(region)
+        if not group.isValid():
+            group = selectionGroup.createSubregionFieldGroup(region)
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodeGroup = group.getFieldNodeGroup(nodes)
+    if not nodeGroup.isValid():
+        nodeGroup = group.createFieldNodeGroup(nodes)
+    nodesetGroup = nodeGroup.getNodesetGroup()
+    for nodeIdentifier in nodeIdentifiers:
+        nodesetGroup.addNode(nodes.findNodeByIdentifier(int(nodeIdentifier)))
+    fieldmodule.endChange()
+    rootFieldmodule.endChange()
+
+class StreamingHistogram(object):
+    '''
+    Histogram accumulating batches of values without storing them, for
+    estimating percentiles of large data. The bin range doubles as needed
+    to take in values outside it, merging pairs of bins, so percentiles are
+    accurate to one bin width; the minimum and maximum are exact.
+    '''
+
+    def __init__(self, numberOfBins=16384):
+        '''
+        :param numberOfBins: Even number of bins.
+        '''
+        self._bins = numpy.zeros(numberOfBins, dtype=numpy.int64)
+        self._lower = None
+        self._upper = None
+        self._count = 0
+        self._minimum = None
+        self._maximum = None
+
+    def getCount(self):
+        return self._count
+
+    def getMinimum(self):
+        return self._minimum
+
+    def getMaximum(self):
+        return self._maximum
+
+    def _expand(self, value):
+        '''
+        Double bin range until value lies within it, merging pairs of bins.
+        '''
+        half = len(self._bins)//2
+        while not (self._lower <= value < self._upper):
+            merged = self._bins.reshape(half, 2).sum(axis=1)
+            width = self._upper - self._lower
+            self._bins[:] = 0
+            if value < self._lower:
+                self._bins[half:] = merged
+                self._lower -= width
+            else:
+                self._bins[:half] = merged
+                self._upper += width
+
+    def add(self, values):
+        '''
+        Add a batch of values to the histogram. NaN values are ignored.
+        '''
+        values = numpy.asarray(values, dtype=numpy.float64).ravel()
+        values = values[~numpy.isnan(values)]
+        if values.size == 0:
+            return
+        batchMinimum = float(values.min())
+        batchMaximum = float(values.max())
+        if self._count == 0:
+            self._minimum = batchMinimum
+            self._maximum = batchMaximum
+            self._lower = batchMinimum
+            # upper bound is exclusive; make it a little above the maximum
+            width = batchMaximum - batchMinimum
+            if width <= 0.0:
+                width = abs(batchMinimum)*1.0E-6 if (batchMinimum != 0.0) else 1.0E-6
+            self._upper = batchMinimum + width*(1.0 + 1.0/len(self._bins))
+        else:
+            self._minimum = min(self._minimum, batchMinimum)
+            self._maximum = max(self._maximum, batchMaximum)
+        self._expand(batchMinimum)
+        self._expand(batchMaximum)
+        numberOfBins = len(self._bins)
+        scale = numberOfBins/(self._upper - self._lower)
+        indexes = numpy.minimum(((values - self._lower)*scale).astype(numpy.int64), numberOfBins - 1)
+        self._bins += numpy.bincount(indexes, minlength=numberOfBins)
+        self._count += values.size
+
+    def getPercentile(self, percent):
+        '''
+        Get value below which percent of values lie, interpolated within bins.
+        :param percent: Percentage from 0.0 to 100.0
+        :return value, or None if empty
+        '''
+        if self._count == 0:
+            return None
+        if percent <= 0.0:
+            return self._minimum
+        if percent >= 100.0:
+            return self._maximum
+        target = self._count*percent/100.0
+        binWidth = (self._upper - self._lower)/len(self._bins)
+        cumulative = numpy.cumsum(self._bins)
+        i = int(numpy.searchsorted(cumulative, target))
+        if i >= len(self._bins):
+            return self._maximum
+        below = cumulative[i] - self._bins[i]
+        value = self._lower + binWidth*(i + (target - below)/self._bins[i])
+        return min(max(value, self._minimum), self._maximum)
+
+class SpectrumRangeSampler(QtCore.QObject):
+    '''
+    Samples data fields at nodes and element xi grids over many times into
+    histograms without blocking the user interface. Zinc is not
+    thread-safe, so fields are evaluated on the main thread for a short time
+    budget per timer tick, while values are binned into the histograms on a
+    worker thread. Histograms must not be read until finished is emitted.
+    '''
+
+    finished = QtCore.Signal()
+
+    def __init__(self, timeBudget=0.05, parent=None):
+        '''
+        :param timeBudget: Seconds of evaluation per timer tick.
+        '''
+        QtCore.QObject.__init__(self, parent)
+        self._timeBudget = timeBudget
+        self._jobs = deque()
+        self._executor = None
+        self._futures = []
+        self._timer = QtCore.QTimer(self)
+        self._timer.setInterval(0)
+        self._timer.timeout.connect(self._sampleNext)
+
+    def start(self, jobs):
+        '''
+        Start sampling, cancelling any sampling in progress.
+        :param jobs: List of (StreamingHistogram, dataField, component, times).
+        '''
+        self.cancel()
+        self._jobs = deque((histogram, dataField, component, deque(times))
+            for histogram, dataField, component, times in jobs if times)
+        # one worker keeps additions to each histogram in order
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._timer.start()
+
+    def isRunning(self):
+        return self._executor is not None
+
+    def wait(self):
+        '''
+        Finish sampling now, without returning to the event loop.
+        '''
+        while self.isRunning():
+            self._sampleNext(None)
+
+    def cancel(self):
+        self._timer.stop()
+        self._jobs.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._futures = []
+
+    def _sampleNext(self, timeBudget=-1):
+        '''
+        Evaluate fields at times until the time budget is used up, or at all
+        remaining times if timeBudget is None.
+        '''
+        if timeBudget == -1:
+            timeBudget = self._timeBudget
+        startClock = _time.perf_counter()
+        while self._jobs and ((timeBudget is None) or ((_time.perf_counter() - startClock) < timeBudget)):
+            histogram, dataField, component, times = self._jobs[0]
+            values = ZincField_getSampleValues(dataField, component, times.popleft())
+            self._futures.append(self._executor.submit(histogram.add, values))
+            if not times:
+                self._jobs.popleft()
+        if self._jobs:
+            return
+        self._timer.stop()
+        for future in self._futures:
+            future.result()
+        self._executor.shutdown(wait=True)
+        self._executor = None
+        self._futures = []
+        self.finished.emit()
+
+class ChangeCoalescer(QtCore.QObject):
+    '''
+    Collects widget-driven changes and applies them together after a short
+    quiet period, inside a single beginChange/endChange on all the Zinc
+    modules they affect, so one user gesture costs one graphics rebuild.
+    A change added with the same key as a pending change supersedes it,
+    e.g. intermediate time slider positions are dropped.
+    '''
+
+    # key of change added
+    changeAdded = QtCore.Signal(str)
+    applied = QtCore.Signal()
+
+    def __init__(self, delay=50, parent=None):
+        '''
+        :param delay: Milliseconds to wait for further changes before applying.
+        '''
+        QtCore.QObject.__init__(self, parent)
+        self._changes = OrderedDict()
+        self._rebuildCount = 0
+        self._changeCount = 0
+        self._timer = QtCore.QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay)
+        self._timer.timeout.connect(self.flush)
+
+    def addChange(self, key, function, modules):
+        '''
+        Queue function to be called when changes are applied.
+        :param key: Identifies the setting changed; replaces pending change with same key.
+        :param function: Callable taking no arguments which makes the change.
+        :param modules: List of Zinc modules with beginChange/endChange affected by the change.
+        '''
+        self._changes.pop(key, None)
+        self._changes[key] = (function, modules)
+        self._changeCount += 1
+        self._timer.start()
+        self.changeAdded.emit(key)
+
+    def hasPendingChanges(self):
+        return len(self._changes) > 0
+
+    def flush(self):
+        '''
+        Apply all pending changes now, in the order they were last added.
+        '''
+        self._timer.stop()
+        if not self._changes:
+            return
+        changes = list(self._changes.values())
+        self._changes.clear()
+        # each module once; Zinc handles to the same module compare equal,
+        # while there is a scene per region
+        modules = []
+        for _, changeModules in changes:
+            for module in changeModules:
+                if not any((module == other) for other in modules):
+                    modules.append(module)
+        for module in modules:
+            module.beginChange()
+        try:
+            for function, _ in changes:
+                function()
+        finally:
+            for module in reversed(modules):
+                module.endChange()
+        self._rebuildCount += 1
+        self.applied.emit()
+
+    def getRebuildCount(self):
+        '''
+        :return Number of times changes have been applied as one rebuild.
+        '''
+        return self._rebuildCount
+
+    def getChangeCount(self):
+        '''
+        :return Number of changes added, including those superseded.
+        '''
+        return self._changeCount
+
+class NodeSpatialIndex(object):
+    '''
+    Spatial index of node coordinates in a region at the current time, for
+    nearest node, box and lasso queries without scene hit tests. The index
+    is updated lazily on the next query after the time, the coordinates or
+    the nodes change, refitting the existing tree when the nodes are the same.
+    '''
+
+    def __init__(self, region, coordinateFieldName=None):
+        '''
+        :param coordinateFieldName: Name of coordinate field, or None to use
+        the first coordinate field in region. Non-rectangular cartesian
+        coordinates are converted.
+        '''
+        self._region = region
+        fieldmodule = region.getFieldmodule()
+        if coordinateFieldName is None:
+            coordinateField = ZincFieldmodule_getDefaultCoordinateField(fieldmodule)
+        else:
+            coordinateField = fieldmodule.findFieldByName(coordinateFieldName)
+        self._coordinateField = ZincField_getRectangularCartesian(coordinateField) \
+            if (coordinateField is not None) and coordinateField.isValid() else None
+        self._nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+        self._nodeIdentifiers = None
+        self._tree = None
+        self._time = None
+        self._changed = True
+        self._fieldmodulenotifier = fieldmodule.createFieldmodulenotifier()
+        self._fieldmodulenotifier.setCallback(self._fieldmoduleChange)
+
+    def _fieldmoduleChange(self, event):
+        # only changes to coordinates or the nodes need the index updated
+        if self._coordinateField is None:
+            return
+        if (event.getFieldChangeFlags(self._coordinateField) & (Field.CHANGE_FLAG_DEFINITION |
+                Field.CHANGE_FLAG_FULL_RESULT | Field.CHANGE_FLAG_PARTIAL_RESULT)) or \
+                (event.getNodesetchanges(self._nodes).getSummaryNodeChangeFlags() != Node.CHANGE_FLAG_NONE):
+            self._changed = True
+
+    def getRegion(self):
+        return self._region
+
+    def getCoordinateFieldName(self):
+        '''
+        :return name of rectangular cartesian coordinate field indexed, or None.
+        '''
+        return self._coordinateField.getName() if self._coordinateField else None
+
+    def update(self, time):
+        '''
+        Bring index up to date with node coordinates at time.
+        :return True if there are indexed nodes.
+        '''
+        from zincview_spatial import PointTree
+        if self._coordinateField is None:
+            return False
+        if (not self._changed) and (time == self._time):
+            return self._tree is not None
+        nodeIdentifiers, coordinates = ZincRegion_evaluateFieldAtNodes(self._region, self._coordinateField.getName(), time)
+        self._time = time
+        self._changed = False
+        if nodeIdentifiers is None:
+            self._tree = None
+            return False
+        points = numpy.zeros((coordinates.shape[0], 3))
+        points[:, :coordinates.shape[1]] = coordinates[:, :3]
+        if (self._tree is not None) and numpy.array_equal(nodeIdentifiers, self._nodeIdentifiers):
+            self._tree.setPoints(points)
+        else:
+            self._tree = PointTree(points)
+        self._nodeIdentifiers = nodeIdentifiers
+        return True
+
+    def getStatistics(self):
+        '''
+        :return number of tree rebuilds, number of refits
+        '''
+        return self._tree.getStatistics() if self._tree else (0, 0)
+
+    def getNodeCoordinates(self, nodeIdentifier, time):
+        '''
+        :return coordinates of node with identifier at time as list, or None.
+        '''
+        if not self.update(time):
+            return None
+        indexes = numpy.flatnonzero(self._nodeIdentifiers == nodeIdentifier)
+        if indexes.size == 0:
+            return None
+        return self._tree.getPoint(indexes[0]).tolist()
+
+    def getBoundingBox(self, time):
+        '''
+        :return minimum, maximum coordinates of nodes, or None, None if none.
+        '''
+        if not self.update(time):
+            return None, None
+        return self._tree.getBoundingBox()
+
+    def findNearestNode(self, point, time, maximumDistance=numpy.inf):
+        '''
+        :return identifier of node nearest to point, distance; or None, inf.
+        '''
+        if not self.update(time):
+            return None, numpy.inf
+        index, distance = self._tree.findNearest(point, maximumDistance)
+        if index < 0:
+            return None, numpy.inf
+        return int(self._nodeIdentifiers[index]), distance
+
+    def findNearestNodeToRay(self, point, direction, time, maximumDistance=numpy.inf):
+        '''
+        :return identifier of node nearest the start of ray among those within
+        maximumDistance of it, distance from ray; or None, inf.
+        '''
+        if not self.update(time):
+            return None, numpy.inf
+        index, distance = self._tree.findNearestToRay(point, direction, maximumDistance)
+        if index < 0:
+            return None, numpy.inf
+        return int(self._nodeIdentifiers[index]), distance
+
+    def findNodesInBox(self, minimum, maximum, time):
+        '''
+        :return int32 array of identifiers of nodes inside axis-aligned box.
+        '''
+        if not self.update(time):
+            return numpy.empty(0, dtype=numpy.int32)
+        return self._nodeIdentifiers[self._tree.findInBox(minimum, maximum)]
+
+    def findNodesInProjectedPolygon(self, matrix, polygon, time):
+        '''
+        :param matrix: 4x4 matrix projecting region coordinates to window.
+        :param polygon: Window coordinates of polygon vertices.
+        :return int32 array of identifiers of nodes projecting inside polygon.
+        '''
+        if not self.update(time):
+            return numpy.empty(0, dtype=numpy.int32)
+        return self._nodeIdentifiers[self._tree.findInProjectedPolygon(matrix, polygon)]
+
+class MeshLocationIndex(object):
+    '''
+    Locates points in a mesh using cached bounding box hierarchies of its
+    elements, one per time for deforming models. Element boxes are the
+    bounds of coordinates sampled on an xi grid, padded for curvature; the
+    hierarchy narrows each point to a few candidate elements which are then
+    solved exactly for xi by Newton iteration. Caches are discarded when
+    any field in the region changes.
+    '''
+
+    def __init__(self, region, coordinateFieldName=None, dimension=None, xiDivisions=3, padding=0.05, maximumCachedTimes=64):
+        '''
+        :param coordinateFieldName: Name of coordinate field, or None to use
+        the first coordinate field in region. Non-rectangular cartesian
+        coordinates are converted.
+        :param dimension: Mesh dimension, or None for highest dimension mesh.
+        :param xiDivisions: Divisions per xi direction for sampling element bounds.
+        :param padding: Fraction of element box size added on each side.
+        :param maximumCachedTimes: Number of per-time hierarchies kept.
+        '''
+        self._region = region
+        fieldmodule = region.getFieldmodule()
+        if coordinateFieldName is None:
+            coordinateField = ZincFieldmodule_getDefaultCoordinateField(fieldmodule)
+        else:
+            coordinateField = fieldmodule.findFieldByName(coordinateFieldName)
+        self._coordinateField = ZincField_getRectangularCartesian(coordinateField) \
+            if (coordinateField is not None) and coordinateField.isValid() else None
+        if dimension is None:
+            mesh = ZincRegion_getHighestDimensionMesh(region)
+        else:
+            mesh = fieldmodule.findMeshByDimension(dimension)
+        self._mesh = mesh
+        self._xiDivisions = xiDivisions
+        self._padding = padding
+        self._maximumCachedTimes = maximumCachedTimes
+        self._hierarchies = OrderedDict()
+        self._buildCount = 0
+        self._fieldmodulenotifier = fieldmodule.createFieldmodulenotifier()
+        self._fieldmodulenotifier.setCallback(self._fieldmoduleChange)
+
+    def _fieldmoduleChange(self, event):
+        # only changes to coordinates or the mesh invalidate element boxes, not
+        # e.g. the coordinate transformation field created by this index or groups
+        if self._coordinateField is None:
+            return
+        if (event.getFieldChangeFlags(self._coordinateField) & (Field.CHANGE_FLAG_DEFINITION |
+                Field.CHANGE_FLAG_FULL_RESULT | Field.CHANGE_FLAG_PARTIAL_RESULT)) or \
+                ((self._mesh is not None) and
+                    (event.getMeshchanges(self._mesh).getSummaryElementChangeFlags() != Element.CHANGE_FLAG_NONE)):
+            self._hierarchies.clear()
+
+    def getMesh(self):
+        return self._mesh
+
+    def getBuildCount(self):
+        '''
+        :return Number of element bounding box hierarchies built.
+        '''
+        return self._buildCount
+
+    def _getHierarchy(self, time):
+        '''
+        :return elementIdentifiers, sample xi, sample coordinates, BoxTree for time.
+        '''
+        from zincview_spatial import BoxTree
+        hierarchy = self._hierarchies.get(time)
+        if hierarchy is not None:
+            self._hierarchies.move_to_end(time)
+            return hierarchy
+        dimension = self._mesh.getDimension()
+        elementIdentifiers, values = ZincRegion_evaluateFieldOnElementXiGrid(self._region,
+            self._coordinateField.getName(), dimension, self._xiDivisions, time)
+        coordinates = numpy.zeros(values.shape[:2] + (3,))
+        coordinates[:, :, :values.shape[2]] = values[:, :, :3]
+        minimums = numpy.nanmin(coordinates, axis=1) if coordinates.shape[1] else coordinates[:, 0]
+        maximums = numpy.nanmax(coordinates, axis=1) if coordinates.shape[1] else coordinates[:, 0]
+        pad = self._padding*numpy.max(maximums - minimums, axis=1, keepdims=True)
+        hierarchy = (elementIdentifiers, ZincMesh_getXiGrid(dimension, self._xiDivisions), coordinates,
+            BoxTree(minimums - pad, maximums + pad))
+        self._hierarchies[time] = hierarchy
+        while len(self._hierarchies) > self._maximumCachedTimes:
+            self._hierarchies.popitem(last=False)
+        self._buildCount += 1
+        return hierarchy
+
+    def _solveXi(self, fieldcache, element, point, xi, derivatives, tolerance, maximumIterations=20):
+        '''
+        Newton solve for xi in element where coordinates equal point, with xi
+        kept inside the element. Least squares for meshes of lower dimension.
+        :return xi, distance from point at xi
+        '''
+        numberOfComponents = self._coordinateField.getNumberOfComponents()
+        simplexComponents = ZincElement_getSimplexXiComponents(element)
+        xi = clampXi(xi, simplexComponents)
+        distance = numpy.inf
+        for iteration in range(maximumIterations):
+            fieldcache.setMeshLocation(element, xi.tolist())
+            result, x = self._coordinateField.evaluateReal(fieldcache, numberOfComponents)
+            if result != RESULT_OK:
+                break
+            residual = point[:numberOfComponents] - numpy.array(x, ndmin=1)
+            distance = float(numpy.linalg.norm(residual))
+            if distance <= tolerance:
+                break
+            jacobian = numpy.empty((numberOfComponents, len(derivatives)))
+            for i, derivative in enumerate(derivatives):
+                result, dx = self._coordinateField.evaluateDerivative(derivative, fieldcache, numberOfComponents)
+                jacobian[:, i] = dx
+            deltaXi = numpy.linalg.lstsq(jacobian, residual, rcond=None)[0]
+            newXi = clampXi(xi + deltaXi, simplexComponents)
+            if numpy.max(numpy.abs(newXi - xi)) < 1.0E-12:
+                break
+            xi = newXi
+        return xi, distance
+
+    def findElementsInProjectedFrustum(self, matrix, width, height, time=0.0, margin=0.0):
+        '''
+        Find elements whose bounding boxes intersect the view frustum, e.g.
+        to cull graphics of elements off screen.
+        :param matrix: 4x4 matrix projecting region coordinates to window pixels.
+        :param width, height: Window size in pixels.
+        :param margin: Pixels added around the window.
+        :return int32 array of element identifiers in increasing order.
+        '''
+        if (self._coordinateField is None) or (self._mesh is None):
+            return numpy.empty(0, dtype=numpy.int32)
+        elementIdentifiers, xiGrid, coordinates, boxTree = self._getHierarchy(time)
+        return numpy.sort(elementIdentifiers[boxTree.findInProjectedFrustum(matrix, width, height, margin)])
+
+    def findMeshLocations(self, points, time=0.0, tolerance=1.0E-6, nearest=False):
+        '''
+        Locate many points in the mesh at time.
+        :param points: float array(n, 3) of rectangular cartesian coordinates.
+        :param tolerance: Distance tolerance relative to element size.
+        :param nearest: If True, points in candidate element boxes but not
+        within tolerance of any element get the closest location found,
+        e.g. for points picked on rendered surfaces.
+        :return elementIdentifiers int32 array(n) with -1 where not found,
+        xi float64 array(n, dimension).
+        '''
+        points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 3)
+        dimension = self._mesh.getDimension() if self._mesh else 0
+        foundIdentifiers = numpy.full(points.shape[0], -1, dtype=numpy.int32)
+        foundXi = numpy.full((points.shape[0], dimension), numpy.nan)
+        if (self._coordinateField is None) or (self._mesh is None):
+            return foundIdentifiers, foundXi
+        elementIdentifiers, xiGrid, coordinates, boxTree = self._getHierarchy(time)
+        pointIndexes, boxIndexes = boxTree.findContaining(points)
+        if pointIndexes.size == 0:
+            return foundIdentifiers, foundXi
+        fieldmodule = self._region.getFieldmodule()
+        fieldcache = fieldmodule.createFieldcache()
+        fieldcache.setTime(time)
+        derivatives = [self._mesh.getChartDifferentialoperator(1, term) for term in range(1, dimension + 1)]
+        bestDistances = numpy.full(points.shape[0], numpy.inf)
+        # start each solve at the nearest sample point in the candidate element
+        samples = coordinates[boxIndexes]
+        starts = numpy.argmin(numpy.sum((samples - points[pointIndexes][:, numpy.newaxis, :])**2, axis=2), axis=1)
+        elementSizes = numpy.max(numpy.max(samples, axis=1) - numpy.min(samples, axis=1), axis=1)
+        for pointIndex, boxIndex, start, elementSize in zip(pointIndexes.tolist(), boxIndexes.tolist(), starts.tolist(), elementSizes.tolist()):
+            if (foundIdentifiers[pointIndex] >= 0) and (bestDistances[pointIndex] == 0.0):
+                continue
+            element = self._mesh.findElementByIdentifier(int(elementIdentifiers[boxIndex]))
+            absoluteTolerance = tolerance*max(elementSize, 1.0E-300)
+            xi, distance = self._solveXi(fieldcache, element, points[pointIndex], xiGrid[start].copy(), derivatives, absoluteTolerance)
+            if distance <= absoluteTolerance:
+                foundIdentifiers[pointIndex] = elementIdentifiers[boxIndex]
+                foundXi[pointIndex] = xi
+                # mark as exactly found so remaining candidates are skipped
+                bestDistances[pointIndex] = 0.0
+            elif nearest and (distance < bestDistances[pointIndex]):
+                foundIdentifiers[pointIndex] = elementIdentifiers[boxIndex]
+                foundXi[pointIndex] = xi
+                bestDistances[pointIndex] = distance
+        return foundIdentifiers, foundXi
+
+def ZincGraphics_isMeshGraphics(graphics):
+    '''
+    :return True if graphics are built element by element, e.g. lines,
+    surfaces, contours and element points. Streamlines are not, since they
+    leave their seed elements.
+    '''
+    if graphics.getType() == Graphics.TYPE_STREAMLINES:
+        return False
+    return graphics.getFieldDomainType() not in [Field.DOMAIN_TYPE_NODES, Field.DOMAIN_TYPE_DATAPOINTS, Field.DOMAIN_TYPE_POINT]
+
+class ViewCullingGroup(object):
+    '''
+    Group of the elements of a region's indexed mesh whose bounding boxes
+    intersect the view frustum, set as the subgroup field of the region's
+    mesh graphics so only elements on screen are tessellated. Graphics with
+    their own subgroup field are left alone. Elements are found in the
+    cached box hierarchy of a MeshLocationIndex and only the difference
+    from the last update is added or removed, so small view changes are
+    cheap. Zinc has no call to add elements by identifier, so elements are
+    also kept in fixed blocks of consecutive identifiers, each its own
+    group; blocks wholly added or removed are changed with one conditional
+    call and only the elements of partly changed blocks one at a time.
+    When all elements are in view the graphics are not culled.
+    '''
+
+    def __init__(self, region, meshLocationIndex, blockSize=1024):
+        '''
+        :param blockSize: Number of elements in each block group.
+        '''
+        self._region = region
+        self._meshLocationIndex = meshLocationIndex
+        self._blockSize = blockSize
+        # sorted element identifiers and their block groups, made on first update
+        self._blockIdentifiers = None
+        self._blockGroups = []
+        fieldmodule = region.getFieldmodule()
+        fieldmodule.beginChange()
+        self._group = fieldmodule.createFieldGroup()
+        self._group.setName("zincview_view_culling")
+        # destroyed once no longer referenced by this object or graphics
+        self._group.setManaged(False)
+        if hasattr(self._group, "setSubelementHandlingMode"):
+            # so surfaces and lines on faces of elements in view are drawn
+            self._group.setSubelementHandlingMode(FieldGroup.SUBELEMENT_HANDLING_MODE_FULL)
+        elementGroup = self._group.createFieldElementGroup(meshLocationIndex.getMesh())
+        self._meshGroup = elementGroup.getMeshGroup()
+        fieldmodule.endChange()
+        self._elementIdentifiers = numpy.empty(0, dtype=numpy.int32)
+        self._culling = False
+
+    def getRegion(self):
+        return self._region
+
+    def getMeshLocationIndex(self):
+        return self._meshLocationIndex
+
+    def getNumberOfElements(self):
+        '''
+        :return number of elements in view at the last update, or -1 if all.
+        '''
+        return self._elementIdentifiers.shape[0] if self._culling else -1
+
+    def update(self, matrix, width, height, time=0.0, margin=0.0):
+        '''
+        Set group to elements in the view frustum and assign it to mesh
+        graphics of the region, including graphics added since the last
+        update. Arguments are as for MeshLocationIndex.findElementsInProjectedFrustum.
+        '''
+        mesh = self._meshLocationIndex.getMesh()
+        elementIdentifiers = self._meshLocationIndex.findElementsInProjectedFrustum(matrix, width, height, time, margin)
+        culling = elementIdentifiers.shape[0] < mesh.getSize()
+        if not culling:
+            elementIdentifiers = numpy.empty(0, dtype=numpy.int32)
+        removed = numpy.setdiff1d(self._elementIdentifiers, elementIdentifiers, assume_unique=True)
+        added = numpy.setdiff1d(elementIdentifiers, self._elementIdentifiers, assume_unique=True)
+        fieldmodule = self._region.getFieldmodule()
+        fieldmodule.beginChange()
+        if removed.shape[0] > elementIdentifiers.shape[0]:
+            # cheaper to refill the group, e.g. after zooming in from a full view
+            self._meshGroup.removeAllElements()
+            added = elementIdentifiers
+        else:
+            self._changeElements(mesh, removed, add=False)
+        self._changeElements(mesh, added, add=True)
+        fieldmodule.endChange()
+        self._elementIdentifiers = elementIdentifiers
+        self._culling = culling
+        self._setGraphicsCulled(culling)
+
+    def _getBlocks(self, mesh):
+        '''
+        Make block groups of consecutive element identifiers on first use.
+        :return sorted int64 array of element identifiers, list of block groups.
+        '''
+        if self._blockIdentifiers is None:
+            identifiers = []
+            elementiter = mesh.createElementiterator()
+            element = elementiter.next()
+            while element.isValid():
+                identifiers.append(element.getIdentifier())
+                element = elementiter.next()
+            self._blockIdentifiers = numpy.sort(numpy.array(identifiers, dtype=numpy.int64))
+            fieldmodule = self._region.getFieldmodule()
+            fieldmodule.beginChange()
+            for start in range(0, self._blockIdentifiers.shape[0], self._blockSize):
+                blockGroup = fieldmodule.createFieldGroup()
+                blockGroup.setManaged(False)
+                meshGroup = blockGroup.createFieldElementGroup(mesh).getMeshGroup()
+                for elementIdentifier in self._blockIdentifiers[start:start + self._blockSize].tolist():
+                    meshGroup.addElement(mesh.findElementByIdentifier(elementIdentifier))
+                self._blockGroups.append(blockGroup)
+            fieldmodule.endChange()
+        return self._blockIdentifiers, self._blockGroups
+
+    def _changeElements(self, mesh, elementIdentifiers, add):
+        '''
+        Add or remove elements with identifiers to or from the group, whole
+        blocks at once.
+        :param elementIdentifiers: Sorted int array of element identifiers.
+        '''
+        if elementIdentifiers.shape[0] == 0:
+            return
+        blockIdentifiers, blockGroups = self._getBlocks(mesh)
+        blocks = numpy.full(elementIdentifiers.shape[0], -1, dtype=numpy.int64)
+        if blockIdentifiers.shape[0]:
+            positions = numpy.minimum(numpy.searchsorted(blockIdentifiers, elementIdentifiers), blockIdentifiers.shape[0] - 1)
+            blocks = numpy.where(blockIdentifiers[positions] == elementIdentifiers, positions//self._blockSize, -1)
+        counts = numpy.bincount(blocks[blocks >= 0], minlength=len(blockGroups))
+        blockSizes = numpy.diff(numpy.append(numpy.arange(0, blockIdentifiers.shape[0], self._blockSize), blockIdentifiers.shape[0]))
+        wholeBlocks = counts == blockSizes
+        for block in numpy.flatnonzero(wholeBlocks).tolist():
+            if add:
+                self._meshGroup.addElementsConditional(blockGroups[block])
+            else:
+                self._meshGroup.removeElementsConditional(blockGroups[block])
+        # elements in partly changed blocks, or made since the blocks were
+        for elementIdentifier in elementIdentifiers[(blocks < 0) | ~wholeBlocks[numpy.maximum(blocks, 0)]].tolist():
+            element = mesh.findElementByIdentifier(elementIdentifier)
+            if add:
+                self._meshGroup.addElement(element)
+            else:
+                self._meshGroup.removeElement(element)
+
+    def restore(self):
+        '''
+        Stop culling graphics of the region. The group is released once
+        this object is discarded.
+        '''
+        self._setGraphicsCulled(False)
+        self._culling = False
+
+    def _setGraphicsCulled(self, culled):
+        scene = self._region.getScene()
+        name = self._group.getName()
+        scene.beginChange()
+        graphics = scene.getFirstGraphics()
+        while graphics.isValid():
+            subgroupField = graphics.getSubgroupField()
+            if subgroupField.isValid():
+                if (not culled) and (subgroupField.getName() == name):
+                    graphics.setSubgroupField(Field())
+            elif culled and ZincGraphics_isMeshGraphics(graphics):
+                graphics.setSubgroupField(self._group)
+            graphics = scene.getNextGraphics(graphics)
+        scene.endChange()
+
 class ZincView(QtGui.QMainWindow):
     '''
     Create a subclass of QMainWindow to get menu bar functionality.
     '''
     
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, profiler=None):
         '''
         Initiaise the ZincView first calling the QWidget __init__ function.
+        :param profiler: Optional StartupProfiler to mark startup phases with.
         '''
         QtGui.QMainWindow.__init__(self, parent)
+        self._profiler = profiler if profiler else StartupProfiler()
 
         self._context = ZincContext("ZincView")
         self._rootRegion = self._context.createRegion()
-        # set up standard materials and glyphs so we can use them elsewhere
-        materialmodule = self._context.getMaterialmodule()
-        materialmodule.defineStandardMaterials()
-        glyphmodule = self._context.getGlyphmodule()
-        glyphmodule.defineStandardGlyphs()
+        # standard materials and glyphs are defined on first use
+        self._standardDefinitionsDefined = False
+        # startup timing is reported once graphics are ready and models given
+        # on the command line are loaded
+        self._startupGraphicsReady = False
+        self._startupPrefetcher = None
+        self._profiler.mark("zinc context")
         
         # Using composition to include the visual element of the GUI.
         self.ui = Ui_ZincView()
         self.ui.setupUi(self)
+        self._profiler.mark("user interface")
         self.ui.toolBox.setCurrentIndex(0)
         self.ui.sceneviewerwidget.setContext(self._context)
         self.ui.sceneviewerwidget.graphicsInitialized.connect(self._graphicsInitialized)
         self.setWindowIcon(QtGui.QIcon(":/cmiss_icon.ico"))
 
+        # time playback, showing cached frames for already visited times
+        self._timePlayer = TimePlayer(self)
+        self._timePlayer.frameRequested.connect(self._timePlayerFrameRequested)
+        self._timePlayer.stopped.connect(self._timePlayerStopped)
+        self._frameCache = FrameCache()
+        self._frameCacheSize = None
+        self._cachedFrameLabel = QtGui.QLabel(self.ui.centralwidget)
+        self._cachedFrameLabel.setSizePolicy(QtGui.QSizePolicy.Ignored, QtGui.QSizePolicy.Ignored)
+        self._cachedFrameLabel.setAttribute(QtCore.Qt.WA_TransparentForMouseEvents)
+        self._cachedFrameLabel.hide()
+        self.ui.gridLayout.addWidget(self._cachedFrameLabel, 0, 0, 1, 1)
+        # time of the cached frame shown, if any
+        self._cachedFrameTime = None
+        self._sceneviewernotifier = None
+
+        # apply widget-driven setting changes in batches
+        self._changeCoalescer = ChangeCoalescer(parent=self)
+        self._changeCoalescer.changeAdded.connect(self._changeAdded)
+        self._changeCoalescer.applied.connect(self._changesApplied)
+        self._volumeCoarseWhileEditing = True
+
+        # session snapshot node parameters still to be read at other times
+        self._sessionReader = None
+        self._sessionPendingTimes = []
+        self._sessionReadTimer = QtCore.QTimer(self)
+        self._sessionReadTimer.setInterval(0)
+        self._sessionReadTimer.timeout.connect(self._sessionReadNext)
+
+        # model resource files to watch for new or modified timesteps:
+        # list of (fileName, time) and (directory, pattern, timeScale, timeOffset)
+        self._modelWatchFiles = []
+        self._modelWatchTimesteps = []
+        self._modelWatcher = None
+
+        # live simulation input received on a background thread, applied
+        # to the model on the main thread in batches
+        self._liveReceiver = None
+        self._liveTimer = QtCore.QTimer(self)
+        self._liveTimer.setInterval(50)
+        self._liveTimer.timeout.connect(self._liveUpdate)
+        self._liveNewRegionPaths = set()
+
+        # estimated memory use by region, refreshed a few regions at a time
+        # while the memory dock is shown or warning thresholds are set
+        self._memoryAccountant = RegionMemoryAccountant(self)
+        self._memoryAccountant.setRootRegion(self._rootRegion)
+        self._memoryAccountant.updated.connect(self._memoryUpdated)
+        self._memoryAccountant.warning.connect(self._memoryWarning)
+        self._memoryTimer = QtCore.QTimer(self)
+        self._memoryTimer.setInterval(200)
+        self._memoryTimer.timeout.connect(self._memoryAccountant.refresh)
+        # created on first use
+        self._memoryDock = None
+
+        # hidden region subtrees paged out to a local cache and read back
+        # when selected or shown
+        self._regionPager = RegionPager()
+        self._regionPagingTimer = QtCore.QTimer(self)
+        self._regionPagingTimer.setInterval(2000)
+        self._regionPagingTimer.timeout.connect(self._regionPagingUpdate)
+        # created on first use
+        self._regionPagingDock = None
+
+        # histograms of spectrum data over times, by (region path, field name, component, times)
+        self._spectrumHistogramCache = {}
+        self._spectrumSampler = SpectrumRangeSampler(parent=self)
+        self._spectrumSampler.finished.connect(self._spectrumSamplerFinished)
+        self._spectrumPendingRange = None
+
+        # interactive isovalue editing of contours and isosurfaces, editor
+        # created on first use
+        self._isovalueEditor = None
+        self._isovalueTargets = []
+        self._isovalueRange = (0.0, 1.0)
+
+        # node spatial indexes by region path, for hover readout and box selection
+        self._nodeSpatialIndexes = {}
+        # element bounding box hierarchies by region path, for mesh location queries
+        self._meshLocationIndexes = {}
+
+        # mesh graphics of visible regions with large meshes restricted to
+        # elements in the view frustum, by region path, updated once the view
+        # has settled; a margin of the window size is kept around the view
+        self._viewCulling = False
+        self._viewCullingGroups = {}
+        self._viewCullingMinimumElements = 100000
+        self._viewCullingMargin = 0.1
+        self._viewCullingUpdating = False
+        self._viewCullingTimer = QtCore.QTimer(self)
+        self._viewCullingTimer.setSingleShot(True)
+        self._viewCullingTimer.setInterval(250)
+        self._viewCullingTimer.timeout.connect(self._viewCullingUpdate)
+
+        # probes at element xi locations, with values cached by (region path,
+        # element, xi, field name, time)
+        self._probes = []
+        self._probeValueCache = {}
+        self._probeClickPosition = None
+        # created on first use
+        self._probeDock = None
+        self._nodeRubberBand = None
+        self._nodeBoxOrigin = None
+        self.ui.sceneviewerwidget.installEventFilter(self)
+        self._profiler.mark("window state")
+
+    def defineStandardMaterialsAndGlyphs(self):
+        '''
+        Define standard materials and glyphs if not already defined. Deferred
+        from startup until a model is loaded or the window is idle.
+        '''
+        if self._standardDefinitionsDefined:
+            return
+        self._standardDefinitionsDefined = True
+        materialmodule = self._context.getMaterialmodule()
+        materialmodule.defineStandardMaterials()
+        glyphmodule = self._context.getGlyphmodule()
+        glyphmodule.defineStandardGlyphs()
+        self._profiler.mark("standard materials and glyphs")
+
     def _graphicsInitialized(self):
         '''
         Callback for when SceneviewerWidget is initialised
@@ -121,7 +1868,54 @@ class ZincView(QtGui.QMainWindow):
         sceneviewer.setScene(self._rootRegion.getScene())
         self.ui.sceneviewerwidget.setSelectModeAll()
         self.ui.sceneviewer_editor_widget.setSceneviewer(sceneviewer)
+        self._sceneviewernotifier = sceneviewer.createSceneviewernotifier()
+        self._sceneviewernotifier.setCallback(self._sceneviewerChange)
         self.allSettingsUpdate()
+        self._profiler.mark("graphics initialised")
+        QtCore.QTimer.singleShot(0, self._startupIdle)
+
+    def _startupIdle(self):
+        self.defineStandardMaterialsAndGlyphs()
+        if not self.ui.live_address_lineedit.text():
+            from zincview_live import DEFAULT_ADDRESS
+            self.ui.live_address_lineedit.setText(DEFAULT_ADDRESS)
+        self._startupGraphicsReady = True
+        if self._startupPrefetcher is not None:
+            self._startupLoad()
+        else:
+            self._startupCheckFinished()
+
+    def startupLoad(self, prefetcher):
+        '''
+        Load models being read by prefetcher once graphics are initialised,
+        so the sceneviewer exists to view them.
+        '''
+        self._startupPrefetcher = prefetcher
+        if self._startupGraphicsReady:
+            QtCore.QTimer.singleShot(0, self._startupLoad)
+
+    def _startupLoad(self):
+        prefetcher = self._startupPrefetcher
+        if prefetcher is None:
+            return
+        self._startupPrefetcher = None
+        self.modelLoadPrefetched(prefetcher)
+        self._startupCheckFinished()
+
+    def _startupCheckFinished(self):
+        if self._startupGraphicsReady and (self._startupPrefetcher is None):
+            self._profiler.report()
+
+    def _sceneviewerChange(self, event):
+        '''
+        Callback for sceneviewer changes. Cached frames are invalid once
+        the view is transformed, and view culling is updated once
+        transformations stop; other redraws, e.g. for time steps, are ignored.
+        '''
+        if event.getChangeFlags() & Sceneviewerevent.CHANGE_FLAG_TRANSFORM:
+            self.frameCacheClear()
+            if self._viewCulling and not self._viewCullingUpdating:
+                self._viewCullingTimer.start()
 
     def modelClear(self):
         '''
@@ -136,27 +1930,77 @@ class ZincView(QtGui.QMainWindow):
         result = msgBox.exec_()
         if result == QtGui.QMessageBox.Cancel:
             return
-        self._rootRegion = self._context.createRegion()
+        self._modelReset()
+        self.allSettingsUpdate()
+
+    def _modelReset(self, rootRegion=None):
+        '''
+        Replace root region and discard all state derived from the old model.
+        :param rootRegion: New root region, already read, or None for a new
+        empty region.
+        '''
+        self._timePlayer.stop()
+        self._changeCoalescer.flush()
+        self._sessionStopReading()
+        self._modelWatchStop()
+        self._liveStop()
+        self._modelWatchFiles = []
+        self._modelWatchTimesteps = []
+        self._regionPager.clear()
+        self.frameCacheClear()
+        self._spectrumHistogramCacheClear()
+        from zincview_volume import clearVolumeLevelsOfDetail
+        from zincview_timeseries import clearTimeSeriesBindings
+        from zincview_isosurface import clearIsosurfaceEngines
+        clearVolumeLevelsOfDetail()
+        clearTimeSeriesBindings()
+        if self._isovalueEditor is not None:
+            self._isovalueEditor.setContours(None)
+        clearIsosurfaceEngines()
+        self._viewCullingTimer.stop()
+        self._viewCullingGroups.clear()
+        self._nodeSpatialIndexes.clear()
+        self._meshLocationIndexes.clear()
+        self.probeClear()
+        self._rootRegion = rootRegion if (rootRegion is not None) else self._context.createRegion()
+        self._memoryAccountant.setRootRegion(self._rootRegion)
         self.ui.region_chooser.setRootRegion(self._rootRegion)
         scene = self._rootRegion.getScene()
         self.ui.scene_editor.setScene(scene)
         self.ui.sceneviewerwidget.getSceneviewer().setScene(scene)
-        self.allSettingsUpdate()
 
     def modelLoad(self):
         '''
         Read model file or run script to read or define model.
         '''
-        fileNameTuple = QtGui.QFileDialog.getOpenFileName(self, "Load ZincView Model", "", "ZincView scripts (*.zincview.py);;Model Files (*.ex* *.fieldml)")
+        fileNameTuple = QtGui.QFileDialog.getOpenFileName(self, "Load ZincView Model", "", "ZincView scripts (*.zincview.py);;Model Files (*.ex* *.fieldml);;Region manifests (*.zvmanifest)")
         inputScriptFileName = fileNameTuple[0]
         fileFilter = fileNameTuple[1]
         if not inputScriptFileName:
             return
         #print("reading file " + inputScriptFileName + ", filter " + fileFilter)
+        if not self.modelLoadFile(inputScriptFileName, "scripts" in fileFilter):
+            msgBox = QtGui.QMessageBox()
+            msgBox.setWindowTitle("ZincView")
+            msgBox.setText("Error reading file: " + inputScriptFileName)
+            msgBox.setStandardButtons(QtGui.QMessageBox.Ok)
+            msgBox.setDefaultButton(QtGui.QMessageBox.Cancel)
+            result = msgBox.exec_()
+            return
+        self.modelLoaded()
+
+    def modelLoadFile(self, inputScriptFileName, isScript, contents=None):
+        '''
+        Read model file or run script into the root region.
+        :param contents: Optional file contents already read: bytes for a model
+        file or compiled code for a script.
+        :return True on success
+        '''
+        self.defineStandardMaterialsAndGlyphs()
         # set current directory to path from file, to support scripts and fieldml with external resources
         path = os.path.dirname(inputScriptFileName)
         os.chdir(path)
-        if "scripts" in fileFilter:
+        if isScript:
             try:
                 # f = open(inputScriptFileName, 'r')
                 # myfunctions = {}
@@ -168,28 +2012,724 @@ class ZincView(QtGui.QMainWindow):
                 import importlib.util
                 spec = importlib.util.spec_from_file_location(mod_name, inputScriptFileName)
                 foo = importlib.util.module_from_spec(spec)
-                spec.loader.exec_module(foo)
+                if contents is not None:
+                    exec(contents, foo.__dict__)
+                else:
+                    spec.loader.exec_module(foo)
+
+                success = foo.loadModel(self._rootRegion)
+                # scripts list numbered timestep files to watch as
+                # watch_timesteps = [(pattern, timeScale[, timeOffset]), ...]
+                if success:
+                    for timesteps in getattr(foo, "watch_timesteps", []):
+                        self._modelWatchTimesteps.append((path,) + tuple(timesteps))
+            except:
+                success = False
+        elif isManifestFileName(inputScriptFileName):
+            try:
+                manifest = readManifest(inputScriptFileName, contents)
+            except (IOError, OSError, ValueError, KeyError) as e:
+                print(e)
+                return False
+            success = not ZincRegion_readManifest(self._rootRegion, manifest)
+        elif (contents is not None) and not inputScriptFileName.endswith(".fieldml"):
+            result = ZincRegion_readBuffers(self._rootRegion, [(contents, None)])
+            success = (result == RESULT_OK)
+        else:
+            result = self._rootRegion.readFile(inputScriptFileName)
+            success = (result == RESULT_OK)
+        if success and not isScript:
+            self._modelWatchFiles.append((inputScriptFileName, None))
+        return success
+
+    def modelLoadPrefetched(self, prefetcher):
+        '''
+        Load model files and scripts read in the background at startup, e.g.
+        from command line arguments, reporting any that fail.
+        '''
+        failedFileNames = []
+        for fileName, contents, error in prefetcher.getResults():
+            if error is not None:
+                print(error)
+                failedFileNames.append(fileName)
+            elif not self.modelLoadFile(fileName, isScriptFileName(fileName), contents):
+                failedFileNames.append(fileName)
+            self._profiler.mark("load " + os.path.basename(fileName))
+        if len(failedFileNames) < len(prefetcher.getFileNames()):
+            self.modelLoaded()
+            self._profiler.mark("model display")
+        if failedFileNames:
+            QtGui.QMessageBox.warning(self, "ZincView", "Error reading file: " + ", ".join(failedFileNames))
+
+    def modelLoaded(self):
+        '''
+        Update widgets and view for newly loaded model.
+        '''
+        scene = self._rootRegion.getScene()
+        # ensure scene editor graphics list is redisplayed, and widgets are updated
+        self.ui.scene_editor.setScene(scene)
+        self.ui.region_chooser.setRootRegion(self._rootRegion)
+        self.frameCacheClear()
+        self._spectrumHistogramCacheClear()
+        self._probeValueCache.clear()
+        self.allSettingsUpdate()
+        self.viewAll()
+
+    def modelWatchStateChanged(self, state):
+        '''
+        Start or stop watching model files for new or modified timesteps.
+        '''
+        if not state:
+            self._modelWatchStop()
+            return
+        if not (self._modelWatchFiles or self._modelWatchTimesteps):
+            print("No model files to watch: load a model file, or a script with watch_timesteps")
+            self.ui.model_watch_checkbox.setChecked(False)
+            return
+        self._modelWatcher = ModelWatcher(self)
+        for fileName, time in self._modelWatchFiles:
+            self._modelWatcher.addFile(fileName, time)
+        for timesteps in self._modelWatchTimesteps:
+            self._modelWatcher.addTimestepPattern(*timesteps)
+        self._modelWatcher.filesChanged.connect(self._modelFilesChanged)
+        self._modelWatcher.start()
+
+    def _modelWatchStop(self):
+        if self._modelWatcher is not None:
+            self._modelWatcher.stop()
+            self._modelWatcher.deleteLater()
+            self._modelWatcher = None
+        self.ui.model_watch_checkbox.setChecked(False)
+
+    def _modelFilesChanged(self, changes):
+        '''
+        Re-read new or modified model files into the existing region in one
+        read, extend the time range to cover new times and discard only the
+        cached frames and probe values the changed times affect. Graphics
+        and field definitions are untouched, so Zinc only rebuilds graphics
+        depending on changed parameters.
+        :param changes: List of (fileName, time), time None if not time-varying.
+        '''
+        oldTimes = ZincRegion_getTimes(self._rootRegion)
+        from opencmiss.zinc.streamregion import StreaminformationRegion
+        sir = self._rootRegion.createStreaminformationRegion()
+        for fileName, time in changes:
+            srf = sir.createStreamresourceFile(fileName)
+            if time is not None:
+                sir.setResourceAttributeReal(srf, StreaminformationRegion.ATTRIBUTE_TIME, time)
+        if self._rootRegion.read(sir) != RESULT_OK:
+            print("Failed to re-read changed model files: " + ", ".join(fileName for fileName, _ in changes))
+            return
+        changedTimes = [time for _, time in changes if time is not None]
+        if len(changedTimes) < len(changes):
+            # a file without time may change anything
+            self.frameCacheClear()
+            self._spectrumHistogramCacheClear()
+            self._probeValueCache.clear()
+        if changedTimes:
+            # time range is extended for new times even if caches were cleared
+            self._modelTimesChanged(oldTimes, changedTimes)
+        if self._probes:
+            self.probeUpdate()
+
+    def _modelTimesChanged(self, oldTimes, changedTimes):
+        '''
+        Discard cached frames, probe values and histograms affected by new or
+        modified parameters at changedTimes and extend the timekeeper range to
+        include them.
+        :param oldTimes: Sorted stored times before the change.
+        '''
+        # values interpolate between stored times, so frames between the
+        # neighbouring stored times of each changed time are stale
+        times = sorted(set(oldTimes + changedTimes))
+        intervals = []
+        for time in changedTimes:
+            index = times.index(time)
+            intervals.append((times[index - 1] if (index > 0) else float("-inf"),
+                times[index + 1] if (index + 1 < len(times)) else float("inf")))
+        self._frameCache.discard(lambda key: any((lower < key < upper) for lower, upper in intervals))
+        changedTimeSet = set(changedTimes)
+        self._spectrumSamplerCancel()
+        for key in [key for key in self._spectrumHistogramCache if changedTimeSet.intersection(key[3])]:
+            del self._spectrumHistogramCache[key]
+        for key in [key for key in self._probeValueCache if key[4] in changedTimeSet]:
+            del self._probeValueCache[key]
+        timekeeper = self._context.getTimekeepermodule().getDefaultTimekeeper()
+        minimum = min(changedTimes)
+        maximum = max(changedTimes)
+        if minimum < timekeeper.getMinimumTime():
+            timekeeper.setMinimumTime(minimum)
+        if maximum > timekeeper.getMaximumTime():
+            timekeeper.setMaximumTime(maximum)
+        self.timeMinimumDisplay()
+        self.timeMaximumDisplay()
+        self.timeSliderDisplay()
+        self.timePlayerUpdate()
+
+    def liveStateChanged(self, state):
+        '''
+        Start or stop receiving live simulation timesteps at the address entered.
+        '''
+        if state:
+            from zincview_live import DEFAULT_ADDRESS
+            self.liveStart(self.ui.live_address_lineedit.text() or DEFAULT_ADDRESS)
+        else:
+            self._liveStop()
+
+    def liveStart(self, address):
+        '''
+        Listen for live simulation timesteps on address unix:PATH or tcp:HOST:PORT.
+        :return True on success
+        '''
+        from zincview_live import LiveReceiver
+        self._liveStop()
+        try:
+            self._liveReceiver = LiveReceiver(address)
+            self._liveReceiver.start()
+        except (OSError, ValueError) as e:
+            print("Failed to start live input on " + address + ": " + str(e))
+            self._liveReceiver = None
+            self.ui.live_checkbox.setChecked(False)
+            return False
+        self.defineStandardMaterialsAndGlyphs()
+        self.ui.live_address_lineedit.setText(address)
+        self.ui.live_address_lineedit.setEnabled(False)
+        self.ui.live_checkbox.setChecked(True)
+        self._liveTimer.start()
+        return True
+
+    def _liveStop(self):
+        self._liveTimer.stop()
+        if self._liveReceiver is not None:
+            self._liveReceiver.stop()
+            self._liveReceiver = None
+        self._liveNewRegionPaths = set()
+        self.ui.live_checkbox.setChecked(False)
+        self.ui.live_address_lineedit.setEnabled(True)
+
+    def _liveUpdate(self):
+        '''
+        Set node parameters of frames received since the last update at
+        their times, and follow the newest time if the current time was at
+        the end of the time range.
+        '''
+        messages = self._liveReceiver.takeMessages()
+        # consecutive frames with the same layout are set together
+        layoutFrames = []
+        for layout, frame in messages:
+            if frame is None:
+                path = layout.getRegionPath()
+                region = self._rootRegion.findSubregionAtPath(path)
+                if not region.isValid():
+                    self._rootRegion.createSubregion(path)
+                self._liveNewRegionPaths.add(path)
+            elif layoutFrames and (layoutFrames[-1][0] is layout):
+                layoutFrames[-1][1].append(frame)
+            else:
+                layoutFrames.append((layout, [frame]))
+        if not layoutFrames:
+            return
+        oldTimes = ZincRegion_getTimes(self._rootRegion)
+        timekeeper = self._context.getTimekeepermodule().getDefaultTimekeeper()
+        follow = (not oldTimes) or (timekeeper.getTime() >= oldTimes[-1])
+        changedTimes = []
+        self._rootRegion.beginHierarchicalChange()
+        for layout, frames in layoutFrames:
+            region = self._rootRegion.findSubregionAtPath(layout.getRegionPath())
+            if not (region.isValid() and
+                    ZincRegion_setNodeFrames(region, layout.getFields(), layout.getNodeIdentifiers(), frames)):
+                print("Failed to set live frames in region " + layout.getRegionPath())
+                continue
+            changedTimes += [time for time, _ in frames]
+        self._rootRegion.endHierarchicalChange()
+        if not changedTimes:
+            return
+        if self._liveNewRegionPaths:
+            for path in self._liveNewRegionPaths:
+                self._liveCreateGraphics(self._rootRegion.findSubregionAtPath(path))
+            self._liveNewRegionPaths = set()
+            self.ui.region_chooser.setRootRegion(self._rootRegion)
+            self.allSettingsUpdate()
+            self.viewAll()
+        self._modelTimesChanged(oldTimes, changedTimes)
+        if follow and not self._timePlayer.isPlaying():
+            newestTime = max(changedTimes)
+            timekeeper.setTime(newestTime)
+            self._timePlayer.setCurrentTime(newestTime)
+            self.timeTextDisplay()
+            self.timeSliderDisplay()
+        if self._probes:
+            self.probeUpdate()
+
+    def _liveCreateGraphics(self, region):
+        '''
+        Show nodes of region receiving live data as points, coloured by the
+        first non-coordinate field, unless region already has graphics.
+        '''
+        from opencmiss.zinc.glyph import Glyph
+        scene = region.getScene()
+        if scene.getFirstGraphics().isValid():
+            return
+        fieldmodule = region.getFieldmodule()
+        coordinateField = ZincFieldmodule_getDefaultCoordinateField(fieldmodule)
+        if coordinateField is None:
+            return
+        dataField = None
+        fielditer = fieldmodule.createFielditerator()
+        field = fielditer.next()
+        while field.isValid():
+            if field.castFiniteElement().isValid() and not field.isTypeCoordinate():
+                dataField = field
+                break
+            field = fielditer.next()
+        scene.beginChange()
+        points = scene.createGraphicsPoints()
+        points.setFieldDomainType(Field.DOMAIN_TYPE_NODES)
+        points.setCoordinateField(coordinateField)
+        points.getGraphicspointattributes().setGlyphShapeType(Glyph.SHAPE_TYPE_POINT)
+        if dataField is not None:
+            points.setDataField(dataField)
+            points.setSpectrum(scene.getSpectrummodule().getDefaultSpectrum())
+        scene.endChange()
+
+    def sessionSaveClicked(self):
+        '''
+        Save whole session to a binary snapshot file.
+        '''
+        fileNameTuple = QtGui.QFileDialog.getSaveFileName(self, "Save ZincView Session", "", "ZincView sessions (*.zvsession)")
+        fileName = fileNameTuple[0]
+        if not fileName:
+            return
+        QtGui.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            success = self.sessionSave(fileName)
+        finally:
+            QtGui.QApplication.restoreOverrideCursor()
+        if not success:
+            QtGui.QMessageBox.warning(self, "ZincView", "Failed to save session: " + fileName)
+
+    def sessionSave(self, fileName):
+        '''
+        Write region tree, scene graphics, materials, spectra, tessellations,
+        timekeeper and sceneviewer state to a session snapshot. Time-varying
+        node parameters are stored in a separate section per time so they
+        can be read lazily.
+        :return True on success
+        '''
+        self._changeCoalescer.flush()
+        self._regionPageInAll()
+        # culling groups are not saved; culling resumes after saving
+        self._viewCullingRestoreAll()
+        # complete any lazy read so all times are saved
+        while self._sessionPendingTimes:
+            self._sessionReadNext()
+        times = ZincRegion_getTimes(self._rootRegion)
+        timekeeper = self._context.getTimekeepermodule().getDefaultTimekeeper()
+        sceneviewer = self.ui.sceneviewerwidget.getSceneviewer()
+        from zincview_session import SessionWriter
+        writer = SessionWriter(fileName)
+        try:
+            if not ZincRegion_writeSnapshot(self._rootRegion, writer, times):
+                raise ValueError("Failed to write model to session")
+            result, eye, lookat, up = sceneviewer.getLookatParameters()
+            state = {
+                "times": times,
+                "materials": _ZincModule_writeDescription(self._context.getMaterialmodule()),
+                "spectra": _ZincModule_writeDescription(self._context.getSpectrummodule()),
+                "tessellations": _ZincModule_writeDescription(self._context.getTessellationmodule()),
+                "timekeeper": {
+                    "minimum": timekeeper.getMinimumTime(),
+                    "maximum": timekeeper.getMaximumTime(),
+                    "time": timekeeper.getTime()},
+                "sceneviewer": _ZincModule_writeDescription(sceneviewer),
+                "view": {
+                    "eye": list(eye), "lookat": list(lookat), "up": list(up),
+                    "viewAngle": sceneviewer.getViewAngle(),
+                    "nearClippingPlane": sceneviewer.getNearClippingPlane(),
+                    "farClippingPlane": sceneviewer.getFarClippingPlane()},
+                "regions": ZincRegion_getDescriptions(self._rootRegion)}
+            writer.addJson("state", state)
+            writer.close()
+        except Exception as e:
+            print(e)
+            writer.abort()
+            return False
+        return True
+
+    def sessionOpenClicked(self):
+        '''
+        Replace model with session read from a snapshot file.
+        '''
+        fileNameTuple = QtGui.QFileDialog.getOpenFileName(self, "Open ZincView Session", "", "ZincView sessions (*.zvsession)")
+        fileName = fileNameTuple[0]
+        if not fileName:
+            return
+        QtGui.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            success = self.sessionOpen(fileName)
+        finally:
+            QtGui.QApplication.restoreOverrideCursor()
+        if not success:
+            QtGui.QMessageBox.warning(self, "ZincView", "Failed to open session: " + fileName)
+
+    def sessionOpen(self, fileName):
+        '''
+        Restore session from snapshot. Only node parameters at the saved
+        current time are read immediately; other times are read afterwards
+        in idle time, one per event loop pass.
+        :return True on success
+        '''
+        from zincview_session import SessionReader
+        # read and check the session into a new region before replacing the model
+        try:
+            reader = SessionReader(fileName)
+        except (IOError, OSError, ValueError) as e:
+            print(e)
+            return False
+        try:
+            state = reader.getState()
+            currentTime = state["timekeeper"]["time"]
+            region = self._context.createRegion()
+            pendingTimes = ZincRegion_readSnapshot(region, reader, state["times"], currentTime)
+        except ValueError as e:
+            reader.close()
+            print(e)
+            return False
+        self._modelReset(region)
+        self.defineStandardMaterialsAndGlyphs()
+        _ZincModule_readDescription(self._context.getMaterialmodule(), state["materials"])
+        _ZincModule_readDescription(self._context.getSpectrummodule(), state["spectra"])
+        _ZincModule_readDescription(self._context.getTessellationmodule(), state["tessellations"])
+        ZincRegion_readDescriptions(self._rootRegion, state["regions"])
+        timekeeper = self._context.getTimekeepermodule().getDefaultTimekeeper()
+        timekeeper.setMinimumTime(state["timekeeper"]["minimum"])
+        timekeeper.setMaximumTime(state["timekeeper"]["maximum"])
+        timekeeper.setTime(currentTime)
+        sceneviewer = self.ui.sceneviewerwidget.getSceneviewer()
+        scene = self._rootRegion.getScene()
+        sceneviewer.setScene(scene)
+        if state["sceneviewer"] is not None:
+            _ZincModule_readDescription(sceneviewer, state["sceneviewer"])
+        else:
+            view = state["view"]
+            sceneviewer.beginChange()
+            sceneviewer.setLookatParametersNonSkew(view["eye"], view["lookat"], view["up"])
+            sceneviewer.setViewAngle(view["viewAngle"])
+            sceneviewer.setNearClippingPlane(view["nearClippingPlane"])
+            sceneviewer.setFarClippingPlane(view["farClippingPlane"])
+            sceneviewer.endChange()
+        self.ui.scene_editor.setScene(scene)
+        self.ui.region_chooser.setRootRegion(self._rootRegion)
+        self.allSettingsUpdate()
+        self._sessionReader = reader
+        self._sessionPendingTimes = [(index, time) for index, time in pendingTimes]
+        if self._sessionPendingTimes:
+            self._sessionReadTimer.start()
+        else:
+            self._sessionStopReading()
+        return True
+
+    def _sessionReadNext(self):
+        '''
+        Read node parameters for the next pending time of the session being opened.
+        '''
+        if not self._sessionPendingTimes:
+            self._sessionStopReading()
+            return
+        index, time = self._sessionPendingTimes.pop(0)
+        buffer = self._sessionReader.getSection("nodes" + str(index))
+        if ZincRegion_readBuffers(self._rootRegion, [(buffer, time)]) != RESULT_OK:
+            print("Failed to read session nodes at time " + str(time))
+        if not self._sessionPendingTimes:
+            self._sessionStopReading()
+            self.frameCacheClear()
+            self.timePlayerUpdate()
+
+    def _sessionStopReading(self):
+        self._sessionReadTimer.stop()
+        self._sessionPendingTimes = []
+        if self._sessionReader is not None:
+            self._sessionReader.close()
+            self._sessionReader = None
+
+    def modelMemoryClicked(self):
+        '''
+        Show estimated memory use by region.
+        '''
+        self._getMemoryDock().show()
+        self._memoryTimer.start()
+
+    def _getMemoryDock(self):
+        '''
+        :return memory dock widget, created on first use.
+        '''
+        if self._memoryDock is None:
+            from zincview_memory import MemoryDockWidget
+            self._memoryDock = MemoryDockWidget(self)
+            self._memoryDock.setWarningThresholds(*self._memoryAccountant.getWarningThresholds())
+            self._memoryDock.thresholdsChanged.connect(self._memoryThresholdsChanged)
+            self._memoryDock.visibilityChanged.connect(self._memoryDockVisibilityChanged)
+            self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self._memoryDock)
+        return self._memoryDock
+
+    def _memoryThresholdsChanged(self):
+        self._memoryAccountant.setWarningThresholds(*self._memoryDock.getWarningThresholds())
+        self._memoryDockVisibilityChanged(self._memoryDock.isVisible())
+
+    def _memoryDockVisibilityChanged(self, visible):
+        '''
+        Keep refreshing estimates while hidden only if warnings are wanted.
+        '''
+        if visible or any((threshold is not None) for threshold in self._memoryAccountant.getWarningThresholds()):
+            self._memoryTimer.start()
+        else:
+            self._memoryTimer.stop()
+
+    def _memoryUpdated(self):
+        if (self._memoryDock is not None) and self._memoryDock.isVisible():
+            self._memoryDock.setUsages(self._memoryAccountant.getUsages(), self._memoryAccountant.getTotalBytes())
+
+    def _memoryWarning(self, message):
+        self.statusBar().showMessage(message)
+        self._getMemoryDock().show()
+
+    def modelPagingStateChanged(self, state):
+        '''
+        Start or stop paging out hidden regions. All paged out regions are
+        read back when stopped.
+        '''
+        if state:
+            self._getRegionPagingDock().show()
+            self._regionPagingTimer.start()
+            self._regionPagingUpdate()
+        else:
+            self._regionPagingTimer.stop()
+            self._regionPageInAll()
+            if self._regionPagingDock is not None:
+                self._regionPagingDock.hide()
+
+    def _getRegionPagingDock(self):
+        '''
+        :return region paging dock widget, created on first use.
+        '''
+        if self._regionPagingDock is None:
+            from zincview_paging import RegionPagingDockWidget
+            self._regionPagingDock = RegionPagingDockWidget(self)
+            self._regionPagingDock.setIdleTime(self._regionPager.getIdleTime())
+            self._regionPagingDock.setMemoryCeiling(self._regionPager.getMemoryCeiling())
+            self._regionPagingDock.settingsChanged.connect(self._regionPagingSettingsChanged)
+            self._regionPagingDock.regionActivated.connect(self._regionPagingRegionActivated)
+            self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self._regionPagingDock)
+        return self._regionPagingDock
+
+    def _regionPagingSettingsChanged(self):
+        self._regionPager.setIdleTime(self._regionPagingDock.getIdleTime())
+        self._regionPager.setMemoryCeiling(self._regionPagingDock.getMemoryCeiling())
+        self._regionPagingUpdate()
+
+    def _regionPagingRegionActivated(self, path):
+        region = self._rootRegion.findSubregionAtPath(path) if path.strip("/") else self._rootRegion
+        if region.isValid():
+            self.ui.region_chooser.setRegion(region)
+            self.regionChanged(0)
+
+    def _getRegionPagingPinnedPaths(self):
+        '''
+        :return set of paths of regions which must stay resident because
+        application objects refer to them.
+        '''
+        from zincview_isosurface import getIsosurfaceEngines
+        from zincview_timeseries import getTimeSeriesBindings
+        from zincview_volume import getVolumeLevelsOfDetail
+        pinnedPaths = set()
+        for binding in getTimeSeriesBindings():
+            pinnedPaths.add(binding.getRegion().getPath())
+        for engine in getIsosurfaceEngines():
+            pinnedPaths.add(engine.getRegion().getPath())
+        for volumeLevelOfDetail in getVolumeLevelsOfDetail():
+            pinnedPaths.add(volumeLevelOfDetail.getImageField().getFieldmodule().getRegion().getPath())
+        for probe in self._probes:
+            pinnedPaths.add(probe[0].getPath())
+        return pinnedPaths
+
+    def _regionPagingUpdate(self):
+        '''
+        Read back paged out regions which have been shown, then page out
+        region subtrees chosen by the pager, and update the paging dock.
+        '''
+        self._changeCoalescer.flush()
+        selectedRegion = self.ui.region_chooser.getRegion()
+        selectedPath = selectedRegion.getPath() if selectedRegion else None
+        pinnedPaths = self._getRegionPagingPinnedPaths()
+        regionStates = []
+        pageInRegions = []
+        for region, visible in ZincRegion_getRegionVisibilitiesInTree(self._rootRegion):
+            path = region.getPath()
+            if self._regionPager.isPagedOut(path):
+                if visible:
+                    pageInRegions.append(region)
+                regionStates.append((path, visible, False, None))
+                continue
+            residentBytes = self._memoryAccountant.getUsage(region).getTotalBytes()
+            regionStates.append((path, visible or (path == selectedPath), path in pinnedPaths, residentBytes))
+        for region in pageInRegions:
+            self._regionPageIn(region)
+        pageOutPaths = self._regionPager.update(regionStates)
+        for path in pageOutPaths:
+            self._regionPageOut(self._rootRegion.findSubregionAtPath(path))
+        if self._regionPagingDock is not None:
+            self._regionPagingDock.setSummaries(self._regionPager.getSummaries(), self._regionPager.getResidentBytes())
+
+    def _regionPagingForget(self, path):
+        '''
+        Discard indexes and cached values for region subtree at path so it
+        can be released.
+        '''
+        def inSubtree(otherPath):
+            return (otherPath == path) or otherPath.startswith(path.rstrip("/") + "/")
+        for cache in [self._nodeSpatialIndexes, self._meshLocationIndexes]:
+            for key in [key for key in cache if inSubtree(key)]:
+                del cache[key]
+        self._memoryAccountant.forget(path)
+        self._spectrumHistogramCacheClear()
+        self._probeValueCache.clear()
+
+    def _regionPageOut(self, region):
+        '''
+        Write region subtree with its field and scene descriptions to a page
+        file and replace it with an empty placeholder.
+        :return True on success
+        '''
+        from zincview_session import SessionWriter
+        path = region.getPath()
+        self._viewCullingForget(path)
+        residentBytes = self._regionPager.getSubtreeBytes(path)
+        fileName = self._regionPager.getNewCacheFileName()
+        writer = SessionWriter(fileName, compressionLevel=1)
+        try:
+            times = ZincRegion_getTimes(region)
+            if not ZincRegion_writeSnapshot(region, writer, times):
+                raise ValueError("Failed to page out region " + path)
+            writer.addJson("state", {"times": times, "regions": ZincRegion_getDescriptions(region)})
+            writer.close()
+        except (IOError, OSError, ValueError) as e:
+            print(e)
+            writer.abort()
+            return False
+        self._regionPagingForget(path)
+        ZincRegion_replaceWithPlaceholder(region)
+        self._regionPager.setPagedOut(path, fileName, residentBytes)
+        return True
+
+    def _regionPageIn(self, region):
+        '''
+        Read paged out region subtree back into its placeholder region.
+        :return True on success
+        '''
+        from zincview_session import SessionReader
+        path = region.getPath()
+        try:
+            reader = SessionReader(self._regionPager.getPagedOutFileName(path))
+        except (IOError, OSError, ValueError) as e:
+            print(e)
+            return False
+        try:
+            state = reader.getJson("state")
+            times = state["times"]
+            buffers = [(reader.getSection("region"), times[0] if times else None)]
+            for i, time in enumerate(times[1:]):
+                buffers.append((reader.getSection("nodes" + str(i + 1)), time))
+            region.beginHierarchicalChange()
+            result = ZincRegion_readBuffers(region, buffers)
+            if result == RESULT_OK:
+                ZincRegion_readDescriptions(region, state["regions"])
+            region.endHierarchicalChange()
+        finally:
+            reader.close()
+        if result != RESULT_OK:
+            print("Failed to page in region " + path)
+            return False
+        self._regionPager.setPagedIn(path)
+        self.frameCacheClear()
+        return True
+
+    def _regionPageInAll(self):
+        '''
+        Read back all paged out regions.
+        '''
+        for path in self._regionPager.getPagedOutPaths():
+            self._regionPageIn(self._rootRegion.findSubregionAtPath(path))
 
-                success = foo.loadModel(self._rootRegion)
-            except:
-                success = False
-        else:
-            result = self._rootRegion.readFile(inputScriptFileName)
-            success = (result == RESULT_OK)
-        if not success:
-            msgBox = QtGui.QMessageBox()
-            msgBox.setWindowTitle("ZincView")
-            msgBox.setText("Error reading file: " + inputScriptFileName)
-            msgBox.setStandardButtons(QtGui.QMessageBox.Ok)
-            msgBox.setDefaultButton(QtGui.QMessageBox.Cancel)
-            result = msgBox.exec_()
+    def _changeAdded(self, key):
+        '''
+        Called when a setting change is queued. Switch volumes to a coarse
+        level of detail while the user is editing settings which rebuild
+        volume graphics, i.e. tessellations.
+        '''
+        from zincview_volume import getVolumeLevelsOfDetail
+        if self._volumeCoarseWhileEditing and key.startswith("tessellation_"):
+            for volumeLevelOfDetail in getVolumeLevelsOfDetail():
+                volumeLevelOfDetail.beginInteraction()
+
+    def _changesApplied(self):
+        '''
+        Called after a batch of coalesced setting changes has been applied.
+        '''
+        from zincview_volume import getVolumeLevelsOfDetail
+        self.frameCacheClear()
+        for volumeLevelOfDetail in getVolumeLevelsOfDetail():
+            volumeLevelOfDetail.endInteraction()
+
+    def getRebuildCount(self):
+        '''
+        :return Number of graphics rebuilds triggered by coalesced setting changes.
+        '''
+        return self._changeCoalescer.getRebuildCount()
+
+    def modelBakeFieldClicked(self):
+        '''
+        Bake a derived field in the region chosen in the Graphics panel to
+        stored time-varying parameters at nodes, or at element sample
+        points if not defined at nodes, and make graphics show the baked
+        field instead.
+        '''
+        region = self.ui.region_chooser.getRegion()
+        if region is None:
+            QtGui.QMessageBox.warning(self, "ZincView", "Region chosen in the Graphics panel no longer exists")
             return
-        scene = self._rootRegion.getScene()
-        # ensure scene editor graphics list is redisplayed, and widgets are updated
+        fieldName, ok = QtGui.QInputDialog.getText(self, "Bake field", "Field name:")
+        if not (ok and fieldName):
+            return
+        fieldmodule = region.getFieldmodule()
+        field = fieldmodule.findFieldByName(fieldName)
+        if not field.isValid():
+            QtGui.QMessageBox.warning(self, "ZincView", "Field " + fieldName + " not found")
+            return
+        times = ZincRegion_getTimes(self._rootRegion)
+        if not times:
+            timekeepermodule = self._context.getTimekeepermodule()
+            times = [timekeepermodule.getDefaultTimekeeper().getTime()]
+        scene = region.getScene()
+        QtGui.QApplication.setOverrideCursor(QtCore.Qt.WaitCursor)
+        try:
+            bakedField = ZincRegion_bakeFieldAtNodes(region, fieldName, times)
+            if bakedField is not None:
+                bakedNames = [bakedField.getName()]
+                graphicsCount = ZincScene_replaceGraphicsField(scene, field, bakedField)
+            else:
+                bakedFields = ZincRegion_bakeFieldsAtElementPoints(region, [fieldName], times)
+                bakedNames = [baked.getName() for baked in bakedFields] if bakedFields else []
+                graphicsCount = ZincScene_useBakedElementPoints(scene, field, bakedFields[0], bakedFields[-1]) if bakedFields else 0
+        finally:
+            QtGui.QApplication.restoreOverrideCursor()
+        if not bakedNames:
+            QtGui.QMessageBox.warning(self, "ZincView", "Failed to bake field " + fieldName)
+            return
+        self.frameCacheClear()
+        self.statusBar().showMessage("Baked " + fieldName + " at " + str(len(times)) + " times to " + ", ".join(bakedNames) +
+            "; " + str(graphicsCount) + " graphics updated")
+        # ensure scene editor field lists include baked fields
         self.ui.scene_editor.setScene(scene)
-        self.ui.region_chooser.setRootRegion(self._rootRegion)
-        self.allSettingsUpdate()
-        self.viewAll()
 
     def toolBoxPageChanged(self, page):
         # enable view widget updates only when looking at them
@@ -232,10 +2772,546 @@ class ZincView(QtGui.QMainWindow):
         self.timeMaximumDisplay()
         self.timeTextDisplay()
         self.timeSliderDisplay()
+        self.timePlayerUpdate()
+        self.timeFramesPerSecondDisplay()
+        self.isovalueContoursUpdate()
 
     def regionChanged(self, int):
         region = self.ui.region_chooser.getRegion()
+        if region is None:
+            return
+        if self._regionPager.isPagedOut(region.getPath()):
+            self._regionPageIn(region)
         self.ui.scene_editor.setScene(region.getScene())
+        self.isovalueContoursUpdate()
+
+    def isovalueContoursUpdate(self):
+        '''
+        List contours graphics in the scene of the region chosen in the
+        Graphics panel, and isosurface engine surfaces in that region.
+        '''
+        from zincview_isosurface import getIsosurfaceEngines
+        if self._isovalueEditor is not None:
+            self._isovalueEditor.stop()
+        region = self.ui.region_chooser.getRegion()
+        self._isovalueTargets = []
+        names = []
+        if region and region.isValid():
+            scene = region.getScene()
+            graphics = scene.getFirstGraphics()
+            while graphics.isValid():
+                contours = graphics.castContours()
+                if contours.isValid():
+                    self._isovalueTargets.append((contours, None, None))
+                    names.append(str(len(names) + 1) + ". contours " + contours.getIsoscalarField().getName())
+                graphics = scene.getNextGraphics(graphics)
+            for engine in getIsosurfaceEngines():
+                if engine.getRegion().getPath() == region.getPath():
+                    for name in engine.getScalarNames():
+                        self._isovalueTargets.append((None, engine, name))
+                        names.append(str(len(names) + 1) + ". isosurface " + name)
+        self.ui.isovalue_contours_combobox.blockSignals(True)
+        self.ui.isovalue_contours_combobox.clear()
+        self.ui.isovalue_contours_combobox.addItems(names)
+        self.ui.isovalue_contours_combobox.blockSignals(False)
+        self.isovalueContoursChanged(self.ui.isovalue_contours_combobox.currentIndex())
+
+    def _getIsovalueEditor(self):
+        '''
+        :return IsovalueEditor, created on first use.
+        '''
+        if self._isovalueEditor is None:
+            from zincview_isosurface import IsovalueEditor
+            self._isovalueEditor = IsovalueEditor(self)
+            self._isovalueEditor.refined.connect(self._isovalueRefined)
+        return self._isovalueEditor
+
+    def isovalueContoursChanged(self, index):
+        '''
+        Choose contours or isosurface to edit isovalue of, and get the
+        slider range from the values of its isoscalar field.
+        '''
+        if (index < 0) or (index >= len(self._isovalueTargets)):
+            if self._isovalueEditor is not None:
+                self._isovalueEditor.setContours(None)
+            self.ui.isovalue_widget.setEnabled(False)
+            self.ui.isovalue_slider.setEnabled(False)
+            return
+        self.ui.isovalue_widget.setEnabled(True)
+        self.ui.isovalue_slider.setEnabled(True)
+        contours, engine, name = self._isovalueTargets[index]
+        isovalueEditor = self._getIsovalueEditor()
+        minimum = maximum = None
+        if contours is not None:
+            isovalueEditor.setContours(contours)
+            field = contours.getIsoscalarField()
+            if field.isValid() and field.getName():
+                timekeepermodule = self._context.getTimekeepermodule()
+                time = timekeepermodule.getDefaultTimekeeper().getTime()
+                values = ZincField_getSampleValues(field, 1, time)
+                if values.size > 0:
+                    minimum, maximum = float(values.min()), float(values.max())
+        else:
+            isovalueEditor.setIsosurface(engine, name)
+            minimum, maximum = engine.getScalarRange(name)
+        isovalue = isovalueEditor.getIsovalue()
+        if minimum is None:
+            value = isovalue if (isovalue is not None) else 0.0
+            minimum, maximum = value - 1.0, value + 1.0
+        elif isovalue is not None:
+            minimum = min(minimum, isovalue)
+            maximum = max(maximum, isovalue)
+        self._isovalueRange = (minimum, maximum)
+        self.isovalueDisplay()
+
+    def isovalueDisplay(self):
+        '''
+        Display isovalue of chosen contours on line edit and slider.
+        '''
+        isovalue = self._getIsovalueEditor().getIsovalue()
+        if isovalue is None:
+            self.ui.isovalue_lineedit.setText("")
+            return
+        self._displayReal(self.ui.isovalue_lineedit, isovalue)
+        self._displayIsovalueSliderValue(isovalue)
+
+    def _displayIsovalueSliderValue(self, isovalue):
+        minimum, maximum = self._isovalueRange
+        self.ui.isovalue_slider.blockSignals(True)
+        if maximum > minimum:
+            value = int(round((isovalue - minimum)*(1000.0/(maximum - minimum))))
+        else:
+            value = 0
+        self.ui.isovalue_slider.setValue(value)
+        self.ui.isovalue_slider.blockSignals(False)
+
+    def _setIsovalue(self, isovalue):
+        '''
+        Show coarse preview at isovalue, to be refined once settled.
+        '''
+        from zincview_volume import getVolumeLevelsOfDetail
+        self.frameCacheClear()
+        if self._volumeCoarseWhileEditing:
+            for volumeLevelOfDetail in getVolumeLevelsOfDetail():
+                volumeLevelOfDetail.beginInteraction()
+        self._getIsovalueEditor().setIsovalue(isovalue)
+
+    def isovalueEntered(self):
+        '''
+        Set isovalue of chosen contours from value in widget
+        '''
+        try:
+            isovalue = float(self.ui.isovalue_lineedit.text())
+            if isovalue != self._getIsovalueEditor().getIsovalue():
+                minimum, maximum = self._isovalueRange
+                self._isovalueRange = (min(minimum, isovalue), max(maximum, isovalue))
+                self._setIsovalue(isovalue)
+                self._displayIsovalueSliderValue(isovalue)
+        except:
+            print("Invalid isovalue")
+            self.isovalueDisplay()
+
+    def isovalueSliderChanged(self, value):
+        '''
+        Preview isovalue from slider while dragging
+        '''
+        minimum, maximum = self._isovalueRange
+        isovalue = minimum + float(value)*((maximum - minimum)/1000.0)
+        self._displayReal(self.ui.isovalue_lineedit, isovalue)
+        self._setIsovalue(isovalue)
+
+    def _isovalueRefined(self):
+        '''
+        Called when an isovalue change has been refined to full resolution.
+        '''
+        from zincview_volume import getVolumeLevelsOfDetail
+        self.frameCacheClear()
+        for volumeLevelOfDetail in getVolumeLevelsOfDetail():
+            volumeLevelOfDetail.endInteraction()
+
+    def getNodeSpatialIndex(self, region=None):
+        '''
+        Get spatial index of nodes in region, creating on first use.
+        :param region: Region to index, or None for the region chosen in the Graphics panel.
+        :return NodeSpatialIndex, or None if the chosen region no longer exists.
+        '''
+        if region is None:
+            region = self.ui.region_chooser.getRegion()
+            if region is None:
+                return None
+        path = region.getPath()
+        nodeSpatialIndex = self._nodeSpatialIndexes.get(path)
+        if nodeSpatialIndex is None:
+            nodeSpatialIndex = NodeSpatialIndex(region)
+            self._nodeSpatialIndexes[path] = nodeSpatialIndex
+        return nodeSpatialIndex
+
+    def getMeshLocationIndex(self, region=None):
+        '''
+        Get mesh location index for the highest dimension mesh in region,
+        creating on first use.
+        :param region: Region to index, or None for the region chosen in the Graphics panel.
+        :return MeshLocationIndex, or None if the chosen region no longer exists.
+        '''
+        if region is None:
+            region = self.ui.region_chooser.getRegion()
+            if region is None:
+                return None
+        path = region.getPath()
+        meshLocationIndex = self._meshLocationIndexes.get(path)
+        if meshLocationIndex is None:
+            meshLocationIndex = MeshLocationIndex(region)
+            self._meshLocationIndexes[path] = meshLocationIndex
+        return meshLocationIndex
+
+    def _getCurrentTime(self):
+        timekeepermodule = self._context.getTimekeepermodule()
+        return timekeepermodule.getDefaultTimekeeper().getTime()
+
+    def _getWindowProjection(self, region):
+        '''
+        :return 4x4 matrix transforming region coordinates to window pixels
+        from the top left, or None if not available.
+        '''
+        sceneviewer = self.ui.sceneviewerwidget.getSceneviewer()
+        if (sceneviewer is None) or (not sceneviewer.isValid()):
+            return None
+        result, matrix = sceneviewer.getTransformationMatrix(SCENECOORDINATESYSTEM_LOCAL, SCENECOORDINATESYSTEM_WINDOW_PIXEL_TOP_LEFT, region.getScene(), 16)
+        if result != RESULT_OK:
+            return None
+        return numpy.array(matrix, dtype=numpy.float64).reshape(4, 4)
+
+    def _getPickRay(self, region, matrix, x, y):
+        '''
+        :param matrix: Window projection of region from _getWindowProjection.
+        :return start, direction in region coordinates of ray from the eye
+        plane through window position x, y, or None, None if not available.
+        '''
+        sceneviewer = self.ui.sceneviewerwidget.getSceneviewer()
+        result, eye, lookat, up = sceneviewer.getLookatParameters()
+        if result != RESULT_OK:
+            return None, None
+        result, worldMatrix = sceneviewer.getTransformationMatrix(SCENECOORDINATESYSTEM_WORLD, SCENECOORDINATESYSTEM_LOCAL, region.getScene(), 16)
+        if result != RESULT_OK:
+            return None, None
+        worldMatrix = numpy.array(worldMatrix, dtype=numpy.float64).reshape(4, 4)
+        eye, lookat = [point[:3]/point[3] for point in numpy.array([list(eye) + [1.0], list(lookat) + [1.0]]).dot(worldMatrix.T)]
+        view = lookat - eye
+        points = numpy.array([[x, y, 0.0, 1.0], [x, y, 1.0, 1.0]]).dot(numpy.linalg.inv(matrix).T)
+        points = points[:, :3]/points[:, 3:]
+        direction = points[1] - points[0]
+        along = numpy.dot(direction, view)
+        if along == 0.0:
+            return None, None
+        if along < 0.0:
+            direction = -direction
+            along = -along
+        # start where the pick line crosses the plane of the eye normal to the view,
+        # which is the eye itself for perspective views
+        start = points[0] - (numpy.dot(points[0] - eye, view)/along)*direction
+        return start, direction
+
+    def nodeHoverStateChanged(self, state):
+        '''
+        Show node identifier and coordinates under the mouse
+        '''
+        self.ui.sceneviewerwidget.setMouseTracking(state)
+        if not state:
+            QtGui.QToolTip.hideText()
+
+    def nodeBoxSelectStateChanged(self, state):
+        '''
+        Drag a box on the view to select nodes instead of transforming the view
+        '''
+        self._nodeBoxOrigin = None
+        if self._nodeRubberBand:
+            self._nodeRubberBand.hide()
+
+    def _nodeHover(self, position, globalPosition, tolerance=5.0):
+        '''
+        Show readout of the node nearest the eye among nodes within
+        tolerance pixels of window position.
+        '''
+        region = self.ui.region_chooser.getRegion()
+        if region is None:
+            QtGui.QToolTip.hideText()
+            return
+        matrix = self._getWindowProjection(region)
+        nodeSpatialIndex = self.getNodeSpatialIndex(region)
+        time = self._getCurrentTime()
+        minimum, maximum = nodeSpatialIndex.getBoundingBox(time)
+        if (matrix is None) or (minimum is None):
+            QtGui.QToolTip.hideText()
+            return
+        x, y = position.x(), position.y()
+        start, direction = self._getPickRay(region, matrix, x, y)
+        if start is None:
+            QtGui.QToolTip.hideText()
+            return
+        # world size of tolerance at the depth of the nodes
+        inverse = numpy.linalg.inv(matrix)
+        centre = numpy.append(0.5*(minimum + maximum), 1.0).dot(matrix.T)
+        depth = centre[2]/centre[3]
+        points = numpy.array([[x, y, depth, 1.0], [x + tolerance, y, depth, 1.0]]).dot(inverse.T)
+        points = points[:, :3]/points[:, 3:]
+        maximumDistance = 4.0*numpy.linalg.norm(points[1] - points[0])
+        nodeIdentifier, _ = nodeSpatialIndex.findNearestNodeToRay(start, direction, time, maximumDistance)
+        if nodeIdentifier is not None:
+            coordinates = nodeSpatialIndex.getNodeCoordinates(nodeIdentifier, time)
+            projected = numpy.append(coordinates, 1.0).dot(matrix.T)
+            if (projected[3] > 0.0) and (numpy.hypot(projected[0]/projected[3] - x, projected[1]/projected[3] - y) <= tolerance):
+                text = "Node " + str(nodeIdentifier) + ": " + ", ".join('{:.5g}'.format(value) for value in coordinates)
+                QtGui.QToolTip.showText(globalPosition, text, self.ui.sceneviewerwidget)
+                return
+        QtGui.QToolTip.hideText()
+
+    def _nodeBoxSelect(self, rectangle, add):
+        '''
+        Select nodes of the region chosen in the Graphics panel which project
+        inside the window rectangle.
+        '''
+        region = self.ui.region_chooser.getRegion()
+        matrix = self._getWindowProjection(region) if region else None
+        if matrix is None:
+            return
+        polygon = [[rectangle.left(), rectangle.top()], [rectangle.right(), rectangle.top()],
+                   [rectangle.right(), rectangle.bottom()], [rectangle.left(), rectangle.bottom()]]
+        nodeIdentifiers = self.getNodeSpatialIndex(region).findNodesInProjectedPolygon(matrix, polygon, self._getCurrentTime())
+        ZincScene_selectNodes(region.getScene(), nodeIdentifiers, add)
+
+    def probeStateChanged(self, state):
+        '''
+        Click on surfaces to add probes instead of transforming the view
+        '''
+        self._probeClickPosition = None
+        if state:
+            self._getProbeDock().show()
+
+    def viewCullingStateChanged(self, state):
+        '''
+        Start or stop culling mesh graphics of large meshes to elements in view.
+        '''
+        self._viewCulling = state
+        if state:
+            self._viewCullingUpdate()
+        else:
+            self._viewCullingTimer.stop()
+            self._viewCullingRestoreAll()
+
+    def _viewCullingUpdate(self):
+        '''
+        Update culling groups of visible regions with large meshes from the
+        current view and time, and stop culling in other regions.
+        '''
+        if not self._viewCulling:
+            return
+        width = self.ui.sceneviewerwidget.width()
+        height = self.ui.sceneviewerwidget.height()
+        margin = self._viewCullingMargin*max(width, height)
+        time = self._getCurrentTime()
+        culledPaths = set()
+        self._viewCullingUpdating = True
+        try:
+            for region, visible in ZincRegion_getRegionVisibilitiesInTree(self._rootRegion):
+                mesh = ZincRegion_getHighestDimensionMesh(region) if visible else None
+                if (mesh is None) or (mesh.getSize() < self._viewCullingMinimumElements):
+                    continue
+                matrix = self._getWindowProjection(region)
+                if matrix is None:
+                    continue
+                path = region.getPath()
+                meshLocationIndex = self.getMeshLocationIndex(region)
+                viewCullingGroup = self._viewCullingGroups.get(path)
+                if (viewCullingGroup is None) or (viewCullingGroup.getMeshLocationIndex() is not meshLocationIndex):
+                    if viewCullingGroup is not None:
+                        viewCullingGroup.restore()
+                    viewCullingGroup = ViewCullingGroup(region, meshLocationIndex)
+                    self._viewCullingGroups[path] = viewCullingGroup
+                viewCullingGroup.update(matrix, width, height, time, margin)
+                culledPaths.add(path)
+            for path in [path for path in self._viewCullingGroups if path not in culledPaths]:
+                self._viewCullingGroups.pop(path).restore()
+        finally:
+            self._viewCullingUpdating = False
+
+    def _viewCullingForget(self, path):
+        '''
+        Stop culling graphics in region subtree at path.
+        '''
+        for key in list(self._viewCullingGroups.keys()):
+            if (key == path) or key.startswith(path.rstrip("/") + "/"):
+                self._viewCullingGroups.pop(key).restore()
+
+    def _viewCullingRestoreAll(self):
+        '''
+        Stop culling graphics in all regions. If culling is on it resumes
+        once the view next settles.
+        '''
+        for viewCullingGroup in self._viewCullingGroups.values():
+            viewCullingGroup.restore()
+        self._viewCullingGroups.clear()
+        if self._viewCulling:
+            self._viewCullingTimer.start()
+
+    def _getProbeDock(self):
+        '''
+        :return probe dock widget, created on first use.
+        '''
+        if self._probeDock is None:
+            from zincview_probe import ProbeDockWidget
+            self._probeDock = ProbeDockWidget(self)
+            self._probeDock.fieldsEntered.connect(self._probeFieldsEntered)
+            self._probeDock.clearClicked.connect(self.probeClear)
+            self.addDockWidget(QtCore.Qt.BottomDockWidgetArea, self._probeDock)
+        return self._probeDock
+
+    def _probeAdd(self, position):
+        '''
+        Add probe at the material point on the surface under window position.
+        The picked element's surface is intersected with the pick ray, and
+        the intersection is located in the highest dimension mesh.
+        '''
+        sceneviewer = self.ui.sceneviewerwidget.getSceneviewer()
+        scenepicker = sceneviewer.getScene().createScenepicker()
+        scenepicker.setSceneviewerRectangle(sceneviewer, SCENECOORDINATESYSTEM_WINDOW_PIXEL_TOP_LEFT,
+            position.x() - 2, position.y() - 2, position.x() + 2, position.y() + 2)
+        element = scenepicker.getNearestElement()
+        if not element.isValid():
+            return
+        fieldmodule = element.getMesh().getFieldmodule()
+        region = fieldmodule.getRegion()
+        matrix = self._getWindowProjection(region)
+        coordinateField = ZincFieldmodule_getDefaultCoordinateField(fieldmodule)
+        if (matrix is None) or (coordinateField is None):
+            return
+        coordinateField = ZincField_getRectangularCartesian(coordinateField)
+        time = self._getCurrentTime()
+        inverse = numpy.linalg.inv(matrix)
+        windowPoints = numpy.array([[position.x(), position.y(), 0.0, 1.0], [position.x(), position.y(), 1.0, 1.0]])
+        points = windowPoints.dot(inverse.T)
+        points = points[:, :3]/points[:, 3:]
+        xi, _ = ZincElement_findXiOnLine(coordinateField, element, points[0], points[1] - points[0], time)
+        if xi is None:
+            return
+        meshLocationIndex = self.getMeshLocationIndex(region)
+        mesh = meshLocationIndex.getMesh()
+        dimension = element.getMesh().getDimension()
+        elementIdentifier = element.getIdentifier()
+        if mesh and (mesh.getDimension() > dimension):
+            fieldcache = fieldmodule.createFieldcache()
+            fieldcache.setTime(time)
+            fieldcache.setMeshLocation(element, xi)
+            result, point = coordinateField.evaluateReal(fieldcache, 3)
+            elementIdentifiers, xis = meshLocationIndex.findMeshLocations([point], time, nearest=True)
+            if elementIdentifiers[0] < 0:
+                return
+            dimension = mesh.getDimension()
+            elementIdentifier = int(elementIdentifiers[0])
+            xi = xis[0].tolist()
+        self._probes.append((region, dimension, elementIdentifier, tuple(xi)))
+        probeDock = self._getProbeDock()
+        if not probeDock.getFieldNames():
+            probeDock.setFieldNames([coordinateField.getName()])
+        probeDock.show()
+        self.probeUpdate()
+
+    def _probeFieldsEntered(self, fieldNames):
+        self.probeUpdate()
+
+    def probeClear(self):
+        '''
+        Remove all probes
+        '''
+        self._probes = []
+        self._probeValueCache.clear()
+        if self._probeDock is not None:
+            self._probeDock.getPlotWidget().setSeries([], [])
+
+    def probeUpdate(self):
+        '''
+        Plot probe field values over all times. Values not yet cached are
+        evaluated for all probes and times in one batch per region and field.
+        '''
+        if self._probeDock is None:
+            return
+        times = ZincRegion_getTimes(self._rootRegion)
+        if not times:
+            times = [self._getCurrentTime()]
+        fieldNames = self._probeDock.getFieldNames()
+        series = []
+        for fieldName in fieldNames:
+            # group probes missing any cached times by region and mesh
+            missing = OrderedDict()
+            for region, dimension, elementIdentifier, xi in self._probes:
+                probeKey = (region.getPath(), elementIdentifier, xi, fieldName)
+                missingTimes = [time for time in times if (probeKey + (time,)) not in self._probeValueCache]
+                if missingTimes:
+                    missing.setdefault((region.getPath(), dimension), (region, [], set()))
+                    entry = missing[(region.getPath(), dimension)]
+                    entry[1].append((elementIdentifier, xi))
+                    entry[2].update(missingTimes)
+            for (path, dimension), (region, locations, missingTimes) in missing.items():
+                missingTimes = sorted(missingTimes)
+                values = ZincRegion_evaluateFieldAtMeshLocations(region, fieldName, dimension,
+                    [location[0] for location in locations], numpy.array([location[1] for location in locations]), missingTimes)
+                if values is None:
+                    print("Probe field " + fieldName + " not found in region " + path)
+                    continue
+                for l, (elementIdentifier, xi) in enumerate(locations):
+                    for t, time in enumerate(missingTimes):
+                        self._probeValueCache[(path, elementIdentifier, xi, fieldName, time)] = values[t, l]
+            for p, (region, dimension, elementIdentifier, xi) in enumerate(self._probes):
+                probeKey = (region.getPath(), elementIdentifier, xi, fieldName)
+                probeValues = [self._probeValueCache.get(probeKey + (time,)) for time in times]
+                if any(value is None for value in probeValues):
+                    continue
+                probeValues = numpy.array(probeValues)
+                for c in range(probeValues.shape[1]):
+                    label = "P" + str(p + 1) + " " + fieldName + ("[" + str(c + 1) + "]" if (probeValues.shape[1] > 1) else "")
+                    series.append((label, probeValues[:, c].tolist()))
+        plotWidget = self._probeDock.getPlotWidget()
+        plotWidget.setSeries(times, series)
+        plotWidget.setCurrentTime(self._getCurrentTime())
+
+    def eventFilter(self, watched, event):
+        '''
+        Intercept sceneviewer mouse events for node hover readout, box selection
+        and adding probes, and drop cached playback frames on resize.
+        '''
+        if watched is self.ui.sceneviewerwidget:
+            eventType = event.type()
+            if eventType == QtCore.QEvent.Resize:
+                self._sceneviewerResized()
+            if self.ui.node_box_select_checkbox.isChecked():
+                if (eventType == QtCore.QEvent.MouseButtonPress) and (event.button() == QtCore.Qt.LeftButton):
+                    self._nodeBoxOrigin = event.pos()
+                    if self._nodeRubberBand is None:
+                        self._nodeRubberBand = QtGui.QRubberBand(QtGui.QRubberBand.Rectangle, self.ui.sceneviewerwidget)
+                    self._nodeRubberBand.setGeometry(QtCore.QRect(self._nodeBoxOrigin, QtCore.QSize()))
+                    self._nodeRubberBand.show()
+                    return True
+                if (eventType == QtCore.QEvent.MouseMove) and (self._nodeBoxOrigin is not None):
+                    self._nodeRubberBand.setGeometry(QtCore.QRect(self._nodeBoxOrigin, event.pos()).normalized())
+                    return True
+                if (eventType == QtCore.QEvent.MouseButtonRelease) and (self._nodeBoxOrigin is not None):
+                    rectangle = QtCore.QRect(self._nodeBoxOrigin, event.pos()).normalized()
+                    self._nodeBoxOrigin = None
+                    self._nodeRubberBand.hide()
+                    self._nodeBoxSelect(rectangle, bool(event.modifiers() & QtCore.Qt.ShiftModifier))
+                    return True
+            if self.ui.probe_checkbox.isChecked():
+                if (eventType == QtCore.QEvent.MouseButtonPress) and (event.button() == QtCore.Qt.LeftButton):
+                    self._probeClickPosition = event.pos()
+                    return True
+                if (eventType == QtCore.QEvent.MouseButtonRelease) and (self._probeClickPosition is not None):
+                    if (event.pos() - self._probeClickPosition).manhattanLength() <= 3:
+                        self._probeAdd(event.pos())
+                    self._probeClickPosition = None
+                    return True
+            if (eventType == QtCore.QEvent.MouseMove) and (event.buttons() == QtCore.Qt.NoButton) and \
+                    self.ui.node_hover_checkbox.isChecked():
+                self._nodeHover(event.pos(), event.globalPos())
+        return QtGui.QMainWindow.eventFilter(self, watched, event)
 
     def viewAll(self):
         '''
@@ -329,8 +3405,11 @@ class ZincView(QtGui.QMainWindow):
             if minimumDivisions != oldMinimumDivisions:
                 result, refinementFactors = tessellation.getRefinementFactors(3)
                 if self._checkTessellationDivisions(minimumDivisions, refinementFactors, self.ui.tessellation_minimum_divisions_lineedit):
-                    if RESULT_OK != tessellation.setMinimumDivisions(minimumDivisions):
-                        raise
+                    def setMinimumDivisions():
+                        if RESULT_OK != tessellation.setMinimumDivisions(minimumDivisions):
+                            print("Invalid tessellation minimum divisions")
+                        self.tessellationMinimumDivisionsDisplay()
+                    self._changeCoalescer.addChange("tessellation_minimum_divisions", setMinimumDivisions, [tessellationmodule])
         except:
             print("Invalid tessellation minimum divisions")
         #self.tessellationMinimumDivisionsDisplay()
@@ -359,8 +3438,11 @@ class ZincView(QtGui.QMainWindow):
             if refinementFactors != oldRefinementFactors:
                 result, minimumDivisions = tessellation.getMinimumDivisions(3)
                 if self._checkTessellationDivisions(minimumDivisions, refinementFactors, self.ui.tessellation_refinement_factors_lineedit):
-                    if RESULT_OK != tessellation.setRefinementFactors(refinementFactors):
-                        raise
+                    def setRefinementFactors():
+                        if RESULT_OK != tessellation.setRefinementFactors(refinementFactors):
+                            print("Invalid tessellation refinement factors")
+                        self.tessellationRefinementFactorsDisplay()
+                    self._changeCoalescer.addChange("tessellation_refinement_factors", setRefinementFactors, [tessellationmodule])
         except:
             print("Invalid tessellation refinement factors")
         #self.tessellationRefinementFactorsDisplay()
@@ -381,48 +3463,193 @@ class ZincView(QtGui.QMainWindow):
         try:
             circleDivisions = int(self.ui.tessellation_circle_divisions_lineedit.text())
             tessellationmodule = self._context.getTessellationmodule()
-            # set circle divisions for all tessellation in module
-            result = RESULT_OK
-            tessellationmodule.beginChange()
-            iter = tessellationmodule.createTessellationiterator()
-            tessellation = iter.next()
-            while tessellation.isValid():
-                result = tessellation.setCircleDivisions(circleDivisions)
-                if RESULT_OK != result:
-                    break # can't raise here otherwise no call to endChange()
+            def setCircleDivisions():
+                # set circle divisions for all tessellation in module
+                iter = tessellationmodule.createTessellationiterator()
                 tessellation = iter.next()
-            tessellationmodule.endChange()
-            if RESULT_OK != result:
-                raise
+                while tessellation.isValid():
+                    if RESULT_OK != tessellation.setCircleDivisions(circleDivisions):
+                        print("Invalid tessellation circle divisions")
+                        break
+                    tessellation = iter.next()
+                self.tessellationCircleDivisionsDisplay()
+            # coalescer wraps change in tessellationmodule begin/endChange
+            self._changeCoalescer.addChange("tessellation_circle_divisions", setCircleDivisions, [tessellationmodule])
         except:
             print("Invalid tessellation circle divisions")
         #self.tessellationCircleDivisionsDisplay()
 
+    def volumeCoarseWhileEditingStateChanged(self, state):
+        '''
+        Set whether volume images use a coarse level of detail while editing
+        '''
+        self._volumeCoarseWhileEditing = bool(state)
+        if not state:
+            self.volumeFullResolutionClicked()
+
+    def volumeFullResolutionClicked(self):
+        '''
+        Switch all volume images to full resolution now
+        '''
+        from zincview_volume import getVolumeLevelsOfDetail
+        for volumeLevelOfDetail in getVolumeLevelsOfDetail():
+            volumeLevelOfDetail.setFullResolution()
+        self.frameCacheClear()
+
     def perturbLinesStateChanged(self, state):
         '''
         Set perturb lines flag from checkbox
         '''
         sceneviewer = self.ui.sceneviewerwidget.getSceneviewer()
         sceneviewer.setPerturbLinesFlag(state)
+        self.frameCacheClear()
 
     def spectrumAutorangeClicked(self):
         '''
-        Set spectrum min/max to fit range of visible data in scene graphics.
+        Set spectrum min/max to fit range of visible data in scene graphics,
+        at the current time or over all times, optionally clipping
+        percentiles at each end of the range. Data not already in the
+        histogram cache is sampled in the background, after which the range
+        is applied.
         '''
         sceneviewer = self.ui.sceneviewerwidget.getSceneviewer()
         scene = sceneviewer.getScene()
         filter = sceneviewer.getScenefilter()
         spectrummodule = scene.getSpectrummodule()
         spectrum = spectrummodule.getDefaultSpectrum()
-        result, minimum, maximum = scene.getSpectrumDataRange(filter, spectrum, 1)
-        if result >= 1: # result is number of components with range, can exceed 1
-            spectrummodule.beginChange()
-            spectrumcomponent = spectrum.getFirstSpectrumcomponent()
-            spectrumcomponent.setRangeMinimum(minimum)
-            spectrumcomponent.setRangeMaximum(maximum)
-            spectrummodule.endChange()
-            self.spectrumMinimumDisplay()
-            self.spectrumMaximumDisplay()
+        try:
+            clipPercent = float(self.ui.spectrum_clip_percent_lineedit.text())
+        except:
+            print("Invalid spectrum clip percent")
+            clipPercent = 0.0
+        timekeepermodule = scene.getTimekeepermodule()
+        timekeeper = timekeepermodule.getDefaultTimekeeper()
+        if self.ui.spectrum_autorange_all_times_checkbox.isChecked():
+            minimumTime = timekeeper.getMinimumTime()
+            maximumTime = timekeeper.getMaximumTime()
+            times = [time for time in ZincRegion_getTimes(self._rootRegion) if minimumTime <= time <= maximumTime]
+            if not times:
+                times = [timekeeper.getTime()]
+        else:
+            times = None
+        if times or (clipPercent > 0.0):
+            if not times:
+                times = [timekeeper.getTime()]
+            histograms, jobs = self._spectrumGetHistograms(spectrum, times, filter)
+            if jobs:
+                self._spectrumPendingRange = (spectrum, histograms, clipPercent)
+                self.ui.spectrum_autorange_button.setEnabled(False)
+                self._spectrumSampler.start(jobs)
+                return
+            self._spectrumSetRange(spectrum, *self._spectrumGetHistogramRange(histograms, clipPercent))
+        else:
+            result, minimum, maximum = scene.getSpectrumDataRange(filter, spectrum, 1)
+            if result >= 1: # result is number of components with range, can exceed 1
+                self._spectrumSetRange(spectrum, minimum, maximum)
+
+    def _spectrumSamplerFinished(self):
+        '''
+        Cache histograms sampled for autorange and apply the range.
+        '''
+        self.ui.spectrum_autorange_button.setEnabled(True)
+        if self._spectrumPendingRange is None:
+            return
+        spectrum, histograms, clipPercent = self._spectrumPendingRange
+        self._spectrumPendingRange = None
+        self._spectrumHistogramCache.update(histograms)
+        self._spectrumSetRange(spectrum, *self._spectrumGetHistogramRange(histograms, clipPercent))
+
+    def _spectrumSamplerCancel(self):
+        '''
+        Abandon any autorange sampling in progress.
+        '''
+        self._spectrumSampler.cancel()
+        self._spectrumPendingRange = None
+        self.ui.spectrum_autorange_button.setEnabled(True)
+
+    def _spectrumHistogramCacheClear(self):
+        self._spectrumSamplerCancel()
+        self._spectrumHistogramCache.clear()
+
+    def _spectrumSetRange(self, spectrum, minimum, maximum):
+        '''
+        Set range of first spectrum component, if minimum is not None.
+        '''
+        if minimum is None:
+            return
+        spectrummodule = self._context.getSpectrummodule()
+        spectrummodule.beginChange()
+        spectrumcomponent = spectrum.getFirstSpectrumcomponent()
+        spectrumcomponent.setRangeMinimum(minimum)
+        spectrumcomponent.setRangeMaximum(maximum)
+        spectrummodule.endChange()
+        self.frameCacheClear()
+        self.spectrumMinimumDisplay()
+        self.spectrumMaximumDisplay()
+
+    def _spectrumGetHistograms(self, spectrum, times, scenefilter=None):
+        '''
+        Get histograms of data coloured by spectrum in visible graphics over
+        times, from the cache or new and empty with jobs to fill them.
+        :return dict (region path, field name, component, times) -> StreamingHistogram,
+        list of SpectrumRangeSampler jobs for new histograms
+        '''
+        scene = self._rootRegion.getScene()
+        spectrumcomponent = spectrum.getFirstSpectrumcomponent()
+        component = spectrumcomponent.getFieldComponent()
+        timesKey = tuple(times)
+        histograms = {}
+        jobs = []
+        for region, dataField in ZincScene_getSpectrumDataFields(scene, spectrum, scenefilter):
+            fieldComponent = min(component, dataField.getNumberOfComponents())
+            key = (region.getPath(), dataField.getName(), fieldComponent, timesKey)
+            if key in histograms:
+                continue
+            histogram = self._spectrumHistogramCache.get(key)
+            if histogram is None:
+                histogram = StreamingHistogram()
+                jobs.append((histogram, dataField, fieldComponent, times))
+            histograms[key] = histogram
+        return histograms, jobs
+
+    def _spectrumGetHistogramRange(self, histograms, clipPercent):
+        '''
+        :return minimum, maximum over histograms after clipping percent at
+        each end, or None, None if no data
+        '''
+        minimum = None
+        maximum = None
+        for histogram in histograms.values():
+            if histogram.getCount() == 0:
+                continue
+            thisMinimum = histogram.getPercentile(clipPercent)
+            thisMaximum = histogram.getPercentile(100.0 - clipPercent)
+            if minimum is None:
+                minimum = thisMinimum
+                maximum = thisMaximum
+            else:
+                minimum = min(minimum, thisMinimum)
+                maximum = max(maximum, thisMaximum)
+        return minimum, maximum
+
+    def spectrumGetDataRangeOverTimes(self, spectrum, times, clipPercent=0.0):
+        '''
+        Get range of data coloured by spectrum in visible graphics, sampled
+        at nodes and element xi grids at each of times, waiting for any
+        sampling. Histograms of values are cached per field and times so
+        repeated calls and changes of clip percentage are fast.
+        :param clipPercent: Percentage of values to exclude at each end of range.
+        :return minimum, maximum or None, None if no data
+        '''
+        sceneviewer = self.ui.sceneviewerwidget.getSceneviewer()
+        scenefilter = sceneviewer.getScenefilter() if sceneviewer else None
+        histograms, jobs = self._spectrumGetHistograms(spectrum, times, scenefilter)
+        if jobs:
+            sampler = SpectrumRangeSampler()
+            sampler.start(jobs)
+            sampler.wait()
+            self._spectrumHistogramCache.update(histograms)
+        return self._spectrumGetHistogramRange(histograms, clipPercent)
 
     def spectrumMinimumDisplay(self):
         '''
@@ -445,11 +3672,14 @@ class ZincView(QtGui.QMainWindow):
             spectrummodule = scene.getSpectrummodule()
             spectrum = spectrummodule.getDefaultSpectrum()
             spectrumcomponent = spectrum.getFirstSpectrumcomponent()
-            if RESULT_OK != spectrumcomponent.setRangeMinimum(minimum):
-                raise
+            def setRangeMinimum():
+                if RESULT_OK != spectrumcomponent.setRangeMinimum(minimum):
+                    print("Invalid spectrum minimum")
+                self.spectrumMinimumDisplay()
+            self._changeCoalescer.addChange("spectrum_minimum", setRangeMinimum, [spectrummodule])
         except:
             print("Invalid spectrum minimum")
-        self.spectrumMinimumDisplay()
+            self.spectrumMinimumDisplay()
 
     def spectrumMaximumDisplay(self):
         '''
@@ -472,11 +3702,14 @@ class ZincView(QtGui.QMainWindow):
             spectrummodule = scene.getSpectrummodule()
             spectrum = spectrummodule.getDefaultSpectrum()
             spectrumcomponent = spectrum.getFirstSpectrumcomponent()
-            if RESULT_OK != spectrumcomponent.setRangeMaximum(maximum):
-                raise
+            def setRangeMaximum():
+                if RESULT_OK != spectrumcomponent.setRangeMaximum(maximum):
+                    print("Invalid spectrum maximum")
+                self.spectrumMaximumDisplay()
+            self._changeCoalescer.addChange("spectrum_maximum", setRangeMaximum, [spectrummodule])
         except:
             print("Invalid spectrum maximum")
-        self.spectrumMaximumDisplay()
+            self.spectrumMaximumDisplay()
 
     def spectrumAddColourBarClicked(self):
         '''
@@ -505,6 +3738,7 @@ class ZincView(QtGui.QMainWindow):
         pointattributes.setBaseSize([1.0,1.0,1.0])
         pointattributes.setGlyphOffset([-0.9,0.0,0.0])
         scene.endChange()
+        self.frameCacheClear()
         # ensure scene editor graphics list is redisplayed
         self.ui.scene_editor.setScene(scene)
 
@@ -594,6 +3828,8 @@ class ZincView(QtGui.QMainWindow):
         '''
         Set default timekeeper current time from value in the widget
         '''
+        # don't let a pending slider position override this time
+        self._changeCoalescer.flush()
         try:
             time = float(self.ui.time_text_lineedit.text())
             scene = self.ui.sceneviewerwidget.getSceneviewer().getScene()
@@ -613,9 +3849,17 @@ class ZincView(QtGui.QMainWindow):
         scene = self.ui.sceneviewerwidget.getSceneviewer().getScene()
         timekeepermodule = scene.getTimekeepermodule()
         timekeeper = timekeepermodule.getDefaultTimekeeper()
+        self._displayTimeSliderValue(timekeeper.getTime())
+
+    def _displayTimeSliderValue(self, time):
+        '''
+        Display time on the time slider without changing the timekeeper
+        '''
+        scene = self.ui.sceneviewerwidget.getSceneviewer().getScene()
+        timekeepermodule = scene.getTimekeepermodule()
+        timekeeper = timekeepermodule.getDefaultTimekeeper()
         minimum = timekeeper.getMinimumTime()
         maximum = timekeeper.getMaximumTime()
-        time = timekeeper.getTime()
         # don't want signal for my change
         self.ui.time_slider.blockSignals(True)
         if maximum != minimum:
@@ -624,6 +3868,8 @@ class ZincView(QtGui.QMainWindow):
             value = 0
         self.ui.time_slider.setValue(value)
         self.ui.time_slider.blockSignals(False)
+        if self._probeDock is not None:
+            self._probeDock.getPlotWidget().setCurrentTime(time)
 
     def timeSliderChanged(self, value):
         '''
@@ -638,8 +3884,134 @@ class ZincView(QtGui.QMainWindow):
             time = float(value)*((maximum - minimum)/10000.0)
         else:
             time = minimum
+        # user takes over from playback
+        self._timePlayer.stop()
+        # show time now but only apply latest slider position when it settles
+        self._displayReal(self.ui.time_text_lineedit, time)
+        def setTime():
+            timekeeper.setTime(time)
+        self._changeCoalescer.addChange("time", setTime, [timekeepermodule, scene])
+
+    def timePlayerUpdate(self):
+        '''
+        Set times to play from stored times in the model, or if none, from
+        evenly spaced steps over the timekeeper range.
+        '''
+        times = ZincRegion_getTimes(self._rootRegion)
+        timekeepermodule = self._context.getTimekeepermodule()
+        timekeeper = timekeepermodule.getDefaultTimekeeper()
+        minimum = timekeeper.getMinimumTime()
+        maximum = timekeeper.getMaximumTime()
+        times = [time for time in times if minimum <= time <= maximum]
+        if len(times) > 1:
+            self._timePlayer.setTimes(times)
+        else:
+            self._timePlayer.setUniformTimes(minimum, maximum, 100)
+        self._timePlayer.setCurrentTime(timekeeper.getTime())
+
+    def timePlayClicked(self, checked):
+        '''
+        Start or stop playing through time from the play button
+        '''
+        if checked:
+            self.timePlayerUpdate()
+            self._timePlayer.play()
+            if not self._timePlayer.isPlaying():
+                self.ui.time_play_button.setChecked(False)
+        else:
+            self._timePlayer.stop()
+
+    def timeFramesPerSecondDisplay(self):
+        '''
+        Display the target frames per second for playing
+        '''
+        self._displayReal(self.ui.time_fps_lineedit, self._timePlayer.getFramesPerSecond())
+
+    def timeFramesPerSecondEntered(self):
+        '''
+        Set target frames per second for playing from value in the widget
+        '''
+        try:
+            self._timePlayer.setFramesPerSecond(float(self.ui.time_fps_lineedit.text()))
+        except:
+            print("Invalid frames per second")
+        self.timeFramesPerSecondDisplay()
+
+    def timePlayModeChanged(self, index):
+        '''
+        Set play mode once, loop or bounce from combo box index
+        '''
+        self._timePlayer.setPlayMode(index)
+
+    def timeSkipFramesStateChanged(self, state):
+        '''
+        Set whether frames are skipped to keep pace with the target rate
+        '''
+        self._timePlayer.setSkipFrames(bool(state))
+
+    def _timePlayerFrameRequested(self, time):
+        '''
+        Show the frame at time from the frame cache if present, otherwise
+        set the time, render and cache the frame.
+        '''
+        size = self.ui.sceneviewerwidget.size()
+        if size != self._frameCacheSize:
+            self.frameCacheClear()
+            self._frameCacheSize = size
+        image = self._frameCache.get(time)
+        if image is not None:
+            self._cachedFrameLabel.setPixmap(QtGui.QPixmap.fromImage(image))
+            self._cachedFrameLabel.show()
+            self._cachedFrameLabel.raise_()
+            self._cachedFrameTime = time
+            self._displayReal(self.ui.time_text_lineedit, time)
+            self._displayTimeSliderValue(time)
+            return
+        self._cachedFrameLabel.hide()
+        timekeepermodule = self._context.getTimekeepermodule()
+        timekeeper = timekeepermodule.getDefaultTimekeeper()
         timekeeper.setTime(time)
+        self.ui.sceneviewerwidget.updateGL()
+        image = self.ui.sceneviewerwidget.grabFrameBuffer()
+        self._frameCache.put(time, image, image.byteCount())
+        self.timeTextDisplay()
+        self.timeSliderDisplay()
+
+    def _timePlayerStopped(self):
+        '''
+        Make the timekeeper time match the last frame shown and return to
+        live rendering.
+        '''
+        self.ui.time_play_button.setChecked(False)
+        self._cachedFrameHide()
+        # cached frames may not reflect graphics edited outside playback
+        self.frameCacheClear()
         self.timeTextDisplay()
+        self.timeSliderDisplay()
+
+    def _cachedFrameHide(self):
+        '''
+        If a cached frame is shown, set the timekeeper to its time and hide it
+        so the sceneviewer is seen live at the same time.
+        '''
+        if self._cachedFrameLabel.isVisible():
+            timekeepermodule = self._context.getTimekeepermodule()
+            timekeeper = timekeepermodule.getDefaultTimekeeper()
+            timekeeper.setTime(self._cachedFrameTime)
+            self._cachedFrameLabel.hide()
+
+    def _sceneviewerResized(self):
+        '''
+        Cached frames are the old size: return to live rendering and discard them.
+        '''
+        self._cachedFrameHide()
+        self.frameCacheClear()
+
+    def frameCacheClear(self):
+        '''
+        Discard cached frames; call whenever graphics or view change.
+        '''
+        self._frameCache.clear()
 
     def saveImageClicked(self):
         '''
@@ -718,12 +4090,28 @@ def main(argv):
     '''
     The entry point for the application, handle application arguments and initialise the 
     GUI.
+    Model files and scripts given as arguments are read in the background
+    while the window is created, then loaded once the event loop starts.
     '''
-    
+    options, argv = parseArguments(argv)
+    profiler = StartupProfiler(_processStartTime, options.profile_startup)
+    profiler.mark("imports")
+    if (options.keep_every is not None) or (options.keep_steps is not None) or (options.keep_tolerance is not None):
+        from zincview_decimate import setDefaultDecimation
+        setDefaultDecimation(options.keep_every, options.keep_steps, options.keep_tolerance)
+    prefetcher = ModelPrefetcher(options.models)
+
     app = QtGui.QApplication(argv)
+    profiler.mark("application")
 
-    w = ZincView()
+    w = ZincView(profiler=profiler)
     w.show()
+    profiler.mark("show window")
+
+    if options.models:
+        w.startupLoad(prefetcher)
+    if options.live:
+        w.liveStart(options.live)
 
     sys.exit(app.exec_())
 # main end
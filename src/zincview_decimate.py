@@ -0,0 +1,132 @@
+"""
+Load-time temporal decimation of timestep file series for ZincView model
+scripts.
+
+Selects which timesteps of a series to read before any are read into Zinc,
+by keeping every Nth step, a target number of evenly spaced steps, or only
+steps whose nodal values change by more than a tolerance from the last
+kept step, so memory use and load time shrink with the number of steps
+kept. Defaults can be set from the ZincView command line.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import numpy
+
+# characters of EX file lines holding only parameter values
+_VALUE_CHARACTERS = frozenset("0123456789+-.eE \t\r\n")
+
+_defaultDecimation = {"every": None, "count": None, "tolerance": None}
+
+def setDefaultDecimation(every=None, count=None, tolerance=None):
+    '''
+    Set decimation applied by ZincRegion_readTimesteps when not specified by
+    the caller, e.g. from command line options.
+    '''
+    _defaultDecimation["every"] = every
+    _defaultDecimation["count"] = count
+    _defaultDecimation["tolerance"] = tolerance
+
+def getDefaultDecimation():
+    '''
+    :return every, count, tolerance
+    '''
+    return _defaultDecimation["every"], _defaultDecimation["count"], _defaultDecimation["tolerance"]
+
+def selectEveryNth(numberOfSteps, every):
+    '''
+    :return indexes of every Nth step from the first, plus the last step.
+    '''
+    indexes = list(range(0, numberOfSteps, max(1, every)))
+    if indexes and (indexes[-1] != numberOfSteps - 1):
+        indexes.append(numberOfSteps - 1)
+    return indexes
+
+def selectEvenlySpaced(times, count):
+    '''
+    :return sorted distinct indexes of the steps with times nearest count
+    evenly spaced times over the time range, including first and last.
+    '''
+    if count >= len(times):
+        return list(range(len(times)))
+    if count <= 1:
+        return [0]
+    times = numpy.asarray(times, dtype=numpy.float64)
+    targets = numpy.linspace(times[0], times[-1], count)
+    upper = numpy.clip(numpy.searchsorted(times, targets), 1, len(times) - 1)
+    lower = upper - 1
+    nearest = numpy.where((targets - times[lower]) <= (times[upper] - targets), lower, upper)
+    return sorted(set(nearest.tolist()))
+
+def readExnodeValues(fileName):
+    '''
+    Quickly read all parameter values in an EX file without Zinc, in file
+    order, for comparing timesteps with the same node and field layout.
+    :return array of values
+    '''
+    with open(fileName, "r") as f:
+        valueLines = [line for line in f if _VALUE_CHARACTERS.issuperset(line)]
+    return numpy.array(" ".join(valueLines).split(), dtype=numpy.float64)
+
+def selectChangedSteps(fileNames, tolerance, readValues=readExnodeValues):
+    '''
+    Keep the first and last steps and each step where any nodal value differs
+    from the last kept step by more than tolerance. Steps whose number of
+    values differs from the last kept step are always kept.
+    Only the last kept step's values are held in memory.
+    :return indexes of kept steps
+    '''
+    if not fileNames:
+        return []
+    indexes = [0]
+    keptValues = readValues(fileNames[0])
+    for i in range(1, len(fileNames)):
+        values = readValues(fileNames[i])
+        if (i == len(fileNames) - 1) or (values.shape != keptValues.shape) or \
+                (numpy.max(numpy.abs(values - keptValues)) > tolerance):
+            indexes.append(i)
+            keptValues = values
+    return indexes
+
+def decimateTimesteps(fileNames, times, every=None, count=None, tolerance=None):
+    '''
+    Select timesteps to read: every Nth, then count evenly spaced, then
+    those changing by more than tolerance, applying whichever are given.
+    :return list of (fileName, time) to keep
+    '''
+    steps = list(zip(fileNames, times))
+    if every and (every > 1):
+        steps = [steps[i] for i in selectEveryNth(len(steps), every)]
+    if count:
+        steps = [steps[i] for i in selectEvenlySpaced([time for _, time in steps], count)]
+    if tolerance is not None:
+        steps = [steps[i] for i in selectChangedSteps([fileName for fileName, _ in steps], tolerance)]
+    return steps
+
+def ZincRegion_readTimesteps(region, fileNames, times, beforeFileNames=(), afterFileNames=(), every=None, count=None, tolerance=None):
+    '''
+    Read decimated timestep files with their times into region in one read.
+    Decimation options not given take defaults from setDefaultDecimation.
+    :param beforeFileNames, afterFileNames: Files without time to read in
+    the same read before and after the timesteps, e.g. element files after.
+    :return result, list of times read
+    '''
+    from opencmiss.zinc.streamregion import StreaminformationRegion
+    defaultEvery, defaultCount, defaultTolerance = getDefaultDecimation()
+    steps = decimateTimesteps(fileNames, times,
+        every if (every is not None) else defaultEvery,
+        count if (count is not None) else defaultCount,
+        tolerance if (tolerance is not None) else defaultTolerance)
+    if len(steps) < len(fileNames):
+        print("Reading " + str(len(steps)) + " of " + str(len(fileNames)) + " timesteps")
+    sir = region.createStreaminformationRegion()
+    for fileName in beforeFileNames:
+        sir.createStreamresourceFile(fileName)
+    for fileName, time in steps:
+        srf = sir.createStreamresourceFile(fileName)
+        sir.setResourceAttributeReal(srf, StreaminformationRegion.ATTRIBUTE_TIME, time)
+    for fileName in afterFileNames:
+        sir.createStreamresourceFile(fileName)
+    return region.read(sir), [time for _, time in steps]
@@ -0,0 +1,433 @@
+"""
+Group and bounding box filtered loading of classic EX (exnode/exelem) files
+for ZincView model scripts.
+
+On first use each file is scanned once to build a sidecar index of the
+byte offsets of every node and element record with its group, header,
+element nodes and faces, and rectangular cartesian node coordinates. The
+index is saved next to the file and reused while the file is unchanged.
+Filtered loads then copy only the selected records and their dependencies
+(element faces and lines, and nodes) from a memory map of the file, each
+preceded by its header, and read them into Zinc from memory.
+
+Example loadModel use:
+    ZincRegion_readFiltered(region, ["heart.exnode", "heart.exelem"], groupNames=["heart"])
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import json
+import mmap
+import os
+import re
+import numpy
+
+# version of sidecar index; increment if index layout changes
+_INDEX_VERSION = 2
+INDEX_SUFFIX = ".zvindex.npz"
+
+KIND_NODE = 0
+KIND_ELEMENT = 1
+
+_GROUP = re.compile(br"^\s*Group name\s*:\s*(.*?)\s*$")
+_REGION = re.compile(br"^\s*Region\s*:")
+_SHAPE = re.compile(br"^\s*Shape\.\s*Dimension\s*=\s*(\d+)")
+_NODE = re.compile(br"^\s*Node\s*:\s*(\d+)")
+_ELEMENT = re.compile(br"^\s*Element\s*:\s*(\d+)\s+(\d+)\s+(\d+)")
+_HEADER = re.compile(br"^\s*(#Fields|#Scale factor sets|#Nodes|!#)")
+_FIELD = re.compile(br"^\s*\d+\)\s*([^,]+),\s*([^,]+),\s*([^,]+),")
+_COMPONENT_VALUE_INDEX = re.compile(br"Value index\s*=\s*(\d+)")
+_SUBSECTION = re.compile(br"^\s*(Faces|Nodes|Scale factors|Values)\s*:")
+
+def getIndexFileName(fileName):
+    return fileName + INDEX_SUFFIX
+
+def _getSourceSignature(fileName):
+    stat = os.stat(fileName)
+    return [stat.st_size, stat.st_mtime_ns]
+
+class _IndexBuilder(object):
+    '''
+    Accumulates records while scanning an EX file.
+    '''
+
+    def __init__(self):
+        self.headers = []
+        self.headerNumbers = {}
+        self.groups = [""]
+        self.regions = [""]
+        self.records = []
+        self.elementNodes = []
+        self.elementNodeCounts = []
+        self.elementFaces = []
+        self.elementFaceCounts = []
+        self.coordinates = []
+
+    def addHeader(self, text):
+        number = self.headerNumbers.get(text)
+        if number is None:
+            number = len(self.headers)
+            self.headers.append(text)
+            self.headerNumbers[text] = number
+        return number
+
+def _parseNodeCoordinateIndexes(headerLines):
+    '''
+    :return list of 0-based value indexes of the x, y, z components of the
+    first rectangular cartesian coordinate field in node header, or None.
+    '''
+    indexes = None
+    for line in headerLines:
+        match = _FIELD.match(line)
+        if match:
+            if indexes is not None:
+                break
+            if (match.group(2).strip() == b"coordinate") and (match.group(3).strip() == b"rectangular cartesian"):
+                indexes = []
+            continue
+        if indexes is not None:
+            valueIndex = _COMPONENT_VALUE_INDEX.search(line)
+            if valueIndex:
+                indexes.append(int(valueIndex.group(1)) - 1)
+    return indexes if indexes else None
+
+def _finishRecord(builder, record, lines, coordinateIndexes):
+    '''
+    Add record with its element nodes and faces, or node coordinates.
+    '''
+    kind = record[0]
+    nodes = []
+    faces = []
+    coordinates = [numpy.nan, numpy.nan, numpy.nan]
+    if kind == KIND_ELEMENT:
+        subsection = None
+        for line in lines[1:]:
+            match = _SUBSECTION.match(line)
+            if match:
+                subsection = match.group(1)
+                continue
+            if subsection == b"Nodes":
+                nodes.extend(int(value) for value in line.split())
+            elif subsection == b"Faces":
+                triple = [int(value) for value in line.split()]
+                # position of non-zero identifier gives face dimension 3, 2 or 1
+                for position in range(len(triple)):
+                    if triple[position] != 0:
+                        faces.append((3 - position, triple[position]))
+                        break
+    elif coordinateIndexes:
+        values = b" ".join(lines[1:]).split()
+        # components beyond those of the coordinate field are zero
+        coordinates = [0.0, 0.0, 0.0]
+        for c, valueIndex in enumerate(coordinateIndexes[:3]):
+            coordinates[c] = float(values[valueIndex]) if (valueIndex < len(values)) else numpy.nan
+    builder.records.append(record)
+    builder.elementNodes.extend(nodes)
+    builder.elementNodeCounts.append(len(nodes))
+    builder.elementFaces.extend(faces)
+    builder.elementFaceCounts.append(len(faces))
+    builder.coordinates.append(coordinates)
+
+def buildIndex(fileName):
+    '''
+    Scan EX file, recording every node and element record.
+    :return ExFileIndex
+    '''
+    builder = _IndexBuilder()
+    groupNumber = 0
+    regionNumber = 0
+    shapeLine = b""
+    dimension = 0
+    headerLines = []
+    inHeader = False
+    headerNumber = -1
+    coordinateIndexes = None
+    record = None
+    recordLines = []
+    with open(fileName, "rb") as f:
+        offset = 0
+        for line in f:
+            lineOffset = offset
+            offset += len(line)
+            nodeMatch = _NODE.match(line)
+            elementMatch = None if nodeMatch else _ELEMENT.match(line)
+            isRecordLine = bool(nodeMatch or elementMatch)
+            isContextLine = (not isRecordLine) and bool(_GROUP.match(line) or _REGION.match(line) or
+                _SHAPE.match(line) or _HEADER.match(line))
+            if (record is not None) and (isRecordLine or isContextLine):
+                record[4] = lineOffset - record[3]
+                _finishRecord(builder, record, recordLines, coordinateIndexes)
+                record = None
+            if isRecordLine:
+                if inHeader:
+                    inHeader = False
+                    header = b"".join(headerLines)
+                    if elementMatch and not headerLines[0].lstrip().startswith(b"Shape"):
+                        header = shapeLine + header
+                    headerNumber = builder.addHeader(header.decode("utf-8"))
+                    coordinateIndexes = _parseNodeCoordinateIndexes(headerLines) if nodeMatch else None
+                if nodeMatch:
+                    record = [KIND_NODE, 0, int(nodeMatch.group(1)), lineOffset, 0, headerNumber, groupNumber, regionNumber]
+                else:
+                    identifier = max(int(elementMatch.group(i)) for i in range(1, 4))
+                    record = [KIND_ELEMENT, dimension, identifier, lineOffset, 0, headerNumber, groupNumber, regionNumber]
+                recordLines = [line]
+                continue
+            if record is not None:
+                recordLines.append(line)
+                continue
+            groupMatch = _GROUP.match(line)
+            if groupMatch:
+                builder.groups.append(groupMatch.group(1).decode("utf-8"))
+                groupNumber = len(builder.groups) - 1
+                inHeader = False
+                continue
+            if _REGION.match(line):
+                builder.regions.append(line.decode("utf-8"))
+                regionNumber = len(builder.regions) - 1
+                inHeader = False
+                continue
+            shapeMatch = _SHAPE.match(line)
+            if shapeMatch:
+                shapeLine = line
+                dimension = int(shapeMatch.group(1))
+                # a new shape starts a header without fields
+                headerLines = [line]
+                inHeader = True
+                continue
+            if line.strip():
+                if not inHeader:
+                    headerLines = []
+                    inHeader = True
+                headerLines.append(line)
+        if record is not None:
+            record[4] = offset - record[3]
+            _finishRecord(builder, record, recordLines, coordinateIndexes)
+    return ExFileIndex(fileName, builder=builder)
+
+class ExFileIndex(object):
+    '''
+    Index of node and element records in an EX file.
+    '''
+
+    def __init__(self, fileName, builder=None, arrays=None):
+        self._fileName = fileName
+        if builder is not None:
+            self._headers = builder.headers
+            self._groups = builder.groups
+            self._regions = builder.regions
+            self._records = numpy.array(builder.records, dtype=numpy.int64).reshape((-1, 8))
+            self._elementNodes = numpy.array(builder.elementNodes, dtype=numpy.int64)
+            self._elementNodeStarts = numpy.concatenate(([0], numpy.cumsum(builder.elementNodeCounts, dtype=numpy.int64)))
+            self._elementFaces = numpy.array(builder.elementFaces, dtype=numpy.int64).reshape((-1, 2))
+            self._elementFaceStarts = numpy.concatenate(([0], numpy.cumsum(builder.elementFaceCounts, dtype=numpy.int64)))
+            self._coordinates = numpy.array(builder.coordinates, dtype=numpy.float64).reshape((-1, 3))
+        else:
+            strings = json.loads(str(arrays["strings"]))
+            self._headers = strings["headers"]
+            self._groups = strings["groups"]
+            self._regions = strings["regions"]
+            self._records = arrays["records"]
+            self._elementNodes = arrays["elementNodes"]
+            self._elementNodeStarts = arrays["elementNodeStarts"]
+            self._elementFaces = arrays["elementFaces"]
+            self._elementFaceStarts = arrays["elementFaceStarts"]
+            self._coordinates = arrays["coordinates"]
+
+    def getFileName(self):
+        return self._fileName
+
+    def getNumberOfRecords(self):
+        return len(self._records)
+
+    def getGroupNames(self):
+        return sorted(set(group for group in self._groups if group))
+
+    def getRecords(self):
+        '''
+        :return array(records, 8) of kind, dimension, identifier, offset,
+        length, header number, group number, region number.
+        '''
+        return self._records
+
+    def getElementNodes(self, recordIndex):
+        return self._elementNodes[self._elementNodeStarts[recordIndex]:self._elementNodeStarts[recordIndex + 1]]
+
+    def getElementFaces(self, recordIndex):
+        '''
+        :return array(faces, 2) of face dimension and identifier.
+        '''
+        return self._elementFaces[self._elementFaceStarts[recordIndex]:self._elementFaceStarts[recordIndex + 1]]
+
+    def getCoordinates(self):
+        '''
+        :return array(records, 3) of node coordinates, NaN where not
+        rectangular cartesian or not a node.
+        '''
+        return self._coordinates
+
+    def save(self, indexFileName):
+        strings = json.dumps({"version": _INDEX_VERSION, "source": _getSourceSignature(self._fileName),
+            "headers": self._headers, "groups": self._groups, "regions": self._regions})
+        with open(indexFileName, "wb") as f:
+            numpy.savez(f, strings=numpy.array(strings), records=self._records,
+                elementNodes=self._elementNodes, elementNodeStarts=self._elementNodeStarts,
+                elementFaces=self._elementFaces, elementFaceStarts=self._elementFaceStarts, coordinates=self._coordinates)
+
+    def selectGroups(self, groupNames):
+        '''
+        :return indexes of records in any of the named groups.
+        '''
+        groupNumbers = [g for g, group in enumerate(self._groups) if group in groupNames]
+        return numpy.flatnonzero(numpy.isin(self._records[:, 6], groupNumbers))
+
+    def selectNodesInBox(self, minimum, maximum):
+        '''
+        :param minimum, maximum: Box coordinates, with any components after
+        the first 1 or 2 unbounded.
+        :return indexes of node records with coordinates inside box.
+        '''
+        minimum = numpy.concatenate((numpy.asarray(minimum, dtype=numpy.float64)[:3], numpy.full(3, -numpy.inf)))[:3]
+        maximum = numpy.concatenate((numpy.asarray(maximum, dtype=numpy.float64)[:3], numpy.full(3, numpy.inf)))[:3]
+        with numpy.errstate(invalid="ignore"):
+            inside = numpy.all((self._coordinates >= minimum) & (self._coordinates <= maximum), axis=1)
+        return numpy.flatnonzero(inside & (self._records[:, 0] == KIND_NODE))
+
+    def selectElementsWithNodes(self, nodeIdentifiers):
+        '''
+        :return indexes of element records using any of nodeIdentifiers.
+        '''
+        usesNode = numpy.concatenate(([0], numpy.cumsum(numpy.isin(self._elementNodes, nodeIdentifiers))))
+        counts = usesNode[self._elementNodeStarts[1:]] - usesNode[self._elementNodeStarts[:-1]]
+        return numpy.flatnonzero((counts > 0) & (self._records[:, 0] == KIND_ELEMENT))
+
+    def extract(self, recordIndexes, data):
+        '''
+        :param data: Memory map or bytes of the file.
+        :return bytes of EX text holding only the records, in file order,
+        each run preceded by its region, group and header.
+        '''
+        pieces = []
+        context = None
+        for recordIndex in numpy.sort(recordIndexes):
+            kind, dimension, identifier, offset, length, headerNumber, groupNumber, regionNumber = self._records[recordIndex]
+            if context != (headerNumber, groupNumber, regionNumber):
+                context = (headerNumber, groupNumber, regionNumber)
+                if self._regions[regionNumber]:
+                    pieces.append(self._regions[regionNumber].encode("utf-8"))
+                if self._groups[groupNumber]:
+                    pieces.append(b" Group name: " + self._groups[groupNumber].encode("utf-8") + b"\n")
+                if headerNumber >= 0:
+                    pieces.append(self._headers[headerNumber].encode("utf-8"))
+            pieces.append(data[int(offset):int(offset + length)])
+        return b"".join(pieces)
+
+def loadIndex(fileName, save=True):
+    '''
+    :return ExFileIndex from sidecar index if it matches the file, otherwise
+    built by scanning the file and saved as sidecar if save.
+    '''
+    indexFileName = getIndexFileName(fileName)
+    if os.path.exists(indexFileName):
+        try:
+            with numpy.load(indexFileName) as arrays:
+                strings = json.loads(str(arrays["strings"]))
+                if (strings["version"] == _INDEX_VERSION) and (strings["source"] == _getSourceSignature(fileName)):
+                    return ExFileIndex(fileName, arrays={name: arrays[name] for name in arrays.files})
+        except (IOError, OSError, ValueError, KeyError):
+            pass
+    index = buildIndex(fileName)
+    if save:
+        try:
+            index.save(indexFileName)
+        except (IOError, OSError) as e:
+            print("Failed to save EX index " + indexFileName + ": " + str(e))
+    return index
+
+def selectFiltered(indexes, groupNames=None, boundingBox=None):
+    '''
+    Select records of several EX files, e.g. an exnode and exelem pair, in
+    any of groupNames and/or with nodes inside boundingBox, plus the faces,
+    lines and nodes they depend on.
+    :param boundingBox: (minimum, maximum) coordinates, or None.
+    :return list of record index arrays, one per index
+    '''
+    selections = []
+    for index in indexes:
+        records = index.getRecords()
+        selected = numpy.ones(len(records), dtype=bool)
+        if groupNames is not None:
+            inGroups = numpy.zeros(len(records), dtype=bool)
+            inGroups[index.selectGroups(groupNames)] = True
+            selected &= inGroups
+        selections.append(selected)
+    if boundingBox is not None:
+        minimum, maximum = numpy.asarray(boundingBox[0], dtype=numpy.float64), numpy.asarray(boundingBox[1], dtype=numpy.float64)
+        boxNodes = numpy.unique(numpy.concatenate([index.getRecords()[index.selectNodesInBox(minimum, maximum), 2]
+            for index in indexes] + [numpy.zeros(0, dtype=numpy.int64)]))
+        for index, selected in zip(indexes, selections):
+            inBox = numpy.zeros(len(selected), dtype=bool)
+            inBox[index.selectElementsWithNodes(boxNodes)] = True
+            records = index.getRecords()
+            inBox[(records[:, 0] == KIND_NODE) & numpy.isin(records[:, 2], boxNodes)] = True
+            selected &= inBox
+    # add faces and lines of selected elements, highest dimension first
+    for dimension in (3, 2):
+        faceKeys = set()
+        for index, selected in zip(indexes, selections):
+            records = index.getRecords()
+            for recordIndex in numpy.flatnonzero(selected & (records[:, 0] == KIND_ELEMENT) & (records[:, 1] == dimension)):
+                faceKeys.update((int(faceDimension), int(identifier)) for faceDimension, identifier in index.getElementFaces(recordIndex))
+        if faceKeys:
+            for index, selected in zip(indexes, selections):
+                records = index.getRecords()
+                for faceDimension in (dimension - 1, dimension - 2):
+                    identifiers = [identifier for keyDimension, identifier in faceKeys if keyDimension == faceDimension]
+                    if identifiers:
+                        selected |= (records[:, 0] == KIND_ELEMENT) & (records[:, 1] == faceDimension) & numpy.isin(records[:, 2], identifiers)
+    # add nodes of selected elements
+    nodeIdentifiers = [numpy.zeros(0, dtype=numpy.int64)]
+    for index, selected in zip(indexes, selections):
+        for recordIndex in numpy.flatnonzero(selected & (index.getRecords()[:, 0] == KIND_ELEMENT)):
+            nodeIdentifiers.append(index.getElementNodes(recordIndex))
+    nodeIdentifiers = numpy.unique(numpy.concatenate(nodeIdentifiers))
+    for index, selected in zip(indexes, selections):
+        records = index.getRecords()
+        selected |= (records[:, 0] == KIND_NODE) & numpy.isin(records[:, 2], nodeIdentifiers)
+    return [numpy.flatnonzero(selected) for selected in selections]
+
+def getFilteredBuffers(fileNames, groupNames=None, boundingBox=None, saveIndex=True):
+    '''
+    :return list of bytes of filtered EX text, one per file.
+    '''
+    indexes = [loadIndex(fileName, saveIndex) for fileName in fileNames]
+    buffers = []
+    for index, recordIndexes in zip(indexes, selectFiltered(indexes, groupNames, boundingBox)):
+        with open(index.getFileName(), "rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                buffers.append(b"")
+                continue
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                buffers.append(index.extract(recordIndexes, data))
+            finally:
+                data.close()
+    return buffers
+
+def ZincRegion_readFiltered(region, fileNames, groupNames=None, boundingBox=None):
+    '''
+    Read only records of classic EX files in any of groupNames and/or with
+    nodes inside boundingBox, with the faces, lines and nodes they use.
+    Bounding box filtering uses rectangular cartesian node coordinates only.
+    :param fileNames: Files to read together, nodes before elements.
+    :param boundingBox: (minimum, maximum) coordinates, or None.
+    :return result
+    '''
+    buffers = getFilteredBuffers(fileNames, groupNames, boundingBox)
+    sir = region.createStreaminformationRegion()
+    for buffer in buffers:
+        if buffer:
+            sir.createStreamresourceMemoryBuffer(buffer)
+    return region.read(sir)
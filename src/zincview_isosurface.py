@@ -0,0 +1,613 @@
+"""
+Fast isosurface extraction from volume image arrays for ZincView.
+
+Runs vectorised marching tetrahedra directly on a scalar volume array,
+splitting the cubes to process over a thread pool, and loads the
+triangles as a surface mesh in a child region. Minimum and maximum values
+of bricks of cubes are kept with each scalar volume so a new isovalue
+only samples bricks crossing it. Extracted surfaces are cached per
+(name, isovalue, level) so revisiting isovalues is instant.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import os
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy
+from PySide import QtCore
+from opencmiss.zinc.element import Element, Elementbasis
+from opencmiss.zinc.field import Field
+
+# cube corner offsets in x, y, z
+_CUBE_CORNERS = numpy.array([[0, 0, 0], [1, 0, 0], [1, 1, 0], [0, 1, 0],
+                             [0, 0, 1], [1, 0, 1], [1, 1, 1], [0, 1, 1]])
+# six tetrahedra around the 0-6 diagonal; neighbouring cubes split shared
+# faces the same way so the surface has no cracks
+_CUBE_TETRAHEDRA = [[0, 5, 1, 6], [0, 1, 2, 6], [0, 2, 3, 6], [0, 3, 7, 6], [0, 7, 4, 6], [0, 4, 5, 6]]
+
+def _getTetrahedronCases():
+    '''
+    :return list over 16 inside/outside cases of tetrahedron vertices of
+    triangles, each a list of 3 edges as local vertex pairs (inside, outside).
+    '''
+    cases = []
+    for case in range(16):
+        inside = [i for i in range(4) if case & (1 << i)]
+        outside = [i for i in range(4) if not (case & (1 << i))]
+        if len(inside) in (0, 4):
+            triangles = []
+        elif len(inside) == 1:
+            triangles = [[(inside[0], o) for o in outside]]
+        elif len(inside) == 3:
+            triangles = [[(i, outside[0]) for i in inside]]
+        else:
+            a, b = inside
+            c, d = outside
+            # quad with edges in cyclic order a-c, a-d, b-d, b-c
+            triangles = [[(a, c), (a, d), (b, d)], [(a, c), (b, d), (b, c)]]
+        cases.append(triangles)
+    return cases
+
+_TETRAHEDRON_CASES = _getTetrahedronCases()
+
+def getBrickRanges(values, brickSize=8):
+    '''
+    Get range of values over bricks of brickSize cubes in each direction,
+    including the voxels shared with neighbouring bricks.
+    :param values: Scalar array(depth, height, width) with all sizes at least 2.
+    :return minimum, maximum arrays(bricks z, bricks y, bricks x)
+    '''
+    cubeMinimum = values[:-1, :-1, :-1]
+    cubeMaximum = cubeMinimum
+    for x, y, z in _CUBE_CORNERS[1:]:
+        corner = values[z:values.shape[0] - 1 + z, y:values.shape[1] - 1 + y, x:values.shape[2] - 1 + x]
+        cubeMinimum = numpy.minimum(cubeMinimum, corner)
+        cubeMaximum = numpy.maximum(cubeMaximum, corner)
+    for axis in range(3):
+        starts = numpy.arange(0, cubeMinimum.shape[axis], brickSize)
+        cubeMinimum = numpy.minimum.reduceat(cubeMinimum, starts, axis=axis)
+        cubeMaximum = numpy.maximum.reduceat(cubeMaximum, starts, axis=axis)
+    return cubeMinimum, cubeMaximum
+
+def _getCrossingCubes(shape, brickRanges, brickSize, isovalue):
+    '''
+    :return flattened volume indexes of the first corners of all cubes in
+    bricks whose range crosses isovalue.
+    '''
+    depth, height, width = shape
+    minimum, maximum = brickRanges
+    bz, by, bx = numpy.nonzero((minimum < isovalue) & (maximum >= isovalue))
+    z = (bz[:, numpy.newaxis]*brickSize + numpy.arange(min(brickSize, depth - 1)))[:, :, numpy.newaxis, numpy.newaxis]
+    y = (by[:, numpy.newaxis]*brickSize + numpy.arange(min(brickSize, height - 1)))[:, numpy.newaxis, :, numpy.newaxis]
+    x = (bx[:, numpy.newaxis]*brickSize + numpy.arange(min(brickSize, width - 1)))[:, numpy.newaxis, numpy.newaxis, :]
+    inside = (z < depth - 1) & (y < height - 1) & (x < width - 1)
+    return ((z*height + y)*width + x)[inside]
+
+def _extractCubes(values, isovalue, base):
+    '''
+    Extract triangles from cubes with first corners at base.
+    :param values: Whole scalar volume array(depth, height, width).
+    :param base: Flattened volume indexes of first corners of cubes.
+    :return edge end indexes array(triangles, 3, 2) into the flattened volume
+    with the inside end first.
+    '''
+    depth, height, width = values.shape
+    flatValues = values.ravel()
+    cornerOffsets = (_CUBE_CORNERS[:, 2]*height + _CUBE_CORNERS[:, 1])*width + _CUBE_CORNERS[:, 0]
+    # only cubes crossing the isovalue produce triangles
+    insideCount = numpy.zeros(base.shape, dtype=numpy.int8)
+    for offset in cornerOffsets:
+        insideCount += flatValues[base + offset] >= isovalue
+    base = base[(insideCount > 0) & (insideCount < 8)]
+    edges = []
+    for tetrahedron in _CUBE_TETRAHEDRA:
+        vertexIndexes = numpy.stack([base + cornerOffsets[corner] for corner in tetrahedron], axis=1)
+        inside = flatValues[vertexIndexes] >= isovalue
+        cases = inside[:, 0] + 2*inside[:, 1] + 4*inside[:, 2] + 8*inside[:, 3]
+        for case in range(1, 15):
+            triangles = _TETRAHEDRON_CASES[case]
+            selected = vertexIndexes[cases == case]
+            if selected.shape[0] == 0:
+                continue
+            for triangle in triangles:
+                edges.append(numpy.stack([numpy.stack([selected[:, a], selected[:, b]], axis=1) for a, b in triangle], axis=1))
+    if not edges:
+        return numpy.empty((0, 3, 2), dtype=numpy.int64)
+    return numpy.concatenate(edges)
+
+def _getIndexCoordinates(indexes, shape, spacing, origin, flipY):
+    '''
+    :return array(n, 3) of x, y, z coordinates of flattened volume indexes.
+    '''
+    depth, height, width = shape
+    z, remainder = numpy.divmod(indexes, height*width)
+    y, x = numpy.divmod(remainder, width)
+    if flipY:
+        y = (height - 1) - y
+    return numpy.stack([x, y, z], axis=1)*spacing + origin
+
+def extractIsosurface(values, isovalue, spacing=(1.0, 1.0, 1.0), origin=(0.5, 0.5, 0.5), flipY=True, numberOfWorkers=None,
+        brickRanges=None, brickSize=8):
+    '''
+    Extract triangulated isosurface from a scalar volume by marching tetrahedra.
+    :param values: Scalar array(depth, height, width); converted to float32.
+    :param spacing: Distance between voxel centres in x, y, z.
+    :param origin: Coordinates of the centre of the first voxel.
+    :param flipY: Set if image rows run from the top, so y increases with
+    decreasing row, as for images read into Zinc image fields.
+    :param numberOfWorkers: Number of threads, default CPU count.
+    :param brickRanges: Optional getBrickRanges(values, brickSize), to reuse
+    when extracting several isovalues.
+    :return vertices float64 array(n, 3), triangles int32 array(m, 3) with
+    normals pointing out of the region where values >= isovalue.
+    '''
+    values = numpy.ascontiguousarray(values, dtype=numpy.float32)
+    if min(values.shape) < 2:
+        return numpy.empty((0, 3)), numpy.empty((0, 3), dtype=numpy.int32)
+    if brickRanges is None:
+        brickRanges = getBrickRanges(values, brickSize)
+    base = _getCrossingCubes(values.shape, brickRanges, brickSize, isovalue)
+    if numberOfWorkers is None:
+        numberOfWorkers = os.cpu_count() or 1
+    chunks = [chunk for chunk in numpy.array_split(base, numberOfWorkers) if chunk.size > 0]
+    with ThreadPoolExecutor(max_workers=max(1, len(chunks))) as executor:
+        results = list(executor.map(lambda chunk: _extractCubes(values, isovalue, chunk), chunks))
+    edges = numpy.concatenate(results) if results else numpy.empty((0, 3, 2), dtype=numpy.int64)
+    if edges.shape[0] == 0:
+        return numpy.empty((0, 3)), numpy.empty((0, 3), dtype=numpy.int32)
+    # merge vertices on shared edges
+    ends = edges.reshape(-1, 2)
+    low = ends.min(axis=1)
+    high = ends.max(axis=1)
+    keys, first, inverse = numpy.unique(low*values.size + high, return_index=True, return_inverse=True)
+    triangles = inverse.reshape(-1, 3).astype(numpy.int32)
+    insideEnds = ends[first, 0]
+    outsideEnds = ends[first, 1]
+    flatValues = values.ravel()
+    insideValues = flatValues[insideEnds]
+    outsideValues = flatValues[outsideEnds]
+    t = (isovalue - insideValues)/(outsideValues - insideValues)
+    spacing = numpy.asarray(spacing, dtype=numpy.float64)
+    origin = numpy.asarray(origin, dtype=numpy.float64)
+    insidePositions = _getIndexCoordinates(insideEnds, values.shape, spacing, origin, flipY)
+    outsidePositions = _getIndexCoordinates(outsideEnds, values.shape, spacing, origin, flipY)
+    vertices = insidePositions + t[:, numpy.newaxis]*(outsidePositions - insidePositions)
+    # orient triangles to face along their edges from inside to outside
+    p0 = vertices[triangles[:, 0]]
+    normals = numpy.cross(vertices[triangles[:, 1]] - p0, vertices[triangles[:, 2]] - p0)
+    outwards = (outsidePositions - insidePositions)[inverse].reshape(-1, 3, 3).sum(axis=1)
+    reverse = numpy.einsum('ij,ij->i', normals, outwards) < 0.0
+    triangles[reverse] = triangles[reverse][:, [0, 2, 1]]
+    return vertices, triangles
+
+def ZincRegion_defineTriangleMesh(region, vertices, triangles, coordinateFieldName="coordinates"):
+    '''
+    Define nodes with coordinates at vertices and linear triangle elements
+    in the 2-D mesh of region, in a single change block.
+    :return coordinate field
+    '''
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    coordinates = fieldmodule.createFieldFiniteElement(3)
+    coordinates.setName(coordinateFieldName)
+    coordinates.setManaged(True)
+    coordinates.setTypeCoordinate(True)
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodes.createNodetemplate()
+    nodetemplate.defineField(coordinates)
+    fieldcache = fieldmodule.createFieldcache()
+    for i, vertex in enumerate(vertices.tolist()):
+        node = nodes.createNode(i + 1, nodetemplate)
+        fieldcache.setNode(node)
+        coordinates.assignReal(fieldcache, vertex)
+    mesh = fieldmodule.findMeshByDimension(2)
+    elementtemplate = mesh.createElementtemplate()
+    elementtemplate.setElementShapeType(Element.SHAPE_TYPE_TRIANGLE)
+    elementtemplate.setNumberOfNodes(3)
+    basis = fieldmodule.createElementbasis(2, Elementbasis.FUNCTION_TYPE_LINEAR_SIMPLEX)
+    elementtemplate.defineFieldSimpleNodal(coordinates, -1, basis, [1, 2, 3])
+    for triangle in triangles.tolist():
+        for i in range(3):
+            elementtemplate.setNode(i + 1, nodes.findNodeByIdentifier(triangle[i] + 1))
+        mesh.defineElement(-1, elementtemplate)
+    fieldmodule.endChange()
+    return coordinates
+
+_isosurfaceEngines = []
+
+def getIsosurfaceEngines():
+    '''
+    :return list of IsosurfaceEngine objects created since last cleared.
+    '''
+    return list(_isosurfaceEngines)
+
+def clearIsosurfaceEngines():
+    '''
+    Forget all registered isosurface engines and their cached surfaces, e.g. when the model is cleared.
+    '''
+    for isosurfaceEngine in _isosurfaceEngines:
+        isosurfaceEngine.clear()
+    del _isosurfaceEngines[:]
+
+class IsosurfaceEngine(object):
+    '''
+    Extracts isosurfaces of named scalar functions of a volume pyramid and
+    shows them as surface graphics in child regions of region. Extracted
+    triangles and child regions are cached per (name, isovalue, level) so
+    switching visibility or returning to a previous isovalue needs no
+    extraction.
+    '''
+
+    def __init__(self, region, levels, spacing=(1.0, 1.0, 1.0), origin=(0.5, 0.5, 0.5), flipY=True, maximumCachedSurfaces=16):
+        '''
+        :param levels: Volume pyramid from loadImageVolumePyramid, full resolution first.
+        :param spacing, origin, flipY: Mapping of full resolution voxels to
+        coordinates, as for extractIsosurface.
+        :param maximumCachedSurfaces: Maximum number of surfaces kept; least
+        recently used surfaces and their child regions are removed.
+        '''
+        self._region = region
+        self._levels = levels
+        self._spacing = numpy.asarray(spacing, dtype=numpy.float64)
+        self._origin = numpy.asarray(origin, dtype=numpy.float64)
+        self._flipY = flipY
+        self._functions = {}
+        self._scalarVolumes = {}
+        self._surfaces = OrderedDict()
+        self._maximumCachedSurfaces = maximumCachedSurfaces
+        self._executor = None
+        self._materials = {}
+        self._isovalues = {}
+        _isosurfaceEngines.append(self)
+
+    def getRegion(self):
+        return self._region
+
+    def getScalarNames(self):
+        return sorted(self._functions.keys())
+
+    def getNumberOfLevels(self):
+        return len(self._levels)
+
+    def getIsovalue(self, name):
+        '''
+        :return isovalue last shown for named scalar, or None.
+        '''
+        return self._isovalues.get(name)
+
+    def clear(self):
+        '''
+        Discard cached surfaces and scalar volumes. Child regions are left
+        for the caller, since the whole model is usually being cleared.
+        '''
+        self._surfaces.clear()
+        self._scalarVolumes.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def defineScalar(self, name, function):
+        '''
+        Define named scalar function of the volume, e.g. the magnitude of RGB
+        values offset from a tissue colour, matching a Zinc field expression.
+        :param function: Callable taking volume array and returning float32
+        array(depth, height, width).
+        '''
+        self._functions[name] = function
+        for key in [key for key in self._scalarVolumes if key[0] == name]:
+            del self._scalarVolumes[key]
+
+    @staticmethod
+    def _computeScalarVolume(function, volume):
+        '''
+        :return scalar values of volume, brick ranges of values
+        '''
+        values = numpy.ascontiguousarray(function(volume), dtype=numpy.float32)
+        return values, getBrickRanges(values)
+
+    def _getScalarVolume(self, name, level):
+        '''
+        :return scalar values, brick ranges for named scalar at level.
+        '''
+        key = (name, level)
+        scalarVolume = self._scalarVolumes.get(key)
+        if scalarVolume is None:
+            scalarVolume = self._computeScalarVolume(self._functions[name], self._levels[level])
+            self._scalarVolumes[key] = scalarVolume
+        return scalarVolume
+
+    def getScalarRange(self, name):
+        '''
+        :return minimum, maximum of named scalar over the coarsest level.
+        '''
+        values, _ = self._getScalarVolume(name, len(self._levels) - 1)
+        return float(values.min()), float(values.max())
+
+    def _computeSurface(self, scalarVolume, function, isovalue, level):
+        '''
+        Extract surface from scalar volume, computing it first with function
+        if None. Uses no mutable engine state, so can run on a worker thread.
+        :return vertices, triangles, scalarVolume
+        '''
+        if scalarVolume is None:
+            scalarVolume = self._computeScalarVolume(function, self._levels[level])
+        values, brickRanges = scalarVolume
+        # voxel centres of coarser levels are at the centres of 2x2x2 blocks
+        scale = 2**level
+        spacing = self._spacing*scale
+        origin = self._origin + 0.5*(scale - 1)*self._spacing
+        vertices, triangles = extractIsosurface(values, isovalue, spacing, origin, self._flipY, brickRanges=brickRanges)
+        return vertices, triangles, scalarVolume
+
+    def hasSurface(self, name, isovalue, level=0):
+        return (name, isovalue, level) in self._surfaces
+
+    def extractSurfaceAsync(self, name, isovalue, level=0):
+        '''
+        Start extracting isosurface on a background thread. Only the arrays
+        are computed there; pass the result to addSurface on the main thread.
+        :return concurrent.futures.Future giving vertices, triangles, scalar
+        volume
+        '''
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1)
+        return self._executor.submit(self._computeSurface, self._scalarVolumes.get((name, level)),
+            self._functions[name], isovalue, level)
+
+    def addSurface(self, name, isovalue, level, vertices, triangles, scalarVolume=None):
+        '''
+        Add extracted surface to the cache, removing least recently used
+        surfaces and their child regions over the limit.
+        :param scalarVolume: Optional scalar volume the surface was extracted
+        from, cached for extracting further isovalues.
+        '''
+        if scalarVolume is not None:
+            self._scalarVolumes.setdefault((name, level), scalarVolume)
+        key = (name, isovalue, level)
+        if key in self._surfaces:
+            self._surfaces.move_to_end(key)
+            return
+        self._surfaces[key] = [vertices, triangles, None]
+        while len(self._surfaces) > self._maximumCachedSurfaces:
+            _, (_, _, childName) = self._surfaces.popitem(last=False)
+            if childName:
+                child = self._region.findChild(childName)
+                if child.isValid():
+                    self._region.removeChild(child)
+
+    def getSurface(self, name, isovalue, level=0):
+        '''
+        :return vertices, triangles of isosurface, extracting if not cached.
+        '''
+        key = (name, isovalue, level)
+        surface = self._surfaces.get(key)
+        if surface is not None:
+            self._surfaces.move_to_end(key)
+            return surface[0], surface[1]
+        vertices, triangles, _ = self._computeSurface(self._getScalarVolume(name, level), None, isovalue, level)
+        self.addSurface(name, isovalue, level, vertices, triangles)
+        return vertices, triangles
+
+    def showIsosurface(self, name, isovalue, material=None, level=0):
+        '''
+        Show isosurface as surface graphics in a child region, hiding other
+        isosurfaces with the same name. Child regions of cached surfaces are
+        reused so only the visibility changes.
+        :return child region
+        '''
+        if material is None:
+            material = self._materials.get(name)
+        else:
+            self._materials[name] = material
+        self._isovalues[name] = isovalue
+        vertices, triangles = self.getSurface(name, isovalue, level)
+        surface = self._surfaces[(name, isovalue, level)]
+        childName = surface[2]
+        child = self._region.findChild(childName) if childName else None
+        if (child is None) or (not child.isValid()):
+            childName = "isosurface_" + name + "_" + str(level) + "_" + repr(float(isovalue)).replace(".", "_").replace("-", "m")
+            child = self._region.createChild(childName)
+            coordinates = ZincRegion_defineTriangleMesh(child, vertices, triangles)
+            scene = child.getScene()
+            scene.beginChange()
+            surfaces = scene.createGraphicsSurfaces()
+            surfaces.setCoordinateField(coordinates)
+            if material is not None:
+                surfaces.setMaterial(material)
+            scene.endChange()
+            surface[2] = childName
+        self.setVisibility(name, True, childName)
+        return child
+
+    def setVisibility(self, name, visible, childName=None):
+        '''
+        Set visibility of isosurfaces with name; if childName is given only
+        that one is made visible and the others hidden.
+        '''
+        for key, surface in self._surfaces.items():
+            if (key[0] != name) or (not surface[2]):
+                continue
+            child = self._region.findChild(surface[2])
+            if child.isValid():
+                child.getScene().setVisibilityFlag(visible and ((childName is None) or (surface[2] == childName)))
+
+
+class IsovalueEditor(QtCore.QObject):
+    '''
+    Changes the isovalue of a contours graphics, or of an isosurface engine
+    scalar, interactively. While the value is changing a coarse preview is
+    shown; once it has been idle for a while the result is refined in
+    stages to full resolution. Changing the value again abandons any
+    refinement still in progress.
+    Contours are previewed with coarser tessellations, since Zinc builds
+    graphics on the main thread when rendered; isosurface engine surfaces
+    are previewed at coarse pyramid levels and finer levels are extracted
+    on a background thread.
+    '''
+
+    refined = QtCore.Signal()
+
+    def __init__(self, parent=None, idleDelay=300, stageDelay=100, numberOfStages=2):
+        '''
+        :param idleDelay: Milliseconds after the last change before refining.
+        :param stageDelay: Milliseconds between refinement stages, giving
+        time to render each one.
+        :param numberOfStages: Number of halvings of resolution for preview.
+        '''
+        QtCore.QObject.__init__(self, parent)
+        self._contours = None
+        self._tessellation = None
+        self._previewTessellations = []
+        self._engine = None
+        self._name = None
+        self._isovalue = None
+        self._numberOfStages = numberOfStages
+        self._stage = 0
+        self._future = None
+        self._idleTimer = QtCore.QTimer(self)
+        self._idleTimer.setSingleShot(True)
+        self._idleTimer.setInterval(idleDelay)
+        self._idleTimer.timeout.connect(self._refine)
+        self._stageTimer = QtCore.QTimer(self)
+        self._stageTimer.setSingleShot(True)
+        self._stageTimer.setInterval(stageDelay)
+        self._stageTimer.timeout.connect(self._refine)
+
+    def setContours(self, contours):
+        '''
+        Edit isovalue of Zinc GraphicsContours; stops editing any previous target.
+        '''
+        self.stop()
+        self._contours = contours
+        self._engine = None
+        self._name = None
+
+    def setIsosurface(self, engine, name):
+        '''
+        Edit isovalue of named scalar of IsosurfaceEngine; stops editing any previous target.
+        '''
+        self.stop()
+        self._contours = None
+        self._engine = engine
+        self._name = name
+
+    def getIsovalue(self):
+        '''
+        :return current isovalue of target, or None if none.
+        '''
+        if self._contours is not None:
+            result, isovalues = self._contours.getListIsovalues(1)
+            if result > 0:
+                return isovalues if isinstance(isovalues, float) else isovalues[0]
+            return None
+        if self._engine is not None:
+            return self._engine.getIsovalue(self._name)
+        return None
+
+    def isRefining(self):
+        return self._idleTimer.isActive() or self._stageTimer.isActive() or (self._future is not None)
+
+    def setIsovalue(self, isovalue):
+        '''
+        Show coarse preview at isovalue and start refining once idle.
+        '''
+        self._cancelRefinement()
+        self._isovalue = isovalue
+        self._stage = self._numberOfStages
+        if self._contours is not None:
+            if not self._previewTessellations:
+                self._createPreviewTessellations()
+            self._setContoursStage()
+        elif self._engine is not None:
+            self._stage = min(self._stage, self._engine.getNumberOfLevels() - 1)
+            self._engine.showIsosurface(self._name, isovalue, level=self._stage)
+        else:
+            return
+        self._idleTimer.start()
+
+    def stop(self):
+        '''
+        Stop refining and restore full resolution of current target.
+        '''
+        self._cancelRefinement()
+        if (self._contours is not None) and (self._tessellation is not None):
+            self._contours.setTessellation(self._tessellation)
+        self._tessellation = None
+        self._previewTessellations = []
+        if (self._engine is not None) and (self._isovalue is not None) and (self._stage > 0):
+            self._engine.showIsosurface(self._name, self._isovalue)
+        self._stage = 0
+
+    def _cancelRefinement(self):
+        self._idleTimer.stop()
+        self._stageTimer.stop()
+        if self._future is not None:
+            self._future.cancel()
+            self._future = None
+
+    def _createPreviewTessellations(self):
+        '''
+        Create tessellations halving divisions of the contours tessellation
+        for each stage, finest first.
+        '''
+        self._tessellation = self._contours.getTessellation()
+        result, minimumDivisions = self._tessellation.getMinimumDivisions(3)
+        result, refinementFactors = self._tessellation.getRefinementFactors(3)
+        tessellationmodule = self._contours.getScene().getTessellationmodule()
+        for stage in range(1, self._numberOfStages + 1):
+            tessellation = tessellationmodule.createTessellation()
+            tessellation.setMinimumDivisions([max(1, divisions >> stage) for divisions in minimumDivisions])
+            tessellation.setRefinementFactors(refinementFactors)
+            tessellation.setCircleDivisions(self._tessellation.getCircleDivisions())
+            self._previewTessellations.append(tessellation)
+
+    def _setContoursStage(self):
+        scene = self._contours.getScene()
+        scene.beginChange()
+        if self._stage > 0:
+            self._contours.setTessellation(self._previewTessellations[self._stage - 1])
+        else:
+            self._contours.setTessellation(self._tessellation)
+        self._contours.setListIsovalues(self._isovalue)
+        scene.endChange()
+
+    def _refine(self):
+        '''
+        Show next finer stage, scheduling the one after.
+        '''
+        if self._stage <= 0:
+            return
+        if self._contours is not None:
+            self._stage -= 1
+            self._setContoursStage()
+            if self._stage == 0:
+                self._tessellation = None
+                self._previewTessellations = []
+                self.refined.emit()
+            else:
+                self._stageTimer.start()
+            return
+        level = self._stage - 1
+        if self._future is None:
+            if self._engine.hasSurface(self._name, self._isovalue, level):
+                self._showLevel(level)
+                return
+            self._future = self._engine.extractSurfaceAsync(self._name, self._isovalue, level)
+        if not self._future.done():
+            self._stageTimer.start()
+            return
+        vertices, triangles, scalarVolume = self._future.result()
+        self._future = None
+        self._engine.addSurface(self._name, self._isovalue, level, vertices, triangles, scalarVolume)
+        self._showLevel(level)
+
+    def _showLevel(self, level):
+        self._stage = level
+        self._engine.showIsosurface(self._name, self._isovalue, level=level)
+        if level == 0:
+            self.refined.emit()
+        else:
+            self._stageTimer.start()
@@ -0,0 +1,220 @@
+"""
+Live simulation input for ZincView: solvers push timesteps of node
+parameters over a local Unix socket or TCP port.
+
+Protocol: a stream of messages, each a little-endian header of message type
+(uint8) and payload length (uint32) followed by the payload.
+  MESSAGE_LAYOUT payload is UTF-8 JSON declaring the field layout:
+    {"region": "/", "nodes": [1, 2, ...], "dtype": "<f8",
+     "fields": [{"name": "coordinates", "components": 3, "coordinate": true}]}
+  MESSAGE_FRAME payload is the time as float64 followed by values of the
+  declared dtype for each node in order, with each node's field components
+  in declared field order.
+A new layout replaces the previous one for its region.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import asyncio
+import collections
+import json
+import os
+import struct
+import threading
+import numpy
+
+MESSAGE_LAYOUT = 1
+MESSAGE_FRAME = 2
+DEFAULT_ADDRESS = "tcp:127.0.0.1:47800"
+
+_HEADER = struct.Struct("<BI")
+_TIME = struct.Struct("<d")
+
+
+def parseAddress(address):
+    '''
+    :param address: 'unix:PATH', 'tcp:HOST:PORT' or 'tcp:PORT'.
+    :return ('unix', path) or ('tcp', host, port)
+    '''
+    kind, _, rest = address.partition(":")
+    if kind == "unix" and rest:
+        return ("unix", rest)
+    if kind == "tcp" and rest:
+        host, _, port = rest.rpartition(":")
+        return ("tcp", host if host else "127.0.0.1", int(port))
+    raise ValueError("Invalid live address '" + address + "': expected unix:PATH or tcp:HOST:PORT")
+
+
+def encodeMessage(messageType, payload):
+    return _HEADER.pack(messageType, len(payload)) + payload
+
+
+def encodeLayout(layout):
+    return encodeMessage(MESSAGE_LAYOUT, json.dumps(layout).encode("utf-8"))
+
+
+def encodeFrame(time, values, dtype="<f8"):
+    return encodeMessage(MESSAGE_FRAME, _TIME.pack(time) + numpy.ascontiguousarray(values, dtype=dtype).tobytes())
+
+
+class LiveLayout(object):
+    '''
+    Declared field layout of node parameter frames for one region.
+    '''
+
+    def __init__(self, description):
+        self._region = description.get("region", "/")
+        self._nodeIdentifiers = numpy.asarray(description["nodes"], dtype=numpy.int64)
+        self._dtype = numpy.dtype(description.get("dtype", "<f8"))
+        self._fields = [(field["name"], int(field["components"]), bool(field.get("coordinate", False)))
+            for field in description["fields"]]
+        self._valuesPerNode = sum(components for _, components, _ in self._fields)
+
+    def getRegionPath(self):
+        return self._region
+
+    def getNumberOfNodes(self):
+        return len(self._nodeIdentifiers)
+
+    def getNodeIdentifiers(self):
+        return self._nodeIdentifiers
+
+    def getFieldNames(self):
+        return [name for name, _, _ in self._fields]
+
+    def getFields(self):
+        '''
+        :return list of (name, number of components, is coordinate) in frame order.
+        '''
+        return list(self._fields)
+
+    def getCoordinateFieldName(self):
+        '''
+        :return name of first coordinate field, or None.
+        '''
+        for name, _, coordinate in self._fields:
+            if coordinate:
+                return name
+        return None
+
+    def getFrameSize(self):
+        '''
+        :return expected frame payload size in bytes.
+        '''
+        return _TIME.size + len(self._nodeIdentifiers)*self._valuesPerNode*self._dtype.itemsize
+
+    def decodeFrame(self, payload):
+        '''
+        :return time, values array of shape (nodes, values per node)
+        '''
+        if len(payload) != self.getFrameSize():
+            raise ValueError("Live frame has " + str(len(payload)) + " bytes, layout expects " + str(self.getFrameSize()))
+        time = _TIME.unpack_from(payload)[0]
+        values = numpy.frombuffer(payload, dtype=self._dtype, offset=_TIME.size)
+        return time, values.reshape((len(self._nodeIdentifiers), self._valuesPerNode))
+
+
+class LiveReceiver(object):
+    '''
+    Receives live messages on a background asyncio thread. Decoded layouts
+    and frames are queued for the main thread to take with takeMessages(),
+    since Zinc must only be used from the main thread.
+    '''
+
+    def __init__(self, address=DEFAULT_ADDRESS):
+        self._address = parseAddress(address)
+        self._messages = collections.deque()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._error = None
+        self._started = threading.Event()
+
+    def getAddress(self):
+        return self._address
+
+    def start(self):
+        '''
+        Start listening; raises error if the server cannot be started.
+        '''
+        self._thread = threading.Thread(target=self._run, name="ZincViewLiveReceiver", daemon=True)
+        self._thread.start()
+        self._started.wait()
+        if self._error is not None:
+            self._thread.join()
+            self._thread = None
+            raise self._error
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._thread = None
+
+    def isRunning(self):
+        return self._thread is not None
+
+    def takeMessages(self):
+        '''
+        :return list of queued (LiveLayout, None) for new layouts and
+        (LiveLayout, (time, values)) for frames, in order received.
+        '''
+        messages = []
+        while self._messages:
+            messages.append(self._messages.popleft())
+        return messages
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            if self._address[0] == "unix":
+                server = asyncio.start_unix_server(self._handleConnection, path=self._address[1])
+            else:
+                server = asyncio.start_server(self._handleConnection, host=self._address[1], port=self._address[2])
+            self._server = self._loop.run_until_complete(server)
+        except (OSError, ValueError) as e:
+            self._error = e
+            self._loop.close()
+            self._started.set()
+            return
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._server.close()
+            self._loop.run_until_complete(self._server.wait_closed())
+            for task in asyncio.all_tasks(self._loop):
+                task.cancel()
+            self._loop.run_until_complete(asyncio.sleep(0))
+            self._loop.close()
+            if self._address[0] == "unix":
+                try:
+                    os.remove(self._address[1])
+                except OSError:
+                    pass
+
+    async def _handleConnection(self, reader, writer):
+        layout = None
+        try:
+            while True:
+                messageType, length = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                payload = await reader.readexactly(length)
+                if messageType == MESSAGE_LAYOUT:
+                    layout = LiveLayout(json.loads(payload.decode("utf-8")))
+                    self._messages.append((layout, None))
+                elif messageType == MESSAGE_FRAME:
+                    if layout is None:
+                        raise ValueError("Live frame received before layout")
+                    self._messages.append((layout, layout.decodeFrame(payload)))
+                else:
+                    raise ValueError("Unknown live message type " + str(messageType))
+        except asyncio.IncompleteReadError:
+            pass
+        except (ValueError, KeyError, TypeError) as e:
+            print("Live input connection closed: " + str(e))
+        finally:
+            writer.close()
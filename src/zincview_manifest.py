@@ -0,0 +1,153 @@
+"""
+Concurrent loading of independent child regions for ZincView models and
+scripts.
+
+A manifest lists the resources of each child region. Resource files are
+read, and gzip-compressed files decompressed, on a pool of worker threads
+while the main thread reads completed regions into detached staging
+regions, so disk access and decompression overlap with Zinc parsing.
+Zinc is only called from the calling thread. Staging regions are attached
+to the model in one hierarchical change, so graphics are rebuilt once
+rather than once per region.
+
+Manifest files are JSON with resource file names relative to the manifest:
+    {"regions": [
+        {"path": "heart", "resources": ["heart.exnode", "heart.exelem"]},
+        {"path": "lungs/left", "resources": [
+            {"file": "left0000.exnode.gz", "time": 0.0},
+            {"file": "left0001.exnode.gz", "time": 1.0}, "left.exelem"]}]}
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import collections
+import gzip
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from opencmiss.zinc.result import RESULT_OK
+
+MANIFEST_SUFFIX = ".zvmanifest"
+
+
+def isManifestFileName(fileName):
+    return fileName.endswith(MANIFEST_SUFFIX)
+
+
+def readManifest(fileName, contents=None):
+    '''
+    Read manifest file, making resource file names absolute.
+    :param contents: Optional bytes of the file already read.
+    :return list of (region path, list of (fileName, time)) with time None
+    for resources without time.
+    '''
+    if contents is None:
+        with open(fileName, "rb") as f:
+            contents = f.read()
+    directory = os.path.dirname(os.path.abspath(fileName))
+    manifest = []
+    for entry in json.loads(contents.decode("utf-8"))["regions"]:
+        resources = []
+        for resource in entry["resources"]:
+            if isinstance(resource, dict):
+                resources.append((os.path.join(directory, resource["file"]), resource.get("time")))
+            else:
+                resources.append((os.path.join(directory, resource), None))
+        manifest.append((entry["path"], resources))
+    return manifest
+
+
+def _readResources(resources):
+    '''
+    Read resource files into memory, decompressing gzip files. FieldML
+    files are left to be read by Zinc from file, since they may refer to
+    other files.
+    :return list of (bytes or fileName, time, isFile)
+    '''
+    buffers = []
+    for fileName, time in resources:
+        if fileName.endswith(".fieldml"):
+            buffers.append((fileName, time, True))
+        elif fileName.endswith(".gz"):
+            with gzip.open(fileName, "rb") as f:
+                buffers.append((f.read(), time, False))
+        else:
+            with open(fileName, "rb") as f:
+                buffers.append((f.read(), time, False))
+    return buffers
+
+
+def _readBuffersIntoRegion(region, buffers):
+    from opencmiss.zinc.streamregion import StreaminformationRegion
+    sir = region.createStreaminformationRegion()
+    for data, time, isFile in buffers:
+        if isFile:
+            resource = sir.createStreamresourceFile(data)
+        else:
+            resource = sir.createStreamresourceMemoryBuffer(data)
+        if time is not None:
+            sir.setResourceAttributeReal(resource, StreaminformationRegion.ATTRIBUTE_TIME, time)
+    return region.read(sir)
+
+
+def ZincRegion_readManifest(region, manifest, numberOfWorkers=None, maximumPending=None):
+    '''
+    Read each child region of manifest into its own staging region, with
+    resource files read concurrently, then attach them under region, all in
+    one hierarchical change. Resources for a region that already exists are
+    read into it, merging with its contents.
+    :param manifest: List of (region path relative to region, list of
+    (fileName, time)) as from readManifest, with parent regions listed
+    before their children.
+    :param numberOfWorkers: Number of reading threads, default CPU count.
+    :param maximumPending: Maximum number of regions read ahead of Zinc,
+    limiting memory held in buffers; default twice the number of workers.
+    :return list of paths of regions which failed to load, empty if all loaded.
+    '''
+    if numberOfWorkers is None:
+        numberOfWorkers = os.cpu_count() or 1
+    if maximumPending is None:
+        maximumPending = 2*numberOfWorkers
+    failedPaths = []
+    staged = []
+    region.beginHierarchicalChange()
+    with ThreadPoolExecutor(max_workers=numberOfWorkers) as executor:
+        entries = iter(manifest)
+        pending = collections.deque()
+        for path, resources in entries:
+            pending.append((path, executor.submit(_readResources, resources)))
+            if len(pending) >= maximumPending:
+                break
+        while pending:
+            path, future = pending.popleft()
+            # keep workers busy reading ahead while Zinc parses this region
+            for nextPath, nextResources in entries:
+                pending.append((nextPath, executor.submit(_readResources, nextResources)))
+                break
+            try:
+                buffers = future.result()
+            except (IOError, OSError) as e:
+                print(e)
+                failedPaths.append(path)
+                continue
+            existingRegion = region.findSubregionAtPath(path)
+            stagingRegion = existingRegion if existingRegion.isValid() else region.createRegion()
+            if _readBuffersIntoRegion(stagingRegion, buffers) != RESULT_OK:
+                print("Failed to read resources of region " + path)
+                failedPaths.append(path)
+                continue
+            if not existingRegion.isValid():
+                staged.append((path, stagingRegion))
+    for path, stagingRegion in staged:
+        parentPath, _, name = path.strip("/").rpartition("/")
+        parent = region.findSubregionAtPath(parentPath) if parentPath else region
+        if not parent.isValid():
+            parent = region.createSubregion(parentPath)
+        stagingRegion.setName(name)
+        if parent.appendChild(stagingRegion) != RESULT_OK:
+            print("Failed to attach region " + path)
+            failedPaths.append(path)
+    region.endHierarchicalChange()
+    return failedPaths
@@ -0,0 +1,489 @@
+"""
+Per-region memory accounting for ZincView.
+
+Estimates, for each region, the bytes used by node parameters including
+copies at each stored time, element data, image fields and graphics
+generated from the current tessellations. Zinc does not report its memory
+use, so estimates are made from counts of nodes, elements, values and
+pixels with typical per-object overheads; they are meant for comparing
+regions and noticing growth, not as exact figures. Node and element
+estimates are recomputed only after fields in the region change; regions
+are visited a few at a time so large trees are refreshed incrementally.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import time as _time
+from PySide import QtGui, QtCore
+from opencmiss.zinc.field import Field
+from opencmiss.zinc.graphics import Graphics
+from opencmiss.zinc.node import Node
+from opencmiss.zinc.result import RESULT_OK
+
+_VALUE_LABELS = [Node.VALUE_LABEL_VALUE, Node.VALUE_LABEL_D_DS1, Node.VALUE_LABEL_D_DS2, Node.VALUE_LABEL_D2_DS1DS2,
+                 Node.VALUE_LABEL_D_DS3, Node.VALUE_LABEL_D2_DS1DS3, Node.VALUE_LABEL_D2_DS2DS3, Node.VALUE_LABEL_D3_DS1DS2DS3]
+
+# typical bytes of Zinc bookkeeping per node and per element
+_NODE_OVERHEAD = 96
+_ELEMENT_OVERHEAD = 160
+# bytes per generated vertex: coordinates, normal and data value as floats
+_VERTEX_BYTES = 28
+
+
+class RegionMemoryUsage(object):
+    '''
+    Estimated bytes used by one region, not including its child regions.
+    '''
+
+    def __init__(self, nodeBytes=0, elementBytes=0, imageBytes=0, graphicsBytes=0):
+        self._nodeBytes = nodeBytes
+        self._elementBytes = elementBytes
+        self._imageBytes = imageBytes
+        self._graphicsBytes = graphicsBytes
+
+    def getNodeBytes(self):
+        return self._nodeBytes
+
+    def getElementBytes(self):
+        return self._elementBytes
+
+    def getImageBytes(self):
+        return self._imageBytes
+
+    def getGraphicsBytes(self):
+        return self._graphicsBytes
+
+    def getTotalBytes(self):
+        return self._nodeBytes + self._elementBytes + self._imageBytes + self._graphicsBytes
+
+
+def _getFiniteElementFields(fieldmodule):
+    fields = []
+    fielditer = fieldmodule.createFielditerator()
+    field = fielditer.next()
+    while field.isValid():
+        feField = field.castFiniteElement()
+        if feField.isValid():
+            fields.append(feField)
+        field = fielditer.next()
+    return fields
+
+
+def ZincRegion_estimateNodeBytes(region):
+    '''
+    Estimate bytes of nodes and datapoints and their parameters, assuming
+    all nodes in a nodeset store the same values and times as the first.
+    '''
+    fieldmodule = region.getFieldmodule()
+    feFields = _getFiniteElementFields(fieldmodule)
+    size = 0
+    for fieldDomainType in [Field.DOMAIN_TYPE_NODES, Field.DOMAIN_TYPE_DATAPOINTS]:
+        nodeset = fieldmodule.findNodesetByFieldDomainType(fieldDomainType)
+        numberOfNodes = nodeset.getSize()
+        if numberOfNodes == 0:
+            continue
+        node = nodeset.createNodeiterator().next()
+        valuesPerNode = 0
+        for feField in feFields:
+            nodetemplate = nodeset.createNodetemplate()
+            if nodetemplate.defineFieldFromNode(feField, node) != RESULT_OK:
+                continue
+            values = 0
+            for component in range(1, feField.getNumberOfComponents() + 1):
+                for valueLabel in _VALUE_LABELS:
+                    values += max(0, nodetemplate.getValueNumberOfVersions(feField, component, valueLabel))
+            timesequence = nodetemplate.getTimesequence(feField)
+            numberOfTimes = timesequence.getNumberOfTimes() if timesequence.isValid() else 1
+            valuesPerNode += values*max(1, numberOfTimes)
+        size += numberOfNodes*(_NODE_OVERHEAD + 8*valuesPerNode)
+    return size
+
+
+def ZincRegion_estimateElementBytes(region):
+    '''
+    Estimate bytes of elements of all dimensions and their local-to-global
+    node maps, assuming all elements of a mesh are like the first.
+    '''
+    fieldmodule = region.getFieldmodule()
+    feFields = None
+    size = 0
+    for dimension in range(1, 4):
+        mesh = fieldmodule.findMeshByDimension(dimension)
+        numberOfElements = mesh.getSize()
+        if numberOfElements == 0:
+            continue
+        bytesPerElement = _ELEMENT_OVERHEAD
+        element = mesh.createElementiterator().next()
+        if hasattr(element, "getElementfieldtemplate"):
+            if feFields is None:
+                feFields = _getFiniteElementFields(fieldmodule)
+            for feField in feFields:
+                eft = element.getElementfieldtemplate(feField, -1)
+                if eft.isValid():
+                    bytesPerElement += 4*eft.getNumberOfLocalNodes()
+        size += numberOfElements*bytesPerElement
+    return size
+
+
+def ZincRegion_estimateImageBytes(region):
+    '''
+    Estimate bytes of pixels in image fields. Images read from volume levels
+    of detail use the size of their current volume level's values, otherwise
+    one byte per component is assumed.
+    '''
+    from zincview_volume import getVolumeLevelsOfDetail
+    volumeComponentBytes = []
+    for volumeLevelOfDetail in getVolumeLevelsOfDetail():
+        level = volumeLevelOfDetail.getLevel()
+        volume = volumeLevelOfDetail.getLevels()[level if (level is not None) else 0]
+        volumeComponentBytes.append((volumeLevelOfDetail.getImageField(), volume.dtype.itemsize))
+    size = 0
+    fieldmodule = region.getFieldmodule()
+    fielditer = fieldmodule.createFielditerator()
+    field = fielditer.next()
+    while field.isValid():
+        imageField = field.castImage()
+        if imageField.isValid():
+            result, pixels = imageField.getSizeInPixels(3)
+            if result == RESULT_OK:
+                componentBytes = 1
+                for volumeImageField, itemsize in volumeComponentBytes:
+                    if volumeImageField == field:
+                        componentBytes = itemsize
+                numberOfPixels = 1
+                for count in pixels:
+                    numberOfPixels *= max(1, count)
+                size += numberOfPixels*field.getNumberOfComponents()*componentBytes
+        field = fielditer.next()
+    return size
+
+
+def _getDivisions(graphics, dimension):
+    '''
+    :return product of tessellation divisions of graphics over dimension.
+    '''
+    tessellation = graphics.getTessellation()
+    if not tessellation.isValid():
+        return 1
+    result, minimumDivisions = tessellation.getMinimumDivisions(3)
+    result, refinementFactors = tessellation.getRefinementFactors(3)
+    divisions = 1
+    for i in range(dimension):
+        divisions *= max(1, minimumDivisions[i])*max(1, refinementFactors[i])
+    return divisions
+
+
+def ZincScene_estimateGraphicsBytes(scene):
+    '''
+    Estimate bytes of vertices generated for visible graphics in scene at
+    their current tessellations. Surfaces and contours are assumed to be
+    drawn on every element of their domain.
+    '''
+    fieldmodule = scene.getRegion().getFieldmodule()
+    meshSizes = [0] + [fieldmodule.findMeshByDimension(dimension).getSize() for dimension in range(1, 4)]
+    highestDimension = 0
+    for dimension in range(3, 0, -1):
+        if meshSizes[dimension] > 0:
+            highestDimension = dimension
+            break
+    size = 0
+    graphics = scene.getFirstGraphics()
+    while graphics.isValid():
+        if graphics.getVisibilityFlag():
+            graphicsType = graphics.getType()
+            fieldDomainType = graphics.getFieldDomainType()
+            if fieldDomainType in [Field.DOMAIN_TYPE_NODES, Field.DOMAIN_TYPE_DATAPOINTS]:
+                vertices = fieldmodule.findNodesetByFieldDomainType(fieldDomainType).getSize()
+            elif graphicsType == Graphics.TYPE_LINES:
+                vertices = meshSizes[1]*(_getDivisions(graphics, 1) + 1)
+            elif graphicsType == Graphics.TYPE_SURFACES:
+                # two triangles of three vertices per division
+                vertices = meshSizes[2]*_getDivisions(graphics, 2)*6
+            elif graphicsType == Graphics.TYPE_CONTOURS:
+                dimension = highestDimension
+                if fieldDomainType == Field.DOMAIN_TYPE_MESH2D:
+                    dimension = 2
+                # list isovalues report a range of 0 isovalues; assume one
+                numberOfIsovalues = max(1, graphics.castContours().getRangeNumberOfIsovalues())
+                # contours cross a fraction of the divisions of each element
+                vertices = meshSizes[dimension]*_getDivisions(graphics, dimension - 1)*6*numberOfIsovalues
+            elif graphicsType == Graphics.TYPE_POINTS:
+                vertices = meshSizes[highestDimension]*_getDivisions(graphics, highestDimension)
+            else:
+                vertices = meshSizes[highestDimension]*64
+            size += vertices*_VERTEX_BYTES
+        graphics = scene.getNextGraphics(graphics)
+    return size
+
+
+class RegionMemoryAccountant(QtCore.QObject):
+    '''
+    Keeps memory usage estimates for all regions in a tree, refreshed
+    incrementally. Node, element and image estimates are cached until a
+    field in the region changes; graphics estimates are recomputed on every
+    pass since scenes have no change notifier. Signals updated() after each
+    complete pass and warning(str) when the total or any region first
+    exceeds its warning threshold.
+    '''
+
+    updated = QtCore.Signal()
+    warning = QtCore.Signal(str)
+
+    def __init__(self, parent=None):
+        QtCore.QObject.__init__(self, parent)
+        self._rootRegion = None
+        # path -> [region, fieldmodulenotifier, fieldsChanged, nodeBytes, elementBytes, imageBytes, graphicsBytes]
+        self._entries = {}
+        self._pendingRegions = []
+        self._passPaths = []
+        self._usages = []
+        self._totalBytes = 0
+        self._totalWarningBytes = None
+        self._regionWarningBytes = None
+        self._warnedPaths = set()
+
+    def setRootRegion(self, rootRegion):
+        '''
+        Start accounting for a new region tree, forgetting the old one.
+        '''
+        self._rootRegion = rootRegion
+        self._entries = {}
+        self._pendingRegions = []
+        self._passPaths = []
+        self._usages = []
+        self._totalBytes = 0
+        self._warnedPaths = set()
+
+    def getWarningThresholds(self):
+        '''
+        :return total bytes, region bytes above which to warn, each None for no warning.
+        '''
+        return self._totalWarningBytes, self._regionWarningBytes
+
+    def setWarningThresholds(self, totalBytes, regionBytes):
+        self._totalWarningBytes = totalBytes
+        self._regionWarningBytes = regionBytes
+        self._warnedPaths = set()
+
+    def forget(self, path):
+        '''
+        Release cached estimates and notifiers for region subtree at path,
+        e.g. before the regions are removed.
+        '''
+        prefix = path.rstrip("/") + "/"
+        for key in [key for key in self._entries if (key == path) or key.startswith(prefix)]:
+            del self._entries[key]
+        self._pendingRegions = [region for region in self._pendingRegions
+            if not ((region.getPath() == path) or region.getPath().startswith(prefix))]
+
+    def _getEntry(self, region):
+        path = region.getPath()
+        entry = self._entries.get(path)
+        if (entry is None) or (entry[0] != region):
+            notifier = region.getFieldmodule().createFieldmodulenotifier()
+            entry = [region, notifier, True, 0, 0, 0, 0]
+            notifier.setCallback(lambda event, entry=entry: entry.__setitem__(2, True))
+            self._entries[path] = entry
+        return entry
+
+    def _updateEntry(self, entry, graphics=True):
+        region = entry[0]
+        if entry[2]:
+            entry[2] = False
+            entry[3] = ZincRegion_estimateNodeBytes(region)
+            entry[4] = ZincRegion_estimateElementBytes(region)
+            entry[5] = ZincRegion_estimateImageBytes(region)
+        if graphics:
+            entry[6] = ZincScene_estimateGraphicsBytes(region.getScene())
+
+    def getUsage(self, region):
+        '''
+        :return RegionMemoryUsage for region, computing any estimates not cached.
+        '''
+        entry = self._getEntry(region)
+        if entry[2]:
+            self._updateEntry(entry)
+        return RegionMemoryUsage(entry[3], entry[4], entry[5], entry[6])
+
+    def getUsages(self):
+        '''
+        :return list of (path, RegionMemoryUsage) for regions in tree order
+        at the end of the last complete pass.
+        '''
+        return list(self._usages)
+
+    def getTotalBytes(self):
+        '''
+        :return estimated bytes of all regions at the end of the last complete pass.
+        '''
+        return self._totalBytes
+
+    def refresh(self, timeBudget=0.02):
+        '''
+        Update estimates for regions of the tree until timeBudget seconds
+        are used, continuing from where the last call stopped. At the end
+        of each pass over the tree, usages and warnings are updated.
+        :return True if a pass was completed
+        '''
+        if self._rootRegion is None:
+            return False
+        if not self._pendingRegions:
+            self._pendingRegions = [self._rootRegion]
+            self._passPaths = []
+        endTime = _time.perf_counter() + timeBudget
+        while self._pendingRegions:
+            region = self._pendingRegions.pop()
+            if region.isValid():
+                self._updateEntry(self._getEntry(region))
+                self._passPaths.append(region.getPath())
+                # visit children in order next, so passes list regions in tree order
+                children = []
+                child = region.getFirstChild()
+                while child.isValid():
+                    children.append(child)
+                    child = child.getNextSibling()
+                self._pendingRegions.extend(reversed(children))
+            if _time.perf_counter() > endTime:
+                break
+        if self._pendingRegions:
+            return False
+        seenPaths = set(self._passPaths)
+        for path in [path for path in self._entries if path not in seenPaths]:
+            del self._entries[path]
+        self._usages = []
+        for path in self._passPaths:
+            entry = self._entries.get(path)
+            if entry is None:
+                # forgotten during the pass
+                continue
+            self._usages.append((path, RegionMemoryUsage(entry[3], entry[4], entry[5], entry[6])))
+        self._totalBytes = sum(usage.getTotalBytes() for _, usage in self._usages)
+        self._checkWarnings()
+        self.updated.emit()
+        return True
+
+    def _checkWarnings(self):
+        '''
+        Emit warning for the total and for each region newly above its
+        threshold; warn again only after dropping back below it.
+        '''
+        overPaths = set()
+        if (self._totalWarningBytes is not None) and (self._totalBytes > self._totalWarningBytes):
+            overPaths.add(None)
+            if None not in self._warnedPaths:
+                self.warning.emit("Estimated model memory " + formatBytes(self._totalBytes) +
+                    " is above warning threshold " + formatBytes(self._totalWarningBytes))
+        if self._regionWarningBytes is not None:
+            for path, usage in self._usages:
+                if usage.getTotalBytes() > self._regionWarningBytes:
+                    overPaths.add(path)
+                    if path not in self._warnedPaths:
+                        self.warning.emit("Estimated memory of region " + path + " " + formatBytes(usage.getTotalBytes()) +
+                            " is above warning threshold " + formatBytes(self._regionWarningBytes))
+        self._warnedPaths = overPaths
+
+
+def formatBytes(size):
+    '''
+    :return size in bytes as a short human readable string.
+    '''
+    if size is None:
+        return ""
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return '{:.0f} {}'.format(size, unit)
+        size /= 1024.0
+    return '{:.1f} GB'.format(size)
+
+
+class MemoryDockWidget(QtGui.QDockWidget):
+    '''
+    Dock widget listing estimated memory use by region, with warning thresholds.
+    '''
+
+    thresholdsChanged = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        QtGui.QDockWidget.__init__(self, "Memory", parent)
+        self.setObjectName("memory_dock_widget")
+        widget = QtGui.QWidget(self)
+        layout = QtGui.QVBoxLayout(widget)
+        layout.setContentsMargins(3, 3, 3, 3)
+        layout.setSpacing(3)
+        thresholdsLayout = QtGui.QHBoxLayout()
+        thresholdsLayout.addWidget(QtGui.QLabel("Warn above total:", widget))
+        self._totalWarningSpinBox = self._createMegabytesSpinBox(widget, "Warn when the estimated memory of the whole model is above this")
+        thresholdsLayout.addWidget(self._totalWarningSpinBox)
+        thresholdsLayout.addWidget(QtGui.QLabel("region:", widget))
+        self._regionWarningSpinBox = self._createMegabytesSpinBox(widget, "Warn when the estimated memory of any one region is above this")
+        thresholdsLayout.addWidget(self._regionWarningSpinBox)
+        thresholdsLayout.addStretch()
+        layout.addLayout(thresholdsLayout)
+        self._totalLabel = QtGui.QLabel(widget)
+        layout.addWidget(self._totalLabel)
+        self._regionTree = QtGui.QTreeWidget(widget)
+        self._regionTree.setHeaderLabels(["Region", "Nodes", "Elements", "Images", "Graphics", "Total"])
+        self._regionTree.setRootIsDecorated(False)
+        self._regionTree.setSortingEnabled(True)
+        layout.addWidget(self._regionTree)
+        self.setWidget(widget)
+
+    def _createMegabytesSpinBox(self, widget, toolTip):
+        spinBox = QtGui.QSpinBox(widget)
+        spinBox.setRange(0, 1048576)
+        spinBox.setSuffix(" MB")
+        spinBox.setSpecialValueText("none")
+        spinBox.setToolTip(toolTip)
+        spinBox.editingFinished.connect(self.thresholdsChanged)
+        return spinBox
+
+    def getWarningThresholds(self):
+        '''
+        :return total bytes, region bytes, each None if not set.
+        '''
+        return tuple((spinBox.value()*1048576 if spinBox.value() else None)
+            for spinBox in [self._totalWarningSpinBox, self._regionWarningSpinBox])
+
+    def setWarningThresholds(self, totalBytes, regionBytes):
+        self._totalWarningSpinBox.setValue(int(totalBytes/1048576) if totalBytes else 0)
+        self._regionWarningSpinBox.setValue(int(regionBytes/1048576) if regionBytes else 0)
+
+    def setUsages(self, usages, totalBytes):
+        '''
+        :param usages: List of (path, RegionMemoryUsage).
+        '''
+        totalWarningBytes, regionWarningBytes = self.getWarningThresholds()
+        self._totalLabel.setText("Estimated total: " + formatBytes(totalBytes))
+        if (totalWarningBytes is not None) and (totalBytes > totalWarningBytes):
+            self._totalLabel.setStyleSheet("color: red")
+        else:
+            self._totalLabel.setStyleSheet("")
+        self._regionTree.setSortingEnabled(False)
+        self._regionTree.clear()
+        items = []
+        for path, usage in usages:
+            sizes = [usage.getNodeBytes(), usage.getElementBytes(), usage.getImageBytes(),
+                usage.getGraphicsBytes(), usage.getTotalBytes()]
+            item = _SizeTreeWidgetItem([path] + [formatBytes(size) for size in sizes])
+            for column, size in enumerate(sizes):
+                item.setData(column + 1, QtCore.Qt.UserRole, size)
+                item.setTextAlignment(column + 1, QtCore.Qt.AlignRight)
+            if (regionWarningBytes is not None) and (usage.getTotalBytes() > regionWarningBytes):
+                item.setForeground(5, QtGui.QBrush(QtCore.Qt.red))
+            items.append(item)
+        self._regionTree.addTopLevelItems(items)
+        self._regionTree.setSortingEnabled(True)
+
+
+class _SizeTreeWidgetItem(QtGui.QTreeWidgetItem):
+    '''
+    Sorts size columns by bytes rather than by text.
+    '''
+
+    def __lt__(self, other):
+        column = self.treeWidget().sortColumn()
+        if column > 0:
+            return self.data(column, QtCore.Qt.UserRole) < other.data(column, QtCore.Qt.UserRole)
+        return self.text(column) < other.text(column)
@@ -0,0 +1,72 @@
+#!/usr/bin/python
+"""
+Mock solver for testing ZincView live input. Sends a grid of nodes on a
+travelling wave surface with a scalar height field, one frame per timestep.
+
+Usage: python zincview_mock_solver.py [--address tcp:127.0.0.1:47800]
+    [--nodes 50] [--steps 200] [--rate 20]
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import argparse
+import socket
+import sys
+import time as _time
+import numpy
+from zincview_live import DEFAULT_ADDRESS, encodeFrame, encodeLayout, parseAddress
+
+
+def connect(address):
+    '''
+    :return socket connected to ZincView live address.
+    '''
+    parsedAddress = parseAddress(address)
+    if parsedAddress[0] == "unix":
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(parsedAddress[1])
+    else:
+        connection = socket.create_connection(parsedAddress[1:])
+    return connection
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(description="Send mock solver timesteps to ZincView live input")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help="unix:PATH or tcp:HOST:PORT")
+    parser.add_argument("--nodes", type=int, default=50, help="nodes along each side of the grid")
+    parser.add_argument("--steps", type=int, default=200, help="number of timesteps to send")
+    parser.add_argument("--rate", type=float, default=20.0, help="timesteps per second")
+    parser.add_argument("--dt", type=float, default=0.01, help="time increment per step")
+    options = parser.parse_args(argv[1:])
+
+    n = options.nodes
+    x, y = numpy.meshgrid(numpy.linspace(0.0, 1.0, n), numpy.linspace(0.0, 1.0, n))
+    x = x.ravel()
+    y = y.ravel()
+    layout = {
+        "region": "/",
+        "nodes": list(range(1, n*n + 1)),
+        "dtype": "<f4",
+        "fields": [
+            {"name": "coordinates", "components": 3, "coordinate": True},
+            {"name": "height", "components": 1}]}
+    connection = connect(options.address)
+    try:
+        connection.sendall(encodeLayout(layout))
+        startTime = _time.perf_counter()
+        for step in range(options.steps):
+            time = step*options.dt
+            z = 0.1*numpy.sin(2.0*numpy.pi*(x + y - time))*numpy.exp(-time)
+            values = numpy.column_stack((x, y, z, z))
+            connection.sendall(encodeFrame(time, values, layout["dtype"]))
+            delay = startTime + (step + 1)/options.rate - _time.perf_counter()
+            if delay > 0.0:
+                _time.sleep(delay)
+    finally:
+        connection.close()
+
+
+if __name__ == '__main__':
+    main(sys.argv)
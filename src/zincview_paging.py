@@ -0,0 +1,293 @@
+"""
+Out-of-core paging of hidden child regions for ZincView.
+
+Region subtrees that stay invisible for longer than an idle time, or that
+were least recently visible when the estimated resident memory of the model
+exceeds a ceiling, are chosen to be written to a local cache directory and
+released. ZincView replaces each with an empty placeholder region of the
+same name and reads it back when the placeholder is selected or shown.
+The pager only decides what to page; ZincView does all Zinc work on the
+main thread.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import os
+import shutil
+import tempfile
+import time as _time
+from PySide import QtGui, QtCore
+from zincview_memory import formatBytes
+
+
+def _getPathParts(path):
+    '''
+    :return tuple of region names in path, empty for the root region.
+    '''
+    return tuple(name for name in path.split("/") if name)
+
+
+class RegionPager(object):
+    '''
+    Tracks when regions were last visible and which are paged out, and
+    chooses region subtrees to page out. Page files are kept in a private
+    temporary directory removed by clear().
+    '''
+
+    def __init__(self, idleTime=60.0, memoryCeiling=None, clock=_time.monotonic):
+        '''
+        :param idleTime: Seconds a region subtree must be hidden before it is paged out.
+        :param memoryCeiling: Estimated resident bytes above which least
+        recently visible hidden subtrees are paged out sooner, or None.
+        '''
+        self._idleTime = idleTime
+        self._memoryCeiling = memoryCeiling
+        self._clock = clock
+        self._cacheDirectory = None
+        self._fileCount = 0
+        # last visible clock time by path parts
+        self._lastVisible = {}
+        # paths paged out: path parts -> (path, fileName, residentBytes)
+        self._paged = {}
+        self._summaries = []
+        self._residentBytes = 0
+
+    def getIdleTime(self):
+        return self._idleTime
+
+    def setIdleTime(self, idleTime):
+        self._idleTime = idleTime
+
+    def getMemoryCeiling(self):
+        return self._memoryCeiling
+
+    def setMemoryCeiling(self, memoryCeiling):
+        self._memoryCeiling = memoryCeiling
+
+    def getResidentBytes(self):
+        '''
+        :return estimated resident bytes of the model at the last update.
+        '''
+        return self._residentBytes
+
+    def getSummaries(self):
+        '''
+        :return list of (path, paged, bytes, idle seconds) for each region
+        at the last update. Bytes are resident bytes for resident regions
+        and bytes before paging out for paged regions.
+        '''
+        return list(self._summaries)
+
+    def update(self, regionStates):
+        '''
+        Choose region subtrees to page out. A subtree containing a visible
+        or pinned region, or inside a pinned region, is never paged out.
+        :param regionStates: List of (path, visible, pinned, residentBytes)
+        for every region in the tree including placeholders of paged out
+        regions, parents before children.
+        :return list of paths of region subtrees to page out.
+        '''
+        now = self._clock()
+        paths = {}
+        blocked = set()
+        pinned = set()
+        lastVisible = {}
+        subtreeBytes = {}
+        self._summaries = []
+        for path, visible, isPinned, residentBytes in regionStates:
+            parts = _getPathParts(path)
+            paths[parts] = path
+            if visible:
+                self._lastVisible[parts] = now
+            last = self._lastVisible.setdefault(parts, now)
+            if isPinned:
+                pinned.add(parts)
+            paged = self._paged.get(parts)
+            if paged is None:
+                self._summaries.append((path, False, residentBytes, now - last))
+            else:
+                self._summaries.append((path, True, paged[2], now - last))
+            for i in range(len(parts) + 1):
+                ancestor = parts[:i]
+                if visible or isPinned:
+                    blocked.add(ancestor)
+                lastVisible[ancestor] = max(lastVisible.get(ancestor, last), last)
+                if (paged is None) and residentBytes:
+                    subtreeBytes[ancestor] = subtreeBytes.get(ancestor, 0) + residentBytes
+        self._residentBytes = subtreeBytes.get((), 0)
+        candidates = []
+        for parts in paths:
+            if (not parts) or (parts in blocked) or (parts in self._paged):
+                continue
+            if any((parts[:i] in pinned) for i in range(len(parts))):
+                continue
+            # page out whole hidden subtrees from their outermost region
+            parentParts = parts[:-1]
+            if parentParts and (parentParts not in blocked):
+                continue
+            candidates.append(parts)
+        candidates.sort(key=lambda parts: lastVisible[parts])
+        pageOut = []
+        residentBytes = self._residentBytes
+        for parts in candidates:
+            if ((now - lastVisible[parts]) >= self._idleTime) or \
+                    ((self._memoryCeiling is not None) and (residentBytes > self._memoryCeiling)):
+                pageOut.append(paths[parts])
+                residentBytes -= subtreeBytes.get(parts, 0)
+        return pageOut
+
+    def getSubtreeBytes(self, path):
+        '''
+        :return estimated resident bytes of region subtree at path at the last update.
+        '''
+        parts = _getPathParts(path)
+        return sum(summary[2] for summary in self._summaries
+            if (not summary[1]) and summary[2] and (_getPathParts(summary[0])[:len(parts)] == parts))
+
+    def getNewCacheFileName(self):
+        '''
+        :return name of a new page file in the cache directory, creating it on first use.
+        '''
+        if self._cacheDirectory is None:
+            self._cacheDirectory = tempfile.mkdtemp(prefix="zincview_paging_")
+        self._fileCount += 1
+        return os.path.join(self._cacheDirectory, "region" + str(self._fileCount) + ".zvpage")
+
+    def setPagedOut(self, path, fileName, residentBytes):
+        '''
+        Record region subtree at path as paged out to fileName. Visibility
+        of regions inside it is forgotten.
+        '''
+        parts = _getPathParts(path)
+        for key in list(self._lastVisible.keys()):
+            if (len(key) > len(parts)) and (key[:len(parts)] == parts):
+                del self._lastVisible[key]
+        self._paged[parts] = (path, fileName, residentBytes)
+        summaries = []
+        for summary in self._summaries:
+            summaryParts = _getPathParts(summary[0])
+            if summaryParts == parts:
+                summaries.append((summary[0], True, residentBytes, summary[3]))
+            elif summaryParts[:len(parts)] != parts:
+                summaries.append(summary)
+        self._summaries = summaries
+        self._residentBytes = max(0, self._residentBytes - residentBytes)
+
+    def isPagedOut(self, path):
+        return _getPathParts(path) in self._paged
+
+    def getPagedOutPaths(self):
+        return [path for path, _, _ in self._paged.values()]
+
+    def getPagedOutFileName(self, path):
+        '''
+        :return page file name for region at path, or None if resident.
+        '''
+        paged = self._paged.get(_getPathParts(path))
+        return paged[1] if paged else None
+
+    def setPagedIn(self, path):
+        '''
+        Record region subtree at path as resident and remove its page file.
+        '''
+        parts = _getPathParts(path)
+        paged = self._paged.pop(parts, None)
+        self._lastVisible[parts] = self._clock()
+        self._summaries = [(summary[0], False, None, 0.0) if (_getPathParts(summary[0]) == parts) else summary
+            for summary in self._summaries]
+        if paged is not None:
+            try:
+                os.remove(paged[1])
+            except OSError:
+                pass
+
+    def clear(self):
+        '''
+        Forget all regions and remove the cache directory, e.g. when the model is cleared.
+        '''
+        self._lastVisible = {}
+        self._paged = {}
+        self._summaries = []
+        self._residentBytes = 0
+        if self._cacheDirectory is not None:
+            shutil.rmtree(self._cacheDirectory, ignore_errors=True)
+            self._cacheDirectory = None
+
+
+class RegionPagingDockWidget(QtGui.QDockWidget):
+    '''
+    Dock widget setting the paging idle time and memory ceiling, and listing
+    which regions are resident or paged out. Activating a region requests
+    it be selected, which reads it back if paged out.
+    '''
+
+    settingsChanged = QtCore.Signal()
+    regionActivated = QtCore.Signal(str)
+
+    def __init__(self, parent=None):
+        QtGui.QDockWidget.__init__(self, "Region paging", parent)
+        self.setObjectName("region_paging_dock_widget")
+        widget = QtGui.QWidget(self)
+        layout = QtGui.QVBoxLayout(widget)
+        layout.setContentsMargins(3, 3, 3, 3)
+        layout.setSpacing(3)
+        settingsLayout = QtGui.QHBoxLayout()
+        settingsLayout.addWidget(QtGui.QLabel("Idle time:", widget))
+        self._idleTimeSpinBox = QtGui.QSpinBox(widget)
+        self._idleTimeSpinBox.setRange(1, 86400)
+        self._idleTimeSpinBox.setSuffix(" s")
+        self._idleTimeSpinBox.setToolTip("Seconds a region must be hidden before it is paged out")
+        self._idleTimeSpinBox.editingFinished.connect(self.settingsChanged)
+        settingsLayout.addWidget(self._idleTimeSpinBox)
+        settingsLayout.addWidget(QtGui.QLabel("Memory ceiling:", widget))
+        self._memoryCeilingSpinBox = QtGui.QSpinBox(widget)
+        self._memoryCeilingSpinBox.setRange(0, 1048576)
+        self._memoryCeilingSpinBox.setSuffix(" MB")
+        self._memoryCeilingSpinBox.setSpecialValueText("none")
+        self._memoryCeilingSpinBox.setToolTip("Page out least recently visible hidden regions while the model's estimated memory is above this")
+        self._memoryCeilingSpinBox.editingFinished.connect(self.settingsChanged)
+        settingsLayout.addWidget(self._memoryCeilingSpinBox)
+        settingsLayout.addStretch()
+        layout.addLayout(settingsLayout)
+        self._totalLabel = QtGui.QLabel(widget)
+        layout.addWidget(self._totalLabel)
+        self._regionTree = QtGui.QTreeWidget(widget)
+        self._regionTree.setHeaderLabels(["Region", "State", "Size", "Hidden"])
+        self._regionTree.setRootIsDecorated(False)
+        self._regionTree.itemActivated.connect(self._itemActivated)
+        layout.addWidget(self._regionTree)
+        self.setWidget(widget)
+
+    def getIdleTime(self):
+        return float(self._idleTimeSpinBox.value())
+
+    def setIdleTime(self, idleTime):
+        self._idleTimeSpinBox.setValue(int(idleTime))
+
+    def getMemoryCeiling(self):
+        '''
+        :return memory ceiling in bytes, or None if none.
+        '''
+        megabytes = self._memoryCeilingSpinBox.value()
+        return megabytes*1048576 if megabytes else None
+
+    def setMemoryCeiling(self, memoryCeiling):
+        self._memoryCeilingSpinBox.setValue(int(memoryCeiling/1048576) if memoryCeiling else 0)
+
+    def setSummaries(self, summaries, residentBytes):
+        '''
+        :param summaries: List from RegionPager.getSummaries().
+        '''
+        self._totalLabel.setText("Estimated resident: " + formatBytes(residentBytes))
+        self._regionTree.clear()
+        items = []
+        for path, paged, size, idleTime in summaries:
+            item = QtGui.QTreeWidgetItem([path, "paged out" if paged else "resident", formatBytes(size),
+                '{:.0f} s'.format(idleTime) if idleTime >= 1.0 else ""])
+            items.append(item)
+        self._regionTree.addTopLevelItems(items)
+
+    def _itemActivated(self, item, column):
+        self.regionActivated.emit(item.text(0))
@@ -0,0 +1,254 @@
+"""
+Time playback engine and rendered frame cache for ZincView.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import time as _time
+from collections import OrderedDict
+from PySide import QtCore
+
+
+class FrameCache(object):
+    '''
+    Least recently used cache of rendered frames keyed by time, bounded by
+    total bytes rather than number of entries.
+    '''
+
+    def __init__(self, maximumBytes=256*1024*1024):
+        self._frames = OrderedDict()
+        self._maximumBytes = maximumBytes
+        self._totalBytes = 0
+        self._hits = 0
+        self._misses = 0
+
+    def clear(self):
+        self._frames.clear()
+        self._totalBytes = 0
+
+    def discard(self, predicate):
+        '''
+        Remove frames whose key satisfies predicate(key).
+        '''
+        for key in [key for key in self._frames if predicate(key)]:
+            self._totalBytes -= self._frames.pop(key)[1]
+
+    def getMaximumBytes(self):
+        return self._maximumBytes
+
+    def setMaximumBytes(self, maximumBytes):
+        self._maximumBytes = maximumBytes
+        self._trim()
+
+    def getTotalBytes(self):
+        return self._totalBytes
+
+    def getStatistics(self):
+        '''
+        :return hits, misses
+        '''
+        return self._hits, self._misses
+
+    def get(self, key):
+        '''
+        :return cached frame for key, or None if not cached
+        '''
+        entry = self._frames.get(key)
+        if entry is None:
+            self._misses += 1
+            return None
+        self._hits += 1
+        self._frames.move_to_end(key)
+        return entry[0]
+
+    def put(self, key, frame, size):
+        '''
+        Add frame of given size in bytes, evicting least recently used
+        frames to stay within the byte limit. Frames larger than the limit
+        are not cached.
+        '''
+        entry = self._frames.pop(key, None)
+        if entry is not None:
+            self._totalBytes -= entry[1]
+        if size > self._maximumBytes:
+            return
+        self._frames[key] = (frame, size)
+        self._totalBytes += size
+        self._trim()
+
+    def _trim(self):
+        while self._totalBytes > self._maximumBytes:
+            _, entry = self._frames.popitem(last=False)
+            self._totalBytes -= entry[1]
+
+
+class TimePlayer(QtCore.QObject):
+    '''
+    Plays a sequence of times at a target frame rate, like cmgui's
+    "play speed N [skip|noskip]". With skip frames on, frames are dropped
+    to keep pace with the wall clock when rendering is slower than the
+    target rate; with it off every frame is shown however long it takes.
+    Emits frameRequested(time) for each frame to show; the receiver is
+    responsible for setting the timekeeper or displaying a cached frame.
+    '''
+
+    PLAY_MODE_ONCE = 0
+    PLAY_MODE_LOOP = 1
+    PLAY_MODE_BOUNCE = 2
+
+    frameRequested = QtCore.Signal(float)
+    stopped = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        QtCore.QObject.__init__(self, parent)
+        self._times = []
+        self._framesPerSecond = 25.0
+        self._playMode = self.PLAY_MODE_LOOP
+        self._skipFrames = True
+        self._direction = 1
+        self._index = 0
+        self._startIndex = 0
+        self._startClock = 0.0
+        self._stepsTaken = 0
+        self._framesShown = 0
+        self._framesSkipped = 0
+        self._timer = QtCore.QTimer(self)
+        self._timer.timeout.connect(self._timerEvent)
+
+    def setTimes(self, times):
+        '''
+        Set the ordered list of times to play. Stops playback if empty.
+        '''
+        self._times = list(times)
+        if not self._times:
+            self.stop()
+        elif self._index >= len(self._times):
+            self._index = len(self._times) - 1
+
+    def getTimes(self):
+        return self._times
+
+    def setUniformTimes(self, minimum, maximum, numberOfSteps):
+        '''
+        Set numberOfSteps + 1 evenly spaced times from minimum to maximum.
+        '''
+        if (numberOfSteps < 1) or (maximum <= minimum):
+            self.setTimes([minimum])
+            return
+        step = (maximum - minimum)/numberOfSteps
+        self.setTimes([minimum + i*step for i in range(numberOfSteps)] + [maximum])
+
+    def getFramesPerSecond(self):
+        return self._framesPerSecond
+
+    def setFramesPerSecond(self, framesPerSecond):
+        if framesPerSecond <= 0.0:
+            raise ValueError("Frames per second must be positive")
+        self._framesPerSecond = framesPerSecond
+        if self.isPlaying():
+            self._timer.setInterval(self._getInterval())
+            self._restartClock()
+
+    def getPlayMode(self):
+        return self._playMode
+
+    def setPlayMode(self, playMode):
+        self._playMode = playMode
+
+    def getSkipFrames(self):
+        return self._skipFrames
+
+    def setSkipFrames(self, skipFrames):
+        self._skipFrames = skipFrames
+        self._restartClock()
+
+    def getStatistics(self):
+        '''
+        :return frames shown, frames skipped since playback started
+        '''
+        return self._framesShown, self._framesSkipped
+
+    def isPlaying(self):
+        return self._timer.isActive()
+
+    def setCurrentTime(self, time):
+        '''
+        Set playback position to the index of the nearest time.
+        '''
+        if not self._times:
+            return
+        self._index = min(range(len(self._times)), key=lambda i: abs(self._times[i] - time))
+        self._restartClock()
+
+    def play(self, direction=1):
+        '''
+        Start playing forward (direction=1) or backward (direction=-1)
+        from the current position.
+        '''
+        if len(self._times) < 2:
+            return
+        self._direction = 1 if direction >= 0 else -1
+        last = len(self._times) - 1
+        if (self._playMode == self.PLAY_MODE_ONCE) and \
+                (self._index == (last if (self._direction > 0) else 0)):
+            self._index = 0 if (self._direction > 0) else last
+        self._framesShown = 0
+        self._framesSkipped = 0
+        self._restartClock()
+        self._timer.start(self._getInterval())
+
+    def stop(self):
+        if self._timer.isActive():
+            self._timer.stop()
+            self.stopped.emit()
+
+    def _getInterval(self):
+        return max(1, int(1000.0/self._framesPerSecond))
+
+    def _restartClock(self):
+        self._startIndex = self._index
+        self._startClock = _time.time()
+        self._stepsTaken = 0
+
+    def _advance(self, steps):
+        '''
+        Move index by steps frames in the current direction, applying the
+        play mode at the ends. Returns False if playback should stop.
+        '''
+        last = len(self._times) - 1
+        index = self._index
+        direction = self._direction
+        for _ in range(steps):
+            index += direction
+            if 0 <= index <= last:
+                continue
+            if self._playMode == self.PLAY_MODE_LOOP:
+                index = 0 if (direction > 0) else last
+            elif self._playMode == self.PLAY_MODE_BOUNCE:
+                direction = -direction
+                index += 2*direction
+                index = max(0, min(last, index))
+            else:
+                self._index = max(0, min(last, index))
+                return False
+        self._index = index
+        self._direction = direction
+        if self._playMode == self.PLAY_MODE_ONCE:
+            return index != (last if (direction > 0) else 0)
+        return True
+
+    def _timerEvent(self):
+        steps = 1
+        if self._skipFrames:
+            # steps needed so shown frame matches the wall clock
+            due = int((_time.time() - self._startClock)*self._framesPerSecond)
+            steps = max(1, due - self._stepsTaken)
+            self._framesSkipped += steps - 1
+        self._stepsTaken += steps
+        keepPlaying = self._advance(steps)
+        self._framesShown += 1
+        self.frameRequested.emit(self._times[self._index])
+        if not keepPlaying:
+            self.stop()
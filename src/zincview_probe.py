@@ -0,0 +1,148 @@
+"""
+Probe dock widget plotting field values at material points over time for ZincView.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import math
+from PySide import QtGui, QtCore
+
+_SERIES_COLOURS = [QtGui.QColor(31, 119, 180), QtGui.QColor(255, 127, 14), QtGui.QColor(44, 160, 44),
+                   QtGui.QColor(214, 39, 40), QtGui.QColor(148, 103, 189), QtGui.QColor(140, 86, 75),
+                   QtGui.QColor(227, 119, 194), QtGui.QColor(127, 127, 127)]
+
+
+class ProbePlotWidget(QtGui.QWidget):
+    '''
+    Minimal line plot of several series against time, with a marker at the
+    current time. Drawn with QPainter so no plotting package is needed.
+    '''
+
+    def __init__(self, parent=None):
+        QtGui.QWidget.__init__(self, parent)
+        self._times = []
+        self._series = []
+        self._currentTime = None
+        self.setMinimumSize(200, 120)
+        self.setSizePolicy(QtGui.QSizePolicy.Expanding, QtGui.QSizePolicy.Expanding)
+
+    def setSeries(self, times, series):
+        '''
+        :param times: List of times.
+        :param series: List of (label, values) with one value per time;
+        NaN values are left as gaps.
+        '''
+        self._times = list(times)
+        self._series = [(label, list(values)) for label, values in series]
+        self.update()
+
+    def setCurrentTime(self, time):
+        self._currentTime = time
+        self.update()
+
+    def _getValueRange(self):
+        values = [value for _, seriesValues in self._series for value in seriesValues if not math.isnan(value)]
+        if not values:
+            return 0.0, 1.0
+        minimum, maximum = min(values), max(values)
+        if maximum == minimum:
+            minimum -= 0.5
+            maximum += 0.5
+        return minimum, maximum
+
+    def paintEvent(self, event):
+        painter = QtGui.QPainter(self)
+        painter.setRenderHint(QtGui.QPainter.Antialiasing)
+        painter.fillRect(self.rect(), QtCore.Qt.white)
+        metrics = painter.fontMetrics()
+        left = metrics.width("-0.0000e+00") + 6
+        top = 4 + metrics.height()*max(1, len(self._series))
+        right = self.width() - 8
+        bottom = self.height() - metrics.height() - 6
+        if (right <= left) or (bottom <= top) or (len(self._times) < 1):
+            painter.end()
+            return
+        minimumTime, maximumTime = self._times[0], self._times[-1]
+        if maximumTime == minimumTime:
+            maximumTime = minimumTime + 1.0
+        minimumValue, maximumValue = self._getValueRange()
+
+        def toX(time):
+            return left + (time - minimumTime)*(right - left)/(maximumTime - minimumTime)
+
+        def toY(value):
+            return bottom - (value - minimumValue)*(bottom - top)/(maximumValue - minimumValue)
+
+        painter.setPen(QtCore.Qt.black)
+        painter.drawRect(QtCore.QRectF(left, top, right - left, bottom - top))
+        painter.drawText(QtCore.QPointF(2, top + metrics.ascent()), '{:.5g}'.format(maximumValue))
+        painter.drawText(QtCore.QPointF(2, bottom), '{:.5g}'.format(minimumValue))
+        painter.drawText(QtCore.QPointF(left, self.height() - 4), '{:.5g}'.format(minimumTime))
+        text = '{:.5g}'.format(maximumTime)
+        painter.drawText(QtCore.QPointF(right - metrics.width(text), self.height() - 4), text)
+        if self._currentTime is not None:
+            painter.setPen(QtGui.QPen(QtCore.Qt.gray, 1, QtCore.Qt.DashLine))
+            x = toX(self._currentTime)
+            painter.drawLine(QtCore.QPointF(x, top), QtCore.QPointF(x, bottom))
+        for s, (label, values) in enumerate(self._series):
+            colour = _SERIES_COLOURS[s % len(_SERIES_COLOURS)]
+            painter.setPen(QtGui.QPen(colour, 1.5))
+            path = QtGui.QPainterPath()
+            started = False
+            for time, value in zip(self._times, values):
+                if math.isnan(value):
+                    started = False
+                    continue
+                point = QtCore.QPointF(toX(time), toY(value))
+                if started:
+                    path.lineTo(point)
+                else:
+                    path.moveTo(point)
+                    started = True
+            painter.drawPath(path)
+            painter.drawText(QtCore.QPointF(left + 4, 2 + metrics.ascent() + s*metrics.height()), label)
+        painter.end()
+
+
+class ProbeDockWidget(QtGui.QDockWidget):
+    '''
+    Dock widget listing fields to probe and plotting probe values over time.
+    '''
+
+    fieldsEntered = QtCore.Signal(list)
+    clearClicked = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        QtGui.QDockWidget.__init__(self, "Probes", parent)
+        self.setObjectName("probe_dock_widget")
+        widget = QtGui.QWidget(self)
+        layout = QtGui.QVBoxLayout(widget)
+        layout.setContentsMargins(3, 3, 3, 3)
+        layout.setSpacing(3)
+        fieldsLayout = QtGui.QHBoxLayout()
+        fieldsLayout.addWidget(QtGui.QLabel("Fields:", widget))
+        self._fieldsLineEdit = QtGui.QLineEdit(widget)
+        self._fieldsLineEdit.setToolTip("Comma separated names of fields to plot at probes")
+        self._fieldsLineEdit.editingFinished.connect(self._fieldsEditingFinished)
+        fieldsLayout.addWidget(self._fieldsLineEdit)
+        self._clearButton = QtGui.QPushButton("Clear probes", widget)
+        self._clearButton.clicked.connect(self.clearClicked)
+        fieldsLayout.addWidget(self._clearButton)
+        layout.addLayout(fieldsLayout)
+        self._plotWidget = ProbePlotWidget(widget)
+        layout.addWidget(self._plotWidget)
+        self.setWidget(widget)
+
+    def getPlotWidget(self):
+        return self._plotWidget
+
+    def getFieldNames(self):
+        return [name.strip() for name in self._fieldsLineEdit.text().split(",") if name.strip()]
+
+    def setFieldNames(self, fieldNames):
+        self._fieldsLineEdit.setText(", ".join(fieldNames))
+
+    def _fieldsEditingFinished(self):
+        self.fieldsEntered.emit(self.getFieldNames())
@@ -0,0 +1,410 @@
+"""
+Lazily populated region tree chooser for ZincView.
+
+Replaces the region chooser combo box, which lists every region in the
+tree whenever the root region is set or the tree changes. Here the tree
+model only asks Zinc for the children of a region when it is expanded, and
+after a change only re-reads regions already expanded, so the cost of the
+widget depends on what the user has opened rather than on the size of the
+model. Searching by name uses an index of region names built a slice at a
+time in idle time and rebuilt after the tree changes.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import time as _time
+from PySide import QtGui, QtCore
+
+
+def _getChildRegions(region):
+    children = []
+    child = region.getFirstChild()
+    while child.isValid():
+        children.append(child)
+        child = child.getNextSibling()
+    return children
+
+
+def _getChildPath(parentPath, name):
+    return parentPath.rstrip("/") + "/" + name
+
+
+class _RegionTreeNode(object):
+    '''
+    Node of RegionTreeModel. Children are None until fetched.
+    '''
+
+    __slots__ = ("region", "name", "path", "parent", "row", "children")
+
+    def __init__(self, region, name, path, parent, row):
+        self.region = region
+        self.name = name
+        self.path = path
+        self.parent = parent
+        self.row = row
+        self.children = None
+
+
+class RegionTreeModel(QtCore.QAbstractItemModel):
+    '''
+    Item model of a Zinc region tree, fetching the children of each region
+    from Zinc only when the view asks for them, e.g. when expanded.
+    '''
+
+    def __init__(self, parent=None):
+        QtCore.QAbstractItemModel.__init__(self, parent)
+        self._rootNode = None
+
+    def setRootRegion(self, rootRegion):
+        self.beginResetModel()
+        self._rootNode = _RegionTreeNode(rootRegion, "/", "/", None, 0) if rootRegion else None
+        self.endResetModel()
+
+    def _getNode(self, index):
+        if index.isValid():
+            return index.internalPointer()
+        return None
+
+    def index(self, row, column, parent=QtCore.QModelIndex()):
+        if column != 0:
+            return QtCore.QModelIndex()
+        parentNode = self._getNode(parent)
+        if parentNode is None:
+            if (row == 0) and self._rootNode:
+                return self.createIndex(0, 0, self._rootNode)
+            return QtCore.QModelIndex()
+        if (parentNode.children is None) or not (0 <= row < len(parentNode.children)):
+            return QtCore.QModelIndex()
+        return self.createIndex(row, 0, parentNode.children[row])
+
+    def parent(self, index):
+        node = self._getNode(index)
+        if (node is None) or (node.parent is None):
+            return QtCore.QModelIndex()
+        return self.createIndex(node.parent.row, 0, node.parent)
+
+    def rowCount(self, parent=QtCore.QModelIndex()):
+        node = self._getNode(parent)
+        if node is None:
+            return 1 if self._rootNode else 0
+        return len(node.children) if node.children else 0
+
+    def columnCount(self, parent=QtCore.QModelIndex()):
+        return 1
+
+    def hasChildren(self, parent=QtCore.QModelIndex()):
+        node = self._getNode(parent)
+        if node is None:
+            return self._rootNode is not None
+        if node.children is not None:
+            return len(node.children) > 0
+        return node.region.getFirstChild().isValid()
+
+    def canFetchMore(self, parent):
+        node = self._getNode(parent)
+        return (node is not None) and (node.children is None) and node.region.getFirstChild().isValid()
+
+    def fetchMore(self, parent):
+        node = self._getNode(parent)
+        if (node is None) or (node.children is not None):
+            return
+        regions = _getChildRegions(node.region)
+        node.children = []
+        if not regions:
+            return
+        self.beginInsertRows(parent, 0, len(regions) - 1)
+        node.children = [_RegionTreeNode(region, region.getName(), _getChildPath(node.path, region.getName()), node, row)
+            for row, region in enumerate(regions)]
+        self.endInsertRows()
+
+    def data(self, index, role=QtCore.Qt.DisplayRole):
+        node = self._getNode(index)
+        if node is None:
+            return None
+        if role == QtCore.Qt.DisplayRole:
+            return node.name
+        if role == QtCore.Qt.ToolTipRole:
+            return node.path
+        return None
+
+    def getPath(self, index):
+        node = self._getNode(index)
+        return node.path if node else None
+
+    def getIndexForPath(self, path):
+        '''
+        Fetch regions on path from the root as needed.
+        :return model index of region at path, or invalid index if not found.
+        '''
+        if self._rootNode is None:
+            return QtCore.QModelIndex()
+        index = self.index(0, 0)
+        for name in [name for name in path.split("/") if name]:
+            self.fetchMore(index)
+            node = index.internalPointer()
+            child = None
+            for child in node.children:
+                if child.name == name:
+                    break
+            else:
+                return QtCore.QModelIndex()
+            index = self.createIndex(child.row, 0, child)
+        return index
+
+    def refresh(self):
+        '''
+        Re-read children of regions already fetched after the tree has
+        changed. Regions whose child names are unchanged keep their fetched
+        children; others are replaced and must be fetched again.
+        '''
+        if self._rootNode is None:
+            return
+        nodes = [self._rootNode]
+        while nodes:
+            node = nodes.pop()
+            if node.children is None:
+                continue
+            regions = _getChildRegions(node.region)
+            names = [region.getName() for region in regions]
+            parentIndex = self.createIndex(node.row, 0, node)
+            if names == [child.name for child in node.children]:
+                # update handles, e.g. for regions replaced by placeholders
+                for child, region in zip(node.children, regions):
+                    child.region = region
+                nodes.extend(node.children)
+                continue
+            if node.children:
+                self.beginRemoveRows(parentIndex, 0, len(node.children) - 1)
+                node.children = []
+                self.endRemoveRows()
+            node.children = None
+            self.fetchMore(parentIndex)
+
+
+class RegionNameIndex(QtCore.QObject):
+    '''
+    Index of the names of all regions in a tree for searching, built a
+    slice at a time by a timer so large trees do not block the interface.
+    '''
+
+    built = QtCore.Signal()
+
+    def __init__(self, parent=None):
+        QtCore.QObject.__init__(self, parent)
+        self._rootRegion = None
+        # list of (lower case name, path)
+        self._entries = []
+        self._pending = []
+        self._buildTimer = QtCore.QTimer(self)
+        self._buildTimer.setInterval(0)
+        self._buildTimer.timeout.connect(self._buildNext)
+
+    def setRootRegion(self, rootRegion):
+        self._rootRegion = rootRegion
+        self.invalidate()
+
+    def invalidate(self):
+        '''
+        Rebuild the index, e.g. after the region tree changes.
+        '''
+        self._entries = []
+        self._pending = [(self._rootRegion, "/")] if self._rootRegion else []
+        if self._pending:
+            self._buildTimer.start()
+
+    def isComplete(self):
+        return not self._pending
+
+    def _buildNext(self, timeBudget=0.01):
+        endTime = _time.perf_counter() + timeBudget
+        while self._pending:
+            region, path = self._pending.pop()
+            child = region.getFirstChild()
+            while child.isValid():
+                name = child.getName()
+                childPath = _getChildPath(path, name)
+                self._entries.append((name.lower(), childPath))
+                self._pending.append((child, childPath))
+                child = child.getNextSibling()
+            if _time.perf_counter() > endTime:
+                return
+        self._buildTimer.stop()
+        self._entries.sort(key=lambda entry: entry[1])
+        self.built.emit()
+
+    def search(self, text, maximumResults=200):
+        '''
+        :return sorted paths of up to maximumResults regions with names
+        containing text, ignoring case, from the part of the index built so far.
+        '''
+        text = text.lower()
+        results = []
+        for name, path in self._entries:
+            if text in name:
+                results.append(path)
+                if len(results) >= maximumResults:
+                    break
+        return sorted(results)
+
+
+class RegionTreeChooserWidget(QtGui.QWidget):
+    '''
+    Button showing the current region path which opens a popup with a lazily
+    populated region tree and a search box. Has the same interface as the
+    region chooser combo box it replaces: currentIndexChanged(int) is
+    emitted with 0 when the user chooses a region.
+    '''
+
+    currentIndexChanged = QtCore.Signal(int)
+
+    def __init__(self, parent=None):
+        QtGui.QWidget.__init__(self, parent)
+        self._rootRegion = None
+        self._path = "/"
+        self._regionnotifier = None
+        self._model = RegionTreeModel(self)
+        self._nameIndex = RegionNameIndex(self)
+        self._nameIndex.built.connect(self._searchTextChanged)
+        # coalesce region tree change notifications
+        self._refreshTimer = QtCore.QTimer(self)
+        self._refreshTimer.setSingleShot(True)
+        self._refreshTimer.setInterval(0)
+        self._refreshTimer.timeout.connect(self._refresh)
+        layout = QtGui.QHBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        self._button = QtGui.QPushButton(self)
+        self._button.setStyleSheet("text-align: left")
+        self._button.clicked.connect(self._showPopup)
+        layout.addWidget(self._button)
+        self._popup = QtGui.QFrame(self, QtCore.Qt.Popup)
+        self._popup.setFrameShape(QtGui.QFrame.StyledPanel)
+        popupLayout = QtGui.QVBoxLayout(self._popup)
+        popupLayout.setContentsMargins(3, 3, 3, 3)
+        popupLayout.setSpacing(3)
+        self._searchLineEdit = QtGui.QLineEdit(self._popup)
+        self._searchLineEdit.setPlaceholderText("Search region names")
+        self._searchLineEdit.textChanged.connect(self._searchTextChanged)
+        popupLayout.addWidget(self._searchLineEdit)
+        self._treeView = QtGui.QTreeView(self._popup)
+        self._treeView.setHeaderHidden(True)
+        self._treeView.setUniformRowHeights(True)
+        self._treeView.setModel(self._model)
+        self._treeView.activated.connect(self._treeItemChosen)
+        self._treeView.clicked.connect(self._treeItemChosen)
+        popupLayout.addWidget(self._treeView)
+        self._searchResultsList = QtGui.QListWidget(self._popup)
+        self._searchResultsList.setUniformItemSizes(True)
+        self._searchResultsList.itemActivated.connect(self._searchResultChosen)
+        self._searchResultsList.itemClicked.connect(self._searchResultChosen)
+        self._searchResultsList.hide()
+        popupLayout.addWidget(self._searchResultsList)
+        self._displayRegion()
+
+    def getRootRegion(self):
+        return self._rootRegion
+
+    def setRootRegion(self, rootRegion):
+        '''
+        Set the root region to choose regions from, and choose it.
+        '''
+        self._rootRegion = rootRegion
+        self._path = "/"
+        self._model.setRootRegion(rootRegion)
+        self._nameIndex.setRootRegion(rootRegion)
+        self._regionnotifier = rootRegion.createRegionnotifier()
+        self._regionnotifier.setCallback(self._regionTreeChange)
+        self._displayRegion()
+
+    def getRegion(self):
+        '''
+        :return current region, or None if it no longer exists.
+        '''
+        if self._rootRegion is None:
+            return None
+        region = self._rootRegion.findSubregionAtPath(self._path) if self._path.strip("/") else self._rootRegion
+        return region if region.isValid() else None
+
+    def setRegion(self, region):
+        '''
+        Set the current region without emitting currentIndexChanged.
+        '''
+        if (self._rootRegion is None) or not (region and region.isValid()):
+            return
+        if not ((region == self._rootRegion) or self._rootRegion.containsSubregion(region)):
+            return
+        path = region.getPath()
+        self._path = "/" + path.strip("/")
+        self._displayRegion()
+
+    def _displayRegion(self):
+        self._button.setText(self._path)
+        self._button.setToolTip(self._path)
+
+    def _regionTreeChange(self, event):
+        self._refreshTimer.start()
+
+    def _refresh(self):
+        '''
+        Update the tree after regions change. If the current region was
+        removed, choose the root region and emit currentIndexChanged.
+        '''
+        self._model.refresh()
+        self._nameIndex.invalidate()
+        if (self._rootRegion is not None) and (self.getRegion() is None):
+            self._path = "/"
+            self._displayRegion()
+            self.currentIndexChanged.emit(0)
+
+    def _showPopup(self):
+        self._searchLineEdit.clear()
+        self._treeView.expand(self._model.index(0, 0))
+        index = self._model.getIndexForPath(self._path)
+        if index.isValid():
+            parent = index.parent()
+            while parent.isValid():
+                self._treeView.expand(parent)
+                parent = parent.parent()
+            self._treeView.setCurrentIndex(index)
+            self._treeView.scrollTo(index)
+        width = max(self.width(), 250)
+        self._popup.resize(width, 300)
+        self._popup.move(self.mapToGlobal(QtCore.QPoint(0, self.height())))
+        self._popup.show()
+        self._searchLineEdit.setFocus()
+
+    def _choosePath(self, path):
+        self._popup.hide()
+        if path is None:
+            return
+        oldPath = self._path
+        self._path = path
+        if self.getRegion() is None:
+            # removed since the name index was built
+            self._path = oldPath
+            return
+        self._displayRegion()
+        self.currentIndexChanged.emit(0)
+
+    def _treeItemChosen(self, index):
+        self._choosePath(self._model.getPath(index))
+
+    def _searchResultChosen(self, item):
+        self._choosePath(item.text())
+
+    def _searchTextChanged(self, text=None):
+        text = self._searchLineEdit.text()
+        if not text:
+            self._searchResultsList.hide()
+            self._treeView.show()
+            return
+        self._treeView.hide()
+        self._searchResultsList.clear()
+        results = self._nameIndex.search(text)
+        self._searchResultsList.addItems(results)
+        if not self._nameIndex.isComplete():
+            item = QtGui.QListWidgetItem("Indexing region names...")
+            item.setFlags(QtCore.Qt.NoItemFlags)
+            self._searchResultsList.addItem(item)
+        self._searchResultsList.show()
@@ -0,0 +1,157 @@
+"""
+Compact binary session snapshot container for ZincView.
+
+A snapshot is a sequence of named, individually zlib-compressed sections
+followed by a JSON table of contents, so a reader can memory map the file
+and decompress only the sections it needs, when it needs them.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import json
+import mmap
+import os
+import struct
+import zlib
+
+SESSION_MAGIC = b"ZVSESSN1"
+SESSION_VERSION = 1
+# keys of the "state" section of a whole session
+SESSION_STATE_KEYS = ("times", "materials", "spectra", "tessellations", "timekeeper", "sceneviewer", "view", "regions")
+# footer is table of contents offset and length, then magic
+_FOOTER = struct.Struct("<QQ8s")
+
+
+class SessionWriter(object):
+    '''
+    Writes sections to a snapshot file. Written to a temporary file and
+    renamed on close so an existing snapshot is never left half written.
+    '''
+
+    def __init__(self, fileName, compressionLevel=6):
+        self._fileName = fileName
+        self._temporaryFileName = fileName + ".tmp"
+        self._file = open(self._temporaryFileName, "wb")
+        self._file.write(SESSION_MAGIC)
+        self._compressionLevel = compressionLevel
+        self._sections = {}
+        self._sectionOrder = []
+
+    def addSection(self, name, data, compress=True):
+        '''
+        :param data: bytes or str; str is stored as UTF-8.
+        '''
+        if name in self._sections:
+            raise ValueError("Duplicate session section " + name)
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        stored = zlib.compress(data, self._compressionLevel) if compress else data
+        offset = self._file.tell()
+        self._file.write(stored)
+        self._sections[name] = [offset, len(stored), len(data), compress]
+        self._sectionOrder.append(name)
+
+    def addJson(self, name, obj):
+        self.addSection(name, json.dumps(obj))
+
+    def close(self):
+        contents = json.dumps({"version": SESSION_VERSION, "order": self._sectionOrder, "sections": self._sections}).encode("utf-8")
+        offset = self._file.tell()
+        self._file.write(contents)
+        self._file.write(_FOOTER.pack(offset, len(contents), SESSION_MAGIC))
+        self._file.close()
+        os.replace(self._temporaryFileName, self._fileName)
+
+    def abort(self):
+        '''
+        Discard snapshot being written.
+        '''
+        self._file.close()
+        os.remove(self._temporaryFileName)
+
+
+class SessionReader(object):
+    '''
+    Reads sections of a snapshot file on demand from a memory map.
+    '''
+
+    def __init__(self, fileName):
+        self._file = open(fileName, "rb")
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise ValueError("Empty session file " + fileName)
+        size = len(self._map)
+        if (size < len(SESSION_MAGIC) + _FOOTER.size) or (self._map[:len(SESSION_MAGIC)] != SESSION_MAGIC):
+            self.close()
+            raise ValueError("Not a ZincView session file: " + fileName)
+        offset, length, magic = _FOOTER.unpack(self._map[size - _FOOTER.size:])
+        if magic != SESSION_MAGIC:
+            self.close()
+            raise ValueError("Truncated ZincView session file: " + fileName)
+        contents = json.loads(self._map[offset:offset + length].decode("utf-8"))
+        if contents["version"] > SESSION_VERSION:
+            self.close()
+            raise ValueError("Session file " + fileName + " is from a newer version of ZincView")
+        self._sections = contents["sections"]
+        self._sectionOrder = contents["order"]
+
+    def getSectionNames(self):
+        '''
+        :return section names in the order written.
+        '''
+        return list(self._sectionOrder)
+
+    def hasSection(self, name):
+        return name in self._sections
+
+    def getSection(self, name):
+        '''
+        :return bytes of section, decompressed, or None if not present.
+        '''
+        section = self._sections.get(name)
+        if section is None:
+            return None
+        offset, storedLength, _, compressed = section
+        data = self._map[offset:offset + storedLength]
+        return zlib.decompress(data) if compressed else data
+
+    def getJson(self, name):
+        data = self.getSection(name)
+        return json.loads(data.decode("utf-8")) if (data is not None) else None
+
+    def getState(self):
+        '''
+        Get and check the "state" section of a whole session, so a session
+        can be rejected before the current model is replaced.
+        :return state dict
+        :raise ValueError if state is missing or incomplete, or a section
+        needed for its times is missing.
+        '''
+        try:
+            state = self.getJson("state")
+        except ValueError:
+            raise ValueError("Invalid session state")
+        if not isinstance(state, dict):
+            raise ValueError("Session has no state")
+        missingKeys = [key for key in SESSION_STATE_KEYS if key not in state]
+        if missingKeys:
+            raise ValueError("Session state is missing " + ", ".join(missingKeys))
+        timekeeper = state["timekeeper"]
+        if not (isinstance(timekeeper, dict) and all((key in timekeeper) for key in ("minimum", "maximum", "time"))):
+            raise ValueError("Session state has incomplete timekeeper")
+        if (state["sceneviewer"] is None) and not (isinstance(state["view"], dict) and
+                all((key in state["view"]) for key in ("eye", "lookat", "up", "viewAngle", "nearClippingPlane", "farClippingPlane"))):
+            raise ValueError("Session state has incomplete view")
+        sectionNames = ["region"] + ["nodes" + str(i) for i in range(1, len(state["times"]))]
+        missingSections = [name for name in sectionNames if not self.hasSection(name)]
+        if missingSections:
+            raise ValueError("Session is missing sections " + ", ".join(missingSections))
+        return state
+
+    def close(self):
+        self._map.close()
+        self._file.close()
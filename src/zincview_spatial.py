@@ -0,0 +1,448 @@
+"""
+Spatial index of points for fast picking and hover queries in ZincView.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import heapq
+import numpy
+
+
+class _MedianSplitTree(object):
+    '''
+    Binary tree over items with a bounding box for each tree node, built by
+    splitting items at the median of their centres along the longest axis.
+    Items are stored contiguously in leaf order so tree node boxes can be
+    refitted with a few vectorised passes.
+    '''
+
+    def _buildTree(self, centres, leafSize):
+        '''
+        Build tree over items with centres array(n, 3); NaN items are omitted.
+        '''
+        valid = numpy.flatnonzero(~numpy.isnan(centres).any(axis=1))
+        order = []
+        starts = []
+        ends = []
+        lefts = []
+        rights = []
+        depths = []
+        # iterative median partition; children are always created after parents
+        stack = [(valid, -1, False, 0)]
+        while stack:
+            indexes, parent, isRight, depth = stack.pop()
+            treeNode = len(starts)
+            start = len(order)
+            starts.append(start)
+            lefts.append(-1)
+            rights.append(-1)
+            depths.append(depth)
+            ends.append(start)
+            if parent >= 0:
+                if isRight:
+                    rights[parent] = treeNode
+                else:
+                    lefts[parent] = treeNode
+            if indexes.shape[0] <= leafSize:
+                order.extend(indexes.tolist())
+                ends[treeNode] = len(order)
+                continue
+            coordinates = centres[indexes]
+            axis = int(numpy.argmax(coordinates.max(axis=0) - coordinates.min(axis=0)))
+            half = indexes.shape[0]//2
+            partition = numpy.argpartition(coordinates[:, axis], half)
+            # right pushed first so left subtree is laid out first
+            stack.append((indexes[partition[half:]], treeNode, True, depth + 1))
+            stack.append((indexes[partition[:half]], treeNode, False, depth + 1))
+        self._order = numpy.array(order, dtype=numpy.int64)
+        self._starts = numpy.array(starts, dtype=numpy.int64)
+        self._ends = numpy.array(ends, dtype=numpy.int64)
+        self._lefts = numpy.array(lefts, dtype=numpy.int64)
+        self._rights = numpy.array(rights, dtype=numpy.int64)
+        # internal node ranges are the union of their children's
+        for treeNode in range(len(starts) - 1, -1, -1):
+            if self._lefts[treeNode] >= 0:
+                self._ends[treeNode] = self._ends[self._rights[treeNode]]
+        depths = numpy.array(depths, dtype=numpy.int64)
+        self._internalByDepth = [numpy.flatnonzero((depths == depth) & (self._lefts >= 0))
+            for depth in range(int(depths.max()) + 1)] if depths.size else []
+        self._leaves = numpy.flatnonzero(self._lefts < 0)
+        self._leaves = self._leaves[numpy.argsort(self._starts[self._leaves], kind='stable')]
+
+    def _fitBoxes(self, itemMinimums, itemMaximums):
+        '''
+        Compute leaf boxes from item boxes then internal boxes up the tree.
+        '''
+        numberOfTreeNodes = self._starts.shape[0]
+        self._minimums = numpy.full((numberOfTreeNodes, 3), numpy.inf)
+        self._maximums = numpy.full((numberOfTreeNodes, 3), -numpy.inf)
+        leaves = self._leaves[self._ends[self._leaves] > self._starts[self._leaves]]
+        if leaves.size:
+            self._minimums[leaves] = numpy.minimum.reduceat(itemMinimums[self._order], self._starts[leaves], axis=0)
+            self._maximums[leaves] = numpy.maximum.reduceat(itemMaximums[self._order], self._starts[leaves], axis=0)
+        for treeNodes in reversed(self._internalByDepth):
+            lefts = self._lefts[treeNodes]
+            rights = self._rights[treeNodes]
+            self._minimums[treeNodes] = numpy.minimum(self._minimums[lefts], self._minimums[rights])
+            self._maximums[treeNodes] = numpy.maximum(self._maximums[lefts], self._maximums[rights])
+
+    def _getTotalExtent(self):
+        extents = self._maximums - self._minimums
+        return float(numpy.sum(extents[numpy.isfinite(extents)]))
+
+    def getBoundingBox(self):
+        '''
+        :return minimum, maximum arrays(3) of all items, or None, None if none.
+        '''
+        if (self._starts.shape[0] == 0) or (not numpy.isfinite(self._minimums[0, 0])):
+            return None, None
+        return self._minimums[0], self._maximums[0]
+
+
+class PointTree(_MedianSplitTree):
+    '''
+    Bounding volume tree over 3-D points built by median splits like a k-d
+    tree. When the points move the boxes are refitted instead of
+    rebuilding, which keeps queries exact; the tree is rebuilt only once
+    refitted boxes have grown enough to slow queries down.
+    '''
+
+    def __init__(self, points, leafSize=32, rebuildGrowth=2.0):
+        '''
+        :param points: float array(n, 3); NaN points are never found.
+        :param leafSize: Maximum points in a leaf.
+        :param rebuildGrowth: Rebuild when total box extent grows by this factor.
+        '''
+        self._leafSize = leafSize
+        self._rebuildGrowth = rebuildGrowth
+        self._rebuildCount = 0
+        self._refitCount = 0
+        self._build(points)
+
+    def getNumberOfPoints(self):
+        return self._points.shape[0]
+
+    def getPoint(self, index):
+        '''
+        :return coordinates of point at index as array(3).
+        '''
+        return self._points[index]
+
+    def getStatistics(self):
+        '''
+        :return number of rebuilds, number of refits
+        '''
+        return self._rebuildCount, self._refitCount
+
+    def _build(self, points):
+        points = numpy.array(points, dtype=numpy.float64).reshape(-1, 3)
+        self._points = points
+        self._buildTree(points, self._leafSize)
+        self._fitBoxes(points, points)
+        self._buildExtent = self._getTotalExtent()
+        self._rebuildCount += 1
+
+    def setPoints(self, points):
+        '''
+        Update point coordinates. If the number of points and the points
+        which are undefined (NaN) are unchanged, boxes are refitted;
+        otherwise, or if refitted boxes have grown too much, the tree is
+        rebuilt.
+        '''
+        points = numpy.array(points, dtype=numpy.float64).reshape(-1, 3)
+        if (points.shape != self._points.shape) or \
+                numpy.any(numpy.isnan(points).any(axis=1) != numpy.isnan(self._points).any(axis=1)):
+            self._build(points)
+            return
+        self._points = points
+        self._fitBoxes(points, points)
+        self._refitCount += 1
+        if self._getTotalExtent() > self._rebuildGrowth*max(self._buildExtent, 1.0E-300):
+            self._build(points)
+
+    def findNearest(self, point, maximumDistance=numpy.inf):
+        '''
+        :return index of point nearest to point within maximumDistance, distance;
+        or -1, inf if none.
+        '''
+        point = numpy.asarray(point, dtype=numpy.float64)
+        bestIndex = -1
+        bestDistanceSquared = maximumDistance*maximumDistance
+        if self._starts.shape[0] == 0:
+            return -1, numpy.inf
+        heap = [(0.0, 0)]
+        while heap:
+            boxDistanceSquared, treeNode = heapq.heappop(heap)
+            if boxDistanceSquared > bestDistanceSquared:
+                break
+            if self._lefts[treeNode] < 0:
+                indexes = self._order[self._starts[treeNode]:self._ends[treeNode]]
+                if indexes.size == 0:
+                    continue
+                distancesSquared = numpy.sum((self._points[indexes] - point)**2, axis=1)
+                i = int(numpy.argmin(distancesSquared))
+                if distancesSquared[i] <= bestDistanceSquared:
+                    bestDistanceSquared = float(distancesSquared[i])
+                    bestIndex = int(indexes[i])
+                continue
+            for child in (self._lefts[treeNode], self._rights[treeNode]):
+                delta = numpy.maximum(numpy.maximum(self._minimums[child] - point, point - self._maximums[child]), 0.0)
+                heapq.heappush(heap, (float(numpy.dot(delta, delta)), int(child)))
+        if bestIndex < 0:
+            return -1, numpy.inf
+        return bestIndex, bestDistanceSquared**0.5
+
+    def findNearestToRay(self, point, direction, maximumDistance=numpy.inf):
+        '''
+        Find the point nearest the start of a ray, e.g. a pick ray from the
+        eye, among points within maximumDistance of it. Points behind the
+        start of the ray are never found.
+        :return index of point, distance from ray; or -1, inf if none.
+        '''
+        point = numpy.asarray(point, dtype=numpy.float64)
+        direction = numpy.asarray(direction, dtype=numpy.float64)
+        direction = direction/numpy.linalg.norm(direction)
+        bestIndex = -1
+        bestDistance = numpy.inf
+        bestParameter = numpy.inf
+        if self._starts.shape[0] == 0:
+            return -1, numpy.inf
+
+        def getBounds(treeNode):
+            # lower bounds on distance from ray and ray parameter from bounding sphere of box,
+            # and upper bound on ray parameter
+            centre = 0.5*(self._minimums[treeNode] + self._maximums[treeNode])
+            radius = 0.5*numpy.linalg.norm(self._maximums[treeNode] - self._minimums[treeNode])
+            offset = centre - point
+            parameter = float(numpy.dot(offset, direction))
+            distance = float(numpy.linalg.norm(offset - parameter*direction)) - radius
+            return distance, parameter - radius, parameter + radius
+
+        heap = [(0.0, 0)]
+        while heap:
+            minimumParameter, treeNode = heapq.heappop(heap)
+            if minimumParameter > bestParameter:
+                break
+            if self._lefts[treeNode] < 0:
+                indexes = self._order[self._starts[treeNode]:self._ends[treeNode]]
+                if indexes.size == 0:
+                    continue
+                offsets = self._points[indexes] - point
+                parameters = offsets.dot(direction)
+                distances = numpy.linalg.norm(offsets - numpy.outer(parameters, direction), axis=1)
+                candidates = numpy.flatnonzero((parameters >= 0.0) & (distances <= maximumDistance))
+                if candidates.size:
+                    i = int(candidates[numpy.argmin(parameters[candidates])])
+                    if parameters[i] < bestParameter:
+                        bestParameter = float(parameters[i])
+                        bestDistance = float(distances[i])
+                        bestIndex = int(indexes[i])
+                continue
+            for child in (self._lefts[treeNode], self._rights[treeNode]):
+                if numpy.isfinite(self._minimums[child, 0]):
+                    distance, lowParameter, highParameter = getBounds(child)
+                    if (distance <= maximumDistance) and (highParameter >= 0.0):
+                        heapq.heappush(heap, (max(lowParameter, 0.0), int(child)))
+        if bestIndex < 0:
+            return -1, numpy.inf
+        return bestIndex, bestDistance
+
+    def findInBox(self, minimum, maximum):
+        '''
+        :return int64 array of indexes of points inside axis-aligned box.
+        '''
+        minimum = numpy.asarray(minimum, dtype=numpy.float64)
+        maximum = numpy.asarray(maximum, dtype=numpy.float64)
+        found = []
+        if self._starts.shape[0] == 0:
+            return numpy.empty(0, dtype=numpy.int64)
+        stack = [0]
+        while stack:
+            treeNode = stack.pop()
+            if numpy.any(self._minimums[treeNode] > maximum) or numpy.any(self._maximums[treeNode] < minimum):
+                continue
+            indexes = self._order[self._starts[treeNode]:self._ends[treeNode]]
+            if numpy.all(self._minimums[treeNode] >= minimum) and numpy.all(self._maximums[treeNode] <= maximum):
+                found.append(indexes)
+            elif self._lefts[treeNode] < 0:
+                coordinates = self._points[indexes]
+                found.append(indexes[numpy.all((coordinates >= minimum) & (coordinates <= maximum), axis=1)])
+            else:
+                stack.append(self._lefts[treeNode])
+                stack.append(self._rights[treeNode])
+        if not found:
+            return numpy.empty(0, dtype=numpy.int64)
+        return numpy.sort(numpy.concatenate(found))
+
+    def findInProjectedPolygon(self, matrix, polygon):
+        '''
+        Find points in front of the eye whose projection lies inside a
+        polygon, e.g. a lasso or rubber band drawn in window coordinates.
+        :param matrix: 4x4 homogeneous projection matrix applied to column vectors.
+        :param polygon: array(vertices, 2) of projected x, y.
+        :return int64 array of indexes of points inside polygon.
+        '''
+        polygon = numpy.asarray(polygon, dtype=numpy.float64)
+        x, y = getProjectedPoints(self._points, matrix)
+        inside = getPointsInPolygon(x, y, polygon)
+        return numpy.flatnonzero(inside)
+
+
+class BoxTree(_MedianSplitTree):
+    '''
+    Bounding volume hierarchy over axis-aligned boxes, e.g. element bounds,
+    queried for many points at once by traversing all points down the tree
+    together level by level.
+    '''
+
+    def __init__(self, minimums, maximums, leafSize=4):
+        '''
+        :param minimums, maximums: float arrays(n, 3) of box bounds; boxes
+        with NaN bounds are never found.
+        '''
+        self._boxMinimums = numpy.array(minimums, dtype=numpy.float64).reshape(-1, 3)
+        self._boxMaximums = numpy.array(maximums, dtype=numpy.float64).reshape(-1, 3)
+        self._buildTree(0.5*(self._boxMinimums + self._boxMaximums), leafSize)
+        self._fitBoxes(self._boxMinimums, self._boxMaximums)
+
+    def getNumberOfBoxes(self):
+        return self._boxMinimums.shape[0]
+
+    def findContaining(self, points):
+        '''
+        Find all boxes containing each point.
+        :param points: float array(m, 3).
+        :return pointIndexes, boxIndexes int64 arrays of each containing
+        pair, ordered by point then by distance of point from box centre.
+        '''
+        points = numpy.asarray(points, dtype=numpy.float64).reshape(-1, 3)
+        foundPoints = []
+        foundBoxes = []
+        if self._starts.shape[0] > 0:
+            pointIndexes = numpy.arange(points.shape[0])
+            treeNodes = numpy.zeros(points.shape[0], dtype=numpy.int64)
+            while pointIndexes.size:
+                coordinates = points[pointIndexes]
+                inside = numpy.all((coordinates >= self._minimums[treeNodes]) & (coordinates <= self._maximums[treeNodes]), axis=1)
+                pointIndexes = pointIndexes[inside]
+                treeNodes = treeNodes[inside]
+                isLeaf = self._lefts[treeNodes] < 0
+                # expand leaves into their boxes
+                leafPoints = pointIndexes[isLeaf]
+                leafNodes = treeNodes[isLeaf]
+                counts = self._ends[leafNodes] - self._starts[leafNodes]
+                total = int(counts.sum())
+                if total:
+                    offsets = numpy.repeat(self._starts[leafNodes] - (numpy.cumsum(counts) - counts), counts) + numpy.arange(total)
+                    boxes = self._order[offsets]
+                    boxPoints = numpy.repeat(leafPoints, counts)
+                    coordinates = points[boxPoints]
+                    inside = numpy.all((coordinates >= self._boxMinimums[boxes]) & (coordinates <= self._boxMaximums[boxes]), axis=1)
+                    foundPoints.append(boxPoints[inside])
+                    foundBoxes.append(boxes[inside])
+                internalPoints = pointIndexes[~isLeaf]
+                internalNodes = treeNodes[~isLeaf]
+                pointIndexes = numpy.concatenate([internalPoints, internalPoints])
+                treeNodes = numpy.concatenate([self._lefts[internalNodes], self._rights[internalNodes]])
+        if not foundPoints:
+            return numpy.empty(0, dtype=numpy.int64), numpy.empty(0, dtype=numpy.int64)
+        pointIndexes = numpy.concatenate(foundPoints)
+        boxIndexes = numpy.concatenate(foundBoxes)
+        centres = 0.5*(self._boxMinimums[boxIndexes] + self._boxMaximums[boxIndexes])
+        distances = numpy.sum((points[pointIndexes] - centres)**2, axis=1)
+        order = numpy.lexsort((distances, pointIndexes))
+        return pointIndexes[order], boxIndexes[order]
+
+    def findInProjectedFrustum(self, matrix, width, height, margin=0.0):
+        '''
+        Find boxes which may be visible in a window, i.e. intersecting the
+        view frustum. Boxes are omitted only if wholly outside one of its
+        side planes or behind the eye, so some boxes near frustum corners
+        are found though not visible. Tree nodes wholly inside the frustum
+        are taken without testing their boxes.
+        :param matrix: 4x4 homogeneous matrix projecting to window pixels,
+        applied to column vectors, with positive w in front of the eye.
+        :param width, height: Window size in pixels.
+        :param margin: Pixels added around the window.
+        :return int64 array of indexes of boxes, in increasing order.
+        '''
+        matrix = numpy.asarray(matrix, dtype=numpy.float64).reshape(4, 4)
+        # planes on homogeneous window coordinates x, y, z, w; inside where all >= 0
+        planes = numpy.array([
+            [1.0, 0.0, 0.0, margin],
+            [-1.0, 0.0, 0.0, width + margin],
+            [0.0, 1.0, 0.0, margin],
+            [0.0, -1.0, 0.0, height + margin],
+            [0.0, 0.0, 0.0, 1.0]]).dot(matrix)
+        normals = planes[:, :3]
+        offsets = planes[:, 3]
+
+        def getPlaneBounds(minimums, maximums):
+            # lowest and highest plane values over box corners, array(n, planes)
+            with numpy.errstate(invalid='ignore'):
+                low = numpy.where(normals > 0.0, normals*minimums[:, numpy.newaxis, :], normals*maximums[:, numpy.newaxis, :])
+                high = numpy.where(normals > 0.0, normals*maximums[:, numpy.newaxis, :], normals*minimums[:, numpy.newaxis, :])
+            # zero normal components contribute nothing, even for empty tree node boxes
+            low = numpy.where(normals == 0.0, 0.0, low)
+            high = numpy.where(normals == 0.0, 0.0, high)
+            return low.sum(axis=2) + offsets, high.sum(axis=2) + offsets
+
+        found = []
+        treeNodes = numpy.zeros(1 if self._starts.shape[0] else 0, dtype=numpy.int64)
+        while treeNodes.size:
+            low, high = getPlaneBounds(self._minimums[treeNodes], self._maximums[treeNodes])
+            keep = ~numpy.any(high < 0.0, axis=1)
+            treeNodes = treeNodes[keep]
+            inside = numpy.all(low[keep] >= 0.0, axis=1)
+            found.append(self._getItemsInTreeNodes(treeNodes[inside]))
+            partial = treeNodes[~inside]
+            isLeaf = self._lefts[partial] < 0
+            boxes = self._getItemsInTreeNodes(partial[isLeaf])
+            if boxes.size:
+                low, high = getPlaneBounds(self._boxMinimums[boxes], self._boxMaximums[boxes])
+                found.append(boxes[~numpy.any(high < 0.0, axis=1)])
+            internalNodes = partial[~isLeaf]
+            treeNodes = numpy.concatenate([self._lefts[internalNodes], self._rights[internalNodes]])
+        if not found:
+            return numpy.empty(0, dtype=numpy.int64)
+        return numpy.sort(numpy.concatenate(found))
+
+    def _getItemsInTreeNodes(self, treeNodes):
+        '''
+        :return int64 array of indexes of all items under treeNodes.
+        '''
+        counts = self._ends[treeNodes] - self._starts[treeNodes]
+        total = int(counts.sum())
+        offsets = numpy.repeat(self._starts[treeNodes] - (numpy.cumsum(counts) - counts), counts) + numpy.arange(total)
+        return self._order[offsets]
+
+
+def getProjectedPoints(points, matrix):
+    '''
+    :return x, y arrays of points projected with 4x4 homogeneous matrix,
+    NaN for points with w <= 0, i.e. behind the eye, whose projections
+    would otherwise be mirrored into the window.
+    '''
+    matrix = numpy.asarray(matrix, dtype=numpy.float64).reshape(4, 4)
+    homogeneous = points.dot(matrix[:, :3].T) + matrix[:, 3]
+    w = numpy.where(homogeneous[:, 3] > 0.0, homogeneous[:, 3], numpy.nan)
+    return homogeneous[:, 0]/w, homogeneous[:, 1]/w
+
+def getPointsInPolygon(x, y, polygon):
+    '''
+    Even-odd rule point in polygon test, vectorised over points.
+    :return bool array, False for NaN points.
+    '''
+    inside = numpy.zeros(x.shape, dtype=bool)
+    count = polygon.shape[0]
+    for i in range(count):
+        x1, y1 = polygon[i]
+        x2, y2 = polygon[(i + 1) % count]
+        if y1 == y2:
+            continue
+        crosses = (y1 > y) != (y2 > y)
+        xCross = x1 + (y - y1)*((x2 - x1)/(y2 - y1))
+        inside ^= crosses & (x < xCross)
+    return inside
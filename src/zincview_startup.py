@@ -0,0 +1,142 @@
+"""
+Startup helpers for ZincView: command line arguments, phase timing and
+reading model files in the background while the window is created.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCRIPT_SUFFIX = ".zincview.py"
+
+
+class StartupProfiler(object):
+    '''
+    Records elapsed time for successive named startup phases.
+    Does nothing unless enabled, so calls can be left in place.
+    '''
+
+    def __init__(self, startTime=None, enabled=False):
+        '''
+        :param startTime: time.perf_counter() value at process start, if known,
+        so module imports are included in the first phase.
+        '''
+        self._enabled = enabled
+        self._lastTime = startTime if (startTime is not None) else time.perf_counter()
+        self._startTime = self._lastTime
+        self._phases = []
+
+    def isEnabled(self):
+        return self._enabled
+
+    def setEnabled(self, enabled):
+        self._enabled = enabled
+
+    def mark(self, phaseName):
+        '''
+        End current phase, naming it phaseName, and start the next.
+        '''
+        now = time.perf_counter()
+        if self._enabled:
+            self._phases.append((phaseName, now - self._lastTime))
+        self._lastTime = now
+
+    def getPhases(self):
+        '''
+        :return list of (phaseName, seconds)
+        '''
+        return list(self._phases)
+
+    def report(self):
+        '''
+        Print phase-by-phase timing breakdown, once.
+        '''
+        if not (self._enabled and self._phases):
+            return
+        width = max([len("total")] + [len(phaseName) for phaseName, _ in self._phases])
+        print("ZincView startup:")
+        for phaseName, seconds in self._phases:
+            print("  " + phaseName.ljust(width) + '  {:8.1f} ms'.format(seconds*1000.0))
+        print("  " + "total".ljust(width) + '  {:8.1f} ms'.format((self._lastTime - self._startTime)*1000.0))
+        self._phases = []
+
+
+def isScriptFileName(fileName):
+    return fileName.endswith(SCRIPT_SUFFIX)
+
+
+def _readModelFile(fileName):
+    '''
+    Read model file contents; scripts are also compiled.
+    :return bytes, or code object for scripts
+    '''
+    with open(fileName, "rb") as f:
+        data = f.read()
+    if isScriptFileName(fileName):
+        return compile(data, fileName, "exec")
+    return data
+
+
+class ModelPrefetcher(object):
+    '''
+    Reads and compiles model files in background threads so disk access and
+    script compilation overlap with window creation. Only Python objects
+    are produced here: all Zinc calls stay on the main thread.
+    '''
+
+    def __init__(self, fileNames, maximumWorkers=4):
+        self._fileNames = [os.path.abspath(fileName) for fileName in fileNames]
+        self._executor = None
+        self._futures = []
+        if self._fileNames:
+            self._executor = ThreadPoolExecutor(max_workers=min(maximumWorkers, len(self._fileNames)))
+            self._futures = [self._executor.submit(_readModelFile, fileName) for fileName in self._fileNames]
+
+    def getFileNames(self):
+        return list(self._fileNames)
+
+    def getResults(self):
+        '''
+        Wait for all files to be read.
+        :return list of (fileName, contents, error) in argument order, with
+        contents bytes or code object, or None if error is set.
+        '''
+        results = []
+        for fileName, future in zip(self._fileNames, self._futures):
+            try:
+                results.append((fileName, future.result(), None))
+            except (IOError, OSError, SyntaxError, ValueError) as e:
+                results.append((fileName, None, e))
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+        return results
+
+
+def parseArguments(argv):
+    '''
+    Parse ZincView arguments, leaving unrecognised ones for Qt.
+    :param argv: Full argument list including program name.
+    :return (options, remaining argv)
+    '''
+    parser = argparse.ArgumentParser(prog=os.path.basename(argv[0]) if argv else "zincview",
+        description="ZincView visualisation application")
+    parser.add_argument("models", nargs="*", metavar="model",
+        help="model files (*.ex*, *.fieldml), region manifests (*.zvmanifest) or scripts (*" + SCRIPT_SUFFIX + ") to load on startup")
+    parser.add_argument("--live", metavar="ADDRESS",
+        help="receive live simulation timesteps on unix:PATH or tcp:HOST:PORT")
+    parser.add_argument("--keep-every", type=int, metavar="N",
+        help="read only every Nth timestep in scripts reading timestep series")
+    parser.add_argument("--keep-steps", type=int, metavar="N",
+        help="read only N evenly spaced timesteps in scripts reading timestep series")
+    parser.add_argument("--keep-tolerance", type=float, metavar="TOLERANCE",
+        help="read only timesteps with nodal values changed by more than TOLERANCE")
+    parser.add_argument("--profile-startup", action="store_true",
+        help="print a phase-by-phase timing breakdown of startup")
+    options, remaining = parser.parse_known_args(argv[1:])
+    return options, argv[:1] + remaining
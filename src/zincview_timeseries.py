@@ -0,0 +1,437 @@
+"""
+Memory-mapped columnar store of time-varying node parameters for ZincView.
+
+A store is a directory holding one raw array per field, value label and
+version, of shape (times, nodes, components), plus a JSON index and a
+template EX file defining the stored fields at the nodes. Arrays are
+memory mapped read-only, so several ZincView processes viewing the same
+store share the operating system page cache. Zinc keeps its own copy of
+any parameters it holds, so a bound region holds only a small window of
+stored times around the current time on a Zinc timesequence, copied from
+the store without parsing text whenever the time leaves the window. Field
+caches at times outside the window see the parameters at its nearest end;
+code evaluating fields over a range of times first widens the window with
+ZincRegion_loadTimeSeriesTimes.
+
+Convert an existing exnode series with:
+    python zincview_timeseries.py heart.zvstore --time-step 0.02 heart0*.exnode
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import argparse
+import json
+import os
+import sys
+import numpy
+from opencmiss.zinc.field import Field
+from opencmiss.zinc.node import Node
+from opencmiss.zinc.result import RESULT_OK
+
+# version of store index; increment if store layout changes
+_STORE_VERSION = 1
+_INDEX_FILE_NAME = "index.json"
+_TEMPLATE_FILE_NAME = "template.exnode"
+
+_VALUE_LABELS = [Node.VALUE_LABEL_VALUE, Node.VALUE_LABEL_D_DS1, Node.VALUE_LABEL_D_DS2, Node.VALUE_LABEL_D2_DS1DS2,
+                 Node.VALUE_LABEL_D_DS3, Node.VALUE_LABEL_D2_DS1DS3, Node.VALUE_LABEL_D2_DS2DS3, Node.VALUE_LABEL_D3_DS1DS2DS3]
+
+def _getColumnFileName(fieldName, valueLabel, version):
+    safeName = "".join((c if (c.isalnum() or c in "-_") else "_") for c in fieldName)
+    return safeName + "." + str(valueLabel) + "." + str(version) + ".raw"
+
+class TimeSeriesStoreWriter(object):
+    '''
+    Creates a store, with columns written in place through writable memory maps.
+    '''
+
+    def __init__(self, directory, times, nodeIdentifiers, dtype="<f8"):
+        '''
+        :param times: Increasing list of times.
+        :param nodeIdentifiers: Identifiers of nodes in column order.
+        '''
+        self._directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        self._times = [float(time) for time in times]
+        self._nodeIdentifiers = [int(identifier) for identifier in nodeIdentifiers]
+        self._dtype = numpy.dtype(dtype)
+        self._fields = {}
+        self._columns = []
+
+    def getDirectory(self):
+        return self._directory
+
+    def getNodeIdentifiers(self):
+        return list(self._nodeIdentifiers)
+
+    def addColumn(self, fieldName, valueLabel, version, numberOfComponents):
+        '''
+        Add column for field parameters with valueLabel and version.
+        :return writable array(times, nodes, components) filled with NaN
+        for parameters not defined at a node.
+        '''
+        fileName = _getColumnFileName(fieldName, valueLabel, version)
+        column = numpy.memmap(os.path.join(self._directory, fileName), dtype=self._dtype, mode="w+",
+            shape=(len(self._times), len(self._nodeIdentifiers), numberOfComponents))
+        column.fill(numpy.nan)
+        self._fields.setdefault(fieldName, {"components": numberOfComponents, "columns": []})
+        self._fields[fieldName]["columns"].append({"valueLabel": valueLabel, "version": version, "file": fileName})
+        self._columns.append(column)
+        return column
+
+    def getTemplateFileName(self):
+        '''
+        :return name of EX file to write with fields defined at all nodes.
+        '''
+        return os.path.join(self._directory, _TEMPLATE_FILE_NAME)
+
+    def close(self):
+        for column in self._columns:
+            column.flush()
+        self._columns = []
+        index = {
+            "version": _STORE_VERSION,
+            "dtype": self._dtype.str,
+            "times": self._times,
+            "nodes": self._nodeIdentifiers,
+            "fields": self._fields}
+        with open(os.path.join(self._directory, _INDEX_FILE_NAME), "w") as f:
+            json.dump(index, f)
+
+class TimeSeriesStore(object):
+    '''
+    Read-only view of a store with columns memory mapped on demand.
+    '''
+
+    def __init__(self, directory):
+        self._directory = directory
+        with open(os.path.join(directory, _INDEX_FILE_NAME), "r") as f:
+            index = json.load(f)
+        if index["version"] > _STORE_VERSION:
+            raise ValueError("Time series store " + directory + " is from a newer version of ZincView")
+        self._dtype = numpy.dtype(index["dtype"])
+        self._times = numpy.array(index["times"])
+        self._nodeIdentifiers = numpy.array(index["nodes"], dtype=numpy.int64)
+        self._fields = index["fields"]
+        self._columns = {}
+
+    def getDirectory(self):
+        return self._directory
+
+    def getTimes(self):
+        return self._times.tolist()
+
+    def getNodeIdentifiers(self):
+        return self._nodeIdentifiers
+
+    def getFieldNames(self):
+        return sorted(self._fields.keys())
+
+    def getTemplateFileName(self):
+        return os.path.join(self._directory, _TEMPLATE_FILE_NAME)
+
+    def getColumns(self, fieldName):
+        '''
+        :return list of (valueLabel, version, array(times, nodes, components))
+        '''
+        columns = self._columns.get(fieldName)
+        if columns is None:
+            field = self._fields[fieldName]
+            shape = (len(self._times), len(self._nodeIdentifiers), field["components"])
+            columns = [(column["valueLabel"], column["version"],
+                numpy.memmap(os.path.join(self._directory, column["file"]), dtype=self._dtype, mode="r", shape=shape))
+                for column in field["columns"]]
+            self._columns[fieldName] = columns
+        return columns
+
+    def getTimeIndexRange(self, minimumTime, maximumTime):
+        '''
+        :return first, last indexes of the fewest stored times whose range
+        contains minimumTime to maximumTime, clamped to the stored times.
+        '''
+        first = max(int(numpy.searchsorted(self._times, minimumTime, side="right")) - 1, 0)
+        last = min(int(numpy.searchsorted(self._times, maximumTime, side="left")), len(self._times) - 1)
+        return first, max(first, last)
+
+_timeSeriesBindings = []
+
+def getTimeSeriesBindings():
+    '''
+    :return list of TimeSeriesBinding objects created since last cleared.
+    '''
+    return list(_timeSeriesBindings)
+
+def clearTimeSeriesBindings():
+    '''
+    Stop updating all bound regions, e.g. when the model is cleared.
+    '''
+    for binding in _timeSeriesBindings:
+        binding.clear()
+    del _timeSeriesBindings[:]
+
+class TimeSeriesBinding(object):
+    '''
+    Loads fields of a region from a store. Parameters at a window of
+    stored times around the time of the default timekeeper are set in Zinc
+    on a timesequence of those times, so Zinc interpolates the fields at
+    any time inside the window. The window moves with the timekeeper.
+    '''
+
+    def __init__(self, region, store, fieldNames=None, windowSize=4):
+        '''
+        Reads the store's template into region if any field is not yet defined.
+        :param fieldNames: Names of fields to bind, or None for all in store.
+        :param windowSize: Number of stored times held in Zinc, at least 2.
+        '''
+        self._region = region
+        self._store = store
+        self._fieldNames = list(fieldNames) if fieldNames else store.getFieldNames()
+        self._windowSize = max(2, windowSize)
+        # first, last indexes of stored times held in Zinc
+        self._window = None
+        fieldmodule = region.getFieldmodule()
+        if not all(fieldmodule.findFieldByName(fieldName).isValid() for fieldName in self._fieldNames):
+            if region.readFile(store.getTemplateFileName()) != RESULT_OK:
+                raise ValueError("Failed to read time series store template " + store.getTemplateFileName())
+        timekeeper = region.getScene().getTimekeepermodule().getDefaultTimekeeper()
+        self._timenotifier = timekeeper.createTimenotifierRegular(1.0, 0.0)
+        self._timenotifier.setCallback(self._timenotifierCallback)
+        self.setTime(timekeeper.getTime())
+        _timeSeriesBindings.append(self)
+
+    def getRegion(self):
+        return self._region
+
+    def getStore(self):
+        return self._store
+
+    def getTimes(self):
+        return self._store.getTimes()
+
+    def getLoadedTimes(self):
+        '''
+        :return list of stored times whose parameters are held in Zinc.
+        '''
+        first, last = self._window
+        return self._store.getTimes()[first:last + 1]
+
+    def clear(self):
+        if self._timenotifier is not None:
+            self._timenotifier.clearCallback()
+            self._timenotifier = None
+
+    def _timenotifierCallback(self, timenotifierevent):
+        self.setTime(timenotifierevent.getTime())
+
+    def setTime(self, time):
+        '''
+        Make sure the stored times either side of time are held in Zinc,
+        loading a new window of times ahead of time if not.
+        '''
+        first, last = self._store.getTimeIndexRange(time, time)
+        if (self._window is not None) and (self._window[0] <= first) and (last <= self._window[1]):
+            return
+        # window reaches ahead of time, for playback forward
+        numberOfTimes = len(self._store.getTimes())
+        last = min(first + self._windowSize - 1, numberOfTimes - 1)
+        first = max(min(first, last - self._windowSize + 1), 0)
+        self._loadWindow(first, last)
+
+    def loadTimes(self, minimumTime, maximumTime):
+        '''
+        Hold the stored times covering minimumTime to maximumTime in Zinc,
+        e.g. before evaluating fields at several times. The window returns
+        to its usual size when the timekeeper time next leaves it.
+        '''
+        first, last = self._store.getTimeIndexRange(minimumTime, maximumTime)
+        if (self._window is not None) and (self._window[0] <= first) and (last <= self._window[1]):
+            return
+        if self._window is not None:
+            first = min(first, self._window[0])
+            last = max(last, self._window[1])
+        self._loadWindow(first, last)
+
+    def _loadWindow(self, first, last):
+        fieldmodule = self._region.getFieldmodule()
+        fieldmodule.beginChange()
+        try:
+            for fieldName in self._fieldNames:
+                self._loadField(fieldName, first, last)
+        finally:
+            fieldmodule.endChange()
+        self._window = (first, last)
+
+    def _loadField(self, fieldName, first, last):
+        '''
+        Make field time-varying over stored times first to last at the store
+        nodes and set its parameters at each of them. Parameters stored as
+        NaN are not set.
+        '''
+        fieldmodule = self._region.getFieldmodule()
+        field = fieldmodule.findFieldByName(fieldName).castFiniteElement()
+        if not field.isValid():
+            raise ValueError("Time series store field " + fieldName + " is not a finite element field")
+        times = self._store.getTimes()[first:last + 1]
+        timesequence = fieldmodule.getMatchingTimesequence(times)
+        nodeset = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+        # Zinc cannot merge a different timesequence into a field already
+        # defined at a node, so the field is undefined first then redefined
+        # with its parameter layout at the node over the window times
+        undefineNodetemplate = nodeset.createNodetemplate()
+        undefineNodetemplate.undefineField(field)
+        nodes = []
+        for identifier in self._store.getNodeIdentifiers().tolist():
+            node = nodeset.findNodeByIdentifier(identifier)
+            if node.isValid():
+                nodetemplate = nodeset.createNodetemplate()
+                nodetemplate.defineFieldFromNode(field, node)
+                nodetemplate.setTimesequence(field, timesequence)
+                if (node.merge(undefineNodetemplate) != RESULT_OK) or (node.merge(nodetemplate) != RESULT_OK):
+                    raise ValueError("Failed to define time series field " + fieldName + " at node " + str(identifier))
+            nodes.append(node)
+        fieldcache = fieldmodule.createFieldcache()
+        columns = self._store.getColumns(fieldName)
+        for t, time in enumerate(times):
+            fieldcache.setTime(time)
+            for valueLabel, version, column in columns:
+                values = numpy.array(column[first + t], dtype=numpy.float64)
+                defined = ~numpy.isnan(values)
+                allDefined = defined.all(axis=1)
+                for n, nodeValues in enumerate(values.tolist()):
+                    node = nodes[n]
+                    if not node.isValid():
+                        continue
+                    fieldcache.setNode(node)
+                    if allDefined[n]:
+                        field.setNodeParameters(fieldcache, -1, valueLabel, version, nodeValues)
+                    else:
+                        for c in numpy.flatnonzero(defined[n]).tolist():
+                            field.setNodeParameters(fieldcache, c + 1, valueLabel, version, [nodeValues[c]])
+
+def ZincRegion_bindTimeSeriesStore(region, directory, fieldNames=None):
+    '''
+    For loadModel scripts: load time-varying fields of region from the
+    store in directory around the current time.
+    :return TimeSeriesBinding
+    '''
+    return TimeSeriesBinding(region, TimeSeriesStore(directory), fieldNames)
+
+def ZincRegion_loadTimeSeriesTimes(region, times):
+    '''
+    Hold the store parameters over the range of times in Zinc for any
+    bindings of region or its child regions, so fields evaluate correctly
+    at all of times.
+    '''
+    if not _timeSeriesBindings:
+        return
+    prefix = "/" + region.getPath().strip("/")
+    prefix = prefix.rstrip("/") + "/"
+    for binding in _timeSeriesBindings:
+        if ("/" + binding.getRegion().getPath().strip("/") + "/").startswith(prefix):
+            binding.loadTimes(min(times), max(times))
+
+def _getNodeFieldColumns(fieldmodule, feField, node):
+    '''
+    :return list of (valueLabel, maximum versions) defined for feField at node.
+    '''
+    nodeset = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodeset.createNodetemplate()
+    nodetemplate.defineFieldFromNode(feField, node)
+    columns = []
+    for valueLabel in _VALUE_LABELS:
+        versions = max(nodetemplate.getValueNumberOfVersions(feField, c, valueLabel)
+            for c in range(1, feField.getNumberOfComponents() + 1))
+        if versions > 0:
+            columns.append((valueLabel, versions))
+    return columns
+
+def convertExnodeSeries(directory, fileNames, times, fieldNames=None, dtype="<f8"):
+    '''
+    Convert a series of exnode files, one per time, to a store. Columns are
+    those defined at the first node of the first file; parameters missing
+    at other nodes or times are stored as NaN and not assigned.
+    :param fieldNames: Names of node fields to store, or None for all.
+    :return TimeSeriesStoreWriter, closed
+    '''
+    from opencmiss.zinc.context import Context
+    context = Context("ZincViewTimeSeries")
+    writer = None
+    columns = {}
+    for t, fileName in enumerate(fileNames):
+        region = context.createRegion()
+        if region.readFile(fileName) != RESULT_OK:
+            raise ValueError("Failed to read " + fileName)
+        fieldmodule = region.getFieldmodule()
+        nodeset = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+        if writer is None:
+            nodes = []
+            nodeiter = nodeset.createNodeiterator()
+            node = nodeiter.next()
+            while node.isValid():
+                nodes.append(node)
+                node = nodeiter.next()
+            if not nodes:
+                raise ValueError("No nodes in " + fileName)
+            writer = TimeSeriesStoreWriter(directory, times, [node.getIdentifier() for node in nodes], dtype)
+            fielditer = fieldmodule.createFielditerator()
+            field = fielditer.next()
+            while field.isValid():
+                feField = field.castFiniteElement()
+                if feField.isValid() and ((fieldNames is None) or (field.getName() in fieldNames)):
+                    fieldColumns = []
+                    for valueLabel, versions in _getNodeFieldColumns(fieldmodule, feField, nodes[0]):
+                        for version in range(1, versions + 1):
+                            fieldColumns.append((valueLabel, version,
+                                writer.addColumn(field.getName(), valueLabel, version, field.getNumberOfComponents())))
+                    columns[field.getName()] = fieldColumns
+                field = fielditer.next()
+            # template defines fields at nodes with first time values
+            sir = region.createStreaminformationRegion()
+            srf = sir.createStreamresourceFile(writer.getTemplateFileName())
+            sir.setResourceDomainTypes(srf, Field.DOMAIN_TYPE_NODES)
+            if region.write(sir) != RESULT_OK:
+                raise ValueError("Failed to write time series store template")
+        fieldcache = fieldmodule.createFieldcache()
+        nodeIdentifiers = writer.getNodeIdentifiers()
+        for fieldName, fieldColumns in columns.items():
+            field = fieldmodule.findFieldByName(fieldName).castFiniteElement()
+            if not field.isValid():
+                continue
+            components = field.getNumberOfComponents()
+            for n, identifier in enumerate(nodeIdentifiers):
+                node = nodeset.findNodeByIdentifier(identifier)
+                if not node.isValid():
+                    continue
+                fieldcache.setNode(node)
+                for valueLabel, version, column in fieldColumns:
+                    result, values = field.getNodeParameters(fieldcache, -1, valueLabel, version, components)
+                    if result == RESULT_OK:
+                        column[t, n] = values
+                    else:
+                        for c in range(components):
+                            result, value = field.getNodeParameters(fieldcache, c + 1, valueLabel, version, 1)
+                            if result == RESULT_OK:
+                                column[t, n, c] = value
+    writer.close()
+    return writer
+
+def main(argv):
+    '''
+    Command line converter from exnode series to time series store.
+    '''
+    parser = argparse.ArgumentParser(description="Convert an exnode series, one file per time, to a ZincView time series store")
+    parser.add_argument("store", help="store directory to create")
+    parser.add_argument("files", nargs="+", help="exnode files in time order")
+    parser.add_argument("--time-start", type=float, default=0.0, help="time of first file")
+    parser.add_argument("--time-step", type=float, default=1.0, help="time between files")
+    parser.add_argument("--field", action="append", dest="fields", help="field to store; default all")
+    parser.add_argument("--single", action="store_true", help="store single precision values")
+    options = parser.parse_args(argv[1:])
+    times = [options.time_start + i*options.time_step for i in range(len(options.files))]
+    convertExnodeSeries(options.store, options.files, times, options.fields, "<f4" if options.single else "<f8")
+
+if __name__ == '__main__':
+    main(sys.argv)
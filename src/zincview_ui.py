@@ -126,6 +126,30 @@ class Ui_ZincView(object):
         self.model_clear_button = QtGui.QPushButton(self.model)
         self.model_clear_button.setObjectName("model_clear_button")
         self.verticalLayout_4.addWidget(self.model_clear_button)
+        self.model_bake_field_button = QtGui.QPushButton(self.model)
+        self.model_bake_field_button.setObjectName("model_bake_field_button")
+        self.verticalLayout_4.addWidget(self.model_bake_field_button)
+        self.model_save_session_button = QtGui.QPushButton(self.model)
+        self.model_save_session_button.setObjectName("model_save_session_button")
+        self.verticalLayout_4.addWidget(self.model_save_session_button)
+        self.model_open_session_button = QtGui.QPushButton(self.model)
+        self.model_open_session_button.setObjectName("model_open_session_button")
+        self.verticalLayout_4.addWidget(self.model_open_session_button)
+        self.model_watch_checkbox = QtGui.QCheckBox(self.model)
+        self.model_watch_checkbox.setObjectName("model_watch_checkbox")
+        self.verticalLayout_4.addWidget(self.model_watch_checkbox)
+        self.live_checkbox = QtGui.QCheckBox(self.model)
+        self.live_checkbox.setObjectName("live_checkbox")
+        self.verticalLayout_4.addWidget(self.live_checkbox)
+        self.live_address_lineedit = QtGui.QLineEdit(self.model)
+        self.live_address_lineedit.setObjectName("live_address_lineedit")
+        self.verticalLayout_4.addWidget(self.live_address_lineedit)
+        self.model_paging_checkbox = QtGui.QCheckBox(self.model)
+        self.model_paging_checkbox.setObjectName("model_paging_checkbox")
+        self.verticalLayout_4.addWidget(self.model_paging_checkbox)
+        self.model_memory_button = QtGui.QPushButton(self.model)
+        self.model_memory_button.setObjectName("model_memory_button")
+        self.verticalLayout_4.addWidget(self.model_memory_button)
         spacerItem = QtGui.QSpacerItem(20, 40, QtGui.QSizePolicy.Minimum, QtGui.QSizePolicy.Expanding)
         self.verticalLayout_4.addItem(spacerItem)
         self.toolBox.addItem(self.model, "")
@@ -151,7 +175,7 @@ class Ui_ZincView(object):
         self.region_label = QtGui.QLabel(self.region_widget)
         self.region_label.setObjectName("region_label")
         self.formLayout_5.setWidget(0, QtGui.QFormLayout.LabelRole, self.region_label)
-        self.region_chooser = RegionChooserWidget(self.region_widget)
+        self.region_chooser = RegionTreeChooserWidget(self.region_widget)
         self.region_chooser.setObjectName("region_chooser")
         self.formLayout_5.setWidget(0, QtGui.QFormLayout.FieldRole, self.region_chooser)
         self.verticalLayout_3.addWidget(self.region_widget)
@@ -163,6 +187,30 @@ class Ui_ZincView(object):
         self.scene_editor.setSizePolicy(sizePolicy)
         self.scene_editor.setObjectName("scene_editor")
         self.verticalLayout_3.addWidget(self.scene_editor)
+        self.isovalue_widget = QtGui.QWidget(self.graphics)
+        self.isovalue_widget.setObjectName("isovalue_widget")
+        self.formLayout_6 = QtGui.QFormLayout(self.isovalue_widget)
+        self.formLayout_6.setContentsMargins(0, 0, 0, 0)
+        self.formLayout_6.setSpacing(3)
+        self.formLayout_6.setObjectName("formLayout_6")
+        self.isovalue_contours_label = QtGui.QLabel(self.isovalue_widget)
+        self.isovalue_contours_label.setObjectName("isovalue_contours_label")
+        self.formLayout_6.setWidget(0, QtGui.QFormLayout.LabelRole, self.isovalue_contours_label)
+        self.isovalue_contours_combobox = QtGui.QComboBox(self.isovalue_widget)
+        self.isovalue_contours_combobox.setObjectName("isovalue_contours_combobox")
+        self.formLayout_6.setWidget(0, QtGui.QFormLayout.FieldRole, self.isovalue_contours_combobox)
+        self.isovalue_label = QtGui.QLabel(self.isovalue_widget)
+        self.isovalue_label.setObjectName("isovalue_label")
+        self.formLayout_6.setWidget(1, QtGui.QFormLayout.LabelRole, self.isovalue_label)
+        self.isovalue_lineedit = QtGui.QLineEdit(self.isovalue_widget)
+        self.isovalue_lineedit.setObjectName("isovalue_lineedit")
+        self.formLayout_6.setWidget(1, QtGui.QFormLayout.FieldRole, self.isovalue_lineedit)
+        self.verticalLayout_3.addWidget(self.isovalue_widget)
+        self.isovalue_slider = QtGui.QSlider(self.graphics)
+        self.isovalue_slider.setMaximum(1000)
+        self.isovalue_slider.setOrientation(QtCore.Qt.Horizontal)
+        self.isovalue_slider.setObjectName("isovalue_slider")
+        self.verticalLayout_3.addWidget(self.isovalue_slider)
         self.toolBox.addItem(self.graphics, "")
         self.view = QtGui.QWidget()
         self.view.setGeometry(QtCore.QRect(0, 0, 228, 425))
@@ -179,6 +227,18 @@ class Ui_ZincView(object):
         self.sceneviewer_editor_widget = SceneviewerEditorWidget(self.view)
         self.sceneviewer_editor_widget.setObjectName("sceneviewer_editor_widget")
         self.verticalLayout_5.addWidget(self.sceneviewer_editor_widget)
+        self.node_hover_checkbox = QtGui.QCheckBox(self.view)
+        self.node_hover_checkbox.setObjectName("node_hover_checkbox")
+        self.verticalLayout_5.addWidget(self.node_hover_checkbox)
+        self.node_box_select_checkbox = QtGui.QCheckBox(self.view)
+        self.node_box_select_checkbox.setObjectName("node_box_select_checkbox")
+        self.verticalLayout_5.addWidget(self.node_box_select_checkbox)
+        self.probe_checkbox = QtGui.QCheckBox(self.view)
+        self.probe_checkbox.setObjectName("probe_checkbox")
+        self.verticalLayout_5.addWidget(self.probe_checkbox)
+        self.view_culling_checkbox = QtGui.QCheckBox(self.view)
+        self.view_culling_checkbox.setObjectName("view_culling_checkbox")
+        self.verticalLayout_5.addWidget(self.view_culling_checkbox)
         self.toolBox.addItem(self.view, "")
         self.time = QtGui.QWidget()
         self.time.setGeometry(QtCore.QRect(0, 0, 228, 425))
@@ -212,6 +272,21 @@ class Ui_ZincView(object):
         self.time_text_label = QtGui.QLabel(self.frame_2)
         self.time_text_label.setObjectName("time_text_label")
         self.formLayout_4.setWidget(2, QtGui.QFormLayout.LabelRole, self.time_text_label)
+        self.time_fps_label = QtGui.QLabel(self.frame_2)
+        self.time_fps_label.setObjectName("time_fps_label")
+        self.formLayout_4.setWidget(3, QtGui.QFormLayout.LabelRole, self.time_fps_label)
+        self.time_fps_lineedit = QtGui.QLineEdit(self.frame_2)
+        self.time_fps_lineedit.setObjectName("time_fps_lineedit")
+        self.formLayout_4.setWidget(3, QtGui.QFormLayout.FieldRole, self.time_fps_lineedit)
+        self.time_play_mode_label = QtGui.QLabel(self.frame_2)
+        self.time_play_mode_label.setObjectName("time_play_mode_label")
+        self.formLayout_4.setWidget(4, QtGui.QFormLayout.LabelRole, self.time_play_mode_label)
+        self.time_play_mode_combobox = QtGui.QComboBox(self.frame_2)
+        self.time_play_mode_combobox.setObjectName("time_play_mode_combobox")
+        self.time_play_mode_combobox.addItem("")
+        self.time_play_mode_combobox.addItem("")
+        self.time_play_mode_combobox.addItem("")
+        self.formLayout_4.setWidget(4, QtGui.QFormLayout.FieldRole, self.time_play_mode_combobox)
         self.verticalLayout_8.addWidget(self.frame_2)
         self.time_slider = QtGui.QSlider(self.time)
         self.time_slider.setMaximum(10000)
@@ -220,6 +295,14 @@ class Ui_ZincView(object):
         self.time_slider.setOrientation(QtCore.Qt.Horizontal)
         self.time_slider.setObjectName("time_slider")
         self.verticalLayout_8.addWidget(self.time_slider)
+        self.time_play_button = QtGui.QPushButton(self.time)
+        self.time_play_button.setCheckable(True)
+        self.time_play_button.setObjectName("time_play_button")
+        self.verticalLayout_8.addWidget(self.time_play_button)
+        self.time_skip_frames_checkbox = QtGui.QCheckBox(self.time)
+        self.time_skip_frames_checkbox.setChecked(True)
+        self.time_skip_frames_checkbox.setObjectName("time_skip_frames_checkbox")
+        self.verticalLayout_8.addWidget(self.time_skip_frames_checkbox)
         spacerItem1 = QtGui.QSpacerItem(20, 40, QtGui.QSizePolicy.Minimum, QtGui.QSizePolicy.Expanding)
         self.verticalLayout_8.addItem(spacerItem1)
         self.toolBox.addItem(self.time, "")
@@ -259,6 +342,13 @@ class Ui_ZincView(object):
         self.perturb_lines_checkbox = QtGui.QCheckBox(self.rendering)
         self.perturb_lines_checkbox.setObjectName("perturb_lines_checkbox")
         self.verticalLayout_7.addWidget(self.perturb_lines_checkbox)
+        self.volume_coarse_while_editing_checkbox = QtGui.QCheckBox(self.rendering)
+        self.volume_coarse_while_editing_checkbox.setChecked(True)
+        self.volume_coarse_while_editing_checkbox.setObjectName("volume_coarse_while_editing_checkbox")
+        self.verticalLayout_7.addWidget(self.volume_coarse_while_editing_checkbox)
+        self.volume_full_resolution_button = QtGui.QPushButton(self.rendering)
+        self.volume_full_resolution_button.setObjectName("volume_full_resolution_button")
+        self.verticalLayout_7.addWidget(self.volume_full_resolution_button)
         spacerItem2 = QtGui.QSpacerItem(20, 40, QtGui.QSizePolicy.Minimum, QtGui.QSizePolicy.Expanding)
         self.verticalLayout_7.addItem(spacerItem2)
         self.toolBox.addItem(self.rendering, "")
@@ -270,6 +360,9 @@ class Ui_ZincView(object):
         self.spectrum_autorange_button = QtGui.QPushButton(self.data_colouring)
         self.spectrum_autorange_button.setObjectName("spectrum_autorange_button")
         self.verticalLayout_6.addWidget(self.spectrum_autorange_button)
+        self.spectrum_autorange_all_times_checkbox = QtGui.QCheckBox(self.data_colouring)
+        self.spectrum_autorange_all_times_checkbox.setObjectName("spectrum_autorange_all_times_checkbox")
+        self.verticalLayout_6.addWidget(self.spectrum_autorange_all_times_checkbox)
         self.frame = QtGui.QFrame(self.data_colouring)
         self.frame.setFrameShape(QtGui.QFrame.StyledPanel)
         self.frame.setFrameShadow(QtGui.QFrame.Raised)
@@ -288,6 +381,12 @@ class Ui_ZincView(object):
         self.spectrum_maximum_label = QtGui.QLabel(self.frame)
         self.spectrum_maximum_label.setObjectName("spectrum_maximum_label")
         self.formLayout_3.setWidget(2, QtGui.QFormLayout.LabelRole, self.spectrum_maximum_label)
+        self.spectrum_clip_percent_label = QtGui.QLabel(self.frame)
+        self.spectrum_clip_percent_label.setObjectName("spectrum_clip_percent_label")
+        self.formLayout_3.setWidget(3, QtGui.QFormLayout.LabelRole, self.spectrum_clip_percent_label)
+        self.spectrum_clip_percent_lineedit = QtGui.QLineEdit(self.frame)
+        self.spectrum_clip_percent_lineedit.setObjectName("spectrum_clip_percent_lineedit")
+        self.formLayout_3.setWidget(3, QtGui.QFormLayout.FieldRole, self.spectrum_clip_percent_lineedit)
         self.verticalLayout_6.addWidget(self.frame)
         self.spectrum_add_colour_bar_button = QtGui.QPushButton(self.data_colouring)
         self.spectrum_add_colour_bar_button.setObjectName("spectrum_add_colour_bar_button")
@@ -323,6 +422,7 @@ class Ui_ZincView(object):
 
         self.retranslateUi(ZincView)
         self.toolBox.setCurrentIndex(1)
+        self.time_play_mode_combobox.setCurrentIndex(1)
         self.toolBox.layout().setSpacing(2)
         QtCore.QObject.connect(self.model_load_button, QtCore.SIGNAL("clicked()"), ZincView.modelLoad)
         QtCore.QObject.connect(self.tessellation_minimum_divisions_lineedit, QtCore.SIGNAL("returnPressed()"), ZincView.tessellationMinimumDivisionsEntered)
@@ -332,7 +432,16 @@ class Ui_ZincView(object):
         QtCore.QObject.connect(self.tessellation_circle_divisions_lineedit, QtCore.SIGNAL("editingFinished()"), ZincView.tessellationCircleDivisionsDisplay)
         QtCore.QObject.connect(self.tessellation_refinement_factors_lineedit, QtCore.SIGNAL("editingFinished()"), ZincView.tessellationRefinementFactorsDisplay)
         QtCore.QObject.connect(self.perturb_lines_checkbox, QtCore.SIGNAL("clicked(bool)"), ZincView.perturbLinesStateChanged)
+        QtCore.QObject.connect(self.volume_coarse_while_editing_checkbox, QtCore.SIGNAL("clicked(bool)"), ZincView.volumeCoarseWhileEditingStateChanged)
+        QtCore.QObject.connect(self.volume_full_resolution_button, QtCore.SIGNAL("clicked()"), ZincView.volumeFullResolutionClicked)
         QtCore.QObject.connect(self.model_clear_button, QtCore.SIGNAL("clicked()"), ZincView.modelClear)
+        QtCore.QObject.connect(self.model_bake_field_button, QtCore.SIGNAL("clicked()"), ZincView.modelBakeFieldClicked)
+        QtCore.QObject.connect(self.model_save_session_button, QtCore.SIGNAL("clicked()"), ZincView.sessionSaveClicked)
+        QtCore.QObject.connect(self.model_open_session_button, QtCore.SIGNAL("clicked()"), ZincView.sessionOpenClicked)
+        QtCore.QObject.connect(self.model_watch_checkbox, QtCore.SIGNAL("clicked(bool)"), ZincView.modelWatchStateChanged)
+        QtCore.QObject.connect(self.live_checkbox, QtCore.SIGNAL("clicked(bool)"), ZincView.liveStateChanged)
+        QtCore.QObject.connect(self.model_paging_checkbox, QtCore.SIGNAL("clicked(bool)"), ZincView.modelPagingStateChanged)
+        QtCore.QObject.connect(self.model_memory_button, QtCore.SIGNAL("clicked()"), ZincView.modelMemoryClicked)
         QtCore.QObject.connect(self.spectrum_autorange_button, QtCore.SIGNAL("clicked()"), ZincView.spectrumAutorangeClicked)
         QtCore.QObject.connect(self.spectrum_minimum_lineedit, QtCore.SIGNAL("editingFinished()"), ZincView.spectrumMinimumEntered)
         QtCore.QObject.connect(self.spectrum_maximum_lineedit, QtCore.SIGNAL("editingFinished()"), ZincView.spectrumMaximumEntered)
@@ -342,10 +451,21 @@ class Ui_ZincView(object):
         QtCore.QObject.connect(self.time_maximum_lineedit, QtCore.SIGNAL("editingFinished()"), ZincView.timeMaximumEntered)
         QtCore.QObject.connect(self.time_text_lineedit, QtCore.SIGNAL("editingFinished()"), ZincView.timeTextEntered)
         QtCore.QObject.connect(self.time_slider, QtCore.SIGNAL("valueChanged(int)"), ZincView.timeSliderChanged)
+        QtCore.QObject.connect(self.time_play_button, QtCore.SIGNAL("clicked(bool)"), ZincView.timePlayClicked)
+        QtCore.QObject.connect(self.time_fps_lineedit, QtCore.SIGNAL("editingFinished()"), ZincView.timeFramesPerSecondEntered)
+        QtCore.QObject.connect(self.time_play_mode_combobox, QtCore.SIGNAL("currentIndexChanged(int)"), ZincView.timePlayModeChanged)
+        QtCore.QObject.connect(self.time_skip_frames_checkbox, QtCore.SIGNAL("clicked(bool)"), ZincView.timeSkipFramesStateChanged)
         QtCore.QObject.connect(self.save_image_button, QtCore.SIGNAL("clicked()"), ZincView.saveImageClicked)
         QtCore.QObject.connect(self.save_webgl_button, QtCore.SIGNAL("clicked()"), ZincView.saveWebGLClicked)
         QtCore.QObject.connect(self.region_chooser, QtCore.SIGNAL("currentIndexChanged(int)"), ZincView.regionChanged)
         QtCore.QObject.connect(self.toolBox, QtCore.SIGNAL("currentChanged(int)"), ZincView.toolBoxPageChanged)
+        QtCore.QObject.connect(self.isovalue_contours_combobox, QtCore.SIGNAL("currentIndexChanged(int)"), ZincView.isovalueContoursChanged)
+        QtCore.QObject.connect(self.isovalue_lineedit, QtCore.SIGNAL("editingFinished()"), ZincView.isovalueEntered)
+        QtCore.QObject.connect(self.isovalue_slider, QtCore.SIGNAL("valueChanged(int)"), ZincView.isovalueSliderChanged)
+        QtCore.QObject.connect(self.node_hover_checkbox, QtCore.SIGNAL("clicked(bool)"), ZincView.nodeHoverStateChanged)
+        QtCore.QObject.connect(self.node_box_select_checkbox, QtCore.SIGNAL("clicked(bool)"), ZincView.nodeBoxSelectStateChanged)
+        QtCore.QObject.connect(self.probe_checkbox, QtCore.SIGNAL("clicked(bool)"), ZincView.probeStateChanged)
+        QtCore.QObject.connect(self.view_culling_checkbox, QtCore.SIGNAL("clicked(bool)"), ZincView.viewCullingStateChanged)
         QtCore.QMetaObject.connectSlotsByName(ZincView)
 
     def retranslateUi(self, ZincView):
@@ -353,24 +473,55 @@ class Ui_ZincView(object):
         self.dockWidget.setWindowTitle(QtGui.QApplication.translate("ZincView", "ZincView Tools", None, QtGui.QApplication.UnicodeUTF8))
         self.model_load_button.setText(QtGui.QApplication.translate("ZincView", "Load model...", None, QtGui.QApplication.UnicodeUTF8))
         self.model_clear_button.setText(QtGui.QApplication.translate("ZincView", "Clear model...", None, QtGui.QApplication.UnicodeUTF8))
+        self.model_bake_field_button.setText(QtGui.QApplication.translate("ZincView", "Bake field...", None, QtGui.QApplication.UnicodeUTF8))
+        self.model_save_session_button.setText(QtGui.QApplication.translate("ZincView", "Save session...", None, QtGui.QApplication.UnicodeUTF8))
+        self.model_open_session_button.setText(QtGui.QApplication.translate("ZincView", "Open session...", None, QtGui.QApplication.UnicodeUTF8))
+        self.model_watch_checkbox.setToolTip(QtGui.QApplication.translate("ZincView", "Re-read new or modified timestep files into the model", None, QtGui.QApplication.UnicodeUTF8))
+        self.model_watch_checkbox.setText(QtGui.QApplication.translate("ZincView", "Watch model files", None, QtGui.QApplication.UnicodeUTF8))
+        self.live_checkbox.setToolTip(QtGui.QApplication.translate("ZincView", "Receive timesteps pushed by a running solver", None, QtGui.QApplication.UnicodeUTF8))
+        self.live_checkbox.setText(QtGui.QApplication.translate("ZincView", "Receive live data", None, QtGui.QApplication.UnicodeUTF8))
+        self.live_address_lineedit.setToolTip(QtGui.QApplication.translate("ZincView", "Live data address: unix:PATH or tcp:HOST:PORT", None, QtGui.QApplication.UnicodeUTF8))
+        self.model_paging_checkbox.setToolTip(QtGui.QApplication.translate("ZincView", "Write regions hidden for a while to a local cache and release them until shown or selected again", None, QtGui.QApplication.UnicodeUTF8))
+        self.model_paging_checkbox.setText(QtGui.QApplication.translate("ZincView", "Page out hidden regions", None, QtGui.QApplication.UnicodeUTF8))
+        self.model_memory_button.setToolTip(QtGui.QApplication.translate("ZincView", "Show estimated memory used by each region, with warning thresholds", None, QtGui.QApplication.UnicodeUTF8))
+        self.model_memory_button.setText(QtGui.QApplication.translate("ZincView", "Memory usage...", None, QtGui.QApplication.UnicodeUTF8))
         self.toolBox.setItemText(self.toolBox.indexOf(self.model), QtGui.QApplication.translate("ZincView", "Model", None, QtGui.QApplication.UnicodeUTF8))
         self.region_label.setText(QtGui.QApplication.translate("ZincView", "Region:", None, QtGui.QApplication.UnicodeUTF8))
+        self.isovalue_contours_label.setText(QtGui.QApplication.translate("ZincView", "Contours:", None, QtGui.QApplication.UnicodeUTF8))
+        self.isovalue_label.setText(QtGui.QApplication.translate("ZincView", "Isovalue:", None, QtGui.QApplication.UnicodeUTF8))
+        self.node_hover_checkbox.setText(QtGui.QApplication.translate("ZincView", "Node readout on hover", None, QtGui.QApplication.UnicodeUTF8))
+        self.node_box_select_checkbox.setText(QtGui.QApplication.translate("ZincView", "Drag box to select nodes", None, QtGui.QApplication.UnicodeUTF8))
+        self.probe_checkbox.setText(QtGui.QApplication.translate("ZincView", "Click surface to add probe", None, QtGui.QApplication.UnicodeUTF8))
+        self.view_culling_checkbox.setToolTip(QtGui.QApplication.translate("ZincView", "Only build graphics of large meshes for elements in view, updated once the view settles", None, QtGui.QApplication.UnicodeUTF8))
+        self.view_culling_checkbox.setText(QtGui.QApplication.translate("ZincView", "Cull graphics outside view", None, QtGui.QApplication.UnicodeUTF8))
         self.toolBox.setItemText(self.toolBox.indexOf(self.graphics), QtGui.QApplication.translate("ZincView", "Graphics", None, QtGui.QApplication.UnicodeUTF8))
         self.toolBox.setItemText(self.toolBox.indexOf(self.view), QtGui.QApplication.translate("ZincView", "View", None, QtGui.QApplication.UnicodeUTF8))
         self.time_autorange_button.setText(QtGui.QApplication.translate("ZincView", "Autorange time", None, QtGui.QApplication.UnicodeUTF8))
         self.time_minimum_label.setText(QtGui.QApplication.translate("ZincView", "Minimum:", None, QtGui.QApplication.UnicodeUTF8))
         self.time_maximum_label.setText(QtGui.QApplication.translate("ZincView", "Maximum:", None, QtGui.QApplication.UnicodeUTF8))
         self.time_text_label.setText(QtGui.QApplication.translate("ZincView", "Time:", None, QtGui.QApplication.UnicodeUTF8))
+        self.time_fps_label.setText(QtGui.QApplication.translate("ZincView", "Frames/s:", None, QtGui.QApplication.UnicodeUTF8))
+        self.time_play_mode_label.setText(QtGui.QApplication.translate("ZincView", "Mode:", None, QtGui.QApplication.UnicodeUTF8))
+        self.time_play_mode_combobox.setItemText(0, QtGui.QApplication.translate("ZincView", "Once", None, QtGui.QApplication.UnicodeUTF8))
+        self.time_play_mode_combobox.setItemText(1, QtGui.QApplication.translate("ZincView", "Loop", None, QtGui.QApplication.UnicodeUTF8))
+        self.time_play_mode_combobox.setItemText(2, QtGui.QApplication.translate("ZincView", "Bounce", None, QtGui.QApplication.UnicodeUTF8))
+        self.time_play_button.setText(QtGui.QApplication.translate("ZincView", "Play", None, QtGui.QApplication.UnicodeUTF8))
+        self.time_skip_frames_checkbox.setText(QtGui.QApplication.translate("ZincView", "Skip frames to keep pace", None, QtGui.QApplication.UnicodeUTF8))
         self.toolBox.setItemText(self.toolBox.indexOf(self.time), QtGui.QApplication.translate("ZincView", "Time", None, QtGui.QApplication.UnicodeUTF8))
         self.tessellation_groupbox.setTitle(QtGui.QApplication.translate("ZincView", "Tessellation divisions:", None, QtGui.QApplication.UnicodeUTF8))
         self.tessellation_minimum_divisions_label.setText(QtGui.QApplication.translate("ZincView", "Minimum:", None, QtGui.QApplication.UnicodeUTF8))
         self.tessellation_refinement_factors_label.setText(QtGui.QApplication.translate("ZincView", "Refinement:", None, QtGui.QApplication.UnicodeUTF8))
         self.tessellation_circle_divisions_label.setText(QtGui.QApplication.translate("ZincView", "Circle:", None, QtGui.QApplication.UnicodeUTF8))
         self.perturb_lines_checkbox.setText(QtGui.QApplication.translate("ZincView", "Perturb lines", None, QtGui.QApplication.UnicodeUTF8))
+        self.volume_coarse_while_editing_checkbox.setText(QtGui.QApplication.translate("ZincView", "Coarse volume while editing", None, QtGui.QApplication.UnicodeUTF8))
+        self.volume_full_resolution_button.setText(QtGui.QApplication.translate("ZincView", "Full resolution volume", None, QtGui.QApplication.UnicodeUTF8))
         self.toolBox.setItemText(self.toolBox.indexOf(self.rendering), QtGui.QApplication.translate("ZincView", "Rendering", None, QtGui.QApplication.UnicodeUTF8))
         self.spectrum_autorange_button.setText(QtGui.QApplication.translate("ZincView", "Autorange spectrum", None, QtGui.QApplication.UnicodeUTF8))
+        self.spectrum_autorange_all_times_checkbox.setText(QtGui.QApplication.translate("ZincView", "Over all times", None, QtGui.QApplication.UnicodeUTF8))
         self.spectrum_minimum_label.setText(QtGui.QApplication.translate("ZincView", "Minimum:", None, QtGui.QApplication.UnicodeUTF8))
         self.spectrum_maximum_label.setText(QtGui.QApplication.translate("ZincView", "Maximum:", None, QtGui.QApplication.UnicodeUTF8))
+        self.spectrum_clip_percent_label.setText(QtGui.QApplication.translate("ZincView", "Clip %:", None, QtGui.QApplication.UnicodeUTF8))
+        self.spectrum_clip_percent_lineedit.setText(QtGui.QApplication.translate("ZincView", "0", None, QtGui.QApplication.UnicodeUTF8))
         self.spectrum_add_colour_bar_button.setText(QtGui.QApplication.translate("ZincView", "Add colour bar", None, QtGui.QApplication.UnicodeUTF8))
         self.toolBox.setItemText(self.toolBox.indexOf(self.data_colouring), QtGui.QApplication.translate("ZincView", "Data Colouring", None, QtGui.QApplication.UnicodeUTF8))
         self.save_image_button.setText(QtGui.QApplication.translate("ZincView", "Save image...", None, QtGui.QApplication.UnicodeUTF8))
@@ -381,6 +532,6 @@ class Ui_ZincView(object):
         self.actionView_All.setText(QtGui.QApplication.translate("ZincView", "View All", None, QtGui.QApplication.UnicodeUTF8))
 
 from opencmiss.zincwidgets.sceneviewerwidget import SceneviewerWidget
-from opencmiss.zincwidgets.regionchooserwidget import RegionChooserWidget
+from zincview_regiontree import RegionTreeChooserWidget
 from opencmiss.zincwidgets.sceneviewereditorwidget import SceneviewerEditorWidget
 from opencmiss.zincwidgets.sceneeditorwidget import SceneEditorWidget
@@ -0,0 +1,492 @@
+"""
+Volume image loading for ZincView model scripts.
+
+Decodes stacks of slice images concurrently into one contiguous array,
+keeps a memory-mapped raw cache of the decoded volume so reopening skips
+image decoding, and transfers the volume to a Zinc image field. Greyscale
+volumes are stored with a single component, a third of the memory and
+texture size of RGB, using 16 bits only if the slice images have 16-bit
+samples. A cached pyramid of half, quarter and
+eighth resolution volumes supports switching image fields to a coarse
+level of detail while editing.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import os
+import json
+from concurrent.futures import ThreadPoolExecutor
+import numpy
+from PySide import QtCore, QtGui
+from opencmiss.zinc.streamimage import StreaminformationImage
+from opencmiss.zinc.result import RESULT_OK
+
+# version of cache header; increment if cache layout changes
+_CACHE_VERSION = 2
+
+STORAGE_AUTO = "auto"
+STORAGE_RGB = "rgb"
+STORAGE_GREYSCALE = "greyscale"
+
+def isGreyscaleImage(rgb):
+    '''
+    :return True if all pixels of rgb array(..., 3) have equal components.
+    '''
+    return numpy.array_equal(rgb[..., 0], rgb[..., 1]) and numpy.array_equal(rgb[..., 0], rgb[..., 2])
+
+def _getRGBToGreyscale(rgb):
+    '''
+    :return luminance of uint8 rgb array(..., 3) as uint8.
+    '''
+    if isGreyscaleImage(rgb):
+        return rgb[..., 0]
+    return numpy.rint(rgb.dot(numpy.array([0.299, 0.587, 0.114]))).astype(numpy.uint8)
+
+def _readPGMHeader(fileName):
+    '''
+    :return width, height, maxval, data offset of binary PGM image file,
+    or None if not a binary PGM image.
+    '''
+    with open(fileName, "rb") as imageFile:
+        header = imageFile.read(512)
+    if header[:2] != b"P5":
+        return None
+    values = []
+    offset = 2
+    while len(values) < 3:
+        while (offset < len(header)) and header[offset:offset + 1].isspace():
+            offset += 1
+        if header[offset:offset + 1] == b"#":
+            offset = header.find(b"\n", offset)
+            if offset < 0:
+                return None
+            continue
+        start = offset
+        while (offset < len(header)) and header[offset:offset + 1].isdigit():
+            offset += 1
+        if start == offset:
+            return None
+        values.append(int(header[start:offset]))
+    # single whitespace character separates header from data
+    return values[0], values[1], values[2], offset + 1
+
+def getImageBitsPerComponent(fileName):
+    '''
+    Get bits per sample of image file. Binary PGM images with values above
+    255 are read with 16 bits; QImage decodes all other images with 8.
+    :return 8 or 16
+    '''
+    header = _readPGMHeader(fileName)
+    if (header is not None) and (header[2] > 255):
+        return 16
+    return 8
+
+def getVolumeBitsPerComponent(fileNames, bitsPerComponent=None):
+    '''
+    Resolve bits per component for slice images, checking 16 bits are only
+    requested for images with 16-bit samples.
+    :param bitsPerComponent: 8, 16, or None to match the first slice image.
+    :return 8 or 16
+    '''
+    sourceBitsPerComponent = getImageBitsPerComponent(fileNames[0])
+    if bitsPerComponent is None:
+        return sourceBitsPerComponent
+    if (bitsPerComponent == 16) and (sourceBitsPerComponent != 16):
+        raise ValueError("16 bits per component requires slice images with 16-bit samples")
+    return bitsPerComponent
+
+def _decodePGM16(fileName, out):
+    '''
+    Read 16-bit binary PGM image file into out, a uint16 array(height, width).
+    '''
+    header = _readPGMHeader(fileName)
+    if (header is None) or (header[2] <= 255):
+        raise IOError("Image " + fileName + " does not have 16-bit samples")
+    width, height, maxval, offset = header
+    if (width != out.shape[1]) or (height != out.shape[0]):
+        raise IOError("Image " + fileName + " size differs from first slice")
+    # samples are big-endian
+    values = numpy.fromfile(fileName, dtype=">u2", count=width*height, offset=offset)
+    if values.size != width*height:
+        raise IOError("Image " + fileName + " is truncated")
+    out[:, :] = values.reshape(height, width)
+
+def decodeImageSlice(fileName, out):
+    '''
+    Decode an image file into out, a preallocated array(height, width, 3)
+    of uint8 RGB values, or array(height, width) of uint8 greyscale, or
+    uint16 greyscale for 16-bit PGM images. QImage is reentrant so this
+    can be called from worker threads.
+    '''
+    if out.dtype == numpy.uint16:
+        _decodePGM16(fileName, out)
+        return
+    image = QtGui.QImage(fileName)
+    if image.isNull():
+        raise IOError("Failed to decode image " + fileName)
+    height, width = out.shape[0], out.shape[1]
+    if (image.width() != width) or (image.height() != height):
+        raise IOError("Image " + fileName + " size differs from first slice")
+    image = image.convertToFormat(QtGui.QImage.Format_RGB888)
+    # rows are padded to 4 byte boundaries
+    rows = numpy.frombuffer(image.constBits(), dtype=numpy.uint8, count=image.byteCount())
+    rows = rows.reshape(height, image.bytesPerLine())
+    rgb = rows[:, :width*3].reshape(height, width, 3)
+    if out.ndim == 2:
+        out[:, :] = _getRGBToGreyscale(rgb)
+    else:
+        out[:, :, :] = rgb
+
+def getImageSliceSize(fileName):
+    '''
+    :return width, height of image from its header, without decoding it.
+    '''
+    reader = QtGui.QImageReader(fileName)
+    size = reader.size()
+    if not size.isValid():
+        raise IOError("Failed to read image size from " + fileName)
+    return size.width(), size.height()
+
+def getVolumeStorage(fileNames, storage=STORAGE_AUTO):
+    '''
+    Resolve storage for slice images. Auto detection decodes the first, middle
+    and last slices and chooses greyscale if all their pixels are grey.
+    :return STORAGE_RGB or STORAGE_GREYSCALE
+    '''
+    if storage != STORAGE_AUTO:
+        return storage
+    width, height = getImageSliceSize(fileNames[0])
+    rgb = numpy.empty((height, width, 3), dtype=numpy.uint8)
+    for fileName in set([fileNames[0], fileNames[len(fileNames)//2], fileNames[-1]]):
+        decodeImageSlice(fileName, rgb)
+        if not isGreyscaleImage(rgb):
+            return STORAGE_RGB
+    return STORAGE_GREYSCALE
+
+def getVolumeShapeAndType(fileNames, storage, bitsPerComponent=None):
+    '''
+    :param storage: STORAGE_RGB or STORAGE_GREYSCALE
+    :param bitsPerComponent: 8, 16 or None to match slice images; 16 is only
+    supported for greyscale.
+    :return shape, numpy dtype of volume array for slice images.
+    '''
+    width, height = getImageSliceSize(fileNames[0])
+    if storage == STORAGE_GREYSCALE:
+        bitsPerComponent = getVolumeBitsPerComponent(fileNames, bitsPerComponent)
+        return (len(fileNames), height, width), (numpy.uint16 if (bitsPerComponent == 16) else numpy.uint8)
+    if bitsPerComponent not in (None, 8):
+        raise ValueError("RGB volumes only support 8 bits per component")
+    return (len(fileNames), height, width, 3), numpy.uint8
+
+def decodeImageSlices(fileNames, out=None, numberOfWorkers=None, storage=STORAGE_RGB, bitsPerComponent=None):
+    '''
+    Decode slice images concurrently into one contiguous array.
+    :param out: Optional preallocated array with shape and type from
+    getVolumeShapeAndType, e.g. a writable numpy.memmap.
+    :param numberOfWorkers: Number of decoding threads, default CPU count.
+    :param storage: STORAGE_RGB or STORAGE_GREYSCALE, used if out not supplied.
+    :return array(slices, height, width, 3) for RGB or array(slices, height,
+    width) for greyscale.
+    '''
+    if out is None:
+        shape, dtype = getVolumeShapeAndType(fileNames, storage, bitsPerComponent)
+        out = numpy.empty(shape, dtype=dtype)
+    if numberOfWorkers is None:
+        numberOfWorkers = os.cpu_count() or 1
+    with ThreadPoolExecutor(max_workers=numberOfWorkers) as executor:
+        futures = [executor.submit(decodeImageSlice, fileName, out[i]) for i, fileName in enumerate(fileNames)]
+        for future in futures:
+            # re-raises any decoding error
+            future.result()
+    return out
+
+def _getSourceSignature(fileNames):
+    '''
+    :return list of [name, size, modification time] for validating caches.
+    '''
+    signature = []
+    for fileName in fileNames:
+        status = os.stat(fileName)
+        signature.append([os.path.abspath(fileName), status.st_size, int(status.st_mtime)])
+    return signature
+
+def readVolumeCache(cacheFileName, fileNames, storage=STORAGE_AUTO, bitsPerComponent=None):
+    '''
+    Open raw volume cache read-only if it exists and matches the source
+    files and requested storage.
+    :param bitsPerComponent: 8, 16 or None to match slice images.
+    :return numpy.memmap of volume, or None if no valid cache.
+    '''
+    headerFileName = cacheFileName + ".json"
+    if not (os.path.isfile(cacheFileName) and os.path.isfile(headerFileName)):
+        return None
+    try:
+        with open(headerFileName, "r") as headerFile:
+            header = json.load(headerFile)
+        if (header["version"] != _CACHE_VERSION) or (header["sources"] != _getSourceSignature(fileNames)):
+            return None
+        if ((storage != STORAGE_AUTO) and (header["storage"] != storage)) or \
+                ((header["storage"] == STORAGE_GREYSCALE) and
+                    (header["bitsPerComponent"] != getVolumeBitsPerComponent(fileNames, bitsPerComponent))):
+            return None
+        return numpy.memmap(cacheFileName, dtype=numpy.dtype(header["dtype"]), mode="r", shape=tuple(header["shape"]))
+    except (OSError, IOError, ValueError, KeyError):
+        return None
+
+def writeVolumeCacheHeader(cacheFileName, fileNames, volume):
+    '''
+    Write header describing raw volume data in cacheFileName.
+    '''
+    header = {
+        "version": _CACHE_VERSION,
+        "storage": STORAGE_GREYSCALE if (volume.ndim == 3) else STORAGE_RGB,
+        "bitsPerComponent": 8*volume.dtype.itemsize,
+        "dtype": volume.dtype.str,
+        "shape": list(volume.shape),
+        "sources": _getSourceSignature(fileNames)
+    }
+    with open(cacheFileName + ".json", "w") as headerFile:
+        json.dump(header, headerFile)
+
+def _writeVolumeCache(cacheFileName, fileNames, shape, dtype, fill):
+    '''
+    Create raw volume cache, calling fill(volume) to write data into a
+    writable memory map, then reopen it read-only.
+    :return numpy.memmap of volume
+    '''
+    temporaryFileName = cacheFileName + ".tmp"
+    volume = numpy.memmap(temporaryFileName, dtype=dtype, mode="w+", shape=shape)
+    try:
+        fill(volume)
+        volume.flush()
+    except:
+        del volume
+        os.remove(temporaryFileName)
+        raise
+    # replace atomically so an interrupted load never leaves a partial cache
+    os.replace(temporaryFileName, cacheFileName)
+    writeVolumeCacheHeader(cacheFileName, fileNames, volume)
+    del volume
+    return numpy.memmap(cacheFileName, dtype=dtype, mode="r", shape=shape)
+
+def loadImageVolume(fileNames, cacheFileName=None, numberOfWorkers=None, storage=STORAGE_AUTO, bitsPerComponent=None):
+    '''
+    Load a stack of slice images into an array(slices, height, width, 3)
+    of uint8 RGB values, or array(slices, height, width) for greyscale.
+    If cacheFileName is given, a valid raw cache is memory-mapped instead
+    of decoding; otherwise slices are decoded straight into a new cache
+    file which is used on the next load.
+    :param fileNames: Slice image files in order of increasing depth.
+    :param storage: STORAGE_AUTO to detect greyscale images, or force
+    STORAGE_RGB or STORAGE_GREYSCALE, converting colour to luminance.
+    :param bitsPerComponent: 8, 16 or None to match slice images. 16 is
+    only supported for greyscale storage of images with 16-bit samples.
+    :return volume array
+    '''
+    if cacheFileName:
+        volume = readVolumeCache(cacheFileName, fileNames, storage, bitsPerComponent)
+        if volume is not None:
+            return volume
+    storage = getVolumeStorage(fileNames, storage)
+    shape, dtype = getVolumeShapeAndType(fileNames, storage, bitsPerComponent)
+    if cacheFileName:
+        def fill(volume):
+            decodeImageSlices(fileNames, volume, numberOfWorkers)
+        return _writeVolumeCache(cacheFileName, fileNames, shape, dtype, fill)
+    return decodeImageSlices(fileNames, numberOfWorkers=numberOfWorkers, storage=storage, bitsPerComponent=bitsPerComponent)
+
+def ZincFieldImage_readVolume(imageField, volume):
+    '''
+    Transfer volume to image field as raw memory buffers, one per slice,
+    without re-encoding. The pixel format, and hence texture format, is
+    luminance for greyscale volumes and RGB otherwise.
+    :param volume: array(slices, height, width, 3) of uint8 RGB, or
+    array(slices, height, width) of uint8 or uint16 greyscale values.
+    :return RESULT_OK on success
+    '''
+    depth, height, width = volume.shape[:3]
+    if volume.ndim == 3:
+        pixelFormat = StreaminformationImage.PIXEL_FORMAT_LUMINANCE
+    else:
+        pixelFormat = StreaminformationImage.PIXEL_FORMAT_RGB
+    streaminformation = imageField.createStreaminformationImage()
+    streaminformation.setAttributeInteger(StreaminformationImage.ATTRIBUTE_RAW_WIDTH_PIXELS, width)
+    streaminformation.setAttributeInteger(StreaminformationImage.ATTRIBUTE_RAW_HEIGHT_PIXELS, height)
+    streaminformation.setAttributeInteger(StreaminformationImage.ATTRIBUTE_BITS_PER_COMPONENT, 8*volume.dtype.itemsize)
+    streaminformation.setPixelFormat(pixelFormat)
+    buffers = [numpy.ascontiguousarray(volume[z]).tobytes() for z in range(depth)]
+    for buffer in buffers:
+        streaminformation.createStreamresourceMemoryBuffer(buffer)
+    # buffers must stay alive until read completes
+    return imageField.read(streaminformation)
+
+def getDownsampledShape(shape):
+    '''
+    :return shape of volume with slices, height and width halved, rounding up.
+    '''
+    return tuple((size + 1)//2 for size in shape[:3]) + tuple(shape[3:])
+
+def downsampleVolume(volume, out=None):
+    '''
+    Halve resolution of volume in all three directions by averaging 2x2x2
+    blocks of voxels, repeating the last voxel where a size is odd. Works
+    through the volume two slices at a time so memory-mapped volumes larger
+    than memory can be downsampled.
+    :param out: Optional preallocated array of getDownsampledShape(volume.shape).
+    :return downsampled volume with same dtype
+    '''
+    if out is None:
+        out = numpy.empty(getDownsampledShape(volume.shape), dtype=volume.dtype)
+    depth, height, width = volume.shape[:3]
+    for z in range(out.shape[0]):
+        slab = numpy.asarray(volume[2*z:min(2*z + 2, depth)], dtype=numpy.float32)
+        if slab.shape[0] == 1:
+            slab = numpy.concatenate([slab, slab])
+        if height % 2:
+            slab = numpy.concatenate([slab, slab[:, -1:]], axis=1)
+        if width % 2:
+            slab = numpy.concatenate([slab, slab[:, :, -1:]], axis=2)
+        blocks = slab.reshape((2, slab.shape[1]//2, 2, slab.shape[2]//2, 2) + slab.shape[3:])
+        out[z] = numpy.rint(blocks.mean(axis=(0, 2, 4))).astype(volume.dtype)
+    return out
+
+def loadImageVolumePyramid(fileNames, cacheFileName=None, numberOfLevels=4, numberOfWorkers=None, storage=STORAGE_AUTO, bitsPerComponent=None):
+    '''
+    Load slice images as for loadImageVolume, and build a pyramid of
+    successively halved resolution volumes. If cacheFileName is given,
+    each level is cached as a raw file cacheFileName.levelN.
+    :param numberOfLevels: Number of levels including full resolution; the
+    default 4 gives full, half, quarter and eighth resolution.
+    :return list of volume arrays from full to coarsest resolution.
+    '''
+    levels = [loadImageVolume(fileNames, cacheFileName, numberOfWorkers, storage, bitsPerComponent)]
+    storage = STORAGE_GREYSCALE if (levels[0].ndim == 3) else STORAGE_RGB
+    for level in range(1, numberOfLevels):
+        previous = levels[-1]
+        shape = getDownsampledShape(previous.shape)
+        if cacheFileName:
+            levelCacheFileName = cacheFileName + ".level" + str(level)
+            volume = readVolumeCache(levelCacheFileName, fileNames, storage, bitsPerComponent)
+            if (volume is None) or (volume.shape != shape):
+                volume = _writeVolumeCache(levelCacheFileName, fileNames, shape, previous.dtype,
+                    lambda out, previous=previous: downsampleVolume(previous, out))
+        else:
+            volume = downsampleVolume(previous)
+        levels.append(volume)
+    return levels
+
+# registry of volume levels of detail created by model scripts, for the application to control
+_volumeLevelsOfDetail = []
+
+def getVolumeLevelsOfDetail():
+    '''
+    :return list of VolumeLevelOfDetail objects created since last cleared.
+    '''
+    return list(_volumeLevelsOfDetail)
+
+def clearVolumeLevelsOfDetail():
+    '''
+    Stop and forget all registered volume levels of detail, e.g. when the model is cleared.
+    '''
+    for volumeLevelOfDetail in _volumeLevelsOfDetail:
+        volumeLevelOfDetail.stop()
+    del _volumeLevelsOfDetail[:]
+
+class VolumeLevelOfDetail(QtCore.QObject):
+    '''
+    Switches an image field between levels of a volume pyramid. A coarse
+    level is used while the user is editing, and full resolution is
+    restored on demand or once editing has been idle for a while. Because
+    the image field is re-read in place and its texture coordinate sizes
+    are unchanged, contours, materials and derived fields using it need
+    no changes. Tessellations used by contours of the image are coarsened
+    by the same factor so the number of contour cells follows the voxels;
+    divisions set by the user since the last level change are kept as the
+    new full resolution divisions. The image field must already hold the
+    full resolution volume. Instances register themselves for
+    getVolumeLevelsOfDetail().
+    '''
+
+    def __init__(self, imageField, levels, tessellations=[], interactiveLevel=2, idleDelay=1000, parent=None):
+        '''
+        :param levels: Volume pyramid from loadImageVolumePyramid.
+        :param tessellations: Tessellations to coarsen with the volume.
+        :param interactiveLevel: Pyramid level to use while editing.
+        :param idleDelay: Milliseconds after editing ends before full resolution.
+        '''
+        QtCore.QObject.__init__(self, parent)
+        self._imageField = imageField
+        self._levels = levels
+        # list of [tessellation, full resolution divisions, divisions last set]
+        self._tessellations = []
+        for tessellation in tessellations:
+            result, minimumDivisions = tessellation.getMinimumDivisions(3)
+            self._tessellations.append([tessellation, list(minimumDivisions), list(minimumDivisions)])
+        self._interactiveLevel = min(interactiveLevel, len(levels) - 1)
+        self._level = 0
+        self._idleTimer = QtCore.QTimer(self)
+        self._idleTimer.setSingleShot(True)
+        self._idleTimer.setInterval(idleDelay)
+        self._idleTimer.timeout.connect(self.setFullResolution)
+        _volumeLevelsOfDetail.append(self)
+
+    def getImageField(self):
+        return self._imageField
+
+    def getLevels(self):
+        return self._levels
+
+    def getNumberOfLevels(self):
+        return len(self._levels)
+
+    def getLevel(self):
+        return self._level
+
+    def setLevel(self, level):
+        '''
+        Read volume at level into the image field and scale tessellations.
+        :return RESULT_OK on success
+        '''
+        level = max(0, min(level, len(self._levels) - 1))
+        if level == self._level:
+            return RESULT_OK
+        fieldmodule = self._imageField.getFieldmodule()
+        fieldmodule.beginChange()
+        result = ZincFieldImage_readVolume(self._imageField, self._levels[level])
+        for entry in self._tessellations:
+            tessellation, minimumDivisions, lastDivisions = entry
+            _, currentDivisions = tessellation.getMinimumDivisions(3)
+            if list(currentDivisions) != lastDivisions:
+                # keep user's edits
+                minimumDivisions = list(currentDivisions)
+            lastDivisions = [max(1, divisions >> level) for divisions in minimumDivisions]
+            tessellation.setMinimumDivisions(lastDivisions)
+            entry[1:] = [minimumDivisions, lastDivisions]
+        fieldmodule.endChange()
+        if result == RESULT_OK:
+            self._level = level
+        return result
+
+    def setFullResolution(self):
+        self._idleTimer.stop()
+        return self.setLevel(0)
+
+    def beginInteraction(self):
+        '''
+        Switch to the interactive level while the user is editing.
+        '''
+        self._idleTimer.stop()
+        if self._level < self._interactiveLevel:
+            self.setLevel(self._interactiveLevel)
+
+    def endInteraction(self):
+        '''
+        Return to full resolution after the idle delay unless editing resumes.
+        '''
+        if self._level != 0:
+            self._idleTimer.start()
+
+    def stop(self):
+        self._idleTimer.stop()
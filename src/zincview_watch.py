@@ -0,0 +1,160 @@
+"""
+Watches model resource files for ZincView so new or modified timestep
+files can be re-read into the existing model.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import os
+import re
+from PySide import QtCore
+
+_FORMAT_FIELD = re.compile(r"\{[^{}]*\}")
+
+
+def getTimestepPatternRegex(pattern):
+    '''
+    Convert a file name format pattern with one integer field, as used by
+    model scripts e.g. 'heart{:0>4}.exnode', to a regular expression
+    matching file names and capturing the number.
+    '''
+    fields = _FORMAT_FIELD.findall(pattern)
+    if len(fields) != 1:
+        raise ValueError("Timestep pattern must have exactly one {} field: " + pattern)
+    prefix, suffix = _FORMAT_FIELD.split(pattern)
+    return re.compile(re.escape(prefix) + r"(\d+)" + re.escape(suffix) + "$")
+
+
+def _getFileState(fileName):
+    '''
+    :return (modification time, size) of file, or None if it does not exist.
+    '''
+    try:
+        stat = os.stat(fileName)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+class ModelWatcher(QtCore.QObject):
+    '''
+    Monitors individual files and directories of numbered timestep files,
+    emitting filesChanged with the files that are new or modified since the
+    watch started or was last reported. A changed file is only reported
+    once its size and modification time are the same in two consecutive
+    scans, so files still being written by a solver are not read early.
+    Directory notifications are used where the platform provides them, with
+    periodic polling as a fallback.
+    '''
+
+    # list of (fileName, time) with time None for files without a time
+    filesChanged = QtCore.Signal(list)
+
+    def __init__(self, parent=None, settleInterval=500, pollInterval=2000):
+        '''
+        :param settleInterval: Milliseconds between scans while files are changing.
+        :param pollInterval: Milliseconds between scans otherwise.
+        '''
+        QtCore.QObject.__init__(self, parent)
+        self._files = {}
+        self._timestepPatterns = []
+        self._fileStates = {}
+        self._pendingStates = {}
+        self._fileSystemWatcher = QtCore.QFileSystemWatcher(self)
+        self._fileSystemWatcher.directoryChanged.connect(self._notified)
+        self._fileSystemWatcher.fileChanged.connect(self._notified)
+        self._settleTimer = QtCore.QTimer(self)
+        self._settleTimer.setSingleShot(True)
+        self._settleTimer.setInterval(settleInterval)
+        self._settleTimer.timeout.connect(self.scan)
+        self._pollTimer = QtCore.QTimer(self)
+        self._pollTimer.setInterval(pollInterval)
+        self._pollTimer.timeout.connect(self.scan)
+
+    def addFile(self, fileName, time=None):
+        '''
+        Watch a single file, re-read at time if not None.
+        '''
+        self._files[os.path.abspath(fileName)] = time
+
+    def addTimestepPattern(self, directory, pattern, timeScale=1.0, timeOffset=0.0):
+        '''
+        Watch all files in directory matching pattern with one integer field,
+        e.g. 'heart{:0>4}.exnode', read at time = number*timeScale + timeOffset.
+        '''
+        self._timestepPatterns.append((os.path.abspath(directory), getTimestepPatternRegex(pattern), timeScale, timeOffset))
+
+    def isActive(self):
+        return self._pollTimer.isActive()
+
+    def start(self):
+        '''
+        Start watching. Files present now are assumed to be loaded already.
+        '''
+        self._fileStates = self._getFileStates()
+        self._pendingStates = {}
+        paths = set(os.path.dirname(fileName) for fileName in self._files)
+        paths.update(directory for directory, _, _, _ in self._timestepPatterns)
+        paths.update(fileName for fileName in self._files if os.path.exists(fileName))
+        paths = [path for path in paths if os.path.exists(path)]
+        if paths:
+            self._fileSystemWatcher.addPaths(paths)
+        self._pollTimer.start()
+
+    def stop(self):
+        self._pollTimer.stop()
+        self._settleTimer.stop()
+        paths = self._fileSystemWatcher.directories() + self._fileSystemWatcher.files()
+        if paths:
+            self._fileSystemWatcher.removePaths(paths)
+        self._pendingStates = {}
+
+    def _getFileStates(self):
+        '''
+        :return dict fileName -> (time, file state) for all watched files that exist.
+        '''
+        fileStates = {}
+        for fileName, time in self._files.items():
+            state = _getFileState(fileName)
+            if state is not None:
+                fileStates[fileName] = (time, state)
+        for directory, regex, timeScale, timeOffset in self._timestepPatterns:
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                match = regex.match(entry.name)
+                if match and entry.is_file():
+                    stat = entry.stat()
+                    fileStates[entry.path] = (int(match.group(1))*timeScale + timeOffset, (stat.st_mtime_ns, stat.st_size))
+        return fileStates
+
+    def _notified(self, path):
+        if not self._settleTimer.isActive():
+            self._settleTimer.start()
+
+    def scan(self):
+        '''
+        Compare watched files with their last reported state, emitting
+        filesChanged for changed files that have stopped changing.
+        '''
+        changes = []
+        for fileName, (time, state) in self._getFileStates().items():
+            reported = self._fileStates.get(fileName)
+            if (reported is not None) and (reported[1] == state):
+                self._pendingStates.pop(fileName, None)
+                continue
+            if self._pendingStates.get(fileName) == state:
+                del self._pendingStates[fileName]
+                self._fileStates[fileName] = (time, state)
+                changes.append((fileName, time))
+            else:
+                self._pendingStates[fileName] = state
+        if self._pendingStates:
+            self._settleTimer.start()
+        if changes:
+            changes.sort(key=lambda change: (change[1] is not None, change[1], change[0]))
+            self.filesChanged.emit(changes)
@@ -0,0 +1,22 @@
+"""
+Test configuration for ZincView: modules are imported from src.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+
+@pytest.fixture
+def application():
+    '''
+    Qt application for signals, timers and widgets; one serves all tests.
+    '''
+    QtGui = pytest.importorskip("PySide.QtGui")
+    return QtGui.QApplication.instance() or QtGui.QApplication([])
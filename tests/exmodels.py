@@ -0,0 +1,75 @@
+"""
+Helpers defining test meshes by reading EX format text, which all
+versions of Zinc can read.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+# shape and linear basis by dimension and whether simplex
+_SHAPES = {
+    (2, False): ("line*line", "l.Lagrange*l.Lagrange", 4),
+    (3, False): ("line*line*line", "l.Lagrange*l.Lagrange*l.Lagrange", 8),
+    (2, True): ("simplex(2)*simplex", "l.simplex(2)*l.simplex", 3),
+    (3, True): ("simplex(2;3)*simplex*simplex", "l.simplex(2;3)*l.simplex*l.simplex", 4)
+}
+
+
+def getNodesText(fields, nodes, groupName="test"):
+    '''
+    Get EX text defining nodes with field values and no derivatives. A field
+    named coordinates is a coordinate field with components x, y, z.
+    :param fields: List of (name, number of components).
+    :param nodes: List of (node identifier, values of all field components).
+    '''
+    lines = [" Group name: %s" % groupName, " #Fields=%d" % len(fields)]
+    valueIndex = 1
+    for f, (name, numberOfComponents) in enumerate(fields):
+        lines.append(" %d) %s, %s, rectangular cartesian, #Components=%d" %
+            (f + 1, name, "coordinate" if (name == "coordinates") else "field", numberOfComponents))
+        for c in range(numberOfComponents):
+            componentName = "xyz"[c] if (name == "coordinates") else str(c + 1)
+            lines.append("   %s.  Value index=%d, #Derivatives=0" % (componentName, valueIndex))
+            valueIndex += 1
+    for identifier, values in nodes:
+        lines.append(" Node:            %d" % identifier)
+        lines.append("   " + " ".join("%.17g" % value for value in values))
+    return "\n".join(lines) + "\n"
+
+
+def getElementsText(dimension, simplex, fields, elements):
+    '''
+    Get EX text defining linear elements interpolating node fields, which
+    must already be defined at the nodes.
+    :param fields: List of (name, number of components); the first is coordinates.
+    :param elements: List of (element identifier, node identifiers).
+    '''
+    shape, basis, numberOfNodes = _SHAPES[(dimension, simplex)]
+    lines = [" Group name: test", " Shape.  Dimension=%d, %s" % (dimension, shape), " #Scale factor sets= 0",
+        " #Nodes= %d" % numberOfNodes, " #Fields=%d" % len(fields)]
+    for f, (name, numberOfComponents) in enumerate(fields):
+        lines.append(" %d) %s, %s, rectangular cartesian, #Components=%d" %
+            (f + 1, name, "coordinate" if (f == 0) else "field", numberOfComponents))
+        for c in range(numberOfComponents):
+            lines.append("   %d.  %s, no modify, standard node based." % (c + 1, basis))
+            lines.append("     #Nodes= %d" % numberOfNodes)
+            for n in range(numberOfNodes):
+                lines.append("      %d.  #Values=1" % (n + 1))
+                lines.append("       Value indices:     1")
+                lines.append("       Scale factor indices:   0")
+    for identifier, nodeIdentifiers in elements:
+        lines.append(" Element:            %d 0 0" % identifier)
+        lines.append("   Nodes:")
+        lines.append("     " + " ".join(str(nodeIdentifier) for nodeIdentifier in nodeIdentifiers))
+    return "\n".join(lines) + "\n"
+
+
+def readText(region, text):
+    '''
+    Read EX text into region.
+    :return Zinc result
+    '''
+    streaminformation = region.createStreaminformationRegion()
+    streaminformation.createStreamresourceMemoryBuffer(text)
+    return region.read(streaminformation)
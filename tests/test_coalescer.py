@@ -0,0 +1,91 @@
+"""
+Tests for coalescing widget-driven setting changes into single rebuilds.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import pytest
+
+pytest.importorskip("PySide")
+pytest.importorskip("opencmiss.zinc")
+pytest.importorskip("opencmiss.zincwidgets")
+from zincview import ChangeCoalescer
+
+
+class _Module(object):
+
+    def __init__(self, log):
+        self._log = log
+
+    def beginChange(self):
+        self._log.append("begin")
+
+    def endChange(self):
+        self._log.append("end")
+
+
+def test_superseded_changes_are_dropped_and_applied_in_one_rebuild(application):
+    log = []
+    module = _Module(log)
+    coalescer = ChangeCoalescer()
+    for position in range(5):
+        coalescer.addChange("time", lambda position=position: log.append(("time", position)), [module])
+    coalescer.addChange("tessellation", lambda: log.append("tessellation"), [module])
+    assert coalescer.hasPendingChanges()
+    coalescer.flush()
+    assert log == ["begin", ("time", 4), "tessellation", "end"]
+    assert coalescer.getRebuildCount() == 1
+    assert coalescer.getChangeCount() == 6
+    assert not coalescer.hasPendingChanges()
+    coalescer.flush()
+    assert coalescer.getRebuildCount() == 1
+
+
+def test_modules_are_ended_when_a_change_fails(application):
+    log = []
+    coalescer = ChangeCoalescer()
+
+    def fail():
+        raise ValueError("bad value")
+
+    coalescer.addChange("bad", fail, [_Module(log)])
+    with pytest.raises(ValueError):
+        coalescer.flush()
+    assert log == ["begin", "end"]
+
+
+def test_change_added_reports_key(application):
+    coalescer = ChangeCoalescer()
+    keys = []
+    coalescer.changeAdded.connect(keys.append)
+    coalescer.addChange("spectrum_minimum", lambda: None, [])
+    coalescer.addChange("tessellation_minimum_divisions", lambda: None, [])
+    assert keys == ["spectrum_minimum", "tessellation_minimum_divisions"]
+
+
+def test_each_region_module_is_begun_once(application):
+    from opencmiss.zinc.context import Context
+    context = Context("test")
+    rootRegion = context.getDefaultRegion()
+    # like scenes, there is a field module per region
+    fieldmodules = [rootRegion.createChild(name).getFieldmodule() for name in ("a", "b")]
+    notified = []
+    fieldmodulenotifiers = []
+    for fieldmodule in fieldmodules:
+        fieldmodulenotifier = fieldmodule.createFieldmodulenotifier()
+        fieldmodulenotifier.setCallback(lambda event, name=fieldmodule.getRegion().getName(): notified.append(name))
+        fieldmodulenotifiers.append(fieldmodulenotifier)
+    notifiedDuringChanges = []
+    coalescer = ChangeCoalescer()
+    for fieldmodule in fieldmodules:
+        coalescer.addChange(fieldmodule.getRegion().getName(),
+            lambda fieldmodule=fieldmodule: fieldmodule.createFieldConstant([1.0]).setManaged(True), [fieldmodule])
+    # another handle to the first field module is the same module
+    coalescer.addChange("again", lambda: notifiedDuringChanges.extend(notified),
+        [rootRegion.findChild("a").getFieldmodule()])
+    coalescer.flush()
+    # both field modules were changing until all changes were applied
+    assert notifiedDuringChanges == []
+    assert notified == ["b", "a"]
@@ -0,0 +1,82 @@
+"""
+Tests for load-time decimation of timestep file series.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import numpy
+import pytest
+from exmodels import getNodesText
+from zincview_decimate import decimateTimesteps, getDefaultDecimation, readExnodeValues, selectChangedSteps, \
+    selectEvenlySpaced, selectEveryNth, setDefaultDecimation, ZincRegion_readTimesteps
+
+
+@pytest.fixture
+def series(tmp_path):
+    # u changes by 0.01 per step for 5 steps then jumps
+    steps = [[0.0, 1.0], [0.01, 1.0], [0.02, 1.0], [0.5, 1.0], [0.51, 1.0], [0.52, 2.0]]
+    fileNames = []
+    for i, values in enumerate(steps):
+        fileName = tmp_path / ("u%d.exnode" % i)
+        fileName.write_text(getNodesText([("u", 1)], [(n + 1, [value]) for n, value in enumerate(values)]))
+        fileNames.append(str(fileName))
+    yield fileNames, [0.5*i for i in range(len(steps))]
+    setDefaultDecimation()
+
+
+def test_select_every_nth():
+    assert selectEveryNth(10, 3) == [0, 3, 6, 9]
+    assert selectEveryNth(8, 3) == [0, 3, 6, 7]
+    assert selectEveryNth(3, 0) == [0, 1, 2]
+    assert selectEveryNth(0, 2) == []
+
+
+def test_select_evenly_spaced():
+    assert selectEvenlySpaced([0.0, 1.0, 2.0, 3.0, 4.0], 3) == [0, 2, 4]
+    # uneven times choose the nearest step to each target time
+    assert selectEvenlySpaced([0.0, 0.1, 0.2, 3.0, 4.0], 3) == [0, 3, 4]
+    assert selectEvenlySpaced([0.0, 1.0], 5) == [0, 1]
+    assert selectEvenlySpaced([0.0, 1.0, 2.0], 1) == [0]
+
+
+def test_read_exnode_values(series):
+    fileNames, times = series
+    assert readExnodeValues(fileNames[5]).tolist() == [0.52, 2.0]
+
+
+def test_select_changed_steps(series):
+    fileNames, times = series
+    assert selectChangedSteps(fileNames, 0.015) == [0, 2, 3, 5]
+    assert selectChangedSteps(fileNames, 10.0) == [0, 5]
+    assert selectChangedSteps([], 1.0) == []
+
+
+def test_select_changed_steps_keeps_layout_changes():
+    values = {"a": numpy.zeros(2), "b": numpy.zeros(3), "c": numpy.zeros(3), "d": numpy.zeros(3)}
+    assert selectChangedSteps(["a", "b", "c", "d"], 1.0, values.__getitem__) == [0, 1, 3]
+
+
+def test_decimate_timesteps_combines_options(series):
+    fileNames, times = series
+    steps = decimateTimesteps(fileNames, times, every=2, count=2)
+    assert steps == [(fileNames[0], 0.0), (fileNames[5], 2.5)]
+    assert decimateTimesteps(fileNames, times) == list(zip(fileNames, times))
+
+
+def test_read_timesteps_uses_defaults(series):
+    pytest.importorskip("opencmiss.zinc")
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.result import RESULT_OK
+    fileNames, times = series
+    setDefaultDecimation(every=2)
+    assert getDefaultDecimation() == (2, None, None)
+    region = Context("test").getDefaultRegion()
+    result, readTimes = ZincRegion_readTimesteps(region, fileNames, times)
+    assert result == RESULT_OK
+    assert readTimes == [0.0, 1.0, 2.0, 2.5]
+    # options given override defaults
+    region = Context("test").getDefaultRegion()
+    result, readTimes = ZincRegion_readTimesteps(region, fileNames, times, every=1, tolerance=0.015)
+    assert readTimes == [0.0, 1.0, 1.5, 2.5]
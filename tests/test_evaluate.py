@@ -0,0 +1,175 @@
+"""
+Tests for batched evaluation of fields at nodes and element xi locations,
+and baking of derived fields.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import numpy
+import pytest
+
+pytest.importorskip("PySide")
+pytest.importorskip("opencmiss.zinc")
+pytest.importorskip("opencmiss.zincwidgets")
+from opencmiss.zinc.context import Context
+from opencmiss.zinc.field import Field
+from opencmiss.zinc.node import Node
+from opencmiss.zinc.result import RESULT_OK
+from exmodels import getElementsText, readText
+from zincview import ZincRegion_bakeFieldAtNodes, ZincRegion_bakeFieldsAtElementPoints, \
+    ZincRegion_evaluateFieldAtMeshLocations, ZincRegion_evaluateFieldAtNodes, ZincRegion_evaluateFieldOnElementXiGrid, \
+    ZincScene_replaceGraphicsField, ZincScene_useBakedElementPoints
+
+TIMES = [0.0, 1.0, 2.0]
+
+
+@pytest.fixture
+def region():
+    '''
+    Square element with 4 nodes; time-varying field u = (node x + time, 10*time),
+    undefined at a fifth node.
+    '''
+    context = Context("test")
+    region = context.getDefaultRegion()
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    coordinates = fieldmodule.createFieldFiniteElement(2)
+    coordinates.setName("coordinates")
+    coordinates.setTypeCoordinate(True)
+    coordinates.setManaged(True)
+    u = fieldmodule.createFieldFiniteElement(2)
+    u.setName("u")
+    u.setManaged(True)
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    timesequence = fieldmodule.getMatchingTimesequence(TIMES)
+    nodetemplate = nodes.createNodetemplate()
+    nodetemplate.defineField(coordinates)
+    nodetemplate.defineField(u)
+    nodetemplate.setTimesequence(u, timesequence)
+    fieldcache = fieldmodule.createFieldcache()
+    for n in range(4):
+        x = [float(n % 2), float(n//2)]
+        node = nodes.createNode(n + 1, nodetemplate)
+        fieldcache.setNode(node)
+        coordinates.setNodeParameters(fieldcache, -1, Node.VALUE_LABEL_VALUE, 1, x)
+        for time in TIMES:
+            fieldcache.setTime(time)
+            u.setNodeParameters(fieldcache, -1, Node.VALUE_LABEL_VALUE, 1, [x[0] + time, 10.0*time])
+    nodetemplate = nodes.createNodetemplate()
+    nodetemplate.defineField(coordinates)
+    nodes.createNode(5, nodetemplate)
+    assert readText(region, getElementsText(2, False, [("coordinates", 2), ("u", 2)], [(1, [1, 2, 3, 4])])) == RESULT_OK
+    fieldmodule.endChange()
+    yield region
+
+
+def test_nodes_single_time(region):
+    nodeIdentifiers, values = ZincRegion_evaluateFieldAtNodes(region, "u", 1.0)
+    assert list(nodeIdentifiers) == [1, 2, 3, 4, 5]
+    assert values.shape == (5, 2)
+    assert numpy.allclose(values[:4], [[1.0, 10.0], [2.0, 10.0], [1.0, 10.0], [2.0, 10.0]])
+    assert numpy.all(numpy.isnan(values[4]))
+
+
+def test_nodes_many_times(region):
+    _, values = ZincRegion_evaluateFieldAtNodes(region, "u", TIMES)
+    assert values.shape == (3, 5, 2)
+    for t, time in enumerate(TIMES):
+        assert numpy.allclose(values[t, :4, 0], [time, time + 1.0, time, time + 1.0])
+        assert numpy.allclose(values[t, :4, 1], 10.0*time)
+    assert numpy.all(numpy.isnan(values[:, 4, :]))
+
+
+def test_numpy_times(region):
+    _, values = ZincRegion_evaluateFieldAtNodes(region, "u", numpy.int64(2))
+    assert values.shape == (5, 2)
+    assert values[0, 1] == 20.0
+    _, values = ZincRegion_evaluateFieldAtNodes(region, "u", numpy.array([0, 2], dtype=numpy.int64))
+    assert values.shape == (2, 5, 2)
+    assert numpy.allclose(values[:, 0, 1], [0.0, 20.0])
+
+
+def test_missing_field(region):
+    assert ZincRegion_evaluateFieldAtNodes(region, "v") == (None, None)
+
+
+def test_element_xi_grid(region):
+    elementIdentifiers, values = ZincRegion_evaluateFieldOnElementXiGrid(region, "u", 2, xiDivisions=1, times=TIMES)
+    assert list(elementIdentifiers) == [1]
+    assert values.shape == (3, 1, 4, 2)
+    # xi varies fastest in first direction, so u follows x at the corners
+    for t, time in enumerate(TIMES):
+        assert numpy.allclose(values[t, 0, :, 0], [time, time + 1.0, time, time + 1.0])
+
+
+def test_mesh_locations(region):
+    xi = numpy.array([[0.5, 0.5], [0.25, 1.0], [0.5, 0.5]])
+    values = ZincRegion_evaluateFieldAtMeshLocations(region, "u", 2, [1, 1, 7], xi, times=[0.0, 2.0])
+    assert values.shape == (2, 3, 2)
+    assert numpy.allclose(values[:, 0, 0], [0.5, 2.5])
+    assert numpy.allclose(values[:, 1, 0], [0.25, 2.25])
+    assert numpy.allclose(values[:, 0, 1], [0.0, 20.0])
+    assert numpy.all(numpy.isnan(values[:, 2, :]))
+
+
+def test_mesh_locations_grouped_by_element_keep_order(region):
+    # element 2 reverses xi1 of element 1
+    assert readText(region, getElementsText(2, False, [("coordinates", 2), ("u", 2)], [(2, [2, 1, 4, 3])])) == RESULT_OK
+    elementIdentifiers = numpy.array([2, 1, 7, 2, 1, 2])
+    xi = numpy.array([[0.25, 0.5], [0.25, 0.5], [0.5, 0.5], [1.0, 0.0], [0.75, 0.5], [0.0, 1.0]])
+    values = ZincRegion_evaluateFieldAtMeshLocations(region, "u", 2, elementIdentifiers, xi, times=1.0)
+    assert values.shape == (6, 2)
+    assert numpy.allclose(values[[0, 1, 3, 4, 5], 0], [1.75, 1.25, 1.0, 1.75, 2.0])
+    assert numpy.all(numpy.isnan(values[2]))
+    values = ZincRegion_evaluateFieldAtMeshLocations(region, "u", 2, [], numpy.empty((0, 2)), times=TIMES)
+    assert values.shape == (3, 0, 2)
+
+
+def _createDerivedField(region, name, expression):
+    fieldmodule = region.getFieldmodule()
+    field = expression(fieldmodule)
+    field.setName(name)
+    field.setManaged(True)
+    return field
+
+
+def test_bake_at_nodes_replaces_graphics_field(region):
+    fieldmodule = region.getFieldmodule()
+    u = fieldmodule.findFieldByName("u")
+    doubled = _createDerivedField(region, "doubled", lambda fieldmodule: fieldmodule.createFieldAdd(u, u))
+    scene = region.getScene()
+    points = scene.createGraphicsPoints()
+    points.setFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    points.setDataField(doubled)
+    lines = scene.createGraphicsLines()
+    bakedField = ZincRegion_bakeFieldAtNodes(region, "doubled", TIMES)
+    assert bakedField.getName() == "doubled_baked"
+    _, values = ZincRegion_evaluateFieldAtNodes(region, "doubled_baked", TIMES)
+    assert numpy.allclose(values[:, 1, 1], [0.0, 20.0, 40.0])
+    assert ZincScene_replaceGraphicsField(scene, doubled, bakedField) == 1
+    assert points.getDataField().getName() == "doubled_baked"
+    assert not lines.getDataField().isValid()
+
+
+def test_rebake_at_element_points_replaces(region):
+    fieldmodule = region.getFieldmodule()
+    coordinates = fieldmodule.findFieldByName("coordinates")
+    u = fieldmodule.findFieldByName("u")
+    gradient = _createDerivedField(region, "gradient", lambda fieldmodule: fieldmodule.createFieldGradient(u, coordinates))
+    scene = region.getScene()
+    points = scene.createGraphicsPoints()
+    points.setFieldDomainType(Field.DOMAIN_TYPE_MESH_HIGHEST_DIMENSION)
+    points.setDataField(gradient)
+    datapoints = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_DATAPOINTS)
+    bakedFields = ZincRegion_bakeFieldsAtElementPoints(region, ["gradient"], TIMES)
+    assert [field.getName() for field in bakedFields] == ["coordinates_baked", "gradient_baked"]
+    assert datapoints.getSize() == 4
+    bakedFields = ZincRegion_bakeFieldsAtElementPoints(region, ["gradient"], TIMES)
+    assert datapoints.getSize() == 4
+    assert not fieldmodule.findFieldByName("gradient_baked_baked").isValid()
+    assert ZincScene_useBakedElementPoints(scene, gradient, bakedFields[0], bakedFields[1]) == 1
+    assert points.getFieldDomainType() == Field.DOMAIN_TYPE_DATAPOINTS
+    assert points.getCoordinateField().getName() == "coordinates_baked"
+    assert points.getDataField().getName() == "gradient_baked"
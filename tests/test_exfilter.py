@@ -0,0 +1,136 @@
+"""
+Tests for group and bounding box filtered loading of EX files.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import os
+import numpy
+import pytest
+from exmodels import getNodesText
+from zincview_exfilter import buildIndex, getFilteredBuffers, getIndexFileName, KIND_ELEMENT, KIND_NODE, loadIndex, \
+    selectFiltered, ZincRegion_readFiltered
+
+# two squares side by side: nodes 1-3 along y = 0, 4-6 along y = 1
+NODE_COORDINATES = [(0.0, 0.0), (1.0, 0.0), (2.0, 0.0), (0.0, 1.0), (1.0, 1.0), (2.0, 1.0)]
+LINE_NODES = {1: (1, 2), 2: (2, 3), 3: (4, 5), 4: (5, 6), 5: (1, 4), 6: (2, 5), 7: (3, 6)}
+# group name, line identifiers, square identifier, square faces, square nodes
+SQUARES = [("left", (1, 3, 5, 6), 1, (5, 6, 1, 3), (1, 2, 4, 5)), ("right", (2, 4, 7), 2, (6, 7, 2, 4), (2, 3, 5, 6))]
+
+
+def _getElementHeader(shape, basis, numberOfNodes):
+    lines = [" Shape.  Dimension=%d, %s" % (shape.count("line"), shape), " #Scale factor sets= 0",
+        " #Nodes= %d" % numberOfNodes, " #Fields=1", " 1) coordinates, coordinate, rectangular cartesian, #Components=2"]
+    for component in "xy":
+        lines += ["   %s.  %s, no modify, standard node based." % (component, basis), "     #Nodes= %d" % numberOfNodes]
+        for n in range(numberOfNodes):
+            lines += ["      %d.  #Values=1" % (n + 1), "       Value indices:     1", "       Scale factor indices:   0"]
+    return lines
+
+
+def _getElementsText():
+    lines = []
+    for groupName, lineIdentifiers, squareIdentifier, faces, nodes in SQUARES:
+        lines.append(" Group name: " + groupName)
+        lines += _getElementHeader("line", "l.Lagrange", 2)
+        for identifier in lineIdentifiers:
+            lines += [" Element:            0 0 %d" % identifier, "   Nodes:", "     %d %d" % LINE_NODES[identifier]]
+        lines += _getElementHeader("line*line", "l.Lagrange*l.Lagrange", 4)
+        lines += [" Element:            %d 0 0" % squareIdentifier, "   Faces:"]
+        lines += ["     0 0 %d" % face for face in faces]
+        lines += ["   Nodes:", "     " + " ".join(str(node) for node in nodes)]
+    return "\n".join(lines) + "\n"
+
+
+@pytest.fixture
+def fileNames(tmp_path):
+    nodesFileName = tmp_path / "mesh.exnode"
+    nodesFileName.write_text(getNodesText([("coordinates", 2)], list(enumerate(NODE_COORDINATES, 1)), "mesh"))
+    elementsFileName = tmp_path / "mesh.exelem"
+    elementsFileName.write_text(_getElementsText())
+    return [str(nodesFileName), str(elementsFileName)]
+
+
+def _getSelected(fileNames, groupNames=None, boundingBox=None):
+    '''
+    :return sorted node identifiers, and sorted (dimension, identifier) of elements selected.
+    '''
+    indexes = [buildIndex(fileName) for fileName in fileNames]
+    nodes = []
+    elements = []
+    for index, recordIndexes in zip(indexes, selectFiltered(indexes, groupNames, boundingBox)):
+        for kind, dimension, identifier in index.getRecords()[recordIndexes, :3].tolist():
+            if kind == KIND_NODE:
+                nodes.append(identifier)
+            else:
+                elements.append((dimension, identifier))
+    return sorted(nodes), sorted(elements)
+
+
+def test_build_index(fileNames):
+    nodesIndex = buildIndex(fileNames[0])
+    assert nodesIndex.getNumberOfRecords() == 6
+    assert nodesIndex.getGroupNames() == ["mesh"]
+    # components beyond those of the coordinate field are zero
+    assert nodesIndex.getCoordinates()[4].tolist() == [1.0, 1.0, 0.0]
+    elementsIndex = buildIndex(fileNames[1])
+    records = elementsIndex.getRecords()
+    assert elementsIndex.getGroupNames() == ["left", "right"]
+    assert records[:, 0].tolist() == [KIND_ELEMENT]*9
+    assert records[4, 1:3].tolist() == [2, 1]
+    assert elementsIndex.getElementNodes(4).tolist() == [1, 2, 4, 5]
+    assert elementsIndex.getElementFaces(4).tolist() == [[1, 5], [1, 6], [1, 1], [1, 3]]
+    assert numpy.all(numpy.isnan(elementsIndex.getCoordinates()))
+
+
+def test_index_saved_and_rebuilt_when_file_changes(fileNames):
+    nodesFileName = fileNames[0]
+    index = loadIndex(nodesFileName)
+    assert os.path.exists(getIndexFileName(nodesFileName))
+    assert loadIndex(nodesFileName).getRecords().tolist() == index.getRecords().tolist()
+    with open(nodesFileName, "a") as f:
+        f.write(" Node:            7\n   5 5\n")
+    assert loadIndex(nodesFileName).getNumberOfRecords() == 7
+
+
+def test_select_groups_adds_faces_and_nodes(fileNames):
+    nodes, elements = _getSelected(fileNames, groupNames=["right"])
+    assert nodes == [2, 3, 5, 6]
+    # line 6 is a face of the right square although only in the left group
+    assert elements == [(1, 2), (1, 4), (1, 6), (1, 7), (2, 2)]
+
+
+def test_select_bounding_box(fileNames):
+    # a 2D box around node 3 selects the right square and its dependencies
+    nodes, elements = _getSelected(fileNames, boundingBox=([1.5, -0.5], [2.5, 0.5]))
+    assert nodes == [2, 3, 5, 6]
+    assert elements == [(1, 2), (1, 4), (1, 6), (1, 7), (2, 2)]
+    # with groups, elements in the group using nodes in the box
+    assert _getSelected(fileNames, groupNames=["left"], boundingBox=([0.5, 0.5, -1.0], [1.5, 1.5, 1.0])) == \
+        ([1, 2, 4, 5], [(1, 1), (1, 3), (1, 5), (1, 6), (2, 1)])
+    assert _getSelected(fileNames, groupNames=["left"], boundingBox=([1.5, -0.5], [2.5, 0.5])) == ([], [])
+
+
+def test_filtered_buffers_keep_headers(fileNames):
+    nodesBuffer, elementsBuffer = getFilteredBuffers(fileNames, groupNames=["left"], saveIndex=False)
+    assert nodesBuffer.count(b"Node:") == 4
+    assert elementsBuffer.count(b"Group name: left") == 2
+    assert elementsBuffer.count(b"Group name: right") == 0
+    assert elementsBuffer.count(b"Shape.  Dimension=2") == 1
+    assert not os.path.exists(getIndexFileName(fileNames[0]))
+
+
+def test_read_filtered(fileNames):
+    pytest.importorskip("opencmiss.zinc")
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.field import Field
+    from opencmiss.zinc.result import RESULT_OK
+    context = Context("test")
+    region = context.getDefaultRegion()
+    assert ZincRegion_readFiltered(region, fileNames, groupNames=["right"]) == RESULT_OK
+    fieldmodule = region.getFieldmodule()
+    assert fieldmodule.findMeshByDimension(2).getSize() == 1
+    assert fieldmodule.findMeshByDimension(1).getSize() == 4
+    assert fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES).getSize() == 4
@@ -0,0 +1,141 @@
+"""
+Tests for isosurface extraction from volume arrays and the isosurface engine.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import numpy
+import pytest
+
+pytest.importorskip("PySide")
+pytest.importorskip("opencmiss.zinc")
+from opencmiss.zinc.context import Context
+from opencmiss.zinc.element import Elementtemplate
+from zincview_isosurface import clearIsosurfaceEngines, extractIsosurface, getBrickRanges, IsosurfaceEngine, \
+    ZincRegion_defineTriangleMesh
+
+
+# surface meshes are defined with the simple nodal element template API
+needsSimpleNodal = pytest.mark.skipif(not hasattr(Elementtemplate, "setNumberOfNodes"),
+    reason="Zinc element template has no simple nodal field definition")
+
+
+def _getSphereVolume(size=16, radius=5.0):
+    '''
+    :return float32 array(size, size, size) of distance of voxel centres from volume centre.
+    '''
+    axis = numpy.arange(size, dtype=numpy.float32) + 0.5
+    z, y, x = numpy.meshgrid(axis, axis, axis, indexing='ij')
+    centre = 0.5*size
+    return numpy.sqrt((x - centre)**2 + (y - centre)**2 + (z - centre)**2)
+
+
+def _getEdgeUseCounts(triangles):
+    edges = numpy.sort(numpy.concatenate([triangles[:, [0, 1]], triangles[:, [1, 2]], triangles[:, [2, 0]]]), axis=1)
+    _, counts = numpy.unique(edges, axis=0, return_counts=True)
+    return counts
+
+
+def test_sphere_is_closed_and_outward():
+    values = -_getSphereVolume()
+    vertices, triangles = extractIsosurface(values, -5.0, flipY=False, numberOfWorkers=3)
+    assert triangles.shape[0] > 100
+    radii = numpy.linalg.norm(vertices - 8.0, axis=1)
+    assert numpy.all(numpy.abs(radii - 5.0) < 0.2)
+    # every edge shared by exactly two triangles
+    assert numpy.all(_getEdgeUseCounts(triangles) == 2)
+    # inside is values >= isovalue, i.e. within the sphere, so normals point out
+    p0 = vertices[triangles[:, 0]]
+    normals = numpy.cross(vertices[triangles[:, 1]] - p0, vertices[triangles[:, 2]] - p0)
+    centres = vertices[triangles].mean(axis=1)
+    assert numpy.all(numpy.einsum('ij,ij->i', normals, centres - 8.0) > 0.0)
+
+
+def test_same_surface_for_any_number_of_workers():
+    values = -_getSphereVolume(12, 4.0)
+    vertices1, triangles1 = extractIsosurface(values, -4.0, numberOfWorkers=1)
+    vertices4, triangles4 = extractIsosurface(values, -4.0, numberOfWorkers=4)
+    assert numpy.allclose(numpy.sort(vertices1, axis=0), numpy.sort(vertices4, axis=0))
+    assert triangles1.shape == triangles4.shape
+
+
+def test_brick_ranges():
+    values = numpy.arange(5*6*7, dtype=numpy.float32).reshape(5, 6, 7)
+    minimum, maximum = getBrickRanges(values, brickSize=4)
+    # 4x5x6 cubes in bricks of 4
+    assert minimum.shape == (1, 2, 2)
+    assert minimum[0, 0, 0] == 0.0
+    # bricks include the voxels shared with the next brick
+    assert maximum[0, 0, 0] == values[4, 4, 4]
+    assert minimum[0, 1, 1] == values[0, 4, 4]
+    assert maximum[0, 1, 1] == values[4, 5, 6]
+
+
+def test_brick_size_does_not_change_surface():
+    values = -_getSphereVolume(13, 4.5)
+    vertices1, triangles1 = extractIsosurface(values, -4.5, brickSize=1)
+    vertices8, triangles8 = extractIsosurface(values, -4.5, brickSize=8, brickRanges=getBrickRanges(values, 8))
+    assert numpy.allclose(numpy.sort(vertices1, axis=0), numpy.sort(vertices8, axis=0))
+    assert triangles1.shape == triangles8.shape
+
+
+def test_no_surface():
+    vertices, triangles = extractIsosurface(numpy.zeros((4, 4, 4)), 1.0)
+    assert vertices.shape == (0, 3)
+    assert triangles.shape == (0, 3)
+
+
+@needsSimpleNodal
+def test_define_triangle_mesh():
+    context = Context("test")
+    region = context.getDefaultRegion()
+    vertices = numpy.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [1.0, 1.0, 0.0]])
+    triangles = numpy.array([[0, 1, 2], [1, 3, 2]], dtype=numpy.int32)
+    coordinates = ZincRegion_defineTriangleMesh(region, vertices, triangles)
+    fieldmodule = region.getFieldmodule()
+    assert coordinates.isValid()
+    assert fieldmodule.findNodesetByFieldDomainType(coordinates.DOMAIN_TYPE_NODES).getSize() == 4
+    assert fieldmodule.findMeshByDimension(2).getSize() == 2
+
+
+@pytest.fixture
+def engine():
+    context = Context("test")
+    region = context.getDefaultRegion()
+    levels = [-_getSphereVolume(8, 2.5), -_getSphereVolume(4, 1.25)]
+    engine = IsosurfaceEngine(region, levels, maximumCachedSurfaces=2)
+    engine.defineScalar("inside", lambda volume: volume)
+    yield engine
+    clearIsosurfaceEngines()
+
+
+@needsSimpleNodal
+def test_engine_caches_surfaces(engine):
+    region = engine.getRegion()
+    child = engine.showIsosurface("inside", -2.0)
+    assert engine.hasSurface("inside", -2.0)
+    assert engine.showIsosurface("inside", -2.0).getName() == child.getName()
+    other = engine.showIsosurface("inside", -1.5, level=1)
+    assert not child.getScene().getVisibilityFlag()
+    assert other.getScene().getVisibilityFlag()
+    # least recently used surface and its child region are removed over the limit
+    engine.showIsosurface("inside", -1.0)
+    assert not engine.hasSurface("inside", -2.0)
+    assert not region.findChild(child.getName()).isValid()
+    assert engine.getIsovalue("inside") == -1.0
+
+
+def test_async_results_are_applied_by_caller(engine):
+    future = engine.extractSurfaceAsync("inside", -2.0)
+    vertices, triangles, scalarVolume = future.result()
+    assert triangles.shape[0] > 0
+    # worker does not change the engine
+    assert not engine.hasSurface("inside", -2.0)
+    assert engine._scalarVolumes == {}
+    engine.addSurface("inside", -2.0, 0, vertices, triangles, scalarVolume)
+    assert engine.hasSurface("inside", -2.0)
+    assert engine._scalarVolumes[("inside", 0)] is scalarVolume
+    # next extraction reuses the scalar volume
+    assert engine.extractSurfaceAsync("inside", -1.0).result()[2] is scalarVolume
@@ -0,0 +1,99 @@
+"""
+Tests for live simulation input: message decoding, receiving and setting
+frames of node parameters in regions.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import socket
+import time
+import numpy
+import pytest
+from zincview_live import encodeFrame, encodeLayout, LiveLayout, LiveReceiver, parseAddress
+
+LAYOUT = {"region": "/live", "nodes": [3, 1], "dtype": "<f4",
+    "fields": [{"name": "coordinates", "components": 2, "coordinate": True}, {"name": "u", "components": 1}]}
+
+
+def test_parse_address():
+    assert parseAddress("unix:/tmp/socket") == ("unix", "/tmp/socket")
+    assert parseAddress("tcp:localhost:1234") == ("tcp", "localhost", 1234)
+    assert parseAddress("tcp:1234") == ("tcp", "127.0.0.1", 1234)
+    with pytest.raises(ValueError):
+        parseAddress("udp:1234")
+
+
+def test_layout_decodes_frames():
+    layout = LiveLayout(LAYOUT)
+    assert layout.getNodeIdentifiers().tolist() == [3, 1]
+    assert layout.getFields() == [("coordinates", 2, True), ("u", 1, False)]
+    assert layout.getCoordinateFieldName() == "coordinates"
+    values = numpy.arange(6.0).reshape(2, 3)
+    message = encodeFrame(1.5, values, dtype="<f4")
+    time, decoded = layout.decodeFrame(message[5:])
+    assert time == 1.5
+    assert decoded.tolist() == values.tolist()
+    with pytest.raises(ValueError):
+        layout.decodeFrame(message[5:-4])
+
+
+def test_receiver_queues_layouts_and_frames(tmp_path):
+    address = "unix:" + str(tmp_path / "live.socket")
+    receiver = LiveReceiver(address)
+    receiver.start()
+    try:
+        connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        connection.connect(str(tmp_path / "live.socket"))
+        connection.sendall(encodeLayout(LAYOUT) + encodeFrame(0.5, numpy.ones((2, 3)), dtype="<f4"))
+        connection.close()
+        messages = []
+        for _ in range(100):
+            messages += receiver.takeMessages()
+            if len(messages) == 2:
+                break
+            time.sleep(0.01)
+    finally:
+        receiver.stop()
+    assert [frame is None for _, frame in messages] == [True, False]
+    assert messages[1][1][0] == 0.5
+    assert messages[1][0] is messages[0][0]
+
+
+@pytest.fixture
+def region():
+    pytest.importorskip("PySide")
+    pytest.importorskip("opencmiss.zinc")
+    pytest.importorskip("opencmiss.zincwidgets")
+    from opencmiss.zinc.context import Context
+    context = Context("test")
+    yield context.getDefaultRegion().createSubregion("live")
+
+
+def test_set_node_frames_keeps_earlier_times(region):
+    from zincview import ZincRegion_evaluateFieldAtNodes, ZincRegion_getTimes, ZincRegion_setNodeFrames
+    layout = LiveLayout(LAYOUT)
+    frame0 = numpy.array([[1.0, 2.0, 10.0], [3.0, 4.0, 20.0]])
+    assert ZincRegion_setNodeFrames(region, layout.getFields(), layout.getNodeIdentifiers(), [(0.0, frame0)])
+    coordinates = region.getFieldmodule().findFieldByName("coordinates")
+    assert coordinates.isTypeCoordinate()
+    assert coordinates.getComponentName(2) == "y"
+    # later frames arrive in separate batches
+    assert ZincRegion_setNodeFrames(region, layout.getFields(), layout.getNodeIdentifiers(),
+        [(1.0, frame0 + 1.0), (2.0, frame0 + 2.0)])
+    assert ZincRegion_getTimes(region) == [0.0, 1.0, 2.0]
+    nodeIdentifiers, values = ZincRegion_evaluateFieldAtNodes(region, "u", [0.0, 1.0, 1.5, 2.0])
+    assert nodeIdentifiers.tolist() == [1, 3]
+    assert values[:, :, 0].tolist() == [[20.0, 10.0], [21.0, 11.0], [21.5, 11.5], [22.0, 12.0]]
+    _, values = ZincRegion_evaluateFieldAtNodes(region, "coordinates", 2.0)
+    assert values.tolist() == [[5.0, 6.0], [3.0, 4.0]]
+
+
+def test_set_node_frames_rejects_mismatched_field(region):
+    from zincview import ZincRegion_setNodeFrames
+    fieldmodule = region.getFieldmodule()
+    field = fieldmodule.createFieldConstant([1.0])
+    field.setName("u")
+    field.setManaged(True)
+    assert not ZincRegion_setNodeFrames(region, [("u", 1, False)], [1], [(0.0, numpy.zeros((1, 1)))])
@@ -0,0 +1,93 @@
+"""
+Tests for reading region manifests with resources read concurrently.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import gzip
+import json
+import os
+import pytest
+
+pytest.importorskip("opencmiss.zinc")
+from opencmiss.zinc.context import Context
+from opencmiss.zinc.field import Field
+from exmodels import getNodesText
+from zincview_manifest import isManifestFileName, readManifest, ZincRegion_readManifest
+
+
+@pytest.fixture
+def context():
+    yield Context("test")
+
+
+def _getNodesCount(region):
+    return region.getFieldmodule().findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES).getSize()
+
+
+def _writeManifest(directory, regions):
+    fileName = str(directory / "model.zvmanifest")
+    with open(fileName, "w") as f:
+        json.dump({"regions": regions}, f)
+    return fileName
+
+
+def test_read_manifest(tmp_path):
+    assert isManifestFileName("model.zvmanifest")
+    assert not isManifestFileName("model.zvmanifest.exnode")
+    fileName = _writeManifest(tmp_path, [
+        {"path": "heart", "resources": ["heart.exnode"]},
+        {"path": "lungs/left", "resources": [{"file": "left1.exnode.gz", "time": 1.0}, "left.exelem"]}])
+    directory = str(tmp_path)
+    assert readManifest(fileName) == [
+        ("heart", [(os.path.join(directory, "heart.exnode"), None)]),
+        ("lungs/left", [(os.path.join(directory, "left1.exnode.gz"), 1.0), (os.path.join(directory, "left.exelem"), None)])]
+    # contents already read are not read again
+    assert readManifest(os.path.join(directory, "other.zvmanifest"),
+        json.dumps({"regions": []}).encode("utf-8")) == []
+
+
+def test_read_regions_from_manifest(context, tmp_path):
+    (tmp_path / "heart.exnode").write_text(getNodesText([("pressure", 1)], [(1, [1.0]), (2, [1.0]), (3, [1.0])]))
+    with gzip.open(str(tmp_path / "left0.exnode.gz"), "wb") as f:
+        f.write(getNodesText([("volume", 1)], [(1, [2.0]), (2, [2.0])]).encode("utf-8"))
+    with gzip.open(str(tmp_path / "left1.exnode.gz"), "wb") as f:
+        f.write(getNodesText([("volume", 1)], [(1, [3.0]), (2, [3.0])]).encode("utf-8"))
+    (tmp_path / "right.exnode").write_text(getNodesText([("volume", 1)], [(5, [4.0])]))
+    manifest = readManifest(_writeManifest(tmp_path, [
+        {"path": "heart", "resources": ["heart.exnode"]},
+        {"path": "lungs", "resources": []},
+        {"path": "lungs/left", "resources": [
+            {"file": "left0.exnode.gz", "time": 0.0}, {"file": "left1.exnode.gz", "time": 1.0}]},
+        {"path": "lungs/right", "resources": ["right.exnode"]}]))
+    rootRegion = context.getDefaultRegion()
+    # few workers and pending regions so reads are queued behind parsing
+    assert ZincRegion_readManifest(rootRegion, manifest, numberOfWorkers=2, maximumPending=2) == []
+    assert _getNodesCount(rootRegion.findSubregionAtPath("heart")) == 3
+    assert rootRegion.findSubregionAtPath("lungs").isValid()
+    leftRegion = rootRegion.findSubregionAtPath("lungs/left")
+    assert _getNodesCount(leftRegion) == 2
+    fieldmodule = leftRegion.getFieldmodule()
+    fieldcache = fieldmodule.createFieldcache()
+    fieldcache.setNode(fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES).findNodeByIdentifier(1))
+    fieldcache.setTime(1.0)
+    assert fieldmodule.findFieldByName("volume").evaluateReal(fieldcache, 1)[1] == 3.0
+    assert _getNodesCount(rootRegion.findSubregionAtPath("lungs/right")) == 1
+
+
+def test_manifest_merges_existing_and_reports_failures(context, tmp_path):
+    rootRegion = context.getDefaultRegion()
+    heartRegion = rootRegion.createChild("heart")
+    (tmp_path / "more.exnode").write_text(getNodesText([("pressure", 1)], [(4, [1.0]), (5, [1.0])]))
+    (tmp_path / "bad.exnode").write_text("not an EX file\n")
+    manifest = readManifest(_writeManifest(tmp_path, [
+        {"path": "heart", "resources": ["more.exnode"]},
+        {"path": "missing", "resources": ["missing.exnode"]},
+        {"path": "bad", "resources": ["bad.exnode"]}]))
+    assert ZincRegion_readManifest(rootRegion, manifest, numberOfWorkers=1) == ["missing", "bad"]
+    assert rootRegion.findSubregionAtPath("heart") == heartRegion
+    assert _getNodesCount(heartRegion) == 2
+    assert not rootRegion.findSubregionAtPath("missing").isValid()
+    assert not rootRegion.findSubregionAtPath("bad").isValid()
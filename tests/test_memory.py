@@ -0,0 +1,108 @@
+"""
+Tests for memory usage estimates and warnings.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import pytest
+
+pytest.importorskip("PySide")
+pytest.importorskip("opencmiss.zinc")
+from opencmiss.zinc.context import Context
+from exmodels import getNodesText, readText
+from zincview_memory import formatBytes, RegionMemoryAccountant, ZincRegion_estimateNodeBytes
+
+
+@pytest.fixture
+def context():
+    yield Context("test")
+
+
+def _getNodes(count):
+    return [(identifier, [identifier, 0.0, 0.0]) for identifier in range(1, count + 1)]
+
+
+def test_format_bytes():
+    assert formatBytes(None) == ""
+    assert formatBytes(100) == "100 B"
+    assert formatBytes(2048) == "2 KB"
+    assert formatBytes(3*1048576) == "3 MB"
+    assert formatBytes(1.5*1073741824) == "1.5 GB"
+
+
+def test_node_bytes_grow_with_nodes(context):
+    region = context.getDefaultRegion()
+    assert ZincRegion_estimateNodeBytes(region) == 0
+    readText(region, getNodesText([("coordinates", 3)], _getNodes(10)))
+    smallBytes = ZincRegion_estimateNodeBytes(region)
+    assert smallBytes > 0
+    readText(region, getNodesText([("coordinates", 3)], _getNodes(100)))
+    assert ZincRegion_estimateNodeBytes(region) > smallBytes
+
+
+def test_accountant_warns_once_above_threshold(application, context):
+    rootRegion = context.getDefaultRegion()
+    childRegion = rootRegion.createChild("child")
+    readText(childRegion, getNodesText([("coordinates", 3)], _getNodes(50)))
+    accountant = RegionMemoryAccountant()
+    accountant.setRootRegion(rootRegion)
+    warnings = []
+    accountant.warning.connect(warnings.append)
+    assert accountant.refresh(timeBudget=10.0)
+    assert len(accountant.getUsages()) == 2
+    childBytes = accountant.getUsages()[1][1].getTotalBytes()
+    assert childBytes > 0
+    assert warnings == []
+    accountant.setWarningThresholds(None, childBytes - 1)
+    assert accountant.refresh(timeBudget=10.0)
+    assert len(warnings) == 1
+    assert "child" in warnings[0]
+    # no repeat while still above the threshold
+    assert accountant.refresh(timeBudget=10.0)
+    assert len(warnings) == 1
+    accountant.setWarningThresholds(childBytes - 1, None)
+    assert accountant.refresh(timeBudget=10.0)
+    assert len(warnings) == 2
+    assert "model memory" in warnings[1]
+
+
+def test_memory_warning_shown_in_status_bar():
+    pytest.importorskip("opencmiss.zincwidgets")
+    from zincview import ZincView
+
+    class StatusBar(object):
+
+        def __init__(self):
+            self.messages = []
+
+        def showMessage(self, message):
+            self.messages.append(message)
+
+    class Dock(object):
+        shown = False
+
+        def show(self):
+            self.shown = True
+
+    class View(object):
+        '''
+        ZincView method reporting memory warnings with the widgets it uses.
+        '''
+        _memoryWarning = ZincView._memoryWarning
+
+        def __init__(self):
+            self._statusBar = StatusBar()
+            self._dock = Dock()
+
+        def statusBar(self):
+            return self._statusBar
+
+        def _getMemoryDock(self):
+            return self._dock
+
+    view = View()
+    view._memoryWarning("Estimated memory of region /child 2 MB is above warning threshold 1 MB")
+    assert view._statusBar.messages == ["Estimated memory of region /child 2 MB is above warning threshold 1 MB"]
+    assert view._dock.shown
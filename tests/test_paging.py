@@ -0,0 +1,88 @@
+"""
+Tests for choosing hidden region subtrees to page out.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import os
+import pytest
+
+pytest.importorskip("PySide")
+from zincview_paging import RegionPager
+
+
+class Clock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def _getStates(visiblePaths=(), pinnedPaths=()):
+    return [(path, path in visiblePaths, path in pinnedPaths, size) for path, size in
+        [("/", 10), ("/a", 100), ("/a/b", 1000), ("/c", 200)]]
+
+
+def test_idle_subtrees_paged_out_from_outermost(clock):
+    pager = RegionPager(idleTime=60.0, clock=clock)
+    assert pager.update(_getStates(visiblePaths=("/a/b", "/c"))) == []
+    clock.now = 30.0
+    # a visible child keeps its ancestors from being paged out
+    assert pager.update(_getStates(visiblePaths=("/a/b", "/c"))) == []
+    clock.now = 60.0
+    assert pager.update(_getStates(visiblePaths=("/c",))) == []
+    clock.now = 90.0
+    # /a is paged out as a whole subtree once /a/b is idle long enough
+    assert pager.update(_getStates(visiblePaths=("/c",))) == ["/a"]
+    assert pager.getSubtreeBytes("/a") == 1100
+
+
+def test_pinned_never_paged_out(clock):
+    pager = RegionPager(idleTime=10.0, clock=clock)
+    pager.update(_getStates())
+    clock.now = 20.0
+    assert pager.update(_getStates(pinnedPaths=("/a/b",))) == ["/c"]
+    assert pager.update(_getStates(pinnedPaths=("/a",))) == ["/c"]
+
+
+def test_memory_ceiling_pages_least_recently_visible(clock):
+    pager = RegionPager(idleTime=1000.0, memoryCeiling=1200, clock=clock)
+    pager.update(_getStates(visiblePaths=("/a", "/c")))
+    clock.now = 5.0
+    pager.update(_getStates(visiblePaths=("/c",)))
+    clock.now = 6.0
+    # total 1310 above 1200: /a hidden longest, paging it is enough
+    assert pager.update(_getStates()) == ["/a"]
+    assert pager.getResidentBytes() == 1310
+
+
+def test_paged_out_and_in(clock):
+    pager = RegionPager(idleTime=10.0, clock=clock)
+    pager.update(_getStates())
+    fileName = pager.getNewCacheFileName()
+    with open(fileName, "w") as pageFile:
+        pageFile.write("page")
+    pager.setPagedOut("/a", fileName, 1100)
+    assert pager.isPagedOut("/a")
+    assert pager.getPagedOutPaths() == ["/a"]
+    assert pager.getPagedOutFileName("/a") == fileName
+    assert pager.getResidentBytes() == 210
+    clock.now = 100.0
+    # placeholder of a paged out region is not chosen again
+    assert pager.update([("/", True, False, 10), ("/a", False, False, 0), ("/c", True, False, 200)]) == []
+    pager.setPagedIn("/a")
+    assert not pager.isPagedOut("/a")
+    assert pager.getPagedOutFileName("/a") is None
+    assert not os.path.exists(fileName)
+    directory = os.path.dirname(fileName)
+    pager.clear()
+    assert not os.path.exists(directory)
@@ -0,0 +1,99 @@
+"""
+Tests for time playback and the rendered frame cache.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import pytest
+
+pytest.importorskip("PySide")
+from zincview_playback import FrameCache, TimePlayer
+
+
+def test_frame_cache_evicts_least_recently_used_within_byte_limit():
+    cache = FrameCache(maximumBytes=30)
+    cache.put(0.0, "a", 10)
+    cache.put(1.0, "b", 10)
+    cache.put(2.0, "c", 10)
+    assert cache.get(0.0) == "a"
+    cache.put(3.0, "d", 10)
+    assert cache.get(1.0) is None
+    assert cache.get(0.0) == "a"
+    assert cache.getTotalBytes() == 30
+    cache.put(4.0, "too big", 31)
+    assert cache.get(4.0) is None
+    assert cache.getTotalBytes() == 30
+
+
+def _playFrames(player, numberOfFrames):
+    times = []
+    player.frameRequested.connect(times.append)
+    for _ in range(numberOfFrames):
+        player._timerEvent()
+    return times
+
+
+def test_time_player_loop_and_bounce_without_skipping():
+    player = TimePlayer()
+    player.setTimes([0.0, 1.0, 2.0])
+    player.setSkipFrames(False)
+    player.setPlayMode(TimePlayer.PLAY_MODE_LOOP)
+    assert _playFrames(player, 4) == [1.0, 2.0, 0.0, 1.0]
+    player = TimePlayer()
+    player.setTimes([0.0, 1.0, 2.0])
+    player.setSkipFrames(False)
+    player.setPlayMode(TimePlayer.PLAY_MODE_BOUNCE)
+    assert _playFrames(player, 5) == [1.0, 2.0, 1.0, 0.0, 1.0]
+
+
+def test_time_player_play_once_stops_at_end(application):
+    player = TimePlayer()
+    player.setTimes([0.0, 1.0, 2.0])
+    player.setSkipFrames(False)
+    player.setPlayMode(TimePlayer.PLAY_MODE_ONCE)
+    stopped = []
+    player.stopped.connect(lambda: stopped.append(True))
+    player.play()
+    assert _playFrames(player, 2) == [1.0, 2.0]
+    assert stopped == [True]
+    assert not player.isPlaying()
+
+
+def test_sceneviewer_resize_drops_cached_frames():
+    pytest.importorskip("opencmiss.zinc")
+    pytest.importorskip("opencmiss.zincwidgets")
+    from opencmiss.zinc.context import Context
+    from zincview import ZincView
+
+    class Label(object):
+        visible = True
+
+        def isVisible(self):
+            return self.visible
+
+        def hide(self):
+            self.visible = False
+
+    class View(object):
+        '''
+        ZincView methods handling sceneviewer resize with the state they use.
+        '''
+        _sceneviewerResized = ZincView._sceneviewerResized
+        _cachedFrameHide = ZincView._cachedFrameHide
+        frameCacheClear = ZincView.frameCacheClear
+
+        def __init__(self):
+            self._context = Context("test")
+            self._cachedFrameLabel = Label()
+            self._cachedFrameTime = 2.0
+            self._frameCache = FrameCache(maximumBytes=30)
+            self._frameCache.put(2.0, "frame", 10)
+
+    view = View()
+    view._sceneviewerResized()
+    assert not view._cachedFrameLabel.isVisible()
+    assert view._frameCache.get(2.0) is None
+    timekeeper = view._context.getTimekeepermodule().getDefaultTimekeeper()
+    assert timekeeper.getTime() == 2.0
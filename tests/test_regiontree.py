@@ -0,0 +1,153 @@
+"""
+Tests for the lazily populated region tree chooser.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import pytest
+
+pytest.importorskip("PySide")
+pytest.importorskip("opencmiss.zinc")
+from opencmiss.zinc.context import Context
+from zincview_regiontree import RegionNameIndex, RegionTreeChooserWidget, RegionTreeModel
+
+
+@pytest.fixture
+def rootRegion():
+    context = Context("test")
+    rootRegion = context.getDefaultRegion()
+    heart = rootRegion.createChild("heart")
+    heart.createChild("left")
+    heart.createChild("right")
+    rootRegion.createChild("lungs")
+    yield rootRegion
+
+
+def test_model_fetches_children_when_asked(application, rootRegion):
+    model = RegionTreeModel()
+    model.setRootRegion(rootRegion)
+    rootIndex = model.index(0, 0)
+    assert model.getPath(rootIndex) == "/"
+    assert model.hasChildren(rootIndex)
+    assert model.rowCount(rootIndex) == 0
+    index = model.getIndexForPath("/heart/right")
+    assert model.getPath(index) == "/heart/right"
+    assert model.rowCount(rootIndex) == 2
+    assert not model.getIndexForPath("/heart/middle").isValid()
+    rootRegion.removeChild(rootRegion.findChild("lungs"))
+    model.refresh()
+    assert model.rowCount(rootIndex) == 1
+    assert model.getPath(model.index(0, 0, rootIndex)) == "/heart"
+
+
+def test_name_index_search(application, rootRegion):
+    nameIndex = RegionNameIndex()
+    nameIndex.setRootRegion(rootRegion)
+    assert not nameIndex.isComplete()
+    nameIndex._buildNext(timeBudget=10.0)
+    assert nameIndex.isComplete()
+    assert nameIndex.search("EFT") == ["/heart/left"]
+    assert nameIndex.search("") == ["/heart", "/heart/left", "/heart/right", "/lungs"]
+    assert nameIndex.search("t", maximumResults=2) == ["/heart", "/heart/left"]
+
+
+class _Chooser(object):
+    '''
+    RegionTreeChooserWidget methods tracking the current region, without
+    the widgets.
+    '''
+    getRegion = RegionTreeChooserWidget.getRegion
+    setRegion = RegionTreeChooserWidget.setRegion
+    _refresh = RegionTreeChooserWidget._refresh
+    _choosePath = RegionTreeChooserWidget._choosePath
+
+    class _Signal(object):
+
+        def __init__(self):
+            self.emitted = []
+
+        def emit(self, value):
+            self.emitted.append(value)
+
+    class _Popup(object):
+
+        def hide(self):
+            pass
+
+    def __init__(self, rootRegion):
+        self._rootRegion = rootRegion
+        self._path = "/"
+        self._model = RegionTreeModel()
+        self._model.setRootRegion(rootRegion)
+        self._nameIndex = RegionNameIndex()
+        self._nameIndex.setRootRegion(rootRegion)
+        self._popup = self._Popup()
+        self.currentIndexChanged = self._Signal()
+        self.displayedPaths = []
+
+    def _displayRegion(self):
+        self.displayedPaths.append(self._path)
+
+
+def test_chooser_resets_to_root_when_region_removed(application, rootRegion):
+    chooser = _Chooser(rootRegion)
+    heart = rootRegion.findChild("heart")
+    left = heart.findChild("left")
+    chooser.setRegion(left)
+    assert chooser.getRegion() == left
+    assert chooser.displayedPaths == ["/heart/left"]
+    chooser._refresh()
+    assert chooser.currentIndexChanged.emitted == []
+    heart.removeChild(left)
+    assert chooser.getRegion() is None
+    chooser._refresh()
+    assert chooser.getRegion() == rootRegion
+    assert chooser.displayedPaths == ["/heart/left", "/"]
+    assert chooser.currentIndexChanged.emitted == [0]
+    # choosing a removed region keeps the current one
+    chooser._choosePath("/heart/left")
+    assert chooser.getRegion() == rootRegion
+    chooser._choosePath("/lungs")
+    assert chooser.getRegion() == rootRegion.findChild("lungs")
+    assert chooser.currentIndexChanged.emitted == [0, 0]
+
+
+@pytest.fixture
+def removedRegionView():
+    pytest.importorskip("opencmiss.zincwidgets")
+    from zincview import ZincView
+
+    class RegionChooser(object):
+
+        def getRegion(self):
+            return None
+
+    class Ui(object):
+        region_chooser = RegionChooser()
+
+    class View(object):
+        '''
+        ZincView methods using the region chosen in the Graphics panel.
+        '''
+        regionChanged = ZincView.regionChanged
+        getNodeSpatialIndex = ZincView.getNodeSpatialIndex
+        getMeshLocationIndex = ZincView.getMeshLocationIndex
+        _nodeBoxSelect = ZincView._nodeBoxSelect
+
+        def __init__(self):
+            self.ui = Ui()
+            self._nodeSpatialIndexes = {}
+            self._meshLocationIndexes = {}
+
+    yield View()
+
+
+def test_removed_region_ignored(removedRegionView):
+    view = removedRegionView
+    view.regionChanged(0)
+    assert view.getNodeSpatialIndex() is None
+    assert view.getMeshLocationIndex() is None
+    view._nodeBoxSelect(None, False)
+    assert view._nodeSpatialIndexes == {}
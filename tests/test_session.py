@@ -0,0 +1,155 @@
+"""
+Tests for session snapshot files and reading them into regions.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import pytest
+from zincview_session import SessionReader, SessionWriter
+
+
+def _getState(times):
+    return {
+        "times": times,
+        "materials": None,
+        "spectra": None,
+        "tessellations": None,
+        "timekeeper": {"minimum": 0.0, "maximum": 2.0, "time": 2.0},
+        "sceneviewer": None,
+        "view": {"eye": [0.0, 0.0, 5.0], "lookat": [0.0, 0.0, 0.0], "up": [0.0, 1.0, 0.0],
+            "viewAngle": 0.5, "nearClippingPlane": 0.1, "farClippingPlane": 10.0},
+        "regions": []}
+
+
+def _writeSession(fileName, state, sections):
+    writer = SessionWriter(fileName)
+    for name, data in sections:
+        writer.addSection(name, data)
+    if state is not None:
+        writer.addJson("state", state)
+    writer.close()
+
+
+def test_sections_round_trip(tmp_path):
+    fileName = str(tmp_path / "test.zvsession")
+    _writeSession(fileName, None, [("a", b"first"), ("b", "second"), ("c", b"")])
+    reader = SessionReader(fileName)
+    assert reader.getSectionNames() == ["a", "b", "c"]
+    assert reader.getSection("b") == b"second"
+    assert reader.getSection("c") == b""
+    assert reader.getSection("d") is None
+    reader.close()
+
+
+def test_get_state(tmp_path):
+    fileName = str(tmp_path / "test.zvsession")
+    state = _getState([0.0, 2.0])
+    _writeSession(fileName, state, [("region", b"r"), ("nodes1", b"n")])
+    reader = SessionReader(fileName)
+    assert reader.getState() == state
+    reader.close()
+
+
+def _without(dictionary, key):
+    dictionary.pop(key)
+    return dictionary
+
+
+@pytest.mark.parametrize("change, message", [
+    (lambda state: None, "no state"),
+    (lambda state: _without(state, "regions"), "missing regions"),
+    (lambda state: dict(state, timekeeper=_without(state["timekeeper"], "time")), "incomplete timekeeper"),
+    (lambda state: dict(state, view=_without(state["view"], "eye")), "incomplete view"),
+    (lambda state: dict(state, times=[0.0, 2.0, 3.0]), "missing sections nodes2")])
+def test_get_state_rejects_incomplete_sessions(tmp_path, change, message):
+    fileName = str(tmp_path / "test.zvsession")
+    _writeSession(fileName, change(_getState([0.0, 2.0])), [("region", b"r"), ("nodes1", b"n")])
+    reader = SessionReader(fileName)
+    with pytest.raises(ValueError, match=message):
+        reader.getState()
+    reader.close()
+
+
+def test_not_a_session(tmp_path):
+    fileName = tmp_path / "test.zvsession"
+    fileName.write_bytes(b"not a session file at all, just some text")
+    with pytest.raises(ValueError, match="Not a ZincView session"):
+        SessionReader(str(fileName))
+
+
+@pytest.fixture
+def snapshot(tmp_path):
+    pytest.importorskip("PySide")
+    pytest.importorskip("opencmiss.zinc")
+    pytest.importorskip("opencmiss.zincwidgets")
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.field import Field
+    from opencmiss.zinc.node import Node
+    from zincview import ZincRegion_getTimes, ZincRegion_writeSnapshot
+    context = Context("test")
+    region = context.getDefaultRegion()
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    coordinates = fieldmodule.createFieldFiniteElement(1)
+    coordinates.setName("coordinates")
+    coordinates.setManaged(True)
+    coordinates.setTypeCoordinate(True)
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodes.createNodetemplate()
+    timesequence = fieldmodule.getMatchingTimesequence([0.0, 1.0, 2.0])
+    nodetemplate.defineField(coordinates)
+    nodetemplate.setTimesequence(coordinates, timesequence)
+    fieldcache = fieldmodule.createFieldcache()
+    fieldcache.setNode(nodes.createNode(1, nodetemplate))
+    for time in (0.0, 1.0, 2.0):
+        fieldcache.setTime(time)
+        coordinates.setNodeParameters(fieldcache, -1, Node.VALUE_LABEL_VALUE, 1, [10.0*time])
+    fieldmodule.endChange()
+    times = ZincRegion_getTimes(region)
+    assert times == [0.0, 1.0, 2.0]
+    fileName = str(tmp_path / "test.zvsession")
+    writer = SessionWriter(fileName)
+    assert ZincRegion_writeSnapshot(region, writer, times)
+    state = _getState(times)
+    writer.addJson("state", state)
+    writer.close()
+    yield context, fileName
+
+
+def _getNodeValue(region, time):
+    from opencmiss.zinc.field import Field
+    fieldmodule = region.getFieldmodule()
+    fieldcache = fieldmodule.createFieldcache()
+    fieldcache.setNode(fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES).findNodeByIdentifier(1))
+    fieldcache.setTime(time)
+    return fieldmodule.findFieldByName("coordinates").evaluateReal(fieldcache, 1)[1]
+
+
+def test_read_snapshot_nearest_time_first(snapshot):
+    from zincview import ZincRegion_readBuffers, ZincRegion_readSnapshot
+    from opencmiss.zinc.result import RESULT_OK
+    context, fileName = snapshot
+    reader = SessionReader(fileName)
+    state = reader.getState()
+    region = context.createRegion()
+    pendingTimes = ZincRegion_readSnapshot(region, reader, state["times"], 2.0)
+    # the current time 2.0 is read with the first time, leaving time 1.0
+    assert pendingTimes == [(1, 1.0)]
+    assert _getNodeValue(region, 2.0) == 20.0
+    assert ZincRegion_readBuffers(region, [(reader.getSection("nodes1"), 1.0)]) == RESULT_OK
+    assert _getNodeValue(region, 1.0) == 10.0
+    reader.close()
+
+
+def test_read_snapshot_rejects_bad_region_data(snapshot, tmp_path):
+    from zincview import ZincRegion_readSnapshot
+    context, fileName = snapshot
+    badFileName = str(tmp_path / "bad.zvsession")
+    _writeSession(badFileName, _getState([0.0]), [("region", b"not EX data")])
+    reader = SessionReader(badFileName)
+    region = context.createRegion()
+    with pytest.raises(ValueError, match="region data"):
+        ZincRegion_readSnapshot(region, reader, [0.0], 0.0)
+    reader.close()
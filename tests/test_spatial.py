@@ -0,0 +1,370 @@
+"""
+Tests for spatial indexes of points and boxes, and of nodes in regions.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import math
+import numpy
+import pytest
+from zincview_spatial import BoxTree, getPointsInPolygon, getProjectedPoints, PointTree
+
+
+@pytest.fixture
+def points():
+    return numpy.random.RandomState(1).uniform(-1.0, 1.0, (500, 3))
+
+
+def test_find_nearest(points):
+    tree = PointTree(points, leafSize=8)
+    for target in numpy.random.RandomState(2).uniform(-1.2, 1.2, (20, 3)):
+        distances = numpy.linalg.norm(points - target, axis=1)
+        index, distance = tree.findNearest(target)
+        assert index == numpy.argmin(distances)
+        assert distance == pytest.approx(distances.min())
+    assert tree.findNearest([5.0, 5.0, 5.0], maximumDistance=1.0) == (-1, numpy.inf)
+
+
+def test_find_nearest_to_ray(points):
+    tree = PointTree(points, leafSize=8)
+    point = numpy.array([0.1, -0.2, 0.0])
+    direction = numpy.array([0.0, 0.1, 1.0])
+    unit = direction/numpy.linalg.norm(direction)
+    offsets = points - point
+    parameters = offsets.dot(unit)
+    distances = numpy.linalg.norm(offsets - numpy.outer(parameters, unit), axis=1)
+    for maximumDistance in (0.2, numpy.inf):
+        # nearest the start of the ray among points near it, never behind it
+        candidates = numpy.flatnonzero((parameters >= 0.0) & (distances <= maximumDistance))
+        expected = candidates[numpy.argmin(parameters[candidates])]
+        index, distance = tree.findNearestToRay(point, direction, maximumDistance)
+        assert index == expected
+        assert distance == pytest.approx(distances[expected])
+    assert tree.findNearestToRay([0.0, 0.0, 2.0], [0.0, 0.0, 1.0]) == (-1, numpy.inf)
+
+
+def test_find_in_box(points):
+    tree = PointTree(points, leafSize=8)
+    minimum = [-0.5, -0.2, 0.0]
+    maximum = [0.3, 0.9, 0.4]
+    expected = numpy.flatnonzero(numpy.all((points >= minimum) & (points <= maximum), axis=1))
+    assert numpy.array_equal(tree.findInBox(minimum, maximum), expected)
+
+
+def test_refit_and_rebuild(points):
+    tree = PointTree(points, leafSize=8)
+    assert tree.getStatistics() == (1, 0)
+    moved = points + 0.01
+    tree.setPoints(moved)
+    assert tree.getStatistics() == (1, 1)
+    assert tree.findNearest(moved[7])[0] == 7
+    # undefined points change the tree structure
+    moved[3] = numpy.nan
+    tree.setPoints(moved)
+    assert tree.getStatistics()[0] == 2
+    assert tree.findNearest(points[3] + 0.01)[0] != 3
+
+
+def test_points_in_polygon():
+    x = numpy.array([0.5, 1.5, 0.5, numpy.nan])
+    y = numpy.array([0.5, 0.5, 1.5, 0.5])
+    square = numpy.array([[0.0, 0.0], [1.0, 0.0], [1.0, 1.0], [0.0, 1.0]])
+    assert list(getPointsInPolygon(x, y, square)) == [True, False, False, False]
+
+
+def test_find_in_projected_polygon(points):
+    tree = PointTree(points)
+    # orthographic projection of x, y to pixels 100 per unit centred at 100
+    matrix = numpy.array([[100.0, 0.0, 0.0, 100.0], [0.0, 100.0, 0.0, 100.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]])
+    polygon = [[100.0, 100.0], [200.0, 100.0], [200.0, 200.0], [100.0, 200.0]]
+    expected = numpy.flatnonzero((points[:, 0] > 0.0) & (points[:, 1] > 0.0))
+    assert numpy.array_equal(tree.findInProjectedPolygon(matrix, polygon), expected)
+
+
+def test_projected_polygon_excludes_points_behind_eye():
+    # perspective projection with the eye at z = -2 looking along z, w = z + 2
+    matrix = numpy.array([[100.0, 0.0, 0.0, 0.0], [0.0, 100.0, 0.0, 0.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 1.0, 2.0]])
+    points = numpy.array([[0.5, 0.5, 0.0], [-0.5, -0.5, -4.0], [0.5, 0.5, -2.0]])
+    tree = PointTree(points)
+    x, y = getProjectedPoints(points, matrix)
+    # point behind the eye would project into the rectangle
+    assert numpy.isnan(x[1:]).all()
+    polygon = [[0.0, 0.0], [50.0, 0.0], [50.0, 50.0], [0.0, 50.0]]
+    assert tree.findInProjectedPolygon(matrix, polygon).tolist() == [0]
+
+
+def test_box_tree_find_containing():
+    minimums = numpy.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0], [0.5, 0.0, 0.0], [numpy.nan]*3])
+    maximums = numpy.array([[1.0, 1.0, 1.0], [2.0, 1.0, 1.0], [1.5, 1.0, 1.0], [numpy.nan]*3])
+    tree = BoxTree(minimums, maximums, leafSize=1)
+    pointIndexes, boxIndexes = tree.findContaining([[0.2, 0.5, 0.5], [0.9, 0.5, 0.5], [3.0, 0.5, 0.5]])
+    assert list(pointIndexes) == [0, 1, 1]
+    # nearest box centre first
+    assert list(boxIndexes) == [0, 2, 0]
+
+
+def test_box_tree_find_in_frustum():
+    centres = numpy.array([[float(i), 0.0, 0.0] for i in range(10)])
+    tree = BoxTree(centres - 0.1, centres + 0.1, leafSize=2)
+    # window 300 pixels wide showing x from 0 to 3 with 100 pixels per unit
+    matrix = numpy.array([[100.0, 0.0, 0.0, 0.0], [0.0, 100.0, 0.0, 50.0], [0.0, 0.0, 1.0, 0.0], [0.0, 0.0, 0.0, 1.0]])
+    assert list(tree.findInProjectedFrustum(matrix, 300, 100)) == [0, 1, 2, 3]
+    assert list(tree.findInProjectedFrustum(matrix, 300, 100, margin=100.0)) == [0, 1, 2, 3, 4]
+
+
+def _createNodes(region, coordinateSystemType):
+    from opencmiss.zinc.field import Field
+    from opencmiss.zinc.node import Node
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    coordinates = fieldmodule.createFieldFiniteElement(3)
+    coordinates.setName("coordinates")
+    coordinates.setManaged(True)
+    coordinates.setTypeCoordinate(True)
+    coordinates.setCoordinateSystemType(coordinateSystemType)
+    coordinates.setCoordinateSystemFocus(1.0)
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodes.createNodetemplate()
+    nodetemplate.defineField(coordinates)
+    fieldcache = fieldmodule.createFieldcache()
+    for identifier, x in ((1, [1.0, 0.5*math.pi, 0.0]), (2, [1.0, 0.5*math.pi, 0.5*math.pi])):
+        node = nodes.createNode(identifier, nodetemplate)
+        fieldcache.setNode(node)
+        coordinates.setNodeParameters(fieldcache, -1, Node.VALUE_LABEL_VALUE, 1, x)
+    fieldmodule.endChange()
+    return coordinates
+
+
+@pytest.fixture
+def nodeSpatialIndex():
+    pytest.importorskip("PySide")
+    pytest.importorskip("opencmiss.zinc")
+    pytest.importorskip("opencmiss.zincwidgets")
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.field import Field
+    from zincview import NodeSpatialIndex
+    context = Context("test")
+    region = context.getDefaultRegion()
+    coordinates = _createNodes(region, Field.COORDINATE_SYSTEM_TYPE_PROLATE_SPHEROIDAL)
+    yield NodeSpatialIndex(region), coordinates
+
+
+def test_node_index_converts_to_rectangular_cartesian(nodeSpatialIndex):
+    index, coordinates = nodeSpatialIndex
+    assert index.getCoordinateFieldName() == "coordinates_rectangular_cartesian"
+    # prolate spheroidal (lambda, mu, theta) with focus 1 at mu = pi/2
+    radius = math.sinh(1.0)
+    assert index.getNodeCoordinates(1, 0.0) == pytest.approx([0.0, radius, 0.0])
+    assert index.getNodeCoordinates(2, 0.0) == pytest.approx([0.0, 0.0, radius], abs=1.0E-12)
+    assert index.findNearestNode([0.0, radius, 0.1], 0.0)[0] == 1
+
+
+def test_node_index_updates_only_for_coordinates_and_nodes(nodeSpatialIndex):
+    from opencmiss.zinc.field import Field
+    from opencmiss.zinc.node import Node
+    index, coordinates = nodeSpatialIndex
+    index.update(0.0)
+    assert index.getStatistics() == (1, 0)
+    fieldmodule = coordinates.getFieldmodule()
+    other = fieldmodule.createFieldConstant([1.0])
+    other.setName("other")
+    other.setManaged(True)
+    index.update(0.0)
+    assert index.getStatistics() == (1, 0)
+    fieldcache = fieldmodule.createFieldcache()
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    fieldcache.setNode(nodes.findNodeByIdentifier(1))
+    coordinates.setNodeParameters(fieldcache, -1, Node.VALUE_LABEL_VALUE, 1, [1.0, 0.5*math.pi, math.pi])
+    index.update(0.0)
+    assert index.getStatistics() == (1, 1)
+    assert index.getNodeCoordinates(1, 0.0) == pytest.approx([0.0, -math.sinh(1.0), 0.0], abs=1.0E-12)
+    nodes.destroyNode(nodes.findNodeByIdentifier(2))
+    assert index.findNodesInBox([-5.0]*3, [5.0]*3, 0.0).tolist() == [1]
+
+
+def _importZincview():
+    pytest.importorskip("PySide")
+    pytest.importorskip("opencmiss.zinc")
+    pytest.importorskip("opencmiss.zincwidgets")
+    import zincview
+    return zincview
+
+
+def test_clamp_xi():
+    zincview = _importZincview()
+    assert zincview.clampXi([1.2, -0.5, 0.3]) == pytest.approx([1.0, 0.0, 0.3])
+    # triangle: projected onto the face where xi sum to 1
+    assert zincview.clampXi([0.8, 0.6], (0, 1)) == pytest.approx([0.6, 0.4])
+    assert zincview.clampXi([1.5, -0.2], (0, 1)) == pytest.approx([1.0, 0.0])
+    assert zincview.clampXi([0.2, 0.3], (0, 1)) == pytest.approx([0.2, 0.3])
+    # tetrahedron
+    xi = zincview.clampXi([0.9, 0.5, -0.1], (0, 1, 2))
+    assert xi == pytest.approx([0.7, 0.3, 0.0])
+    # wedge simplex in xi 1 and 3, line in xi 2
+    assert zincview.clampXi([0.7, 1.3, 0.7], (0, 2)) == pytest.approx([0.5, 1.0, 0.5])
+
+
+@pytest.fixture
+def triangleMeshLocationIndex():
+    _importZincview()
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.field import Field
+    from opencmiss.zinc.node import Node
+    from opencmiss.zinc.result import RESULT_OK
+    from exmodels import getElementsText, readText
+    from zincview import MeshLocationIndex
+    context = Context("test")
+    region = context.getDefaultRegion()
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    coordinates = fieldmodule.createFieldFiniteElement(2)
+    coordinates.setName("coordinates")
+    coordinates.setManaged(True)
+    coordinates.setTypeCoordinate(True)
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodes.createNodetemplate()
+    nodetemplate.defineField(coordinates)
+    fieldcache = fieldmodule.createFieldcache()
+    for identifier, x in ((1, [0.0, 0.0]), (2, [1.0, 0.0]), (3, [0.0, 1.0]), (4, [1.0, 1.0])):
+        fieldcache.setNode(nodes.createNode(identifier, nodetemplate))
+        coordinates.setNodeParameters(fieldcache, -1, Node.VALUE_LABEL_VALUE, 1, x)
+    # two triangles splitting the unit square along its diagonal from node 2 to 3
+    assert readText(region, getElementsText(2, True, [("coordinates", 2)], [(1, [1, 2, 3]), (2, [4, 3, 2])])) == RESULT_OK
+    fieldmodule.endChange()
+    yield MeshLocationIndex(region, dimension=2)
+
+
+def test_mesh_locations_in_triangles(triangleMeshLocationIndex):
+    index = triangleMeshLocationIndex
+    points = [[0.2, 0.3, 0.0], [0.7, 0.6, 0.0], [0.55, 0.55, 0.0], [1.5, 0.5, 0.0]]
+    elementIdentifiers, xi = index.findMeshLocations(points)
+    assert elementIdentifiers.tolist() == [1, 2, 2, -1]
+    assert xi[0] == pytest.approx([0.2, 0.3])
+    # element 2 xi directions run from node 4 to 3 and node 4 to 2
+    assert xi[1] == pytest.approx([0.3, 0.4])
+    assert xi[2] == pytest.approx([0.45, 0.45])
+    assert numpy.all(numpy.sum(xi[:3], axis=1) <= 1.0 + 1.0E-12)
+
+
+def test_nearest_mesh_location_in_triangle_is_on_diagonal(triangleMeshLocationIndex):
+    index = triangleMeshLocationIndex
+    mesh = index.getMesh()
+    # remove element 2 so points beyond the diagonal are nearest to its edge
+    mesh.destroyElement(mesh.findElementByIdentifier(2))
+    elementIdentifiers, xi = index.findMeshLocations([[0.6, 0.5, 0.0]], nearest=True)
+    assert elementIdentifiers.tolist() == [1]
+    assert xi[0] == pytest.approx([0.55, 0.45])
+
+
+@pytest.fixture
+def rowMeshLocationIndex():
+    _importZincview()
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.field import Field
+    from opencmiss.zinc.node import Node
+    from opencmiss.zinc.result import RESULT_OK
+    from exmodels import getElementsText, readText
+    from zincview import MeshLocationIndex
+    context = Context("test")
+    region = context.getDefaultRegion()
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    coordinates = fieldmodule.createFieldFiniteElement(2)
+    coordinates.setName("coordinates")
+    coordinates.setManaged(True)
+    coordinates.setTypeCoordinate(True)
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodes.createNodetemplate()
+    nodetemplate.defineField(coordinates)
+    fieldcache = fieldmodule.createFieldcache()
+    for i in range(11):
+        for j in range(2):
+            fieldcache.setNode(nodes.createNode(1 + i + 11*j, nodetemplate))
+            coordinates.setNodeParameters(fieldcache, -1, Node.VALUE_LABEL_VALUE, 1, [float(i), float(j)])
+    # row of 10 unit squares along x, element i + 1 from x = i to i + 1
+    elements = [(i + 1, [i + 1, i + 2, i + 12, i + 13]) for i in range(10)]
+    assert readText(region, getElementsText(2, False, [("coordinates", 2)], elements)) == RESULT_OK
+    lines = region.getScene().createGraphicsLines()
+    lines.setCoordinateField(coordinates)
+    fieldmodule.endChange()
+    yield MeshLocationIndex(region, dimension=2)
+
+
+def _getCulledElements(viewCullingGroup):
+    mesh = viewCullingGroup.getMeshLocationIndex().getMesh()
+    graphics = viewCullingGroup.getRegion().getScene().getFirstGraphics()
+    subgroupField = graphics.getSubgroupField()
+    if not subgroupField.isValid():
+        return None
+    meshGroup = subgroupField.castGroup().getFieldElementGroup(mesh).getMeshGroup()
+    return [identifier for identifier in range(1, mesh.getSize() + 1)
+        if meshGroup.containsElement(mesh.findElementByIdentifier(identifier))]
+
+
+def test_view_culling_group(rowMeshLocationIndex):
+    from zincview import ViewCullingGroup
+    index = rowMeshLocationIndex
+    viewCullingGroup = ViewCullingGroup(index.getMesh().getFieldmodule().getRegion(), index, blockSize=2)
+    # window pixels are region x, y; element boxes are padded by 5%
+    matrix = numpy.identity(4)
+    viewCullingGroup.update(matrix, 3.5, 1.0)
+    assert viewCullingGroup.getNumberOfElements() == 4
+    assert _getCulledElements(viewCullingGroup) == [1, 2, 3, 4]
+    matrix[0, 3] = -5.0
+    viewCullingGroup.update(matrix, 3.5, 1.0)
+    assert _getCulledElements(viewCullingGroup) == [5, 6, 7, 8, 9]
+    viewCullingGroup.update(matrix, 3.5, 1.0, margin=2.0)
+    assert _getCulledElements(viewCullingGroup) == [3, 4, 5, 6, 7, 8, 9, 10]
+    # all elements in view: not culled
+    viewCullingGroup.update(matrix, 3.5, 1.0, margin=10.0)
+    assert viewCullingGroup.getNumberOfElements() == -1
+    assert _getCulledElements(viewCullingGroup) is None
+    viewCullingGroup.update(numpy.identity(4), 1.5, 1.0)
+    assert _getCulledElements(viewCullingGroup) == [1, 2]
+    viewCullingGroup.restore()
+    assert _getCulledElements(viewCullingGroup) is None
+
+
+def test_view_culling_only_after_transform():
+    zincview = _importZincview()
+    from opencmiss.zinc.sceneviewer import Sceneviewerevent
+
+    class Timer(object):
+        started = 0
+
+        def start(self):
+            self.started += 1
+
+    class Event(object):
+
+        def __init__(self, changeFlags):
+            self._changeFlags = changeFlags
+
+        def getChangeFlags(self):
+            return self._changeFlags
+
+    class View(object):
+        '''
+        ZincView sceneviewer change callback with the state it updates.
+        '''
+        _sceneviewerChange = zincview.ZincView._sceneviewerChange
+
+        def __init__(self):
+            self._viewCulling = True
+            self._viewCullingUpdating = False
+            self._viewCullingTimer = Timer()
+            self.frameCacheClears = 0
+
+        def frameCacheClear(self):
+            self.frameCacheClears += 1
+
+    view = View()
+    view._sceneviewerChange(Event(Sceneviewerevent.CHANGE_FLAG_REPAINT_REQUIRED))
+    assert (view._viewCullingTimer.started, view.frameCacheClears) == (0, 0)
+    view._sceneviewerChange(Event(Sceneviewerevent.CHANGE_FLAG_TRANSFORM | Sceneviewerevent.CHANGE_FLAG_REPAINT_REQUIRED))
+    assert (view._viewCullingTimer.started, view.frameCacheClears) == (1, 1)
+    view._viewCullingUpdating = True
+    view._sceneviewerChange(Event(Sceneviewerevent.CHANGE_FLAG_TRANSFORM))
+    assert (view._viewCullingTimer.started, view.frameCacheClears) == (1, 2)
@@ -0,0 +1,126 @@
+"""
+Tests for spectrum autorange sampling of visible graphics.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import numpy
+import pytest
+
+pytest.importorskip("PySide")
+pytest.importorskip("opencmiss.zinc")
+pytest.importorskip("opencmiss.zincwidgets")
+from PySide import QtCore
+from opencmiss.zinc.context import Context
+from opencmiss.zinc.field import Field
+from opencmiss.zinc.node import Node
+from zincview import SpectrumRangeSampler, StreamingHistogram, ZincScene_getSpectrumDataFields
+
+
+def _createNodeValues(region, name, values):
+    fieldmodule = region.getFieldmodule()
+    fieldmodule.beginChange()
+    field = fieldmodule.createFieldFiniteElement(1)
+    field.setName(name)
+    nodes = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodes.createNodetemplate()
+    nodetemplate.defineField(field)
+    fieldcache = fieldmodule.createFieldcache()
+    for value in values:
+        node = nodes.createNode(-1, nodetemplate)
+        fieldcache.setNode(node)
+        field.setNodeParameters(fieldcache, -1, Node.VALUE_LABEL_VALUE, 1, value)
+    fieldmodule.endChange()
+    return field
+
+
+def _createColouredPoints(region, field, spectrum):
+    scene = region.getScene()
+    points = scene.createGraphicsPoints()
+    points.setFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    points.setDataField(field)
+    points.setSpectrum(spectrum)
+    return points
+
+
+@pytest.fixture
+def model():
+    context = Context("test")
+    root = context.getDefaultRegion()
+    spectrum = context.getSpectrummodule().getDefaultSpectrum()
+    child = root.createChild("child")
+    rootField = _createNodeValues(root, "pressure", [1.0, 2.0, 3.0])
+    childField = _createNodeValues(child, "pressure", [10.0, 20.0])
+    rootPoints = _createColouredPoints(root, rootField, spectrum)
+    _createColouredPoints(child, childField, spectrum)
+    return context, root, child, spectrum, rootPoints
+
+
+def _fieldRegionNames(dataFields):
+    return sorted((region.getName() or "") for region, _ in dataFields)
+
+
+def test_histogram_percentiles():
+    histogram = StreamingHistogram(numberOfBins=1000)
+    histogram.add(numpy.arange(0.0, 50.0))
+    histogram.add([numpy.nan])
+    histogram.add(numpy.arange(50.0, 101.0))
+    assert histogram.getCount() == 101
+    assert histogram.getMinimum() == 0.0
+    assert histogram.getMaximum() == 100.0
+    assert histogram.getPercentile(0.0) == 0.0
+    assert histogram.getPercentile(100.0) == 100.0
+    assert abs(histogram.getPercentile(10.0) - 10.0) < 1.0
+    assert abs(histogram.getPercentile(90.0) - 90.0) < 1.0
+
+
+def test_data_fields_skip_hidden(model):
+    context, root, child, spectrum, rootPoints = model
+    scene = root.getScene()
+    assert _fieldRegionNames(ZincScene_getSpectrumDataFields(scene, spectrum)) == ["", "child"]
+    rootPoints.setVisibilityFlag(False)
+    assert _fieldRegionNames(ZincScene_getSpectrumDataFields(scene, spectrum)) == ["child"]
+    rootPoints.setVisibilityFlag(True)
+    child.getScene().setVisibilityFlag(False)
+    assert _fieldRegionNames(ZincScene_getSpectrumDataFields(scene, spectrum)) == [""]
+
+
+def test_data_fields_scenefilter(model):
+    context, root, child, spectrum, rootPoints = model
+    scenefilter = context.getScenefiltermodule().createScenefilterRegion(child)
+    dataFields = ZincScene_getSpectrumDataFields(root.getScene(), spectrum, scenefilter)
+    assert _fieldRegionNames(dataFields) == ["child"]
+
+
+def test_sampler_fills_histograms(application, model):
+    context, root, child, spectrum, rootPoints = model
+    jobs = []
+    for region, dataField in ZincScene_getSpectrumDataFields(root.getScene(), spectrum):
+        jobs.append((StreamingHistogram(), dataField, 1, [0.0, 1.0]))
+    sampler = SpectrumRangeSampler(timeBudget=0.0)
+    finished = []
+    sampler.finished.connect(lambda: finished.append(True))
+    sampler.start(jobs)
+    assert sampler.isRunning()
+    sampler.wait()
+    assert not sampler.isRunning()
+    assert finished == [True]
+    counts = sorted(histogram.getCount() for histogram, _, _, _ in jobs)
+    assert counts == [4, 6]
+    assert max(histogram.getMaximum() for histogram, _, _, _ in jobs) == 20.0
+
+
+def test_sampler_cancel(application, model):
+    context, root, child, spectrum, rootPoints = model
+    dataField = root.getFieldmodule().findFieldByName("pressure")
+    histogram = StreamingHistogram()
+    sampler = SpectrumRangeSampler()
+    finished = []
+    sampler.finished.connect(lambda: finished.append(True))
+    sampler.start([(histogram, dataField, 1, [0.0])])
+    sampler.cancel()
+    assert not sampler.isRunning()
+    QtCore.QCoreApplication.processEvents()
+    assert finished == []
@@ -0,0 +1,123 @@
+"""
+Tests for startup: deferred imports, argument parsing and loading models
+given on the command line once graphics are ready.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import os
+import subprocess
+import sys
+import pytest
+from zincview_startup import isScriptFileName, ModelPrefetcher, parseArguments, StartupProfiler
+
+
+def test_parse_arguments():
+    options, argv = parseArguments(["zincview.py", "--profile-startup", "--keep-every", "2", "a.exnode", "b.zincview.py"])
+    assert options.profile_startup
+    assert options.keep_every == 2
+    assert options.keep_steps is None
+    assert options.models == ["a.exnode", "b.zincview.py"]
+    assert isScriptFileName("b.zincview.py")
+    assert not isScriptFileName("a.exnode")
+
+
+def test_model_prefetcher_reports_missing_files(tmp_path):
+    fileName = tmp_path / "a.exnode"
+    fileName.write_bytes(b"contents")
+    missingFileName = str(tmp_path / "missing.exnode")
+    prefetcher = ModelPrefetcher([str(fileName), missingFileName])
+    results = prefetcher.getResults()
+    assert [result[0] for result in results] == [str(fileName), missingFileName]
+    assert results[0][1:] == (b"contents", None)
+    assert results[1][2] is not None
+
+
+def test_profiler_phases():
+    profiler = StartupProfiler(startTime=0.0, enabled=True)
+    profiler.mark("first")
+    profiler.mark("second")
+    assert [phase[0] for phase in profiler.getPhases()] == ["first", "second"]
+
+
+def test_import_defers_optional_modules():
+    pytest.importorskip("PySide")
+    pytest.importorskip("opencmiss.zinc")
+    pytest.importorskip("opencmiss.zincwidgets")
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    environment = dict(os.environ)
+    environment["PYTHONPATH"] = os.pathsep.join([source] + [path for path in sys.path if path])
+    deferredModules = ["asyncio", "zincview_decimate", "zincview_isosurface", "zincview_live",
+        "zincview_spatial", "zincview_timeseries", "zincview_volume"]
+    output = subprocess.check_output([sys.executable, "-c",
+        "import sys, zincview; print(' '.join(name for name in " + repr(deferredModules) + " if name in sys.modules))"],
+        env=environment)
+    assert output.decode().strip() == ""
+
+
+class _LineEdit(object):
+
+    def __init__(self):
+        self._text = ""
+
+    def text(self):
+        return self._text
+
+    def setText(self, text):
+        self._text = text
+
+
+@pytest.fixture
+def startupView():
+    pytest.importorskip("PySide")
+    pytest.importorskip("opencmiss.zinc")
+    pytest.importorskip("opencmiss.zincwidgets")
+    from zincview import ZincView
+
+    class View(object):
+        '''
+        Startup methods of ZincView with the window parts they use.
+        '''
+        startupLoad = ZincView.startupLoad
+        _startupIdle = ZincView._startupIdle
+        _startupLoad = ZincView._startupLoad
+        _startupCheckFinished = ZincView._startupCheckFinished
+
+        def __init__(self):
+            self.ui = type("Ui", (object,), {})()
+            self.ui.live_address_lineedit = _LineEdit()
+            self._startupGraphicsReady = False
+            self._startupPrefetcher = None
+            self.calls = []
+            self._profiler = self
+
+        def defineStandardMaterialsAndGlyphs(self):
+            self.calls.append("define")
+
+        def modelLoadPrefetched(self, prefetcher):
+            assert self._startupGraphicsReady
+            self.calls.append(("load", prefetcher))
+
+        def report(self):
+            self.calls.append("report")
+
+    return View()
+
+
+def test_startup_load_waits_for_graphics(startupView):
+    from zincview_live import DEFAULT_ADDRESS
+    startupView.startupLoad("prefetcher")
+    assert startupView.calls == []
+    startupView._startupIdle()
+    assert startupView.calls == ["define", ("load", "prefetcher"), "report"]
+    assert startupView.ui.live_address_lineedit.text() == DEFAULT_ADDRESS
+    # a queued load does nothing once loaded
+    startupView._startupLoad()
+    assert len(startupView.calls) == 3
+
+
+def test_startup_without_models_reports_when_graphics_ready(startupView):
+    startupView._startupIdle()
+    assert startupView.calls == ["define", "report"]
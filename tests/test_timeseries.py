@@ -0,0 +1,131 @@
+"""
+Tests for time series stores and loading them into regions.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import numpy
+import pytest
+
+pytest.importorskip("opencmiss.zinc")
+from opencmiss.zinc.context import Context
+from opencmiss.zinc.field import Field
+from opencmiss.zinc.node import Node
+from exmodels import getNodesText
+from zincview_timeseries import clearTimeSeriesBindings, convertExnodeSeries, getTimeSeriesBindings, \
+    TimeSeriesBinding, TimeSeriesStore, TimeSeriesStoreWriter, ZincRegion_loadTimeSeriesTimes
+
+
+@pytest.fixture
+def store(tmp_path):
+    fileNames = []
+    for t in range(3):
+        fileName = tmp_path / ("u%d.exnode" % t)
+        fileName.write_text(getNodesText([("u", 2)], [(1, [t, 10.0*t]), (2, [t + 100.0, 10.0*(t + 100.0)])]))
+        fileNames.append(str(fileName))
+    directory = str(tmp_path / "u.zvstore")
+    convertExnodeSeries(directory, fileNames, [0.0, 1.0, 3.0])
+    yield TimeSeriesStore(directory)
+    clearTimeSeriesBindings()
+
+
+def test_convert_exnode_series(store):
+    assert store.getTimes() == [0.0, 1.0, 3.0]
+    assert store.getNodeIdentifiers().tolist() == [1, 2]
+    assert store.getFieldNames() == ["u"]
+    [(valueLabel, version, column)] = store.getColumns("u")
+    assert (valueLabel, version) == (Node.VALUE_LABEL_VALUE, 1)
+    assert column[2].tolist() == [[2.0, 20.0], [102.0, 1020.0]]
+    assert store.getTimeIndexRange(2.0, 2.0) == (1, 2)
+    assert store.getTimeIndexRange(1.0, 1.0) == (1, 1)
+    assert store.getTimeIndexRange(-1.0, 0.5) == (0, 1)
+    assert store.getTimeIndexRange(0.5, 5.0) == (0, 2)
+
+
+def _evaluate(region, nodeIdentifier, time):
+    fieldmodule = region.getFieldmodule()
+    fieldcache = fieldmodule.createFieldcache()
+    fieldcache.setNode(fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES).findNodeByIdentifier(nodeIdentifier))
+    fieldcache.setTime(time)
+    result, values = fieldmodule.findFieldByName("u").evaluateReal(fieldcache, 2)
+    return values
+
+
+def test_bound_field_evaluates_at_field_cache_time(store):
+    context = Context("test")
+    region = context.getDefaultRegion()
+    binding = TimeSeriesBinding(region, store)
+    assert getTimeSeriesBindings() == [binding]
+    # evaluated at times other than the timekeeper time
+    assert _evaluate(region, 1, 1.0) == pytest.approx([1.0, 10.0])
+    assert _evaluate(region, 2, 3.0) == pytest.approx([102.0, 1020.0])
+    assert _evaluate(region, 2, 2.0) == pytest.approx([101.5, 1015.0])
+    # a field evaluating u at two times in one field cache
+    fieldmodule = region.getFieldmodule()
+    u = fieldmodule.findFieldByName("u")
+    bothTimes = fieldmodule.createFieldConcatenate([fieldmodule.createFieldTimeLookup(u, fieldmodule.createFieldConstant([time]))
+        for time in (0.0, 3.0)])
+    fieldcache = fieldmodule.createFieldcache()
+    fieldcache.setNode(fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES).findNodeByIdentifier(1))
+    assert bothTimes.evaluateReal(fieldcache, 4)[1] == pytest.approx([0.0, 0.0, 2.0, 20.0])
+    clearTimeSeriesBindings()
+    assert getTimeSeriesBindings() == []
+
+
+def test_stored_nan_parameters_are_not_set(tmp_path):
+    writer = TimeSeriesStoreWriter(str(tmp_path / "v.zvstore"), [0.0, 1.0], [1])
+    column = writer.addColumn("u", Node.VALUE_LABEL_VALUE, 1, 2)
+    column[0] = [[1.0, 2.0]]
+    column[1] = [[3.0, numpy.nan]]
+    writer.close()
+    context = Context("test")
+    region = context.getDefaultRegion()
+    fieldmodule = region.getFieldmodule()
+    u = fieldmodule.createFieldFiniteElement(2)
+    u.setName("u")
+    u.setManaged(True)
+    nodeset = fieldmodule.findNodesetByFieldDomainType(Field.DOMAIN_TYPE_NODES)
+    nodetemplate = nodeset.createNodetemplate()
+    nodetemplate.defineField(u)
+    nodeset.createNode(1, nodetemplate)
+    TimeSeriesBinding(region, TimeSeriesStore(str(tmp_path / "v.zvstore")))
+    assert _evaluate(region, 1, 1.0)[0] == 3.0
+    clearTimeSeriesBindings()
+
+
+def test_bind_rejects_non_finite_element_field(store):
+    context = Context("test")
+    region = context.getDefaultRegion()
+    u = region.getFieldmodule().createFieldConstant([1.0, 2.0])
+    u.setName("u")
+    u.setManaged(True)
+    with pytest.raises(ValueError, match="not a finite element field"):
+        TimeSeriesBinding(region, store)
+
+
+def test_binding_holds_window_of_times(store):
+    context = Context("test")
+    region = context.getDefaultRegion()
+    timekeeper = context.getTimekeepermodule().getDefaultTimekeeper()
+    binding = TimeSeriesBinding(region, store, windowSize=2)
+    assert binding.getLoadedTimes() == [0.0, 1.0]
+    assert _evaluate(region, 1, 0.5) == pytest.approx([0.5, 5.0])
+    # outside the window Zinc clamps to its nearest end
+    assert _evaluate(region, 1, 3.0) == pytest.approx([1.0, 10.0])
+    timekeeper.setTime(2.0)
+    assert binding.getLoadedTimes() == [1.0, 3.0]
+    assert _evaluate(region, 2, 2.0) == pytest.approx([101.5, 1015.0])
+    timekeeper.setTime(3.0)
+    assert binding.getLoadedTimes() == [1.0, 3.0]
+    # evaluating over a range of times loads all times covering it
+    ZincRegion_loadTimeSeriesTimes(context.getDefaultRegion(), [0.0, 3.0])
+    assert binding.getLoadedTimes() == [0.0, 1.0, 3.0]
+    assert _evaluate(region, 1, 0.0) == pytest.approx([0.0, 0.0])
+    # until the time next leaves the window
+    timekeeper.setTime(0.5)
+    assert binding.getLoadedTimes() == [0.0, 1.0, 3.0]
+    clearTimeSeriesBindings()
+    timekeeper.setTime(2.0)
+    assert binding.getLoadedTimes() == [0.0, 1.0, 3.0]
@@ -0,0 +1,167 @@
+"""
+Tests for volume image slice decoding, raw volume caches and storage formats.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import os
+import numpy
+import pytest
+
+pytest.importorskip("PySide")
+pytest.importorskip("opencmiss.zinc")
+from PySide import QtGui
+from zincview_volume import decodeImageSlices, getImageBitsPerComponent, getVolumeStorage, loadImageVolume, \
+    readVolumeCache, STORAGE_GREYSCALE, STORAGE_RGB
+
+
+def _writeSlices(directory, colours, width=5, height=3):
+    '''
+    Write one image of uniform colour per slice.
+    :return list of file names
+    '''
+    fileNames = []
+    for i, colour in enumerate(colours):
+        image = QtGui.QImage(width, height, QtGui.QImage.Format_RGB32)
+        image.fill(QtGui.QColor(*colour))
+        fileName = os.path.join(str(directory), "slice%d.png" % i)
+        assert image.save(fileName)
+        fileNames.append(fileName)
+    return fileNames
+
+
+def test_decode_slices_contiguous(application, tmp_path):
+    fileNames = _writeSlices(tmp_path, [(10, 20, 30), (40, 50, 60)])
+    volume = decodeImageSlices(fileNames, numberOfWorkers=2)
+    assert volume.shape == (2, 3, 5, 3)
+    assert volume.dtype == numpy.uint8
+    assert volume.flags["C_CONTIGUOUS"]
+    assert numpy.all(volume[0] == [10, 20, 30])
+    assert numpy.all(volume[1] == [40, 50, 60])
+
+
+def test_decode_size_mismatch(application, tmp_path):
+    fileNames = _writeSlices(tmp_path, [(0, 0, 0)])
+    other = QtGui.QImage(4, 3, QtGui.QImage.Format_RGB32)
+    other.fill(QtGui.QColor(0, 0, 0))
+    otherFileName = str(tmp_path.joinpath("other.png"))
+    assert other.save(otherFileName)
+    with pytest.raises(IOError):
+        decodeImageSlices(fileNames + [otherFileName])
+
+
+def test_greyscale_detection(application, tmp_path):
+    assert getVolumeStorage(_writeSlices(tmp_path, [(7, 7, 7), (9, 9, 9)])) == STORAGE_GREYSCALE
+    assert getVolumeStorage(_writeSlices(tmp_path, [(7, 7, 7), (9, 8, 9)])) == STORAGE_RGB
+
+
+def test_volume_cache(application, tmp_path):
+    fileNames = _writeSlices(tmp_path, [(1, 1, 1), (2, 2, 2), (3, 3, 3)])
+    cacheFileName = str(tmp_path.joinpath("volume.raw"))
+    assert readVolumeCache(cacheFileName, fileNames) is None
+    volume = loadImageVolume(fileNames, cacheFileName)
+    assert isinstance(volume, numpy.memmap)
+    assert volume.shape == (3, 3, 5)
+    assert list(volume[:, 0, 0]) == [1, 2, 3]
+    cached = readVolumeCache(cacheFileName, fileNames)
+    assert numpy.array_equal(cached, volume)
+    # storage mismatch and changed sources invalidate the cache
+    assert readVolumeCache(cacheFileName, fileNames, storage=STORAGE_RGB) is None
+    _writeSlices(tmp_path, [(1, 1, 1), (5, 5, 5)], width=6)
+    assert readVolumeCache(cacheFileName, fileNames) is None
+
+
+def _writePGM16(directory, name, values):
+    '''
+    Write uint16 array(height, width) as a 16-bit binary PGM image.
+    :return file name
+    '''
+    fileName = os.path.join(str(directory), name)
+    height, width = values.shape
+    with open(fileName, "wb") as imageFile:
+        imageFile.write(("P5\n# 16-bit test slice\n%d %d\n65535\n" % (width, height)).encode())
+        imageFile.write(values.astype(">u2").tobytes())
+    return fileName
+
+
+def test_greyscale_keeps_8_bit_values(application, tmp_path):
+    fileNames = _writeSlices(tmp_path, [(3, 3, 3), (200, 200, 200)])
+    assert getImageBitsPerComponent(fileNames[0]) == 8
+    volume = loadImageVolume(fileNames)
+    assert volume.dtype == numpy.uint8
+    assert list(volume[:, 0, 0]) == [3, 200]
+    with pytest.raises(ValueError):
+        loadImageVolume(fileNames, bitsPerComponent=16)
+
+
+def test_16_bit_pgm(application, tmp_path):
+    values = numpy.arange(15, dtype=numpy.uint16).reshape(3, 5)*4001
+    fileNames = [_writePGM16(tmp_path, "slice%d.pgm" % i, values + i) for i in range(2)]
+    assert getImageBitsPerComponent(fileNames[0]) == 16
+    cacheFileName = str(tmp_path.joinpath("volume.raw"))
+    volume = loadImageVolume(fileNames, cacheFileName)
+    assert volume.dtype == numpy.uint16
+    assert numpy.array_equal(volume[0], values)
+    assert numpy.array_equal(volume[1], values + 1)
+    assert readVolumeCache(cacheFileName, fileNames) is not None
+    assert readVolumeCache(cacheFileName, fileNames, bitsPerComponent=8) is None
+
+
+@pytest.fixture
+def levelOfDetail(application):
+    '''
+    Level of detail for an image field of a 3 level greyscale pyramid, with
+    a tessellation coarsened with it. Reading volumes into the image field
+    is recorded instead of done.
+    '''
+    import zincview_volume
+    from opencmiss.zinc.context import Context
+    from opencmiss.zinc.result import RESULT_OK
+    from zincview_volume import clearVolumeLevelsOfDetail, downsampleVolume, VolumeLevelOfDetail
+    context = Context("test")
+    imageField = context.getDefaultRegion().getFieldmodule().createFieldImage()
+    levels = [numpy.arange(512, dtype=numpy.uint8).reshape(8, 8, 8)]
+    for level in range(2):
+        levels.append(downsampleVolume(levels[-1]))
+    tessellation = context.getTessellationmodule().createTessellation()
+    tessellation.setMinimumDivisions([16])
+    reads = []
+    originalReadVolume = zincview_volume.ZincFieldImage_readVolume
+
+    def readVolume(field, volume):
+        reads.append(volume.shape)
+        return RESULT_OK
+
+    zincview_volume.ZincFieldImage_readVolume = readVolume
+    try:
+        yield VolumeLevelOfDetail(imageField, levels, [tessellation]), tessellation, reads
+    finally:
+        zincview_volume.ZincFieldImage_readVolume = originalReadVolume
+        clearVolumeLevelsOfDetail()
+
+
+def test_level_of_detail_starts_at_full_resolution(levelOfDetail):
+    volumeLevelOfDetail, tessellation, reads = levelOfDetail
+    assert volumeLevelOfDetail.getLevel() == 0
+    volumeLevelOfDetail.setFullResolution()
+    volumeLevelOfDetail.endInteraction()
+    assert reads == []
+    volumeLevelOfDetail.beginInteraction()
+    assert volumeLevelOfDetail.getLevel() == 2
+    assert reads == [(2, 2, 2)]
+    assert tessellation.getMinimumDivisions(3)[1] == [4, 4, 4]
+    volumeLevelOfDetail.setFullResolution()
+    assert reads == [(2, 2, 2), (8, 8, 8)]
+    assert tessellation.getMinimumDivisions(3)[1] == [16, 16, 16]
+
+
+def test_level_of_detail_keeps_tessellation_edits(levelOfDetail):
+    volumeLevelOfDetail, tessellation, reads = levelOfDetail
+    volumeLevelOfDetail.beginInteraction()
+    tessellation.setMinimumDivisions([32])
+    volumeLevelOfDetail.setFullResolution()
+    assert tessellation.getMinimumDivisions(3)[1] == [32, 32, 32]
+    volumeLevelOfDetail.beginInteraction()
+    assert tessellation.getMinimumDivisions(3)[1] == [8, 8, 8]
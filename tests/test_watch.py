@@ -0,0 +1,87 @@
+"""
+Tests for watching model files and re-reading changed files into the model.
+
+This Source Code Form is subject to the terms of the Mozilla Public
+License, v. 2.0. If a copy of the MPL was not distributed with this
+file, You can obtain one at http://mozilla.org/MPL/2.0/.
+"""
+
+import pytest
+
+pytest.importorskip("PySide")
+from exmodels import getNodesText
+from zincview_watch import getTimestepPatternRegex, ModelWatcher
+
+
+def test_timestep_pattern_regex():
+    regex = getTimestepPatternRegex("heart{:0>4}.exnode")
+    assert regex.match("heart0012.exnode").group(1) == "0012"
+    assert regex.match("heart0012.exnodes") is None
+    with pytest.raises(ValueError):
+        getTimestepPatternRegex("heart.exnode")
+
+
+def test_changes_reported_once_settled(application, tmp_path):
+    (tmp_path / "step1.exnode").write_text("1")
+    watcher = ModelWatcher()
+    watcher.addTimestepPattern(str(tmp_path), "step{}.exnode", timeScale=0.5)
+    watcher.addFile(str(tmp_path / "mesh.exelem"))
+    reported = []
+    watcher.filesChanged.connect(reported.append)
+    watcher.start()
+    (tmp_path / "step2.exnode").write_text("2")
+    (tmp_path / "mesh.exelem").write_text("mesh")
+    watcher.scan()
+    assert reported == []
+    watcher.scan()
+    watcher.stop()
+    # files without time come first
+    assert reported == [[(str(tmp_path / "mesh.exelem"), None), (str(tmp_path / "step2.exnode"), 1.0)]]
+
+
+@pytest.fixture
+def filesChangedView():
+    pytest.importorskip("opencmiss.zinc")
+    pytest.importorskip("opencmiss.zincwidgets")
+    from opencmiss.zinc.context import Context
+    from zincview import ZincView
+
+    class View(object):
+        '''
+        ZincView method re-reading changed files with the state it updates.
+        '''
+        _modelFilesChanged = ZincView._modelFilesChanged
+
+        def __init__(self):
+            self._context = Context("test")
+            self._rootRegion = self._context.getDefaultRegion()
+            self._probes = []
+            self._probeValueCache = {"value": 1.0}
+            self.calls = []
+
+        def frameCacheClear(self):
+            self.calls.append("frameCacheClear")
+
+        def _spectrumHistogramCacheClear(self):
+            self.calls.append("histogramCacheClear")
+
+        def _modelTimesChanged(self, oldTimes, changedTimes):
+            self.calls.append(("timesChanged", oldTimes, changedTimes))
+
+    yield View()
+
+
+def test_files_changed_with_and_without_time(filesChangedView, tmp_path):
+    view = filesChangedView
+    timeless = tmp_path / "static.exnode"
+    timeless.write_text(getNodesText([("v", 1)], [(2, [1.0])]))
+    timed = tmp_path / "step2.exnode"
+    timed.write_text(getNodesText([("u", 1)], [(1, [2.0])]))
+    view._modelFilesChanged([(str(timeless), None), (str(timed), 2.0)])
+    # caches are cleared for the file without time and the time range
+    # is still extended for the timed file
+    assert view.calls == ["frameCacheClear", "histogramCacheClear", ("timesChanged", [], [2.0])]
+    assert view._probeValueCache == {}
+    view.calls = []
+    view._modelFilesChanged([(str(timed), 2.0)])
+    assert view.calls == [("timesChanged", [2.0], [2.0])]